@@ -0,0 +1,243 @@
+"""
+This module is for offline reports over the whole manuscript history.
+
+Events are streamed out of the event log in batches into a handful of
+NumPy columns: manuscript, seq, state, action, actor and timestamp.
+Strings are stored as small integer codes into lookup tables, so a
+million events take a few tens of megabytes, and every report is a
+few vectorized passes over the columns instead of a loop over dicts:
+
+- funnel: per monthly cohort of submissions, how many manuscripts ever
+  reached each of a list of states
+- dwell_times: how long manuscripts stay in each state
+- throughput: how many times each actor took given actions, per month
+
+Run it as a module to print all three as JSON.
+"""
+import json
+from datetime import datetime
+
+import numpy as np
+import pymongo as pm
+
+import data.db_connect as dbc
+import data.events as evt
+
+# Columns
+MANUSCRIPT = 'manuscript'
+SEQ = 'seq'
+STATE = 'state'
+ACTION = 'action'
+ACTOR = 'actor'
+TIMESTAMP = 'timestamp'
+# Lookup tables: code -> value, for the coded columns
+TABLES = 'tables'
+
+# Event fields
+STATE_KEY = 'state'
+ACTION_KEY = 'action'
+ACTOR_KEY = 'actor'
+
+# Report keys
+COHORT_SIZE = 'submitted'
+COUNT = 'count'
+MEAN_HOURS = 'mean_hours'
+MEDIAN_HOURS = 'median_hours'
+P90_HOURS = 'p90_hours'
+
+BATCH_SIZE = 10000
+EPOCH = datetime(1970, 1, 1)
+
+DTYPES = {
+    MANUSCRIPT: np.int32,
+    SEQ: np.int32,
+    STATE: np.int16,
+    ACTION: np.int16,
+    ACTOR: np.int32,
+    TIMESTAMP: np.float64,
+}
+CODED = (MANUSCRIPT, STATE, ACTION, ACTOR)
+
+
+def _seconds(timestamp) -> float:
+    """Seconds since the epoch, NaN if unknown."""
+    if type(timestamp) is datetime and timestamp.tzinfo is None:
+        return (timestamp - EPOCH).total_seconds()
+    timestamp = dbc.to_utc(timestamp)
+    return timestamp.timestamp() if timestamp else np.nan
+
+
+def columns_from(events, size_hint: int = 0) -> dict:
+    """
+    Pack event dicts, ordered by manuscript and seq, into columns.
+    Arrays are preallocated from size_hint and doubled if it was low.
+    """
+    size = max(size_hint, 1)
+    columns = {name: np.empty(size, dtype) for name, dtype in DTYPES.items()}
+    tables = {name: {} for name in CODED}
+    keys = {MANUSCRIPT: evt.MANUSCRIPT_ID, STATE: STATE_KEY,
+            ACTION: ACTION_KEY, ACTOR: ACTOR_KEY}
+    n = 0
+    for event in events:
+        if n == size:
+            size *= 2
+            for name in columns:
+                columns[name] = np.resize(columns[name], size)
+        for name in CODED:
+            table = tables[name]
+            columns[name][n] = table.setdefault(event.get(keys[name]),
+                                                len(table))
+        columns[SEQ][n] = event.get(evt.SEQ, 0)
+        columns[TIMESTAMP][n] = _seconds(event.get(evt.TIMESTAMP))
+        n += 1
+    columns = {name: column[:n] for name, column in columns.items()}
+    columns[TABLES] = {name: list(table) for name, table in tables.items()}
+    return columns
+
+
+def load_events(since=None, until=None,
+                batch_size: int = BATCH_SIZE) -> dict:
+    """
+    Stream the event log, optionally only since <= timestamp < until,
+    into columns. Walks the (manuscript_id, seq) index, so each
+    manuscript's events arrive together and in order.
+    """
+    filt = {}
+    if since is not None or until is not None:
+        filt[evt.TIMESTAMP] = {}
+        if since is not None:
+            filt[evt.TIMESTAMP]['$gte'] = since
+        if until is not None:
+            filt[evt.TIMESTAMP]['$lt'] = until
+    collection = dbc.client[dbc.JOURNAL_DB][evt.EVENTS_COLLECTION]
+    cursor = collection.find(
+        filt,
+        {dbc.MONGO_ID: 0, evt.MANUSCRIPT_ID: 1, evt.SEQ: 1,
+         evt.TIMESTAMP: 1, STATE_KEY: 1, ACTION_KEY: 1, ACTOR_KEY: 1},
+        batch_size=batch_size,
+    ).sort([(evt.MANUSCRIPT_ID, pm.ASCENDING), (evt.SEQ, pm.ASCENDING)])
+    return columns_from(cursor, collection.count_documents(filt))
+
+
+def _code(columns: dict, name: str, value) -> int:
+    """The code of value in a lookup table, or -1 if absent."""
+    table = columns[TABLES][name]
+    return table.index(value) if value in table else -1
+
+
+def _months(seconds: np.ndarray) -> np.ndarray:
+    """Map epoch seconds to numpy months."""
+    return seconds.astype('datetime64[s]').astype('datetime64[M]')
+
+
+def _first_rows(manuscripts: np.ndarray) -> np.ndarray:
+    """Row of each manuscript's first event; rows are grouped."""
+    starts = np.flatnonzero(np.diff(manuscripts)) + 1
+    return np.concatenate([[0], starts]) if len(manuscripts) else starts
+
+
+def funnel(columns: dict, states: list) -> dict:
+    """
+    Return {cohort month: {COHORT_SIZE: n, state: reached, ...}}:
+    manuscripts grouped by the month of their first event, and how many
+    in each group ever reached each of states.
+    """
+    manuscripts = columns[MANUSCRIPT]
+    if not len(manuscripts):
+        return {}
+    n_manuscripts = len(columns[TABLES][MANUSCRIPT])
+    first = _first_rows(manuscripts)
+    cohort_month = np.full(n_manuscripts, np.datetime64('NaT'),
+                           'datetime64[M]')
+    valid = ~np.isnan(columns[TIMESTAMP][first])
+    cohort_month[manuscripts[first][valid]] = _months(
+        columns[TIMESTAMP][first][valid])
+    months, cohort = np.unique(cohort_month, return_inverse=True)
+    report = {}
+    counts = {COHORT_SIZE: np.bincount(cohort, minlength=len(months))}
+    for state in states:
+        in_state = columns[STATE] == _code(columns, STATE, state)
+        reached = np.zeros(n_manuscripts, bool)
+        reached[manuscripts[in_state]] = True
+        counts[state] = np.bincount(cohort, weights=reached,
+                                    minlength=len(months))
+    for i, month in enumerate(months):
+        if np.isnat(month):
+            continue
+        report[str(month)] = {name: int(values[i])
+                              for name, values in counts.items()}
+    return report
+
+
+def dwell_times(columns: dict) -> dict:
+    """
+    Return {state: {COUNT, MEAN_HOURS, MEDIAN_HOURS, P90_HOURS}} for
+    every completed stay in a state: from the event that moved a
+    manuscript into it to the next event that moved it out.
+    Consecutive events in the same state are one stay.
+    """
+    manuscripts = columns[MANUSCRIPT]
+    states = columns[STATE]
+    if not len(manuscripts):
+        return {}
+    new_run = np.ones(len(states), bool)
+    new_run[1:] = (states[1:] != states[:-1]) | (
+        manuscripts[1:] != manuscripts[:-1])
+    runs = np.flatnonzero(new_run)
+    ended = manuscripts[runs[1:]] == manuscripts[runs[:-1]]
+    entered, left = runs[:-1][ended], runs[1:][ended]
+    hours = (columns[TIMESTAMP][left] - columns[TIMESTAMP][entered]) / 3600
+    run_states = states[entered]
+    known = ~np.isnan(hours)
+    hours, run_states = hours[known], run_states[known]
+    report = {}
+    for code in np.unique(run_states):
+        stays = hours[run_states == code]
+        report[columns[TABLES][STATE][code]] = {
+            COUNT: int(len(stays)),
+            MEAN_HOURS: round(float(stays.mean()), 2),
+            MEDIAN_HOURS: round(float(np.median(stays)), 2),
+            P90_HOURS: round(float(np.percentile(stays, 90)), 2),
+        }
+    return report
+
+
+def throughput(columns: dict, actions: list) -> dict:
+    """
+    Return {actor: {month: count}} for events taking any of actions,
+    e.g. the editorial decisions each editor made per month.
+    """
+    codes = [_code(columns, ACTION, action) for action in actions]
+    chosen = np.isin(columns[ACTION], codes) & ~np.isnan(
+        columns[TIMESTAMP])
+    if not chosen.any():
+        return {}
+    actors = columns[ACTOR][chosen]
+    months, month_index = np.unique(_months(columns[TIMESTAMP][chosen]),
+                                    return_inverse=True)
+    pairs, counts = np.unique(actors.astype(np.int64) * len(months)
+                              + month_index, return_counts=True)
+    report = {}
+    for pair, count in zip(pairs, counts):
+        actor = columns[TABLES][ACTOR][pair // len(months)]
+        report.setdefault(actor, {})[str(months[pair % len(months)])] = (
+            int(count))
+    return report
+
+
+def main():
+    import data.manuscripts as ms
+    columns = load_events()
+    print(json.dumps({
+        'events': int(len(columns[SEQ])),
+        'funnel': funnel(columns, [ms.STATE_REFEREE_REVIEW,
+                                   ms.STATE_COPY_EDIT, ms.STATE_PUBLISHED,
+                                   ms.STATE_REJECTED]),
+        'dwell_times': dwell_times(columns),
+        'throughput': throughput(columns, [ms.ACTION_ACCEPT,
+                                           ms.ACTION_REJECT]),
+    }, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
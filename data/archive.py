@@ -0,0 +1,112 @@
+"""
+This module is the archive tier for closed manuscripts.
+
+Manuscripts that have been published, rejected or withdrawn for long
+enough are moved out of the hot manuscripts collection into
+ARCHIVE_COLLECTION. Each archived manuscript is one document with the
+same _id, a few uncompressed fields for listing, and the whole
+manuscript as zlib-compressed BSON, so old revisions and histories
+take little space and add nothing to the hot collection's indexes.
+The manuscripts module decides what to archive and reads back through
+fetch() when a manuscript is not in the hot collection.
+"""
+import os
+import zlib
+
+import bson
+import pymongo as pm
+from bson import ObjectId
+
+import data.db_connect as dbc
+
+ARCHIVE_COLLECTION = 'manuscripts_archive'
+
+# Archive document fields
+STATE = 'state'
+TITLE = 'title'
+AUTHOR_EMAIL = 'author_email'
+CLOSED_AT = 'closed_at'
+ARCHIVED_AT = 'archived_at'
+BLOB = 'blob'
+
+# How long a manuscript stays closed before it is archived
+ARCHIVE_AFTER_DAYS_ENV = 'JOURNAL_ARCHIVE_AFTER_DAYS'
+DEFAULT_ARCHIVE_AFTER_DAYS = 365
+
+COMPRESSION_LEVEL = 6
+
+dbc.connect_db()
+
+
+def init_indexes():
+    """Create the indexes used to list the archive."""
+    dbc.create_index(ARCHIVE_COLLECTION, [(AUTHOR_EMAIL, pm.ASCENDING)])
+    dbc.create_index(ARCHIVE_COLLECTION, [(ARCHIVED_AT, pm.ASCENDING)])
+
+
+init_indexes()
+
+
+def archive_after_days() -> int:
+    """The configured age, in days, at which closed manuscripts move."""
+    return int(os.environ.get(ARCHIVE_AFTER_DAYS_ENV,
+                              DEFAULT_ARCHIVE_AFTER_DAYS))
+
+
+def pack(manuscript: dict, closed_at=None) -> dict:
+    """Build the archive document for a manuscript."""
+    return {
+        dbc.MONGO_ID: ObjectId(str(manuscript[dbc.MONGO_ID])),
+        STATE: manuscript.get(STATE),
+        TITLE: manuscript.get(TITLE),
+        AUTHOR_EMAIL: manuscript.get(AUTHOR_EMAIL),
+        CLOSED_AT: closed_at,
+        ARCHIVED_AT: dbc.now(),
+        BLOB: bson.Binary(zlib.compress(bson.encode(manuscript),
+                                        COMPRESSION_LEVEL)),
+    }
+
+
+def unpack(doc: dict) -> dict:
+    """Return the manuscript stored in an archive document."""
+    manuscript = bson.decode(zlib.decompress(doc[BLOB]))
+    dbc.convert_mongo_id(manuscript)
+    return manuscript
+
+
+def store(docs: list):
+    """Write archive documents, replacing any earlier copies."""
+    if docs:
+        dbc.bulk_write(ARCHIVE_COLLECTION, [
+            pm.ReplaceOne({dbc.MONGO_ID: doc[dbc.MONGO_ID]}, doc,
+                          upsert=True)
+            for doc in docs])
+
+
+def fetch(manuscript_id: str):
+    """Return an archived manuscript, or None if it is not archived."""
+    doc = dbc.client[dbc.JOURNAL_DB][ARCHIVE_COLLECTION].find_one(
+        {dbc.MONGO_ID: ObjectId(manuscript_id)})
+    return unpack(doc) if doc else None
+
+
+def take(manuscript_id: str, filt: dict = None):
+    """
+    Atomically drop an archived manuscript, if it also matches filt,
+    and return it; None if nothing matched.
+    """
+    doc = dbc.fetch_and_del_one(ARCHIVE_COLLECTION, {
+        **(filt or {}), dbc.MONGO_ID: ObjectId(manuscript_id)})
+    return unpack(doc) if doc else None
+
+
+def remove(manuscript_ids: list):
+    """Drop manuscripts from the archive."""
+    if manuscript_ids:
+        dbc.del_many(ARCHIVE_COLLECTION, {dbc.MONGO_ID: {
+            '$in': [ObjectId(str(mid)) for mid in manuscript_ids]}})
+
+
+def count() -> int:
+    """How many manuscripts are archived."""
+    return dbc.count(ARCHIVE_COLLECTION, {})
@@ -0,0 +1,77 @@
+"""
+This module stores revision bodies content-addressed.
+
+Each distinct text is one document whose _id is the SHA-256 of the
+text, with a count of the revisions referring to it. Revisions hold
+the hash instead of the text, so a body resubmitted unchanged, or the
+same abstract on several manuscripts, is stored once. put() takes a
+reference for every text it is given and release() gives them back;
+a blob is deleted once nothing refers to it.
+"""
+import hashlib
+from collections import Counter
+
+import pymongo as pm
+
+import data.db_connect as dbc
+
+BLOBS_COLLECTION = 'revision_blobs'
+
+CONTENT = 'content'
+REFS = 'refs'
+
+dbc.connect_db()
+
+
+def key_of(content: str) -> str:
+    """The hash a text is stored under."""
+    return hashlib.sha256((content or '').encode('utf-8')).hexdigest()
+
+
+def put(contents: list) -> list:
+    """
+    Store texts, taking one reference to each, in one round trip.
+    Returns their hashes, in order.
+    """
+    keys = [key_of(content) for content in contents]
+    texts = dict(zip(keys, contents))
+    counts = Counter(keys)
+    dbc.bulk_write(BLOBS_COLLECTION, [
+        pm.UpdateOne({dbc.MONGO_ID: key},
+                     {'$setOnInsert': {CONTENT: texts[key] or ''},
+                      '$inc': {REFS: count}},
+                     upsert=True)
+        for key, count in counts.items()])
+    return keys
+
+
+def release(keys: list):
+    """
+    Give back one reference per hash in keys and delete blobs nothing
+    refers to any more. A put() racing with the delete either keeps
+    the blob alive or recreates it.
+    """
+    counts = Counter(key for key in keys if key)
+    if not counts:
+        return
+    dbc.bulk_write(BLOBS_COLLECTION, [
+        pm.UpdateOne({dbc.MONGO_ID: key}, {'$inc': {REFS: -count}})
+        for key, count in counts.items()])
+    dbc.del_many(BLOBS_COLLECTION, {dbc.MONGO_ID: {'$in': list(counts)},
+                                    REFS: {'$lte': 0}})
+
+
+def get_many(keys) -> dict:
+    """Return {hash: text} for the stored hashes among keys."""
+    keys = list(set(key for key in keys if key))
+    if not keys:
+        return {}
+    return {blob[dbc.MONGO_ID]: blob[CONTENT]
+            for blob in dbc.fetch_many(BLOBS_COLLECTION,
+                                       {dbc.MONGO_ID: {'$in': keys}})}
+
+
+def refs(key: str) -> int:
+    """How many references a blob has; 0 if it is not stored."""
+    blob = dbc.fetch_one(BLOBS_COLLECTION, {dbc.MONGO_ID: key})
+    return blob[REFS] if blob else 0
@@ -0,0 +1,127 @@
+"""
+This module is an in-process cache of serialized responses.
+
+Each entry is the encoded body of a response plus the tags of the data
+it was built from, such as 'users' or 'texts'. The data modules call
+invalidate() with their tag on every write; that bumps the tag's
+generation, and entries stored under an older generation are treated
+as missing. Entries also expire after their TTL, which bounds how
+stale a cache in another server process can get, and the least
+recently used entries are dropped once the cache is full. An entry
+can also keep compressed copies of its body, so each encoding is only
+computed once per entry.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Tags for the data responses are built from
+TAG_USERS = 'users'
+TAG_ROLES = 'roles'
+TAG_TEXTS = 'texts'
+
+SIZE_ENV = 'JOURNAL_RESPONSE_CACHE_SIZE'
+DEFAULT_SIZE = 512
+DEFAULT_TTL = 60
+
+# Entry fields
+BODY = 'body'
+EXPIRES = 'expires'
+GENERATIONS = 'generations'
+VARIANTS = 'variants'
+
+# key -> entry, oldest use first
+entries = OrderedDict()
+# tag -> number of times it was invalidated
+generations = {}
+lock = threading.Lock()
+
+
+def size() -> int:
+    """How many responses the cache holds."""
+    return int(os.environ.get(SIZE_ENV, DEFAULT_SIZE))
+
+
+def stamp(tags) -> dict:
+    """
+    Return the current generations of tags. Take this before reading
+    the data a response is built from, so a write made meanwhile makes
+    the stored entry stale.
+    """
+    with lock:
+        return _generations(tags)
+
+
+def _generations(tags) -> dict:
+    return {tag: generations.get(tag, 0) for tag in tags}
+
+
+def _live(key: str):
+    """Return the entry for key if it is fresh, dropping it if not."""
+    entry = entries.get(key)
+    if entry is None:
+        return None
+    if (entry[EXPIRES] <= time.monotonic()
+            or entry[GENERATIONS] != _generations(entry[GENERATIONS])):
+        del entries[key]
+        return None
+    return entry
+
+
+def get(key: str):
+    """Return the cached body for key, or None if missing or stale."""
+    with lock:
+        entry = _live(key)
+        if entry is None:
+            return None
+        entries.move_to_end(key)
+        return entry[BODY]
+
+
+def get_variant(key: str, encoding: str):
+    """Return the body for key compressed with encoding, if kept."""
+    with lock:
+        entry = _live(key)
+        return entry[VARIANTS].get(encoding) if entry else None
+
+
+def put_variant(key: str, encoding: str, source: bytes, body: bytes):
+    """
+    Keep body, source compressed with encoding, as a copy of key's
+    body, if key is still cached with source as its body.
+    """
+    with lock:
+        entry = _live(key)
+        if entry is not None and entry[BODY] == source:
+            entry[VARIANTS][encoding] = body
+
+
+def put(key: str, body, tags: dict, ttl: float = DEFAULT_TTL):
+    """
+    Cache body under key until ttl seconds pass or one of the tags in
+    the stamp() taken before building it is invalidated.
+    """
+    with lock:
+        entries[key] = {
+            BODY: body,
+            EXPIRES: time.monotonic() + ttl,
+            GENERATIONS: dict(tags),
+            VARIANTS: {},
+        }
+        entries.move_to_end(key)
+        while len(entries) > size():
+            entries.popitem(last=False)
+
+
+def invalidate(*tags):
+    """Make every entry built from any of tags stale."""
+    with lock:
+        for tag in tags:
+            generations[tag] = generations.get(tag, 0) + 1
+
+
+def clear():
+    """Drop every entry."""
+    with lock:
+        entries.clear()
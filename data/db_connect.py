@@ -1,6 +1,8 @@
 import os
+from datetime import datetime, timezone
 
 import pymongo as pm
+from pymongo.errors import BulkWriteError
 
 LOCAL = "0"
 CLOUD = "1"
@@ -46,6 +48,38 @@ def connect_db():
             client = pm.MongoClient()
 
 
+def now() -> datetime:
+    """
+    The current time as a timezone-aware UTC datetime.
+    Mongo stores these as native BSON dates, so always use this
+    rather than local time or ISO strings for stored timestamps.
+    """
+    return datetime.now(timezone.utc)
+
+
+def to_utc(value) -> datetime:
+    """
+    Convert a stored timestamp to an aware UTC datetime.
+    Accepts ISO strings (naive ones are taken as server local time,
+    which is how they used to be written) and datetimes (naive ones
+    are taken as UTC, which is how Mongo returns them).
+    Returns None for anything else.
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+        if value.tzinfo is None:
+            value = value.astimezone()
+    elif isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+    else:
+        return None
+    return value.astimezone(timezone.utc)
+
+
 def convert_mongo_id(doc: dict):
     if MONGO_ID in doc:
         doc[MONGO_ID] = str(doc[MONGO_ID])
@@ -58,13 +92,15 @@ def insert_one(collection, doc, db=JOURNAL_DB, testing=False):
     return client[db][collection].insert_one(doc)
 
 
-def fetch_one(collection, filt, db=JOURNAL_DB, testing=False):
+def fetch_one(collection, filt, db=JOURNAL_DB, testing=False,
+              projection=None):
     """
-    Find with a filter and return only the first doc found.
+    Find with a filter and return only the first doc found,
+    optionally with only the fields in projection.
     Return None if not found.
     """
     try:
-        for doc in client[db][collection].find(filt):
+        for doc in client[db][collection].find(filt, projection):
             if MONGO_ID in doc:
                 doc[MONGO_ID] = str(doc[MONGO_ID])
             return doc
@@ -80,6 +116,29 @@ def del_one(collection, filt, db=JOURNAL_DB, testing=False):
     client[db][collection].delete_one(filt)
 
 
+def fetch_and_del_one(collection, filt, db=JOURNAL_DB):
+    """
+    Delete the first doc matching a filter in one atomic step.
+    Returns the deleted doc, or None if nothing matched.
+    """
+    doc = client[db][collection].find_one_and_delete(filt)
+    if doc:
+        convert_mongo_id(doc)
+    return doc
+
+
+def fetch_and_update_one(collection, filt, update, db=JOURNAL_DB):
+    """
+    Update the first doc matching a filter in one atomic step.
+    Returns the doc as it was before the update, or None if nothing
+    matched.
+    """
+    doc = client[db][collection].find_one_and_update(filt, update)
+    if doc:
+        convert_mongo_id(doc)
+    return doc
+
+
 def update_doc(
         collection,
         filters,
@@ -130,3 +189,76 @@ def fetch_all_as_dict(key, collection, db=JOURNAL_DB, remove_id=True):
     except Exception as e:
         print(f"Error fetching all documents as dict: {e}")
     return ret
+
+
+def create_index(collection, keys, unique=False, db=JOURNAL_DB):
+    """
+    Ensure an index exists on collection.
+    keys is a list of (field, direction) pairs, as pymongo expects.
+    """
+    return client[db][collection].create_index(keys, unique=unique)
+
+
+def fetch_many(collection, filt, sort=None, limit=0, projection=None,
+               db=JOURNAL_DB):
+    """
+    Find all docs matching a filter, optionally sorted and limited.
+    sort is a list of (field, direction) pairs.
+    """
+    ret = []
+    try:
+        cursor = client[db][collection].find(filt, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        for doc in cursor:
+            convert_mongo_id(doc)
+            ret.append(doc)
+    except Exception as e:
+        print(f"Error fetching documents: {e}")
+    return ret
+
+
+def count(collection, filt, db=JOURNAL_DB):
+    """
+    Count the docs matching a filter.
+    """
+    return client[db][collection].count_documents(filt)
+
+
+def del_many(collection, filt, db=JOURNAL_DB):
+    """
+    Delete every doc matching a filter.
+    """
+    return client[db][collection].delete_many(filt)
+
+
+def insert_many(collection, docs, db=JOURNAL_DB):
+    """
+    Insert docs in one round trip, carrying on past failures.
+    Returns the set of positions in docs that failed to insert.
+    """
+    if not docs:
+        return set()
+    try:
+        client[db][collection].insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        return {err['index'] for err in e.details.get('writeErrors', [])}
+    return set()
+
+
+def bulk_write(collection, ops, db=JOURNAL_DB):
+    """
+    Send a list of pymongo write operations in one round trip.
+    """
+    if not ops:
+        return None
+    return client[db][collection].bulk_write(ops, ordered=False)
+
+
+def upsert_doc(collection, filt, doc, db=JOURNAL_DB):
+    """
+    Replace the doc matching a filter, inserting it if there is none.
+    """
+    return client[db][collection].replace_one(filt, doc, upsert=True)
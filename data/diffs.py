@@ -0,0 +1,204 @@
+"""
+This module computes and caches diffs between manuscript revisions.
+
+Stored revisions never change, so a diff between two versions of a
+manuscript is computed once and kept in a bounded in-process cache,
+least recently used first out. Diffing runs in the worker process
+pool: request() only hands the work off and reports it as pending, and
+a callback files the result when it is ready. A diff whose
+computation raises is remembered too, since it would fail the same
+way again, so callers get the error instead of retrying it on every
+poll. A worker or pool failure is not: the next request tries again.
+compute() is a plain function of its arguments so it can run in the
+pool.
+"""
+import difflib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import data.workers as wrk
+
+MODE_LINES = 'lines'
+MODE_WORDS = 'words'
+MODES = (MODE_LINES, MODE_WORDS)
+
+# Diff keys
+MODE = 'mode'
+HUNKS = 'hunks'
+OP = 'op'
+FROM_START = 'from_start'
+TO_START = 'to_start'
+OLD = 'old'
+NEW = 'new'
+ADDED = 'added'
+REMOVED = 'removed'
+
+STATUS_DONE = 'DONE'
+STATUS_PENDING = 'PENDING'
+STATUS_FAILED = 'FAILED'
+
+CACHE_SIZE_ENV = 'JOURNAL_DIFF_CACHE_SIZE'
+DEFAULT_CACHE_SIZE = 256
+
+WORD_RE = re.compile(r'\S+')
+
+# (manuscript_id, from, to, mode) -> diff, oldest use first
+cache = OrderedDict()
+# Keys whose diff raised -> error message, oldest first
+failed = OrderedDict()
+# Keys being computed -> event set once they are done
+pending = {}
+lock = threading.Lock()
+
+
+def cache_size() -> int:
+    """How many diffs the cache holds."""
+    return int(os.environ.get(CACHE_SIZE_ENV, DEFAULT_CACHE_SIZE))
+
+
+def _tokens(text: str, mode: str) -> list:
+    if mode == MODE_WORDS:
+        return WORD_RE.findall(text or '')
+    return (text or '').splitlines()
+
+
+def compute(old_text: str, new_text: str, mode: str = MODE_LINES) -> dict:
+    """
+    Diff two texts by line or by word.
+
+    Returns:
+        The mode, how many lines or words were added and removed, and
+        the hunks that differ: each an op (insert, delete or replace),
+        where it starts in each text and the old and new tokens.
+    """
+    old, new = _tokens(old_text, mode), _tokens(new_text, mode)
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    hunks = []
+    added = removed = 0
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == 'equal':
+            continue
+        hunks.append({OP: op, FROM_START: i1, TO_START: j1,
+                      OLD: old[i1:i2], NEW: new[j1:j2]})
+        removed += i2 - i1
+        added += j2 - j1
+    return {MODE: mode, ADDED: added, REMOVED: removed, HUNKS: hunks}
+
+
+def _compute_or_error(old_text: str, new_text: str, mode: str) -> tuple:
+    """
+    Run compute() in the pool and return (diff, None), or (None, error
+    message) if it raised, so the callback can tell a diff that cannot
+    be computed from a worker that died.
+    """
+    try:
+        return compute(old_text, new_text, mode), None
+    except Exception as e:
+        return None, str(e)
+
+
+def cached(key: tuple):
+    """Return a cached diff, marking it recently used, or None."""
+    with lock:
+        diff = cache.get(key)
+        if diff is not None:
+            cache.move_to_end(key)
+        return diff
+
+
+def _store(key: tuple, diff: dict, store: OrderedDict = cache):
+    with lock:
+        store[key] = diff
+        store.move_to_end(key)
+        while len(store) > cache_size():
+            store.popitem(last=False)
+
+
+def status(key: tuple) -> tuple:
+    """
+    Where the diff for key stands, without starting it:
+    (STATUS_DONE, diff), (STATUS_FAILED, error message),
+    (STATUS_PENDING, None), or (None, None) if it was never requested.
+    """
+    diff = cached(key)
+    if diff is not None:
+        return STATUS_DONE, diff
+    with lock:
+        if key in failed:
+            return STATUS_FAILED, failed[key]
+        if key in pending:
+            return STATUS_PENDING, None
+    return None, None
+
+
+def request(key: tuple, old_text: str, new_text: str) -> tuple:
+    """
+    Return the status() of the diff for key, first starting it in the
+    worker pool if it was never requested, in which case it is
+    (STATUS_PENDING, None). If the work cannot be queued this returns
+    (STATUS_FAILED, error message) but does not remember the failure,
+    so a later request tries again. key ends with the mode.
+    """
+    current = status(key)
+    if current[0] is not None:
+        return current
+    with lock:
+        if key in pending:
+            return STATUS_PENDING, None
+        done = pending[key] = threading.Event()
+    try:
+        future = wrk.submit(_compute_or_error, old_text, new_text, key[-1])
+    except Exception as e:
+        print(f"Error queueing diff: {e}")
+        _finish(key, done, None)
+        return STATUS_FAILED, f'Could not queue diff: {e}'
+    future.add_done_callback(lambda fut: _finish(key, done, fut))
+    return STATUS_PENDING, None
+
+
+def _finish(key: tuple, done: threading.Event, future):
+    """
+    Cache a computed diff, or the error if computing it raised. If
+    the worker itself failed nothing is kept, so the next request
+    starts the diff again. Runs on the executor's callback thread.
+    """
+    try:
+        if future is not None:
+            diff, error = future.result()
+            if error is None:
+                _store(key, diff)
+            else:
+                print(f"Error computing diff {key}: {error}")
+                _store(key, f'Could not compute diff: {error}', failed)
+    except Exception as e:
+        print(f"Error running diff {key}: {e}")
+    finally:
+        with lock:
+            if pending.get(key) is done:
+                del pending[key]
+        done.set()
+
+
+def wait_for(key: tuple, timeout: float = None):
+    """
+    Block until a diff started by this process finishes, then return
+    it, or None if it failed. Meant for scripts and tests.
+    """
+    with lock:
+        done = pending.get(key)
+    if done is not None:
+        done.wait(timeout)
+    return cached(key)
+
+
+def forget(manuscript_id: str):
+    """
+    Drop every cached diff and failure of a manuscript, e.g. when it
+    is deleted.
+    """
+    with lock:
+        for store in (cache, failed):
+            for key in [key for key in store if key[0] == manuscript_id]:
+                del store[key]
@@ -0,0 +1,109 @@
+"""
+This module extracts plain text from Word (.docx) submissions.
+A .docx file is a zip archive; the body lives in word/document.xml
+as OOXML, so we read it directly rather than pulling in a Word library.
+Everything here is pure so it can run inside a worker process.
+"""
+import io
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+DOCUMENT_PART = 'word/document.xml'
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+PARA_TAG = f'{{{W_NS}}}p'
+TEXT_TAG = f'{{{W_NS}}}t'
+TAB_TAG = f'{{{W_NS}}}tab'
+BREAK_TAGS = {f'{{{W_NS}}}br', f'{{{W_NS}}}cr'}
+
+TEXT = 'text'
+ABSTRACT = 'abstract'
+WORD_COUNT = 'word_count'
+ABSTRACT_WORD_COUNT = 'abstract_word_count'
+
+ABSTRACT_HEADING = 'abstract'
+# Sections that mark the end of an abstract when it has no heading break.
+ABSTRACT_END_HEADINGS = {
+    'introduction',
+    'keywords',
+    'key words',
+    'background',
+    '1 introduction',
+    '1. introduction',
+}
+ABSTRACT_PREFIX = re.compile(r'^\s*abstract\s*[:.\-—]\s*', re.IGNORECASE)
+WORD_RE = re.compile(r'\w+(?:[\'’-]\w+)*')
+
+
+def read_paragraphs(docx_bytes: bytes) -> list:
+    """
+    Return the document's paragraphs as a list of strings.
+    Raises ValueError if the bytes are not a readable .docx file.
+    """
+    try:
+        with zipfile.ZipFile(io.BytesIO(docx_bytes)) as archive:
+            xml = archive.read(DOCUMENT_PART)
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise ValueError(f'Not a valid .docx file: {e}')
+    try:
+        root = ET.fromstring(xml)
+    except ET.ParseError as e:
+        raise ValueError(f'Malformed .docx document: {e}')
+    paragraphs = []
+    for para in root.iter(PARA_TAG):
+        parts = []
+        for node in para.iter():
+            if node.tag == TEXT_TAG and node.text:
+                parts.append(node.text)
+            elif node.tag == TAB_TAG:
+                parts.append('\t')
+            elif node.tag in BREAK_TAGS:
+                parts.append('\n')
+        paragraphs.append(''.join(parts))
+    return paragraphs
+
+
+def count_words(text: str) -> int:
+    """Count words the way a word processor roughly would."""
+    return len(WORD_RE.findall(text or ''))
+
+
+def find_abstract(paragraphs: list) -> str:
+    """
+    Find the abstract: either a paragraph starting "Abstract:" or the
+    paragraphs following a lone "Abstract" heading, up to the next
+    blank line or section heading.
+    """
+    for i, para in enumerate(paragraphs):
+        stripped = para.strip()
+        if ABSTRACT_PREFIX.match(stripped):
+            return ABSTRACT_PREFIX.sub('', stripped, count=1)
+        if stripped.lower() == ABSTRACT_HEADING:
+            body = []
+            for following in paragraphs[i + 1:]:
+                following = following.strip()
+                if not following:
+                    if body:
+                        break
+                    continue
+                if following.lower().rstrip(':') in ABSTRACT_END_HEADINGS:
+                    break
+                body.append(following)
+            return '\n'.join(body)
+    return ''
+
+
+def extract(docx_bytes: bytes) -> dict:
+    """
+    Parse a .docx file and return its text, abstract and word counts.
+    """
+    paragraphs = read_paragraphs(docx_bytes)
+    text = '\n'.join(paragraphs).strip()
+    abstract = find_abstract(paragraphs)
+    return {
+        TEXT: text,
+        ABSTRACT: abstract,
+        WORD_COUNT: count_words(text),
+        ABSTRACT_WORD_COUNT: count_words(abstract),
+    }
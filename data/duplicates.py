@@ -0,0 +1,187 @@
+"""
+This module spots near-duplicate manuscripts and heavy text reuse.
+
+Each manuscript's text is cut into overlapping word shingles and
+summarised by a MinHash signature, whose agreement with another
+signature estimates the Jaccard similarity of the two shingle sets.
+Signatures are split into bands and bucketed (locality-sensitive
+hashing), so a lookup only compares against manuscripts sharing a
+bucket rather than the whole corpus.
+
+Signatures are stored in the DB. The buckets are rebuilt from them on
+first use, so nothing has to be rehashed after a restart. Changing
+NUM_PERM, SHINGLE_SIZE or HASH_SEED invalidates the stored signatures.
+"""
+import re
+import threading
+import zlib
+
+import numpy as np
+
+import data.db_connect as dbc
+
+SIGNATURES_COLLECTION = 'manuscript_signatures'
+
+MANUSCRIPT_ID = 'manuscript_id'
+SIGNATURE = 'signature'
+SIMILARITY = 'similarity'
+KIND = 'kind'
+
+KIND_DUPLICATE = 'near_duplicate'
+KIND_OVERLAP = 'overlap'
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+HASH_SEED = 20241
+# Mersenne prime modulus; shingle hashes are kept below it so a*x + b
+# fits in 64 bits.
+PRIME = (1 << 31) - 1
+
+# Estimated Jaccard similarity at or above which a pair is flagged.
+DUPLICATE_THRESHOLD = 0.8
+OVERLAP_THRESHOLD = 0.5
+
+WORD_RE = re.compile(r'\w+')
+
+_rng = np.random.default_rng(HASH_SEED)
+_coef_a = _rng.integers(1, PRIME, NUM_PERM, dtype=np.uint64)
+_coef_b = _rng.integers(0, PRIME, NUM_PERM, dtype=np.uint64)
+
+signatures = {}
+buckets = {}
+loaded = False
+lock = threading.Lock()
+
+dbc.connect_db()
+
+
+def init_indexes():
+    """Create the index signature writes rely on."""
+    dbc.create_index(SIGNATURES_COLLECTION, [(MANUSCRIPT_ID, 1)],
+                     unique=True)
+
+
+init_indexes()
+
+
+def shingles(text: str) -> np.ndarray:
+    """
+    Return the hashes of the text's SHINGLE_SIZE-word shingles; empty
+    if the text is shorter than one shingle.
+    """
+    words = WORD_RE.findall((text or '').lower())
+    hashes = {
+        zlib.crc32(' '.join(words[i:i + SHINGLE_SIZE]).encode()) % PRIME
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+
+def signature(text: str) -> np.ndarray:
+    """
+    Return the MinHash signature of text, or None if it is too short
+    to have one.
+    """
+    hashes = shingles(text)
+    if not len(hashes):
+        return None
+    permuted = (np.outer(_coef_a, hashes) + _coef_b[:, None]) % PRIME
+    return permuted.min(axis=1)
+
+
+def _band_keys(sig: np.ndarray) -> list:
+    return [(band, sig[band * ROWS:(band + 1) * ROWS].tobytes())
+            for band in range(BANDS)]
+
+
+def _index(manuscript_id: str, sig: np.ndarray):
+    """Add a signature to the buckets. Caller holds lock."""
+    _unindex(manuscript_id)
+    signatures[manuscript_id] = sig
+    for key in _band_keys(sig):
+        buckets.setdefault(key, set()).add(manuscript_id)
+
+
+def _unindex(manuscript_id: str):
+    """Take a signature out of the buckets. Caller holds lock."""
+    old = signatures.pop(manuscript_id, None)
+    if old is None:
+        return
+    for key in _band_keys(old):
+        bucket = buckets.get(key)
+        if bucket is not None:
+            bucket.discard(manuscript_id)
+            if not bucket:
+                del buckets[key]
+
+
+def load():
+    """Rebuild the buckets from the stored signatures."""
+    global loaded
+    with lock:
+        signatures.clear()
+        buckets.clear()
+        for doc in dbc.fetch_many(SIGNATURES_COLLECTION, {},
+                                  projection={dbc.MONGO_ID: 0}):
+            _index(doc[MANUSCRIPT_ID],
+                   np.array(doc[SIGNATURE], dtype=np.uint64))
+        loaded = True
+
+
+def _ensure_loaded():
+    if not loaded:
+        load()
+
+
+def find_similar(sig: np.ndarray, exclude_id: str = None) -> list:
+    """
+    Return {manuscript_id, similarity, kind} for every indexed
+    manuscript whose estimated similarity to sig reaches
+    OVERLAP_THRESHOLD, most similar first.
+    """
+    _ensure_loaded()
+    with lock:
+        candidates = set()
+        for key in _band_keys(sig):
+            candidates |= buckets.get(key, set())
+        candidates.discard(exclude_id)
+        found = []
+        for candidate in candidates:
+            similarity = float(np.mean(signatures[candidate] == sig))
+            if similarity >= OVERLAP_THRESHOLD:
+                found.append({
+                    MANUSCRIPT_ID: candidate,
+                    SIMILARITY: round(similarity, 3),
+                    KIND: (KIND_DUPLICATE
+                           if similarity >= DUPLICATE_THRESHOLD
+                           else KIND_OVERLAP),
+                })
+    return sorted(found, key=lambda match: -match[SIMILARITY])
+
+
+def check(manuscript_id: str, text: str) -> list:
+    """
+    Compare a manuscript's text against everything indexed, then store
+    its signature. Returns the matches, as for find_similar().
+    Texts too short to shingle are never flagged or stored.
+    """
+    sig = signature(text)
+    if sig is None:
+        remove(manuscript_id)
+        return []
+    matches = find_similar(sig, exclude_id=manuscript_id)
+    dbc.upsert_doc(SIGNATURES_COLLECTION, {MANUSCRIPT_ID: manuscript_id},
+                   {MANUSCRIPT_ID: manuscript_id,
+                    SIGNATURE: [int(value) for value in sig]})
+    with lock:
+        _index(manuscript_id, sig)
+    return matches
+
+
+def remove(manuscript_id: str):
+    """Forget a manuscript's signature."""
+    dbc.del_many(SIGNATURES_COLLECTION, {MANUSCRIPT_ID: manuscript_id})
+    with lock:
+        _unindex(manuscript_id)
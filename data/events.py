@@ -0,0 +1,116 @@
+"""
+This module is the append-only log of manuscript events.
+Every state change or text update is one small document, numbered per
+manuscript by seq. The unique (manuscript_id, seq) index both serves
+history reads and stops two writers from recording the same step.
+The one exception to append-only is retract(), which takes back events
+whose manuscript snapshot could not be written.
+"""
+import pymongo as pm
+
+import data.db_connect as dbc
+
+EVENTS_COLLECTION = 'manuscript_events'
+
+MANUSCRIPT_ID = 'manuscript_id'
+SEQ = 'seq'
+TIMESTAMP = 'timestamp'
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+dbc.connect_db()
+
+
+def init_indexes():
+    """Create the indexes the event log relies on."""
+    dbc.create_index(EVENTS_COLLECTION,
+                     [(MANUSCRIPT_ID, pm.ASCENDING), (SEQ, pm.ASCENDING)],
+                     unique=True)
+    dbc.create_index(EVENTS_COLLECTION, [(TIMESTAMP, pm.ASCENDING)])
+
+
+init_indexes()
+
+
+def append(manuscript_id: str, seq: int, event: dict) -> dict:
+    """
+    Append an event to a manuscript's log and return the stored record.
+    Raises pymongo.errors.DuplicateKeyError if seq is already taken,
+    which means another writer got there first.
+    """
+    record = {MANUSCRIPT_ID: manuscript_id, SEQ: seq}
+    record.update(event)
+    dbc.insert_one(EVENTS_COLLECTION, record)
+    dbc.convert_mongo_id(record)
+    return record
+
+
+def append_many(records: list) -> set:
+    """
+    Append several already-numbered events in one round trip.
+    Each record must carry its own MANUSCRIPT_ID and SEQ.
+    Returns the positions of records that were not stored because
+    their seq was already taken.
+    """
+    return dbc.insert_many(EVENTS_COLLECTION, records)
+
+
+def retract(entries: list):
+    """
+    Remove the events at the given (manuscript_id, seq) pairs. Only the
+    writer that appended an event may retract it, and only when the
+    snapshot write that follows failed: the snapshot then still points
+    at the previous seq, and leaving the event behind would make every
+    later append for the manuscript collide with it.
+    """
+    if not entries:
+        return
+    dbc.del_many(EVENTS_COLLECTION, {'$or': [
+        {MANUSCRIPT_ID: manuscript_id, SEQ: seq}
+        for manuscript_id, seq in entries
+    ]})
+
+
+def fetch_page(manuscript_id: str, after: int = 0,
+               limit: int = DEFAULT_PAGE_SIZE) -> list:
+    """
+    Return up to limit events for a manuscript with seq > after,
+    oldest first. Walks the (manuscript_id, seq) index, so the cost
+    does not depend on how long the history is.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    return dbc.fetch_many(
+        EVENTS_COLLECTION,
+        {MANUSCRIPT_ID: manuscript_id, SEQ: {'$gt': after}},
+        sort=[(SEQ, pm.ASCENDING)],
+        limit=limit,
+        projection={dbc.MONGO_ID: 0},
+    )
+
+
+def fetch_since(since, until=None, limit: int = 0) -> list:
+    """
+    Return events with since <= timestamp < until, oldest first.
+    This is a range scan on the timestamp index.
+    """
+    time_range = {'$gte': since}
+    if until is not None:
+        time_range['$lt'] = until
+    return dbc.fetch_many(
+        EVENTS_COLLECTION,
+        {TIMESTAMP: time_range},
+        sort=[(TIMESTAMP, pm.ASCENDING), (SEQ, pm.ASCENDING)],
+        limit=limit,
+        projection={dbc.MONGO_ID: 0},
+    )
+
+
+def count(manuscript_id: str) -> int:
+    """Return how many events a manuscript has."""
+    return dbc.count(EVENTS_COLLECTION, {MANUSCRIPT_ID: manuscript_id})
+
+
+def delete_for(manuscript_id: str):
+    """Drop a manuscript's whole log, e.g. when it is deleted."""
+    dbc.del_many(EVENTS_COLLECTION, {MANUSCRIPT_ID: manuscript_id})
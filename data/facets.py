@@ -0,0 +1,133 @@
+"""
+This module keeps facet counts for browsing manuscripts: how many
+manuscripts carry each tag, in each state, by month of submission.
+
+Counts live in one small collection with a document per (tag, state,
+month) cell, updated with $inc as manuscripts are created, tagged,
+moved and deleted, so facets never require reading the manuscripts.
+Every manuscript is also counted once under ALL_TAGS, which is what
+state and month totals are read from when no tag is chosen; summing
+real tags would count a manuscript once per tag.
+"""
+import pymongo as pm
+
+import data.db_connect as dbc
+
+FACETS_COLLECTION = 'manuscript_facets'
+
+TAG = 'tag'
+STATE = 'state'
+MONTH = 'month'
+COUNT = 'count'
+
+# The tag every manuscript is counted under, tagged or not
+ALL_TAGS = ''
+
+# Result keys
+TOTAL = 'total'
+STATES = 'states'
+MONTHS = 'months'
+TAGS = 'tags'
+
+DEFAULT_TOP_TAGS = 20
+MAX_TOP_TAGS = 200
+
+dbc.connect_db()
+
+
+def init_indexes():
+    """Create the index that makes each cell unique."""
+    dbc.create_index(FACETS_COLLECTION,
+                     [(TAG, pm.ASCENDING), (STATE, pm.ASCENDING),
+                      (MONTH, pm.ASCENDING)], unique=True)
+
+
+init_indexes()
+
+
+def month_of(timestamp) -> str:
+    """Return the 'YYYY-MM' a timestamp falls in, or None."""
+    if timestamp is None:
+        return None
+    if isinstance(timestamp, str):
+        return timestamp[:7]
+    return timestamp.strftime('%Y-%m')
+
+
+def adjust(changes: dict):
+    """
+    Apply count changes in one round trip.
+
+    Args:
+        changes: {(tag, state, month): delta}; zero deltas are skipped
+    """
+    ops = [pm.UpdateOne({TAG: tag, STATE: state, MONTH: month},
+                        {'$inc': {COUNT: delta}}, upsert=True)
+           for (tag, state, month), delta in changes.items() if delta]
+    if not ops:
+        return
+    dbc.bulk_write(FACETS_COLLECTION, ops)
+    if any(delta < 0 for delta in changes.values()):
+        dbc.del_many(FACETS_COLLECTION, {COUNT: {'$lte': 0}})
+
+
+def replace_all(counts: dict):
+    """Reset every count, e.g. after a rebuild from the manuscripts."""
+    dbc.del_many(FACETS_COLLECTION, {})
+    docs = [{TAG: tag, STATE: state, MONTH: month, COUNT: count}
+            for (tag, state, month), count in counts.items() if count > 0]
+    if docs:
+        dbc.insert_many(FACETS_COLLECTION, docs)
+
+
+def _grouped(filt: dict, field: str, limit: int = 0) -> list:
+    """Sum counts of the cells matching filt, per value of field."""
+    pipeline = [
+        {'$match': filt},
+        {'$group': {dbc.MONGO_ID: f'${field}', COUNT: {'$sum': f'${COUNT}'}}},
+        {'$sort': {COUNT: pm.DESCENDING, dbc.MONGO_ID: pm.ASCENDING}},
+    ]
+    if limit:
+        pipeline.append({'$limit': limit})
+    collection = dbc.client[dbc.JOURNAL_DB][FACETS_COLLECTION]
+    return [(row[dbc.MONGO_ID], row[COUNT])
+            for row in collection.aggregate(pipeline)]
+
+
+def read(tag: str = None, state: str = None, since: str = None,
+         until: str = None, top: int = DEFAULT_TOP_TAGS) -> dict:
+    """
+    Return facet counts for a slice of the manuscripts.
+
+    Args:
+        tag: Only count manuscripts with this tag
+        state: Only count manuscripts in this state
+        since: First submission month to count, as 'YYYY-MM'
+        until: Last submission month to count, as 'YYYY-MM'
+        top: How many of the most common tags to list
+
+    Returns:
+        A dict with the total, counts per state and per month for the
+        slice, and the top tags (with counts) among manuscripts in the
+        chosen states and months.
+    """
+    top = max(1, min(top, MAX_TOP_TAGS))
+    filt = {}
+    if state:
+        filt[STATE] = state
+    if since or until:
+        filt[MONTH] = {}
+        if since:
+            filt[MONTH]['$gte'] = since
+        if until:
+            filt[MONTH]['$lte'] = until
+    sliced = {**filt, TAG: tag or ALL_TAGS}
+    states = dict(_grouped(sliced, STATE))
+    return {
+        TOTAL: sum(states.values()),
+        STATES: states,
+        MONTHS: dict(sorted(_grouped(sliced, MONTH),
+                            key=lambda row: row[0] or '')),
+        TAGS: [{TAG: name, COUNT: count} for name, count in _grouped(
+            {**filt, TAG: {'$ne': ALL_TAGS}}, TAG, top)],
+    }
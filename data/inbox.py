@@ -0,0 +1,118 @@
+"""
+This module stores each user's work inbox: the manuscripts currently
+waiting on them. It is a materialized view. The manuscripts module
+recomputes a manuscript's entries whenever its workflow position
+changes and replaces them here, so reading an inbox is one indexed
+query instead of a scan of every manuscript.
+
+An entry is owned by one user's email, or by a role when nobody in
+particular is responsible yet (e.g. an editor queue for manuscripts
+with no assigned editor).
+"""
+import pymongo as pm
+
+import data.db_connect as dbc
+
+INBOX_COLLECTION = 'inbox'
+
+OWNER = 'owner'
+ROLE = 'role'
+MANUSCRIPT_ID = 'manuscript_id'
+TITLE = 'title'
+STATE = 'state'
+ACTIONS = 'actions'
+UPDATED = 'updated'
+
+ITEMS = 'items'
+TOTAL = 'total'
+COUNTS = 'counts'
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+dbc.connect_db()
+
+
+def init_indexes():
+    """Create the indexes inbox reads and rewrites rely on."""
+    dbc.create_index(INBOX_COLLECTION,
+                     [(OWNER, pm.ASCENDING), (UPDATED, pm.DESCENDING)])
+    dbc.create_index(INBOX_COLLECTION,
+                     [(ROLE, pm.ASCENDING), (OWNER, pm.ASCENDING),
+                      (UPDATED, pm.DESCENDING)])
+    dbc.create_index(INBOX_COLLECTION, [(MANUSCRIPT_ID, pm.ASCENDING)])
+
+
+init_indexes()
+
+
+def replace_many(entries_by_manuscript: dict):
+    """
+    Replace the inbox entries of several manuscripts at once.
+    entries_by_manuscript maps manuscript ID to its new entries;
+    an empty list just clears that manuscript from every inbox.
+    """
+    if not entries_by_manuscript:
+        return
+    dbc.del_many(INBOX_COLLECTION, {
+        MANUSCRIPT_ID: {'$in': list(entries_by_manuscript)}})
+    dbc.insert_many(INBOX_COLLECTION, [
+        dict(entry)
+        for entries in entries_by_manuscript.values()
+        for entry in entries
+    ])
+
+
+def replace(manuscript_id: str, entries: list):
+    """Replace one manuscript's inbox entries."""
+    replace_many({manuscript_id: entries})
+
+
+def remove(manuscript_id: str):
+    """Take a manuscript out of every inbox."""
+    dbc.del_many(INBOX_COLLECTION, {MANUSCRIPT_ID: manuscript_id})
+
+
+def _owner_filter(email: str, roles) -> dict:
+    """Match entries owned by email or queued for one of roles."""
+    return {'$or': [
+        {OWNER: email},
+        {OWNER: None, ROLE: {'$in': list(roles or [])}},
+    ]}
+
+
+def read(email: str, roles=None, state: str = None, page: int = 1,
+         per_page: int = DEFAULT_PAGE_SIZE) -> dict:
+    """
+    Return one page of what is waiting on email, newest first, along
+    with the total and a count per state.
+
+    Args:
+        email: The user's email
+        roles: The user's role codes, for shared role queues
+        state: Only return entries in this state
+        page: 1-based page number
+        per_page: Entries per page
+    """
+    per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+    page = max(1, page)
+    filt = _owner_filter(email, roles)
+    collection = dbc.client[dbc.JOURNAL_DB][INBOX_COLLECTION]
+    counts = {
+        row[dbc.MONGO_ID]: row[TOTAL]
+        for row in collection.aggregate([
+            {'$match': filt},
+            {'$group': {dbc.MONGO_ID: f'${STATE}', TOTAL: {'$sum': 1}}},
+        ])
+    }
+    if state:
+        filt = {'$and': [filt, {STATE: state}]}
+    cursor = (collection.find(filt, {dbc.MONGO_ID: 0})
+              .sort(UPDATED, pm.DESCENDING)
+              .skip((page - 1) * per_page)
+              .limit(per_page))
+    return {
+        ITEMS: list(cursor),
+        TOTAL: counts.get(state, 0) if state else sum(counts.values()),
+        COUNTS: counts,
+    }
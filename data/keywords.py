@@ -0,0 +1,81 @@
+"""
+This module extracts keyword tags from a manuscript's title and
+abstract.
+
+The text is cut into runs of words at punctuation and stop words, and
+every phrase of one to MAX_PHRASE_WORDS words inside a run is a
+candidate. A candidate scores its number of occurrences times its
+length, with title occurrences counting double. Only candidates found
+in the title or more than once qualify, so one-off words and word
+sequences don't crowd out real terms. The best candidates win, skipping
+any that overlap a tag already chosen. extract() is a plain function of
+its arguments so it can run in the worker process pool.
+"""
+import re
+
+from data.recommend import STOP_WORDS
+
+MAX_TAGS = 5
+MAX_PHRASE_WORDS = 3
+MIN_WORD_LENGTH = 3
+TITLE_WEIGHT = 2.0
+
+CLAUSE_RE = re.compile(r'[^\w\s\-]+')
+WORD_RE = re.compile(r'[a-z][a-z0-9\-]*')
+
+
+def runs(text: str) -> list:
+    """
+    Split text into runs of words not broken by punctuation or a stop
+    word.
+    """
+    found = []
+    for clause in CLAUSE_RE.split((text or '').lower()):
+        current = []
+        for word in WORD_RE.findall(clause):
+            if word in STOP_WORDS or len(word) < MIN_WORD_LENGTH:
+                if current:
+                    found.append(current)
+                current = []
+            else:
+                current.append(word)
+        if current:
+            found.append(current)
+    return found
+
+
+def _count_phrases(text: str, weight: float, counts: dict):
+    """Add weight to counts for every candidate phrase in text."""
+    for run in runs(text):
+        for size in range(1, MAX_PHRASE_WORDS + 1):
+            for start in range(len(run) - size + 1):
+                phrase = tuple(run[start:start + size])
+                counts[phrase] = counts.get(phrase, 0.0) + weight
+
+
+def _overlaps(phrase: tuple, chosen: list) -> bool:
+    """Check whether phrase is part of, or contains, a chosen tag."""
+    text = f' {" ".join(phrase)} '
+    return any(text in f' {" ".join(tag)} ' or f' {" ".join(tag)} ' in text
+               for tag in chosen)
+
+
+def extract(title: str, abstract: str, count: int = MAX_TAGS) -> list:
+    """
+    Return up to count keyword tags for a manuscript, best first.
+    Tags are lowercase phrases of one to MAX_PHRASE_WORDS words.
+    """
+    counts = {}
+    _count_phrases(title, TITLE_WEIGHT, counts)
+    _count_phrases(abstract, 1.0, counts)
+    scores = {phrase: total * len(phrase)
+              for phrase, total in counts.items()
+              if total >= TITLE_WEIGHT}
+    chosen = []
+    for phrase, _ in sorted(scores.items(),
+                            key=lambda item: (-item[1], item[0])):
+        if len(chosen) == count:
+            break
+        if not _overlaps(phrase, chosen):
+            chosen.append(phrase)
+    return [' '.join(phrase) for phrase in chosen]
@@ -2,10 +2,31 @@
 This file contains the manuscript data and operations.
 """
 
+import threading
+from collections import Counter
 from typing import Dict, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+import data.archive as arc
+import data.blobs as blb
 import data.db_connect as dbc
+import data.diffs as dff
+import data.duplicates as dup
+import data.events as evt
+import data.facets as fct
+import data.inbox as ibx
+import data.keywords as kw
+import data.recommend as rec
+import data.referee_load as rl
+import data.roles as rls
+import data.search as srch
+import data.stats as sts
+import data.turnaround as tat
+import data.users as usr
+import data.workers as wrk
+import data.workflow as wf
 from bson import ObjectId
+import pymongo as pm
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 # Constants for manuscript fields
 TITLE = 'title'
@@ -19,15 +40,48 @@ HISTORY = 'history'
 EDITOR_EMAIL = 'editor'
 REPORT = 'report'
 VERDICT = 'verdict'
+# Fields of one entry in the REFEREES array
+REFEREE_EMAIL = 'email'
+ASSIGNED_AT = 'assigned_at'
 VERSION = 'version'
 REVISIONS = 'revisions'
+# Fields of a stored revision holding the blob hashes of its bodies.
+# Revision bodies live in data.blobs and are stored once, however many
+# revisions or manuscripts share them. The current TEXT and ABSTRACT
+# are also kept inline at the top of the manuscript on purpose: search,
+# duplicate checks, batch transitions and the archive read them straight
+# from the collection, often through projections, and would otherwise
+# each need a blob lookup. That costs one extra copy of the current
+# bodies per manuscript, however many revisions it has, and it is only
+# rewritten when a body actually changes.
+TEXT_REF = 'text_ref'
+ABSTRACT_REF = 'abstract_ref'
+BODY_REFS = {TEXT: TEXT_REF, ABSTRACT: ABSTRACT_REF}
 REVIEW_ROUND = 'review_round'
 REFEREE_COMMENTS = 'referee_comments'
 AUTHOR_RESPONSE = 'author_response'
 TIMESTAMP = 'timestamp'
+WORD_COUNT = 'word_count'
+ABSTRACT_WORD_COUNT = 'abstract_word_count'
+# Manuscripts whose text this one closely matches; see data.duplicates
+SIMILAR = 'similar_manuscripts'
+# Keyword tags extracted from the title and abstract; see data.keywords
+TAGS = 'tags'
+# When the manuscript entered its current state
+STATE_SINCE = 'state_since'
+ACCEPTANCE_RATE = 'acceptance_rate'
+# Set on manuscripts read back from the archive tier; see data.archive
+ARCHIVED = 'archived'
+
+EVENT_SEQ = 'event_seq'
+# Bumped by every write to a manuscript, for ETags
+WRITE_VERSION = 'write_version'
+BUMP_WRITE_VERSION = {'$inc': {WRITE_VERSION: 1}}
 
 ID_KEY = '_id'
 ERROR_KEY = 'error'
+# Set alongside ERROR_KEY when the actor lacks the role an action needs
+FORBIDDEN_KEY = 'forbidden'
 STATE_KEY = 'state'
 ACTOR_KEY = 'actor'
 ACTION_KEY = 'action'
@@ -79,90 +133,201 @@ VALID_STATES = {
 
 VERDICT_ACCEPT = 'ACCEPT'
 VERDICT_REJECT = 'REJECT'
+VERDICT_ACCEPT_WITH_REVISIONS = ACTION_ACCEPT_WITH_REVISIONS
 
-MANUSCRIPTS_COLLECTION = 'manuscripts'
+# The state a referee's verdict sends the manuscript to
+VERDICT_STATES = {
+    VERDICT_ACCEPT: STATE_COPY_EDIT,
+    VERDICT_REJECT: STATE_REJECTED,
+    VERDICT_ACCEPT_WITH_REVISIONS: STATE_AUTHOR_REVISIONS,
+}
 
-# Manuscript workflow state machine based on the FSM diagram
-MANUSCRIPT_FLOW_MAP = {
-    STATE_SUBMITTED: {
-        ACTION_ASSIGN_REFEREE: STATE_REFEREE_REVIEW,
-        ACTION_REJECT: STATE_REJECTED,
-        ACTION_WITHDRAW: STATE_WITHDRAWN,
-        ACTION_EDITOR_MOVE: None,
-    },
-    STATE_REFEREE_REVIEW: {
-        ACTION_ASSIGN_REFEREE: STATE_REFEREE_REVIEW,
-        ACTION_REMOVE_REFEREE: STATE_REFEREE_REVIEW,
-        ACTION_SUBMIT_REVIEW: None,
-        ACTION_ACCEPT: STATE_COPY_EDIT,
-        ACTION_ACCEPT_WITH_REVISIONS: STATE_AUTHOR_REVISIONS,
-        ACTION_REJECT: STATE_REJECTED,
-        ACTION_WITHDRAW: STATE_WITHDRAWN,
-        ACTION_EDITOR_MOVE: None,
-    },
-    STATE_AUTHOR_REVISIONS: {
-        ACTION_DONE: STATE_EDITOR_REVIEW,
-        ACTION_WITHDRAW: STATE_WITHDRAWN,
-        ACTION_EDITOR_MOVE: None,
-    },
-    STATE_EDITOR_REVIEW: {
-        ACTION_ACCEPT: STATE_COPY_EDIT,
-        ACTION_WITHDRAW: STATE_WITHDRAWN,
-        ACTION_EDITOR_MOVE: None,
-    },
-    STATE_COPY_EDIT: {
-        ACTION_DONE: STATE_AUTHOR_REVIEW,
-        ACTION_WITHDRAW: STATE_WITHDRAWN,
-        ACTION_EDITOR_MOVE: None,
-    },
-    STATE_AUTHOR_REVIEW: {
-        ACTION_DONE: STATE_FORMATTING,
-        ACTION_WITHDRAW: STATE_WITHDRAWN,
-        ACTION_EDITOR_MOVE: None,
-    },
-    STATE_FORMATTING: {
-        ACTION_DONE: STATE_PUBLISHED,
-        ACTION_WITHDRAW: STATE_WITHDRAWN,
-        ACTION_EDITOR_MOVE: None,
-    },
-    STATE_PUBLISHED: {
-        ACTION_WITHDRAW: STATE_WITHDRAWN,
-        ACTION_EDITOR_MOVE: None,
-    },
-    STATE_REJECTED: {
-        ACTION_EDITOR_MOVE: None,
-    },
-    STATE_WITHDRAWN: {
-        ACTION_EDITOR_MOVE: None,
-    },
+# Requested states that stand for a workflow state
+STATE_ALIASES = {
+    STATE_ACCEPTED: STATE_COPY_EDIT,
 }
 
+MANUSCRIPTS_COLLECTION = 'manuscripts'
+# What manuscripts are called in the search index
+SEARCH_KIND = 'manuscript'
+
+NOT_FOUND_MESSAGE = "Manuscript not found"
+ARCHIVED_MESSAGE = "Manuscript is archived; restore it first"
+CONFLICT_MESSAGE = "Manuscript was changed by someone else; please retry"
+WRITE_FAILED_MESSAGE = "Change could not be saved; please retry"
+PUBLISHED_DELETE_MESSAGE = "Cannot delete a published manuscript"
+
+# Keys for batch transition items and their results
+BATCH_MANUSCRIPT_ID = 'manuscript_id'
+BATCH_ACTION = 'action'
+BATCH_PARAMS = 'params'
+BATCH_OK = 'ok'
+
+# How many recent events the manuscript document keeps embedded;
+# the full history lives in the events collection.
+HISTORY_LIMIT = 20
+
+# Actions a role can always take; they never mean a manuscript is
+# waiting on that role, so they don't put it in anyone's inbox.
+INBOX_IGNORED_ACTIONS = {ACTION_WITHDRAW, ACTION_EDITOR_MOVE}
+
+# Roles a transition can require, relative to the manuscript:
+# any editor, a referee assigned to it, or its author.
+ROLE_EDITOR = rls.EDITOR_CODE
+ROLE_REFEREE = rls.REFEREE_CODE
+ROLE_AUTHOR = rls.AUTHOR_CODE
+
+
+def _row(from_state, action, to_state, roles):
+    """Build one row of the transition table."""
+    return {wf.FROM_STATE: from_state, wf.ACTION: action,
+            wf.TO_STATE: to_state, wf.ROLES: roles}
+
+
+# Manuscript workflow transition table based on the FSM diagram.
+# A to_state of None means the action works out its own target.
+# This is the default; a table stored in the workflow collection wins.
+TRANSITION_TABLE = [
+    _row(STATE_SUBMITTED, ACTION_ASSIGN_REFEREE,
+         STATE_REFEREE_REVIEW, [ROLE_EDITOR]),
+    _row(STATE_SUBMITTED, ACTION_REJECT, STATE_REJECTED, [ROLE_EDITOR]),
+    _row(STATE_SUBMITTED, ACTION_WITHDRAW, STATE_WITHDRAWN, [ROLE_AUTHOR]),
+    _row(STATE_SUBMITTED, ACTION_EDITOR_MOVE, None, [ROLE_EDITOR]),
+    _row(STATE_REFEREE_REVIEW, ACTION_ASSIGN_REFEREE,
+         STATE_REFEREE_REVIEW, [ROLE_EDITOR]),
+    _row(STATE_REFEREE_REVIEW, ACTION_REMOVE_REFEREE,
+         STATE_REFEREE_REVIEW, [ROLE_EDITOR]),
+    _row(STATE_REFEREE_REVIEW, ACTION_SUBMIT_REVIEW, None, [ROLE_REFEREE]),
+    _row(STATE_REFEREE_REVIEW, ACTION_ACCEPT,
+         STATE_COPY_EDIT, [ROLE_EDITOR, ROLE_REFEREE]),
+    _row(STATE_REFEREE_REVIEW, ACTION_ACCEPT_WITH_REVISIONS,
+         STATE_AUTHOR_REVISIONS, [ROLE_EDITOR, ROLE_REFEREE]),
+    _row(STATE_REFEREE_REVIEW, ACTION_REJECT,
+         STATE_REJECTED, [ROLE_EDITOR, ROLE_REFEREE]),
+    _row(STATE_REFEREE_REVIEW, ACTION_WITHDRAW,
+         STATE_WITHDRAWN, [ROLE_AUTHOR]),
+    _row(STATE_REFEREE_REVIEW, ACTION_EDITOR_MOVE, None, [ROLE_EDITOR]),
+    _row(STATE_AUTHOR_REVISIONS, ACTION_DONE,
+         STATE_EDITOR_REVIEW, [ROLE_AUTHOR]),
+    _row(STATE_AUTHOR_REVISIONS, ACTION_WITHDRAW,
+         STATE_WITHDRAWN, [ROLE_AUTHOR]),
+    _row(STATE_AUTHOR_REVISIONS, ACTION_EDITOR_MOVE, None, [ROLE_EDITOR]),
+    _row(STATE_EDITOR_REVIEW, ACTION_ACCEPT, STATE_COPY_EDIT, [ROLE_EDITOR]),
+    _row(STATE_EDITOR_REVIEW, ACTION_WITHDRAW, STATE_WITHDRAWN, [ROLE_AUTHOR]),
+    _row(STATE_EDITOR_REVIEW, ACTION_EDITOR_MOVE, None, [ROLE_EDITOR]),
+    _row(STATE_COPY_EDIT, ACTION_DONE, STATE_AUTHOR_REVIEW, [ROLE_EDITOR]),
+    _row(STATE_COPY_EDIT, ACTION_WITHDRAW, STATE_WITHDRAWN, [ROLE_AUTHOR]),
+    _row(STATE_COPY_EDIT, ACTION_EDITOR_MOVE, None, [ROLE_EDITOR]),
+    _row(STATE_AUTHOR_REVIEW, ACTION_DONE, STATE_FORMATTING, [ROLE_AUTHOR]),
+    _row(STATE_AUTHOR_REVIEW, ACTION_WITHDRAW, STATE_WITHDRAWN, [ROLE_AUTHOR]),
+    _row(STATE_AUTHOR_REVIEW, ACTION_EDITOR_MOVE, None, [ROLE_EDITOR]),
+    _row(STATE_FORMATTING, ACTION_DONE, STATE_PUBLISHED, [ROLE_EDITOR]),
+    _row(STATE_FORMATTING, ACTION_WITHDRAW, STATE_WITHDRAWN, [ROLE_AUTHOR]),
+    _row(STATE_FORMATTING, ACTION_EDITOR_MOVE, None, [ROLE_EDITOR]),
+    _row(STATE_PUBLISHED, ACTION_WITHDRAW, STATE_WITHDRAWN, [ROLE_AUTHOR]),
+    _row(STATE_PUBLISHED, ACTION_EDITOR_MOVE, None, [ROLE_EDITOR]),
+    _row(STATE_REJECTED, ACTION_EDITOR_MOVE, None, [ROLE_EDITOR]),
+    _row(STATE_WITHDRAWN, ACTION_EDITOR_MOVE, None, [ROLE_EDITOR]),
+]
+
 dbc.connect_db()  # connect to MongoDB
 
+workflow = wf.load(TRANSITION_TABLE)
+# The same workflow as a plain {state: {action: target}} map.
+MANUSCRIPT_FLOW_MAP = wf.flow_map(workflow)
+
+
+def reload_workflow():
+    """
+    Recompile the workflow, e.g. after the stored table changes.
+    """
+    global workflow, MANUSCRIPT_FLOW_MAP
+    workflow = wf.load(TRANSITION_TABLE)
+    MANUSCRIPT_FLOW_MAP = wf.flow_map(workflow)
+
+
+def init_indexes():
+    """
+    Create the indexes used for time-range queries, for finding
+    the manuscripts a referee is on and for filtering by tag.
+    """
+    for field in (f'{HISTORY}.{TIMESTAMP}', f'{REVISIONS}.{TIMESTAMP}',
+                  f'{REFEREES}.{REFEREE_EMAIL}'):
+        dbc.create_index(MANUSCRIPTS_COLLECTION, [(field, pm.ASCENDING)])
+    dbc.create_index(MANUSCRIPTS_COLLECTION,
+                     [(TAGS, pm.ASCENDING), (STATE, pm.ASCENDING)])
+
+
+init_indexes()
+
 
 def get_collection_name(testing=False):
     """Return the collection name"""
     return MANUSCRIPTS_COLLECTION
 
 
+def _store_bodies(revision: dict) -> dict:
+    """
+    Store a revision's text and abstract as blobs and return the
+    revision to save, holding their hashes instead.
+    """
+    stored = {k: v for k, v in revision.items() if k not in BODY_REFS}
+    keys = blb.put([revision.get(field) for field in BODY_REFS])
+    stored.update(zip(BODY_REFS.values(), keys))
+    return stored
+
+
+def _body_refs(manuscript: dict) -> list:
+    """Every blob hash the manuscript's revisions refer to."""
+    return [revision[ref]
+            for revision in (manuscript or {}).get(REVISIONS) or []
+            for ref in BODY_REFS.values() if revision.get(ref)]
+
+
+def _hydrate(manuscripts) -> list:
+    """
+    Fill in revision texts and abstracts from their blobs, with one
+    query for all of manuscripts. Revisions saved before bodies were
+    stored as blobs keep their inline text.
+    """
+    manuscripts = [m for m in manuscripts if m and ERROR_KEY not in m]
+    revisions = [revision for manuscript in manuscripts
+                 for revision in manuscript.get(REVISIONS) or []]
+    bodies = blb.get_many(revision.get(ref) for revision in revisions
+                          for ref in BODY_REFS.values())
+    for revision in revisions:
+        for field, ref in BODY_REFS.items():
+            if ref in revision:
+                revision[field] = bodies.get(revision[ref])
+    return manuscripts
+
+
 def create_manuscript(
     title: str,
     author: str,
     author_email: str,
     text: str,
     abstract: str,
-    testing=False
+    testing=False,
+    abstract_pending: bool = False
 ) -> dict:
     """
     Create a new manuscript entry and insert it into the MongoDB collection.
 
     Args:
-        title (str): The manuscript title (5-200 characters)
+        title (str): The manuscript title (MIN_TITLE_LENGTH to
+            MAX_TITLE_LENGTH characters)
         author (str): The author's name
         author_email (str): The author's email
         text (str): The manuscript text
-        abstract (str): The manuscript abstract (100-5000 characters)
+        abstract (str): The manuscript abstract (MIN_ABSTRACT_LENGTH to
+            MAX_ABSTRACT_LENGTH characters)
         testing (bool): Whether this is a test run
+        abstract_pending (bool): The abstract is missing because it is
+            still to come from an uploaded document (see
+            apply_extraction), so only its maximum length is checked.
+            This only makes a difference while MIN_ABSTRACT_LENGTH is
+            above 0.
 
     Raises:
         ValueError: If title or abstract length requirements are not met
@@ -177,7 +342,8 @@ def create_manuscript(
             )
 
         # Validate abstract length
-        if (len(abstract.strip()) < MIN_ABSTRACT_LENGTH
+        if ((len(abstract.strip()) < MIN_ABSTRACT_LENGTH
+                and not abstract_pending)
                 or len(abstract.strip()) > MAX_ABSTRACT_LENGTH):
             raise ValueError(
                 f"Abstract must be between {MIN_ABSTRACT_LENGTH} and "
@@ -194,17 +360,22 @@ def create_manuscript(
                 f"'{author_email}' already exists"
             )
 
-        timestamp = datetime.now().isoformat()
+        timestamp = dbc.now()
+        first_event = {
+            "state": STATE_SUBMITTED,
+            "timestamp": timestamp,
+            "actor": author_email,
+        }
         manuscript = {
             TITLE: title,
             AUTHOR: author,
             AUTHOR_EMAIL: author_email,
             STATE: STATE_SUBMITTED,
-            REFEREES: {},
+            REFEREES: [],
             TEXT: text,
             ABSTRACT: abstract,
             VERSION: 1,
-            REVISIONS: [{
+            REVISIONS: [_store_bodies({
                 VERSION: 1,
                 TEXT: text,
                 ABSTRACT: abstract,
@@ -212,20 +383,24 @@ def create_manuscript(
                 REVIEW_ROUND: 0,
                 REFEREE_COMMENTS: [],
                 AUTHOR_RESPONSE: None
-            }],
-            HISTORY: [
-                {
-                    "state": STATE_SUBMITTED,
-                    "timestamp": timestamp,
-                    "actor": author_email,
-                }
-            ],
+            })],
+            HISTORY: [{**first_event, evt.SEQ: 1}],
+            EVENT_SEQ: 1,
+            WRITE_VERSION: 1,
+            STATE_SINCE: timestamp,
             EDITOR_EMAIL: None,
             "referee_email": None
         }
 
-        result = dbc.insert_one(collection, manuscript)
+        try:
+            result = dbc.insert_one(collection, manuscript)
+        except Exception:
+            blb.release(_body_refs(manuscript))
+            raise
         manuscript[ID_KEY] = str(result.inserted_id)
+        _hydrate([manuscript])
+        evt.append(manuscript[ID_KEY], 1, first_event)
+        _dispatch([(None, manuscript, first_event)])
         return manuscript
 
     except Exception as e:
@@ -236,6 +411,8 @@ def create_manuscript(
 def get_manuscript(manuscript_id: str, testing=False) -> Optional[dict]:
     """
     Retrieve a manuscript by ID from MongoDB.
+    Manuscripts moved to the archive tier are read from there, marked
+    with ARCHIVED.
     """
     try:
         manuscript = dbc.fetch_one(
@@ -245,14 +422,1077 @@ def get_manuscript(manuscript_id: str, testing=False) -> Optional[dict]:
         )
         if manuscript:
             manuscript[ID_KEY] = str(manuscript.get(ID_KEY))
+        else:
+            manuscript = arc.fetch(manuscript_id)
+            if manuscript:
+                manuscript[ARCHIVED] = True
+                _drop_dead_matches(manuscript)
+        _hydrate([manuscript])
         return manuscript
     except Exception as e:
         print(f"Error fetching manuscript: {e}")
         return {ERROR_KEY: f"Invalid manuscript ID or not found: {str(e)}"}
 
 
+def get_write_version(manuscript_id: str) -> Optional[int]:
+    """
+    Return how many times a manuscript has been written, reading only
+    that field, or None if it is not in the active collection.
+    """
+    try:
+        manuscript = dbc.fetch_one(MANUSCRIPTS_COLLECTION,
+                                   {ID_KEY: ObjectId(manuscript_id)},
+                                   projection={WRITE_VERSION: 1})
+    except Exception as e:
+        print(f"Error fetching write version: {e}")
+        return None
+    return manuscript.get(WRITE_VERSION, 0) if manuscript else None
+
+
+def _snapshot_update(event: dict, seq: int, update_fields: dict,
+                     push: dict = None) -> dict:
+    """
+    Build the Mongo update that folds event number seq into the
+    manuscript snapshot: apply update_fields and keep only the newest
+    HISTORY_LIMIT events embedded.
+    """
+    pushes = dict(push or {})
+    pushes[HISTORY] = {
+        '$each': [{**event, evt.SEQ: seq}],
+        '$slice': -HISTORY_LIMIT,
+    }
+    return {"$set": {**update_fields, EVENT_SEQ: seq}, "$push": pushes,
+            **BUMP_WRITE_VERSION}
+
+
+# Functions that keep derived views, such as the inbox or the search
+# index, in step with manuscript writes; see on_change().
+change_listeners = []
+
+
+def on_change(listener):
+    """
+    Register listener to be told about every manuscript write. It is
+    called with a list of (before, after, event) changes: before is
+    None for a new manuscript, after is None for a deleted one, and
+    event is the event recorded with the write, if any.
+    """
+    change_listeners.append(listener)
+    return listener
+
+
+def _dispatch(changes: list, listeners=None):
+    """
+    Tell every listener, or just listeners, about changes at once, so
+    each can write them in as few round trips as it likes. Listeners
+    keep derived views, so a failure is logged rather than failing the
+    write; each view has a rebuild function to bring it back in line.
+    """
+    changes = [change for change in changes
+               if not (change[1] and ERROR_KEY in change[1])]
+    if not changes:
+        return
+    for listener in (change_listeners if listeners is None else listeners):
+        try:
+            listener(changes)
+        except Exception as e:
+            print(f"Error in {listener.__name__}: {e}")
+
+
+def _record_event(manuscript: dict, event: dict, update_fields: dict,
+                  push: dict = None) -> dict:
+    """
+    Append event to the manuscript's event log, then fold it into the
+    manuscript snapshot. Returns the updated manuscript. If the
+    snapshot write fails the event is retracted, so the next write can
+    take the same seq, and the error is raised.
+    """
+    manuscript_id = str(manuscript[ID_KEY])
+    seq = manuscript.get(EVENT_SEQ, 0) + 1
+    try:
+        evt.append(manuscript_id, seq, event)
+    except DuplicateKeyError:
+        return {ERROR_KEY: CONFLICT_MESSAGE}
+    try:
+        dbc.update_doc(
+            MANUSCRIPTS_COLLECTION,
+            {ID_KEY: ObjectId(manuscript_id)},
+            _snapshot_update(event, seq, update_fields, push)
+        )
+    except Exception:
+        evt.retract([(manuscript_id, seq)])
+        raise
+    updated = get_manuscript(manuscript_id)
+    _dispatch([(manuscript, updated, event)])
+    return updated
+
+
+def find_referee(manuscript: dict, email: str) -> Optional[dict]:
+    """Return email's entry in the manuscript's referees, if any."""
+    for referee in manuscript.get(REFEREES, []):
+        if referee.get(REFEREE_EMAIL) == email:
+            return referee
+    return None
+
+
+def is_referee(manuscript_id: str, email: str) -> bool:
+    """
+    Check that email is assigned to referee the manuscript, using the
+    referees.email index rather than loading the manuscript.
+    """
+    try:
+        return dbc.count(MANUSCRIPTS_COLLECTION, {
+            ID_KEY: ObjectId(manuscript_id),
+            f'{REFEREES}.{REFEREE_EMAIL}': email,
+        }) > 0
+    except Exception as e:
+        print(f"Error checking referee: {e}")
+        return False
+
+
+def get_referee_manuscripts(referee_email: str,
+                            pending_only: bool = False) -> Dict:
+    """
+    Get the manuscripts a referee is assigned to, keyed by ID.
+    With pending_only, leave out the ones they have already reviewed.
+    This is a lookup on the referees.email index.
+    """
+    if pending_only:
+        filt = {REFEREES: {'$elemMatch': {REFEREE_EMAIL: referee_email,
+                                          VERDICT: ''}}}
+    else:
+        filt = {f'{REFEREES}.{REFEREE_EMAIL}': referee_email}
+    return {
+        manuscript[ID_KEY]: manuscript
+        for manuscript in _hydrate(
+            dbc.fetch_many(MANUSCRIPTS_COLLECTION, filt))
+    }
+
+
+def actor_roles(manuscript: dict, email: str, user_roles) -> set:
+    """
+    Return the workflow roles email holds on this manuscript, given
+    the role codes on their user record.
+    """
+    roles = set()
+    if ROLE_EDITOR in (user_roles or []):
+        roles.add(ROLE_EDITOR)
+    if email and email == manuscript.get(AUTHOR_EMAIL):
+        roles.add(ROLE_AUTHOR)
+    if email and find_referee(manuscript, email) is not None:
+        roles.add(ROLE_REFEREE)
+    return roles
+
+
+def allowed_actions(manuscript: dict, email: str, user_roles) -> list:
+    """
+    Return the actions email may take on the manuscript right now.
+    """
+    return wf.allowed_actions(
+        workflow, manuscript.get(STATE),
+        actor_roles(manuscript, email, user_roles))
+
+
+def inbox_entries(manuscript: dict) -> list:
+    """
+    Work out whose inbox the manuscript belongs in right now: every
+    role with a workflow action to take in its state, resolved to
+    people. An unassigned manuscript goes to the shared editor queue
+    (owner None), and referees drop out once they have a verdict.
+    """
+    state = manuscript.get(STATE)
+    entries = []
+    for role in (ROLE_EDITOR, ROLE_REFEREE, ROLE_AUTHOR):
+        actions = [
+            action for action in wf.allowed_actions(workflow, state, [role])
+            if action not in INBOX_IGNORED_ACTIONS
+        ]
+        if not actions:
+            continue
+        if role == ROLE_EDITOR:
+            owners = [manuscript.get(EDITOR_EMAIL)]
+        elif role == ROLE_REFEREE:
+            owners = [
+                referee[REFEREE_EMAIL]
+                for referee in manuscript.get(REFEREES, [])
+                if not referee.get(VERDICT)
+            ]
+        else:
+            owners = [manuscript.get(AUTHOR_EMAIL)]
+        for owner in owners:
+            entries.append({
+                ibx.OWNER: owner,
+                ibx.ROLE: role,
+                ibx.MANUSCRIPT_ID: str(manuscript[ID_KEY]),
+                ibx.TITLE: manuscript.get(TITLE),
+                ibx.STATE: state,
+                ibx.ACTIONS: actions,
+                ibx.UPDATED: dbc.now(),
+            })
+    return entries
+
+
+@on_change
+def _track_inbox(changes: list):
+    """
+    Rewrite the inbox entries of every changed manuscript in one go;
+    rebuild_inbox() recomputes them all.
+    """
+    ibx.replace_many({
+        str((after or before)[ID_KEY]): inbox_entries(after) if after else []
+        for before, after, _ in changes
+    })
+
+
+def rebuild_inbox() -> int:
+    """
+    Recompute every manuscript's inbox entries, e.g. after the
+    workflow changes. Returns the number of manuscripts processed.
+    """
+    entries = {
+        manuscript[ID_KEY]: inbox_entries(manuscript)
+        for manuscript in dbc.fetch_many(
+            MANUSCRIPTS_COLLECTION, {},
+            projection={TITLE: 1, STATE: 1, AUTHOR_EMAIL: 1,
+                        EDITOR_EMAIL: 1, REFEREES: 1})
+    }
+    ibx.replace_many(entries)
+    return len(entries)
+
+
+def _pending_referees(manuscript: dict) -> set:
+    """Return who still owes this manuscript a review."""
+    if not manuscript or manuscript.get(STATE) != STATE_REFEREE_REVIEW:
+        return set()
+    return {referee[REFEREE_EMAIL]
+            for referee in manuscript.get(REFEREES, [])
+            if not referee.get(VERDICT)}
+
+
+@on_change
+def _track_referee_load(changes: list):
+    """Report the change in owed reviews of each change."""
+    for before, after, _ in changes:
+        owed_before = _pending_referees(before)
+        owed_after = _pending_referees(after)
+        for email in owed_after - owed_before:
+            rl.adjust(email, 1)
+        for email in owed_before - owed_after:
+            rl.adjust(email, -1)
+
+
+def active_review_counts() -> dict:
+    """Return {referee email: reviews owed} from the database."""
+    collection = dbc.client[dbc.JOURNAL_DB][MANUSCRIPTS_COLLECTION]
+    return {
+        row[ID_KEY]: row['count']
+        for row in collection.aggregate([
+            {'$match': {STATE: STATE_REFEREE_REVIEW}},
+            {'$unwind': f'${REFEREES}'},
+            {'$match': {f'{REFEREES}.{VERDICT}': ''}},
+            {'$group': {ID_KEY: f'${REFEREES}.{REFEREE_EMAIL}',
+                        'count': {'$sum': 1}}},
+        ])
+    }
+
+
+def rebuild_referee_load():
+    """Reload referee workloads from users and manuscripts."""
+    referees = [
+        user[usr.EMAIL]
+        for user in dbc.fetch_many(usr.USERS_COLLECTION,
+                                   {usr.ROLES: ROLE_REFEREE},
+                                   projection={usr.EMAIL: 1})
+    ]
+    rl.rebuild(referees, active_review_counts())
+
+
+def _recommend_text(manuscript: dict) -> str:
+    """The part of a manuscript referee recommendations compare."""
+    return f"{manuscript.get(TITLE) or ''}\n{manuscript.get(ABSTRACT) or ''}"
+
+
+def _reviewed_by(manuscript: dict) -> set:
+    """Return the referees who have given this manuscript a verdict."""
+    return {referee[REFEREE_EMAIL]
+            for referee in (manuscript or {}).get(REFEREES, [])
+            if referee.get(VERDICT)}
+
+
+@on_change
+def _track_recommendations(changes: list):
+    """Report text changes and new reviews to the recommender."""
+    for before, after, _ in changes:
+        text_before = _recommend_text(before) if before else None
+        text_after = _recommend_text(after) if after else None
+        if text_before != text_after:
+            if text_before is not None:
+                rec.remove_document(text_before)
+            if text_after is not None:
+                rec.add_document(text_after)
+        if after:
+            for email in _reviewed_by(after) - _reviewed_by(before):
+                rec.add_review(email, text_after)
+
+
+def rebuild_recommendations():
+    """Reload the recommender from every manuscript's reviews."""
+    rec.rebuild(
+        (_recommend_text(manuscript), _reviewed_by(manuscript))
+        for manuscript in dbc.fetch_many(
+            MANUSCRIPTS_COLLECTION, {},
+            projection={TITLE: 1, ABSTRACT: 1, REFEREES: 1}))
+
+
+def recommend_referees(manuscript_id: str, count: int = 5) -> list:
+    """
+    Return up to count {email, score} dicts, best first, for referees
+    whose past reviews are closest to the manuscript's title and
+    abstract. Its author and current referees are left out.
+    Returns an error dict if the manuscript does not exist.
+    """
+    manuscript = get_manuscript(manuscript_id)
+    if not manuscript or ERROR_KEY in manuscript:
+        return {ERROR_KEY: NOT_FOUND_MESSAGE}
+    if not rec.is_loaded():
+        rebuild_recommendations()
+    return [
+        {REFEREE_EMAIL: email, 'score': score}
+        for email, score in rec.recommend(
+            _recommend_text(manuscript), count,
+            exclude=_referee_exclusions(manuscript))
+    ]
+
+
+def _search_fields(manuscript: dict) -> dict:
+    return {srch.TITLE: manuscript.get(TITLE),
+            srch.ABSTRACT: manuscript.get(ABSTRACT),
+            srch.TEXT: manuscript.get(TEXT)}
+
+
+def _search_meta(manuscript: dict) -> dict:
+    return {srch.TITLE: manuscript.get(TITLE),
+            srch.STATE: manuscript.get(STATE),
+            srch.AUTHOR: manuscript.get(AUTHOR),
+            srch.AUTHOR_EMAIL: manuscript.get(AUTHOR_EMAIL)}
+
+
+SEARCH_PROJECTION = {TITLE: 1, ABSTRACT: 1, TEXT: 1, STATE: 1, AUTHOR: 1,
+                     AUTHOR_EMAIL: 1}
+
+
+def _search_documents():
+    """Yield every manuscript for a search index rebuild."""
+    for manuscript in dbc.fetch_many(MANUSCRIPTS_COLLECTION, {},
+                                     projection=SEARCH_PROJECTION):
+        yield (manuscript[ID_KEY], _search_fields(manuscript),
+               _search_meta(manuscript))
+
+
+def _search_fetch(manuscript_ids: list) -> dict:
+    """Return {id: searchable fields} for a page of search hits."""
+    manuscripts = dbc.fetch_many(
+        MANUSCRIPTS_COLLECTION,
+        {ID_KEY: {'$in': [ObjectId(mid) for mid in manuscript_ids]}},
+        projection={TITLE: 1, ABSTRACT: 1, TEXT: 1})
+    return {manuscript[ID_KEY]: _search_fields(manuscript)
+            for manuscript in manuscripts}
+
+
+@on_change
+def _track_search(changes: list):
+    """Keep the search index in step with manuscript changes."""
+    for before, after, _ in changes:
+        if not after:
+            srch.remove(SEARCH_KIND, str(before[ID_KEY]))
+            continue
+        manuscript_id = str(after[ID_KEY])
+        if before is None or _search_fields(before) != _search_fields(after):
+            srch.index(SEARCH_KIND, manuscript_id, _search_fields(after),
+                       _search_meta(after))
+        elif _search_meta(before) != _search_meta(after):
+            srch.update_meta(SEARCH_KIND, manuscript_id,
+                             _search_meta(after))
+
+
+srch.register_source(SEARCH_KIND, _search_documents, _search_fetch)
+
+
+def _submitted_at(manuscript: dict):
+    """When a manuscript was first submitted."""
+    revisions = manuscript.get(REVISIONS) or [{}]
+    return revisions[0].get(TIMESTAMP)
+
+
+def _submitted_month(manuscript: dict) -> str:
+    """The 'YYYY-MM' a manuscript was first submitted in."""
+    return fct.month_of(_submitted_at(manuscript))
+
+
+def _facet_cells(manuscript: dict, tags=None) -> Counter:
+    """
+    The facet cells a manuscript is counted in: its state and
+    submission month under each of its tags and under fct.ALL_TAGS.
+    """
+    if not manuscript or ERROR_KEY in manuscript:
+        return Counter()
+    if tags is None:
+        tags = manuscript.get(TAGS) or []
+    state = manuscript.get(STATE)
+    month = _submitted_month(manuscript)
+    return Counter((tag, state, month) for tag in {fct.ALL_TAGS, *tags})
+
+
+def _move_facets(before: Counter, after: Counter):
+    """Send the difference between two sets of cells to fct."""
+    changes = dict(after)
+    for cell, count in before.items():
+        changes[cell] = changes.get(cell, 0) - count
+    fct.adjust(changes)
+
+
+@on_change
+def _track_facets(changes: list):
+    """
+    Keep facet counts in step with manuscript changes, in one write.
+    Tags only change through apply_tags(), so both sides are counted
+    with the newer tags; that keeps counts right when tagging finishes
+    between reading the manuscript and writing the change.
+    """
+    before_cells, after_cells = Counter(), Counter()
+    for before, after, _ in changes:
+        tags = (after or before or {}).get(TAGS) or []
+        before_cells.update(_facet_cells(before, tags))
+        after_cells.update(_facet_cells(after, tags))
+    _move_facets(before_cells, after_cells)
+
+
+FACET_PROJECTION = {STATE: 1, TAGS: 1, f'{REVISIONS}.{TIMESTAMP}': 1}
+
+# Tagging jobs started by this process, set once their tags are stored.
+tagging = {}
+tagging_lock = threading.Lock()
+
+TAG_RETRIES = 3
+
+
+def apply_tags(manuscript_id: str, tags: list) -> Optional[list]:
+    """
+    Store a manuscript's keyword tags and move its facet counts to
+    match. The write is conditional on the state that was counted, and
+    retried if a transition got there first. Returns the tags, or None
+    if the manuscript no longer exists.
+    """
+    tags = list(dict.fromkeys(tags))
+    for _ in range(TAG_RETRIES):
+        manuscript = dbc.fetch_one(MANUSCRIPTS_COLLECTION,
+                                   {ID_KEY: ObjectId(manuscript_id)})
+        if not manuscript:
+            return None
+        result = dbc.update_doc(
+            MANUSCRIPTS_COLLECTION,
+            {ID_KEY: ObjectId(manuscript_id), STATE: manuscript.get(STATE)},
+            {'$set': {TAGS: tags}, **BUMP_WRITE_VERSION})
+        if result.matched_count:
+            try:
+                _move_facets(_facet_cells(manuscript),
+                             _facet_cells(manuscript, tags))
+            except Exception as e:
+                print(f"Error updating facet counts: {e}")
+            return tags
+    raise ValueError(f"Manuscript {manuscript_id} kept changing; "
+                     "tags not stored")
+
+
+def _tagged_text(manuscript: dict) -> tuple:
+    """The fields keyword tags are extracted from."""
+    return (manuscript or {}).get(TITLE), (manuscript or {}).get(ABSTRACT)
+
+
+@on_change
+def _track_tags(changes: list):
+    """Retag new manuscripts and ones whose title or abstract changed."""
+    for before, after, _ in changes:
+        if after and (before is None
+                      or _tagged_text(before) != _tagged_text(after)):
+            _queue_tagging(after)
+
+
+def _queue_tagging(manuscript: dict):
+    """
+    Extract tags from the manuscript's title and abstract in the worker
+    pool; they are stored by a callback, off the request thread.
+    """
+    manuscript_id = str(manuscript[ID_KEY])
+    done = threading.Event()
+    with tagging_lock:
+        tagging[manuscript_id] = done
+    try:
+        future = wrk.submit(kw.extract, manuscript.get(TITLE),
+                            manuscript.get(ABSTRACT))
+    except Exception as e:
+        print(f"Error queueing tagging: {e}")
+        _finish_tagging(manuscript_id, done, None)
+        return
+    future.add_done_callback(
+        lambda fut: _finish_tagging(manuscript_id, done, fut))
+
+
+def _finish_tagging(manuscript_id: str, done: threading.Event, future):
+    """Store extracted tags. Runs on the executor's callback thread."""
+    try:
+        if future is not None:
+            apply_tags(manuscript_id, future.result())
+    except Exception as e:
+        print(f"Error tagging manuscript {manuscript_id}: {e}")
+    finally:
+        with tagging_lock:
+            if tagging.get(manuscript_id) is done:
+                del tagging[manuscript_id]
+        done.set()
+
+
+def wait_for_tags(manuscript_id: str, timeout: float = None) -> list:
+    """
+    Block until tagging started by this process finishes, then return
+    the manuscript's tags. Meant for scripts and tests.
+    """
+    with tagging_lock:
+        done = tagging.get(manuscript_id)
+    if done is not None:
+        done.wait(timeout)
+    manuscript = get_manuscript(manuscript_id)
+    return (manuscript or {}).get(TAGS, [])
+
+
+def rebuild_facets() -> int:
+    """
+    Recount every facet from the manuscripts, e.g. after a migration.
+    Returns the number of manuscripts counted.
+    """
+    counts = Counter()
+    manuscripts = dbc.fetch_many(MANUSCRIPTS_COLLECTION, {},
+                                 projection=FACET_PROJECTION)
+    for manuscript in manuscripts:
+        counts.update(_facet_cells(manuscript))
+    fct.replace_all(counts)
+    return len(manuscripts)
+
+
+def state_entered(manuscript: dict):
+    """
+    Return when the manuscript entered its current state: STATE_SINCE,
+    or for manuscripts written before it existed, the oldest of the
+    trailing embedded history events in that state.
+    """
+    if manuscript.get(STATE_SINCE):
+        return manuscript[STATE_SINCE]
+    entered = None
+    for event in reversed(manuscript.get(HISTORY) or []):
+        if event.get(STATE_KEY) != manuscript.get(STATE):
+            break
+        entered = event.get(TIMESTAMP)
+    return entered
+
+
+def _stats_transition(manuscript: dict, event: dict) -> tuple:
+    """Describe an event applied to manuscript for the rollups."""
+    return sts.transition(event[TIMESTAMP], event[ACTION_KEY],
+                          manuscript.get(STATE), event[STATE_KEY],
+                          state_entered(manuscript))
+
+
+@on_change
+def _track_stats(changes: list):
+    """Fold new manuscripts and transitions into the daily rollups."""
+    sts.record([
+        sts.submission(event[TIMESTAMP], after[STATE]) if before is None
+        else _stats_transition(before, event)
+        for before, after, event in changes if event
+    ])
+
+
+def rebuild_stats() -> int:
+    """
+    Recompute every daily rollup by replaying the event log, e.g. after
+    a migration. Returns the number of events replayed.
+    """
+    changes = []
+    replayed = 0
+    state = entered = current = None
+    cursor = dbc.client[dbc.JOURNAL_DB][evt.EVENTS_COLLECTION].find(
+        {}, {dbc.MONGO_ID: 0}).sort([(evt.MANUSCRIPT_ID, pm.ASCENDING),
+                                     (evt.SEQ, pm.ASCENDING)])
+    for event in cursor:
+        replayed += 1
+        if event[evt.MANUSCRIPT_ID] != current:
+            current = event[evt.MANUSCRIPT_ID]
+            state = event.get(STATE_KEY)
+            entered = event.get(TIMESTAMP)
+            changes.append(sts.submission(entered, state))
+            continue
+        changes.append(sts.transition(event.get(TIMESTAMP),
+                                      event.get(ACTION_KEY), state,
+                                      event.get(STATE_KEY), entered))
+        if event.get(STATE_KEY) != state:
+            state = event.get(STATE_KEY)
+            entered = event.get(TIMESTAMP)
+    sts.replace_all(changes)
+    return replayed
+
+
+# A manuscript is decided when it moves from a state it awaits a
+# decision in to one a decision sends it to, by whatever action: an
+# editor's accept or reject, a referee's verdict or an editor move.
+PRE_DECISION_STATES = {STATE_SUBMITTED, STATE_REFEREE_REVIEW,
+                       STATE_AUTHOR_REVISIONS, STATE_EDITOR_REVIEW}
+DECISION_STATES = {STATE_COPY_EDIT, STATE_REJECTED}
+
+
+def is_decision(from_state: str, to_state: str) -> bool:
+    """Whether moving from from_state to to_state decides a manuscript."""
+    return from_state in PRE_DECISION_STATES and to_state in DECISION_STATES
+
+
+def _seconds_between(start, end) -> Optional[float]:
+    start, end = dbc.to_utc(start), dbc.to_utc(end)
+    if start is None or end is None:
+        return None
+    return max(0.0, (end - start).total_seconds())
+
+
+def _turnaround_samples(manuscript: dict, event: dict) -> list:
+    """
+    Return the (metric, scope, subject, seconds) durations an event
+    applied to manuscript completes: a referee's first report on it,
+    the final decision, or both when a referee's verdict decides it.
+    A decision counts for the manuscript's editor, or for the actor
+    if none is assigned and the actor is not a referee.
+    """
+    action = event.get(ACTION_KEY)
+    samples = []
+    if action == ACTION_SUBMIT_REVIEW:
+        email = event.get(ACTOR_KEY)
+        referee = find_referee(manuscript, email) if email else None
+        if referee and not referee.get(VERDICT):
+            seconds = _seconds_between(referee.get(ASSIGNED_AT),
+                                       event[TIMESTAMP])
+            samples += [
+                (tat.METRIC_REVIEW, tat.SCOPE_REFEREE, email, seconds),
+                (tat.METRIC_REVIEW, tat.SCOPE_JOURNAL, tat.JOURNAL,
+                 seconds),
+            ]
+    if is_decision(manuscript.get(STATE), event.get(STATE_KEY)):
+        seconds = _seconds_between(_submitted_at(manuscript),
+                                   event[TIMESTAMP])
+        editor = manuscript.get(EDITOR_EMAIL)
+        if editor is None and action != ACTION_SUBMIT_REVIEW:
+            editor = event.get(ACTOR_KEY)
+        if editor:
+            samples.append(
+                (tat.METRIC_DECISION, tat.SCOPE_EDITOR, editor, seconds))
+        samples.append(
+            (tat.METRIC_DECISION, tat.SCOPE_JOURNAL, tat.JOURNAL, seconds))
+    return samples
+
+
+@on_change
+def _track_turnaround(changes: list):
+    """Record the turnaround durations transitions complete."""
+    tat.record([sample for before, _, event in changes if before and event
+                for sample in _turnaround_samples(before, event)])
+
+
+def _duplicate_text(manuscript: dict) -> str:
+    """The part of a manuscript compared for duplicates."""
+    return '\n'.join(manuscript.get(field) or ''
+                     for field in (TITLE, ABSTRACT, TEXT))
+
+
+def _check_duplicates(manuscript: dict):
+    """
+    Look the manuscript's text up in the duplicate index, which only
+    compares it with manuscripts sharing an LSH bucket with it, and
+    record any near-duplicates or heavy overlap on it under SIMILAR.
+    """
+    manuscript_id = str(manuscript[ID_KEY])
+    matches = dup.check(manuscript_id, _duplicate_text(manuscript))
+    dbc.update_doc(MANUSCRIPTS_COLLECTION,
+                   {ID_KEY: ObjectId(manuscript_id)},
+                   {'$set': {SIMILAR: matches}, **BUMP_WRITE_VERSION})
+    manuscript[SIMILAR] = matches
+
+
+def _drop_dead_matches(manuscript: dict):
+    """
+    Drop deleted manuscripts from an archived manuscript's SIMILAR
+    list; deletes only prune the lists in the active collection.
+    """
+    matches = manuscript.get(SIMILAR)
+    if not matches:
+        return
+    ids = {'$in': [ObjectId(match[dup.MANUSCRIPT_ID]) for match in matches]}
+    live = {doc[ID_KEY]
+            for collection in (MANUSCRIPTS_COLLECTION, arc.ARCHIVE_COLLECTION)
+            for doc in dbc.fetch_many(collection, {ID_KEY: ids},
+                                      projection={ID_KEY: 1})}
+    manuscript[SIMILAR] = [match for match in matches
+                           if match[dup.MANUSCRIPT_ID] in live]
+
+
+@on_change
+def _track_duplicates(changes: list):
+    """
+    Check new manuscripts and ones whose text changed for duplicates.
+    Deleted ones leave the duplicate index and every SIMILAR list.
+    """
+    deleted = []
+    for before, after, _ in changes:
+        if after is None:
+            deleted.append(str(before[ID_KEY]))
+            dup.remove(deleted[-1])
+        elif (before is None
+              or _duplicate_text(before) != _duplicate_text(after)):
+            _check_duplicates(after)
+    if deleted:
+        dbc.bulk_write(MANUSCRIPTS_COLLECTION, [pm.UpdateMany(
+            {f'{SIMILAR}.{dup.MANUSCRIPT_ID}': {'$in': deleted}},
+            {'$pull': {SIMILAR: {dup.MANUSCRIPT_ID: {'$in': deleted}}},
+             **BUMP_WRITE_VERSION})])
+
+
+def get_stats(since: str = None, until: str = None) -> dict:
+    """
+    Return editorial statistics from since to until ('YYYY-MM-DD',
+    inclusive); see sts.summarize. Adds the acceptance rate: entries
+    into COPY_EDIT over entries into COPY_EDIT or REJECTED, or None
+    before any decision. Counting states rather than actions takes in
+    decisions made by a referee's verdict or an editor move.
+    """
+    summary = sts.summarize(since, until)
+    accepted = summary[sts.ENTERED].get(STATE_COPY_EDIT, 0)
+    decided = accepted + summary[sts.ENTERED].get(STATE_REJECTED, 0)
+    summary[ACCEPTANCE_RATE] = (round(accepted / decided, 4)
+                                if decided else None)
+    return summary
+
+
+# Views that only cover the active collection: archiving a manuscript
+# takes it out of these and restoring puts it back, while the others
+# keep counting it
+HOT_VIEWS = (_track_inbox, _track_search)
+
+# States a manuscript is done with, and can be archived in
+CLOSED_STATES = (STATE_PUBLISHED, STATE_REJECTED, STATE_WITHDRAWN)
+ARCHIVE_BATCH_SIZE = 500
+
+
+def _archivable(cutoff: datetime) -> dict:
+    """
+    Match closed manuscripts that entered their state before cutoff;
+    those written before STATE_SINCE existed go by their history.
+    """
+    return {STATE: {'$in': list(CLOSED_STATES)}, '$or': [
+        {STATE_SINCE: {'$lt': cutoff}},
+        {STATE_SINCE: {'$exists': False},
+         f'{HISTORY}.{TIMESTAMP}': {'$not': {'$gte': cutoff}}},
+    ]}
+
+
+def archive_closed(older_than_days: int = None,
+                   batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Move manuscripts closed for more than older_than_days (default:
+    arc.archive_after_days()) to the archive tier, in batches.
+
+    Each batch is copied to the archive, then deleted from the hot
+    collection only if its event sequence is unchanged, so a manuscript
+    reopened meanwhile stays put and its copy is dropped. Archived
+    manuscripts leave the inbox and search index. Returns how many
+    were archived.
+    """
+    if older_than_days is None:
+        older_than_days = arc.archive_after_days()
+    filt = _archivable(dbc.now() - timedelta(days=older_than_days))
+    archived = 0
+    while True:
+        batch = dbc.fetch_many(MANUSCRIPTS_COLLECTION, filt,
+                               limit=batch_size)
+        if not batch:
+            return archived
+        arc.store([arc.pack(manuscript, state_entered(manuscript))
+                   for manuscript in batch])
+        dbc.bulk_write(MANUSCRIPTS_COLLECTION, [
+            pm.DeleteOne({ID_KEY: ObjectId(manuscript[ID_KEY]),
+                          EVENT_SEQ: manuscript.get(EVENT_SEQ)})
+            for manuscript in batch])
+        kept = {manuscript[ID_KEY] for manuscript in dbc.fetch_many(
+            MANUSCRIPTS_COLLECTION,
+            {ID_KEY: {'$in': [ObjectId(m[ID_KEY]) for m in batch]}},
+            projection={ID_KEY: 1})}
+        arc.remove(list(kept))
+        moved = [m for m in batch if m[ID_KEY] not in kept]
+        _dispatch([(manuscript, None, None) for manuscript in moved],
+                  HOT_VIEWS)
+        archived += len(moved)
+        if not moved:
+            return archived
+
+
+def restore_manuscript(manuscript_id: str) -> Optional[dict]:
+    """
+    Move an archived manuscript back into the hot collection, e.g. to
+    reopen it. Returns it, or an error dict if it is not archived.
+    """
+    manuscript = arc.fetch(manuscript_id)
+    if not manuscript:
+        return {ERROR_KEY: NOT_FOUND_MESSAGE}
+    _drop_dead_matches(manuscript)
+    dbc.insert_one(MANUSCRIPTS_COLLECTION,
+                   {**manuscript, ID_KEY: ObjectId(manuscript_id)})
+    arc.remove([manuscript_id])
+    _dispatch([(None, manuscript, None)], HOT_VIEWS)
+    _hydrate([manuscript])
+    return manuscript
+
+
+def get_facets(tag: str = None, state: str = None, since: str = None,
+               until: str = None, top: int = fct.DEFAULT_TOP_TAGS) -> dict:
+    """Return facet counts for a slice of the pipeline; see fct.read."""
+    return fct.read(tag=tag, state=state, since=since, until=until,
+                    top=top)
+
+
+def get_manuscripts_by_tags(tags: list, state: str = None) -> Dict:
+    """
+    Return {id: manuscript} for the manuscripts carrying every one of
+    tags, optionally only those in state. Uses the tag index.
+    """
+    filt = {TAGS: {'$all': list(tags)}}
+    if state:
+        filt[STATE] = state
+    return {manuscript[ID_KEY]: manuscript
+            for manuscript in _hydrate(
+                dbc.fetch_many(MANUSCRIPTS_COLLECTION, filt))}
+
+
+def _referee_exclusions(manuscript: dict) -> set:
+    """People who can't be picked to referee this manuscript."""
+    excluded = {referee[REFEREE_EMAIL]
+                for referee in manuscript.get(REFEREES, [])}
+    excluded.add(manuscript.get(AUTHOR_EMAIL))
+    return excluded
+
+
+def suggest_referees(manuscript_id: str, count: int = 1) -> list:
+    """
+    Return up to count of the least-loaded referees not already on the
+    manuscript, or an error dict if it does not exist.
+    """
+    manuscript = get_manuscript(manuscript_id)
+    if not manuscript or ERROR_KEY in manuscript:
+        return {ERROR_KEY: NOT_FOUND_MESSAGE}
+    if not rl.is_loaded():
+        rebuild_referee_load()
+    return rl.least_loaded(count, exclude=_referee_exclusions(manuscript))
+
+
+def assign_least_loaded(manuscript_id: str, count: int = 1,
+                        actor_email: str = None, user_roles=None) -> dict:
+    """
+    Assign the count least-loaded referees to a manuscript.
+    Returns the updated manuscript or an error dict.
+    """
+    picks = suggest_referees(manuscript_id, count)
+    if isinstance(picks, dict):
+        return picks
+    if not picks:
+        return {ERROR_KEY: "No referees are available"}
+    return process_manuscript_action(
+        manuscript_id, ACTION_ASSIGN_REFEREE, actor_email=actor_email,
+        user_roles=user_roles, referee_emails=picks)
+
+
+def assign_least_loaded_batch(manuscript_ids: list, count: int = 1,
+                              actor_email: str = None,
+                              user_roles=None) -> list:
+    """
+    Assign count least-loaded referees to each of several manuscripts,
+    spreading the new reviews across referees, in one process_batch.
+    Returns its per-manuscript results.
+    """
+    object_ids = []
+    for manuscript_id in manuscript_ids:
+        try:
+            object_ids.append(ObjectId(manuscript_id))
+        except Exception:
+            continue
+    manuscripts = {
+        manuscript[ID_KEY]: manuscript
+        for manuscript in dbc.fetch_many(
+            MANUSCRIPTS_COLLECTION, {ID_KEY: {'$in': object_ids}},
+            projection={AUTHOR_EMAIL: 1, REFEREES: 1})
+    }
+    if not rl.is_loaded():
+        rebuild_referee_load()
+    picks = rl.plan([
+        (count, _referee_exclusions(manuscripts.get(manuscript_id, {})))
+        for manuscript_id in manuscript_ids
+    ])
+    return process_batch([
+        {BATCH_MANUSCRIPT_ID: manuscript_id,
+         BATCH_ACTION: ACTION_ASSIGN_REFEREE,
+         BATCH_PARAMS: {'referee_emails': picked}}
+        for manuscript_id, picked in zip(manuscript_ids, picks)
+    ], actor_email=actor_email, user_roles=user_roles)
+
+
+def is_action_allowed(state: str, action: str) -> bool:
+    """Check whether the workflow allows action in state at all."""
+    return wf.lookup(workflow, state, action) is not None
+
+
+def get_allowed_actions(manuscript_ids: list, email: str,
+                        user_roles) -> dict:
+    """
+    Return {manuscript_id: [actions]} for what email may do to each
+    manuscript right now, in one query. Only the fields the workflow
+    needs are fetched. Unknown or invalid IDs are left out.
+    """
+    object_ids = []
+    for manuscript_id in manuscript_ids:
+        try:
+            object_ids.append(ObjectId(manuscript_id))
+        except Exception:
+            continue
+    manuscripts = dbc.fetch_many(
+        MANUSCRIPTS_COLLECTION,
+        {ID_KEY: {'$in': object_ids}},
+        projection={STATE: 1, AUTHOR_EMAIL: 1, REFEREES: 1})
+    return {
+        manuscript[ID_KEY]: allowed_actions(manuscript, email, user_roles)
+        for manuscript in manuscripts
+    }
+
+
+def action_for_state(current_state: str, requested_state: str) -> str:
+    """
+    Return the action that moves a manuscript from current_state to
+    requested_state, or None if only an editor move can.
+    """
+    requested_state = STATE_ALIASES.get(requested_state, requested_state)
+    return wf.action_to(workflow, current_state, requested_state)
+
+
+def _submit_review(manuscript, event, next_state, referee_email=None,
+                   report='', verdict=None, **kwargs):
+    """Record a referee's report; the verdict picks the next state."""
+    if verdict not in VERDICT_STATES:
+        raise ValueError("Invalid verdict for review submission.")
+    referees = [dict(referee) for referee in manuscript.get(REFEREES, [])]
+    if referee_email:
+        referee = find_referee({REFEREES: referees}, referee_email)
+        if referee is None:
+            referee = {REFEREE_EMAIL: referee_email,
+                       ASSIGNED_AT: event[TIMESTAMP]}
+            referees.append(referee)
+        referee.update({REPORT: report, VERDICT: verdict})
+    event[ACTOR_KEY] = referee_email
+    event[VERDICT] = verdict
+    return VERDICT_STATES[verdict], {REFEREES: referees}
+
+
+def _remove_referee(manuscript, event, next_state, referee_email=None,
+                    **kwargs):
+    """Drop a referee; with none left the manuscript is SUBMITTED."""
+    referees = [referee for referee in manuscript.get(REFEREES, [])
+                if referee.get(REFEREE_EMAIL) != referee_email]
+    if not referees:
+        next_state = STATE_SUBMITTED
+    return next_state, {REFEREES: referees}
+
+
+def _assign_referee(manuscript, event, next_state, referee_email=None,
+                    referee_emails=(), **kwargs):
+    """Add one or more referees with empty reports."""
+    referees = list(manuscript.get(REFEREES, []))
+    for email in [referee_email, *referee_emails]:
+        if email and find_referee({REFEREES: referees}, email) is None:
+            referees.append({
+                REFEREE_EMAIL: email,
+                REPORT: '',
+                VERDICT: '',
+                ASSIGNED_AT: event[TIMESTAMP],
+            })
+    return next_state, {REFEREES: referees}
+
+
+def _editor_move(manuscript, event, next_state, target_state=None,
+                 **kwargs):
+    """Move to whatever state the editor asked for."""
+    if not wf.is_state(workflow, target_state):
+        raise ValueError("Invalid target state for editor move.")
+    return target_state, {}
+
+
+# Actions with side effects beyond the state change. Each handler gets
+# the manuscript, the event being recorded, the table's target state
+# and the action's keyword arguments, and returns the next state and
+# any extra fields to set.
+ACTION_HANDLERS = {
+    ACTION_SUBMIT_REVIEW: _submit_review,
+    ACTION_REMOVE_REFEREE: _remove_referee,
+    ACTION_ASSIGN_REFEREE: _assign_referee,
+    ACTION_EDITOR_MOVE: _editor_move,
+}
+
+
+def _plan_action(manuscript: dict, action: str, actor_email=None,
+                 user_roles=None, **kwargs) -> tuple:
+    """
+    Work out, in memory, what an action does to a manuscript.
+    If user_roles (the actor's role codes) is given, the actor must
+    hold one of the roles the workflow requires for the action.
+
+    Returns:
+        An (event, update_fields) pair ready for _record_event.
+
+    Raises:
+        PermissionError: If the actor lacks the role the action needs
+        ValueError: If the action is not allowed or its parameters
+        are invalid
+    """
+    current_state = manuscript[STATE]
+    transition = wf.lookup(workflow, current_state, action)
+    if transition is None:
+        raise ValueError(f"Action {action} not allowed")
+    if user_roles is not None:
+        required = transition[wf.ROLES]
+        if not required & actor_roles(manuscript, actor_email, user_roles):
+            names = ', '.join(sorted(rls.ROLES.get(role, role)
+                                     for role in required))
+            raise PermissionError(f"Action {action} in state "
+                                  f"{current_state} is limited to: {names}")
+    event = {
+        TIMESTAMP: dbc.now(),
+        ACTOR_KEY: actor_email,
+        ACTION_KEY: action
+    }
+    next_state = transition[wf.TO_STATE]
+    update_fields = {}
+    handler = ACTION_HANDLERS.get(action)
+    if handler:
+        next_state, update_fields = handler(
+            manuscript, event, next_state, **kwargs)
+    event[STATE_KEY] = next_state
+    update_fields[STATE] = next_state
+    if next_state != current_state:
+        update_fields[STATE_SINCE] = event[TIMESTAMP]
+    return event, update_fields
+
+
 def process_manuscript_action(manuscript_id, action, actor_email=None,
-                              **kwargs):
+                              user_roles=None, **kwargs):
     """Central function for processing manuscript state transitions.
 
     This function implements the finite state machine (FSM) that controls
@@ -262,164 +1502,212 @@ def process_manuscript_action(manuscript_id, action, actor_email=None,
         manuscript_id: The ID of the manuscript
         action: The action to perform (must be one of the ACTION_* constants)
         actor_email: Email of the person performing the action
+        user_roles: The actor's role codes; if given, the workflow's
+            role requirements for the action are enforced
         **kwargs: Additional parameters needed for specific actions
 
     Returns:
-        The updated manuscript or an error dict
+        The updated manuscript or an error dict, with FORBIDDEN_KEY set
+        if the actor lacks the role the action needs
     """
     manuscript = get_manuscript(manuscript_id)
-    if not manuscript:
-        return {ERROR_KEY: "Manuscript not found"}
-    current_state = manuscript[STATE]
-    next_state = MANUSCRIPT_FLOW_MAP.get(current_state, {}).get(action)
+    if not manuscript or ERROR_KEY in manuscript:
+        return {ERROR_KEY: NOT_FOUND_MESSAGE}
+    if manuscript.get(ARCHIVED):
+        return {ERROR_KEY: ARCHIVED_MESSAGE}
+    try:
+        event, update_fields = _plan_action(
+            manuscript, action, actor_email, user_roles, **kwargs)
+    except PermissionError as e:
+        return {ERROR_KEY: str(e), FORBIDDEN_KEY: True}
+    except ValueError as e:
+        return {ERROR_KEY: str(e)}
+    return _record_event(manuscript, event, update_fields)
 
-    # Special handling for actions that require logic
-    if action == ACTION_SUBMIT_REVIEW:
-        verdict = kwargs.get('verdict')
-        if verdict == VERDICT_ACCEPT:
-            next_state = STATE_COPY_EDIT
-        elif verdict == VERDICT_REJECT:
-            next_state = STATE_REJECTED
-        elif verdict == ACTION_ACCEPT_WITH_REVISIONS:
-            next_state = STATE_AUTHOR_REVISIONS
-        else:
-            return {ERROR_KEY: "Invalid verdict for review submission."}
-        # Update referee's report and verdict
-        referee_email = kwargs.get('referee_email')
-        report = kwargs.get('report', '')
-        referees = manuscript.get(REFEREES, {})
-        if referee_email:
-            referees[referee_email] = {REPORT: report, VERDICT: verdict}
-        update_fields = {
-            STATE: next_state,
-            REFEREES: referees,
-            HISTORY: manuscript.get(HISTORY, []) + [{
-                "state": next_state,
-                "timestamp": datetime.now().isoformat(),
-                "actor": referee_email,
-                "action": action,
-                "verdict": verdict
-            }]
-        }
-        dbc.update_doc(
-            MANUSCRIPTS_COLLECTION,
-            {ID_KEY: ObjectId(manuscript_id)},
-            {"$set": update_fields}
-        )
-        return get_manuscript(manuscript_id)
-    elif action == ACTION_REMOVE_REFEREE:
-        referee_email = kwargs.get('referee_email')
-        referees = manuscript.get(REFEREES, {})
-        if referee_email in referees:
-            del referees[referee_email]
-        # If no referees left, return to SUBMITTED
-        if not referees:
-            next_state = STATE_SUBMITTED
-        else:
-            next_state = STATE_REFEREE_REVIEW
-        update_fields = {
-            STATE: next_state,
-            REFEREES: referees,
-            HISTORY: manuscript.get(HISTORY, []) + [{
-                "state": next_state,
-                "timestamp": datetime.now().isoformat(),
-                "actor": actor_email,
-                "action": action
-            }]
-        }
-        dbc.update_doc(
-            MANUSCRIPTS_COLLECTION,
-            {ID_KEY: ObjectId(manuscript_id)},
-            {"$set": update_fields}
-        )
-        return get_manuscript(manuscript_id)
-    elif action == ACTION_ASSIGN_REFEREE:
-        referee_email = kwargs.get('referee_email')
-        referees = manuscript.get(REFEREES, {})
-        if referee_email and referee_email not in referees:
-            referees[referee_email] = {REPORT: '', VERDICT: ''}
-        update_fields = {
-            STATE: STATE_REFEREE_REVIEW,
-            REFEREES: referees,
-            HISTORY: manuscript.get(HISTORY, []) + [{
-                "state": STATE_REFEREE_REVIEW,
-                "timestamp": datetime.now().isoformat(),
-                "actor": actor_email,
-                "action": action
-            }]
-        }
-        dbc.update_doc(
-            MANUSCRIPTS_COLLECTION,
-            {ID_KEY: ObjectId(manuscript_id)},
-            {"$set": update_fields}
-        )
-        return get_manuscript(manuscript_id)
-    elif action == ACTION_EDITOR_MOVE:
-        target_state = kwargs.get('target_state')
-        if target_state not in MANUSCRIPT_FLOW_MAP:
-            return {ERROR_KEY: "Invalid target state for editor move."}
-        update_fields = {
-            STATE: target_state,
-            HISTORY: manuscript.get(HISTORY, []) + [{
-                "state": target_state,
-                "timestamp": datetime.now().isoformat(),
-                "actor": actor_email,
-                "action": action
-            }]
-        }
-        dbc.update_doc(
-            MANUSCRIPTS_COLLECTION,
-            {ID_KEY: ObjectId(manuscript_id)},
-            {"$set": update_fields}
-        )
-        return get_manuscript(manuscript_id)
-    elif action == ACTION_WITHDRAW:
-        update_fields = {
-            STATE: STATE_WITHDRAWN,
-            HISTORY: manuscript.get(HISTORY, []) + [{
-                "state": STATE_WITHDRAWN,
-                "timestamp": datetime.now().isoformat(),
-                "actor": actor_email,
-                "action": action
-            }]
-        }
-        dbc.update_doc(
+
+def process_batch(items: list, actor_email: str = None,
+                  user_roles=None) -> list:
+    """
+    Apply many transitions at once, e.g. after an editorial meeting.
+
+    All manuscripts are fetched in one query and every item is checked
+    against the workflow in memory. The accepted transitions are
+    then written with one insert into the event log and one bulk update.
+    Events whose snapshot update is not applied are retracted again.
+
+    Args:
+        items: dicts with BATCH_MANUSCRIPT_ID, BATCH_ACTION and an
+            optional BATCH_PARAMS dict of extra action arguments
+        actor_email: Email of the person performing the actions
+        user_roles: The actor's role codes, enforced as in
+            process_manuscript_action
+
+    Returns:
+        One result dict per item, in order: either BATCH_OK with the new
+        state, or ERROR_KEY with the reason the item was not applied.
+    """
+    results = [{BATCH_MANUSCRIPT_ID: item.get(BATCH_MANUSCRIPT_ID),
+                BATCH_ACTION: item.get(BATCH_ACTION)} for item in items]
+    object_ids = {}
+    for result in results:
+        try:
+            object_ids[result[BATCH_MANUSCRIPT_ID]] = ObjectId(
+                result[BATCH_MANUSCRIPT_ID])
+        except Exception:
+            result[ERROR_KEY] = "Invalid manuscript ID"
+    manuscripts = {
+        manuscript[ID_KEY]: manuscript
+        for manuscript in dbc.fetch_many(
             MANUSCRIPTS_COLLECTION,
-            {ID_KEY: ObjectId(manuscript_id)},
-            {"$set": update_fields}
-        )
-        return get_manuscript(manuscript_id)
-    # Standard transitions
-    if next_state is None:
-        return {
-            ERROR_KEY: f"Action {action} not allowed"
-        }
-    update_fields = {
-        STATE: next_state,
-        HISTORY: manuscript.get(HISTORY, []) + [{
-            "state": next_state,
-            "timestamp": datetime.now().isoformat(),
-            "actor": actor_email,
-            "action": action
-        }]
+            {ID_KEY: {'$in': list(object_ids.values())}})
     }
-    dbc.update_doc(
+
+    planned = []
+    seen = set()
+    for item, result in zip(items, results):
+        if ERROR_KEY in result:
+            continue
+        manuscript_id = result[BATCH_MANUSCRIPT_ID]
+        manuscript = manuscripts.get(manuscript_id)
+        action = result[BATCH_ACTION]
+        if manuscript is None:
+            result[ERROR_KEY] = NOT_FOUND_MESSAGE
+        elif manuscript_id in seen:
+            result[ERROR_KEY] = "Manuscript appears more than once in batch"
+        else:
+            try:
+                event, update_fields = _plan_action(
+                    manuscript, action, actor_email, user_roles,
+                    **(item.get(BATCH_PARAMS) or {}))
+            except (ValueError, PermissionError) as e:
+                result[ERROR_KEY] = str(e)
+                continue
+            seq = manuscript.get(EVENT_SEQ, 0) + 1
+            planned.append((result, manuscript_id, seq, event,
+                            update_fields))
+        seen.add(manuscript_id)
+
+    failed = evt.append_many([
+        {evt.MANUSCRIPT_ID: manuscript_id, evt.SEQ: seq, **event}
+        for _, manuscript_id, seq, event, _ in planned
+    ])
+    ops = []
+    written = []
+    for i, (result, manuscript_id, seq, event, update_fields) in enumerate(
+            planned):
+        if i in failed:
+            result[ERROR_KEY] = CONFLICT_MESSAGE
+            continue
+        ops.append(pm.UpdateOne(
+            {ID_KEY: object_ids[manuscript_id]},
+            _snapshot_update(event, seq, update_fields)))
+        written.append((result, manuscript_id, seq, event, update_fields))
+    unwritten = _failed_writes(ops)
+    evt.retract([(written[i][1], written[i][2]) for i in unwritten])
+    changes = []
+    for i, (result, manuscript_id, _, event, update_fields) in enumerate(
+            written):
+        if i in unwritten:
+            result[ERROR_KEY] = WRITE_FAILED_MESSAGE
+            continue
+        before = manuscripts[manuscript_id]
+        changes.append((before, {**before, **update_fields}, event))
+        result[BATCH_OK] = True
+        result[STATE] = update_fields[STATE]
+    _dispatch(changes)
+    return results
+
+
+def _failed_writes(ops: list) -> set:
+    """
+    Apply snapshot updates in one round trip and return the positions
+    of those that were not applied. If the whole write fails, none of
+    them count as applied.
+    """
+    try:
+        dbc.bulk_write(MANUSCRIPTS_COLLECTION, ops)
+    except BulkWriteError as e:
+        return {err['index'] for err in e.details.get('writeErrors', [])}
+    except Exception as e:
+        print(f"Error writing batch: {e}")
+        return set(range(len(ops)))
+    return set()
+
+
+def apply_extraction(
+    manuscript_id: str,
+    version: int,
+    extracted: dict
+) -> Optional[dict]:
+    """
+    Store text extracted from an uploaded document on the manuscript.
+    Only applies if the manuscript is still at the version the upload
+    was made against, so a later text update is never overwritten.
+    The extracted abstract is used only if the manuscript has none yet,
+    so one the author typed in is kept, and only if it fits the length
+    limits.
+    """
+    before = dbc.fetch_one(MANUSCRIPTS_COLLECTION,
+                           {ID_KEY: ObjectId(manuscript_id)}) or {}
+    text = extracted.get(TEXT, '')
+    update_fields = {TEXT: text, WORD_COUNT: extracted.get(WORD_COUNT, 0)}
+    bodies = {TEXT: text}
+    filt = {}
+    abstract = (extracted.get(ABSTRACT) or '').strip()
+    if (not (before.get(ABSTRACT) or '').strip()
+            and MIN_ABSTRACT_LENGTH < len(abstract) <= MAX_ABSTRACT_LENGTH):
+        update_fields[ABSTRACT] = abstract
+        update_fields[ABSTRACT_WORD_COUNT] = extracted.get(
+            ABSTRACT_WORD_COUNT, 0)
+        bodies[ABSTRACT] = abstract
+        # Never overwrite an abstract stored since it was read
+        filt[ABSTRACT] = before.get(ABSTRACT)
+    revision = next((rev for rev in before.get(REVISIONS) or []
+                     if rev.get(VERSION) == version), {})
+    # Only replace the bodies read here, so each old blob is released
+    # exactly once even if two extractions race.
+    old_refs = {BODY_REFS[field]: revision.get(BODY_REFS[field])
+                for field in bodies}
+    new_refs = dict(zip(old_refs, blb.put(list(bodies.values()))))
+    for ref, key in new_refs.items():
+        update_fields[f'{REVISIONS}.$.{ref}'] = key
+    result = dbc.update_doc(
         MANUSCRIPTS_COLLECTION,
-        {ID_KEY: ObjectId(manuscript_id)},
-        {"$set": update_fields}
+        {
+            ID_KEY: ObjectId(manuscript_id),
+            VERSION: version,
+            REVISIONS: {'$elemMatch': {VERSION: version, **old_refs}},
+            **filt,
+        },
+        {"$set": update_fields,
+         "$unset": {f'{REVISIONS}.$.{field}': '' for field in bodies},
+         **BUMP_WRITE_VERSION}
     )
-    return get_manuscript(manuscript_id)
+    if not result.matched_count:
+        blb.release(list(new_refs.values()))
+        raise ValueError(
+            f"Manuscript {manuscript_id} is no longer at version {version}")
+    blb.release(list(old_refs.values()))
+    manuscript = get_manuscript(manuscript_id)
+    _dispatch([(before, manuscript, None)])
+    return manuscript
 
 
 def assign_editor(manuscript_id: str, editor_email: str) -> Optional[dict]:
     """Assign an editor to a manuscript."""
     try:
-        dbc.update_doc(
+        before = dbc.fetch_and_update_one(
             MANUSCRIPTS_COLLECTION,
             {ID_KEY: ObjectId(manuscript_id)},
-            {"$set": {EDITOR_EMAIL: editor_email}}
+            {"$set": {EDITOR_EMAIL: editor_email}, **BUMP_WRITE_VERSION}
         )
-        return get_manuscript(manuscript_id)
+        if not before:
+            return get_manuscript(manuscript_id)
+        manuscript = {**before, EDITOR_EMAIL: editor_email,
+                      WRITE_VERSION: before.get(WRITE_VERSION, 0) + 1}
+        _hydrate([manuscript])
+        _dispatch([(before, manuscript, None)])
+        return manuscript
     except Exception as e:
         print(f"Error assigning editor: {e}")
         return None
@@ -474,7 +1762,7 @@ def get_all_manuscripts(testing=False) -> Dict:
     manuscripts = {}
     try:
         collection = get_collection_name(testing)
-        all_manuscripts = dbc.fetch_all(collection)
+        all_manuscripts = _hydrate(dbc.fetch_all(collection))
         for manuscript in all_manuscripts:
             if ID_KEY in manuscript:
                 manuscript[ID_KEY] = str(manuscript.get(ID_KEY))
@@ -485,27 +1773,41 @@ def get_all_manuscripts(testing=False) -> Dict:
         return manuscripts
 
 
+# Only manuscripts that are not published may be deleted
+DELETABLE = {STATE: {'$ne': STATE_PUBLISHED}}
+PURGE_BATCH_SIZE = 500
+
+
+def _forget(manuscripts: list):
+    """Drop everything kept about deleted manuscripts elsewhere."""
+    for manuscript in manuscripts:
+        evt.delete_for(manuscript[ID_KEY])
+        dff.forget(manuscript[ID_KEY])
+        blb.release(_body_refs(manuscript))
+    _dispatch([(manuscript, None, None) for manuscript in manuscripts])
+
+
 def delete_manuscript(manuscript_id: str, testing=False) -> Optional[dict]:
     """
     Delete a manuscript by ID from database.
     Returns the deleted manuscript if successful,
-    or an error message if not found
+    or an error message if not found or published.
+
+    The not-published check and the delete are one atomic write, so a
+    manuscript published meanwhile is never deleted. Only a failed
+    delete costs a second read, to tell which error it was.
     """
     try:
-        manuscript = get_manuscript(manuscript_id, testing=testing)
-
-        if not manuscript:
-            return {ERROR_KEY: "Manuscript not found"}
-
-        if manuscript.get(STATE) == STATE_PUBLISHED:
-            return {ERROR_KEY: "Cannot delete a published manuscript"}
-
-        dbc.del_one(
+        manuscript = dbc.fetch_and_del_one(
             MANUSCRIPTS_COLLECTION,
-            {ID_KEY: ObjectId(manuscript_id)},
-            db=dbc.JOURNAL_DB,
-            testing=testing
-        )
+            {**DELETABLE, ID_KEY: ObjectId(manuscript_id)})
+        if not manuscript:
+            manuscript = arc.take(manuscript_id, DELETABLE)
+        if not manuscript:
+            if get_manuscript(manuscript_id, testing=testing):
+                return {ERROR_KEY: PUBLISHED_DELETE_MESSAGE}
+            return {ERROR_KEY: NOT_FOUND_MESSAGE}
+        _forget([manuscript])
         return manuscript
 
     except Exception as e:
@@ -513,6 +1815,43 @@ def delete_manuscript(manuscript_id: str, testing=False) -> Optional[dict]:
         return {ERROR_KEY: f"Invalid manuscript ID or not found: {str(e)}"}
 
 
+def purge_manuscripts(manuscript_ids: list = None, author_email: str = None,
+                      batch_size: int = PURGE_BATCH_SIZE) -> list:
+    """
+    Delete many unpublished manuscripts at once, e.g. test or spam
+    submissions: those with the given IDs, by the given author, or
+    both. Published ones are never touched, and neither is anything
+    changed while the purge runs. Returns the IDs deleted.
+    """
+    filt = dict(DELETABLE)
+    if manuscript_ids is not None:
+        filt[ID_KEY] = {'$in': [ObjectId(mid) for mid in manuscript_ids]}
+    if author_email is not None:
+        filt[AUTHOR_EMAIL] = author_email
+    if len(filt) == len(DELETABLE):
+        raise ValueError('Say which manuscripts to purge')
+    deleted = []
+    while True:
+        batch = dbc.fetch_many(MANUSCRIPTS_COLLECTION, filt,
+                               limit=batch_size)
+        if not batch:
+            return deleted
+        dbc.bulk_write(MANUSCRIPTS_COLLECTION, [
+            pm.DeleteOne({**DELETABLE,
+                          ID_KEY: ObjectId(manuscript[ID_KEY]),
+                          EVENT_SEQ: manuscript.get(EVENT_SEQ)})
+            for manuscript in batch])
+        kept = {manuscript[ID_KEY] for manuscript in dbc.fetch_many(
+            MANUSCRIPTS_COLLECTION,
+            {ID_KEY: {'$in': [ObjectId(m[ID_KEY]) for m in batch]}},
+            projection={ID_KEY: 1})}
+        gone = [m for m in batch if m[ID_KEY] not in kept]
+        _forget(gone)
+        deleted.extend(manuscript[ID_KEY] for manuscript in gone)
+        if not gone:
+            return deleted
+
+
 def accept_manuscript(manuscript_id: str, actor_email: str) -> Optional[dict]:
     """Accept a manuscript using the FSM action handler."""
     return process_manuscript_action(
@@ -646,10 +1985,10 @@ def update_manuscript_text(
             return {
                 "error": f"Cannot update manuscript in state: {current_state}"
             }
-        timestamp = datetime.now().isoformat()
+        timestamp = dbc.now()
         current_version = manuscript.get(VERSION, 1)
         new_version = current_version + 1
-        new_revision = {
+        new_revision = _store_bodies({
             VERSION: new_version,
             TEXT: new_text,
             ABSTRACT: new_abstract,
@@ -657,25 +1996,27 @@ def update_manuscript_text(
             REVIEW_ROUND: len(manuscript.get(REVISIONS, [])),
             REFEREE_COMMENTS: [],
             AUTHOR_RESPONSE: author_response
-        }
-        manuscript[TEXT] = new_text
-        manuscript[ABSTRACT] = new_abstract
-        manuscript[VERSION] = new_version
-        manuscript[REVISIONS] = manuscript.get(REVISIONS, []) + [new_revision]
-        manuscript[HISTORY].append({
-            STATE_KEY: current_state,
-            TIMESTAMP: timestamp,
-            ACTOR_KEY: author_email,
-            ACTION_KEY: TEXT_UPDATE_ACTION,
-            VERSION: new_version
         })
-        _id = manuscript.pop('_id')
-        dbc.update_doc(
-            MANUSCRIPTS_COLLECTION,
-            {"_id": ObjectId(_id)},
-            manuscript
+        # Leave the inline copy of an unchanged body alone
+        update_fields = {field: body for field, body in
+                         ((TEXT, new_text), (ABSTRACT, new_abstract))
+                         if body != manuscript.get(field)}
+        update_fields[VERSION] = new_version
+        updated = _record_event(
+            manuscript,
+            {
+                STATE_KEY: current_state,
+                TIMESTAMP: timestamp,
+                ACTOR_KEY: author_email,
+                ACTION_KEY: TEXT_UPDATE_ACTION,
+                VERSION: new_version
+            },
+            update_fields,
+            push={REVISIONS: new_revision}
         )
-        return get_manuscript(manuscript_id)
+        if ERROR_KEY in updated:
+            blb.release(_body_refs({REVISIONS: [new_revision]}))
+        return updated
     except Exception as e:
         print(f"Error updating manuscript text: {e}")
         return {"error": str(e)}
@@ -696,9 +2037,18 @@ def get_manuscript_version(
         The manuscript version or None if not found
     """
     try:
-        manuscript = get_manuscript(manuscript_id)
+        # Project just the one revision, so the cost doesn't grow with
+        # the number of revisions; archived manuscripts are unpacked whole.
+        manuscript = dbc.fetch_one(
+            get_collection_name(testing),
+            {ID_KEY: ObjectId(manuscript_id)},
+            testing=testing,
+            projection={VERSION: 1,
+                        REVISIONS: {'$elemMatch': {VERSION: version}}}
+        ) or arc.fetch(manuscript_id)
+        _hydrate([manuscript])
         if (
-            "error" in manuscript
+            not manuscript
             or version < 1
             or version > manuscript.get(VERSION, 1)
         ):
@@ -727,6 +2077,39 @@ def get_manuscript_version(
         return {"error": f"An error occurred: {str(e)}"}
 
 
+# Keys of get_diff results
+DIFF_STATUS = 'status'
+DIFF = 'diff'
+
+
+def get_diff(manuscript_id: str, from_version: int, to_version: int,
+             mode: str = dff.MODE_LINES) -> dict:
+    """
+    Return the diff between two versions of a manuscript, as
+    {DIFF_STATUS: dff.STATUS_DONE, DIFF: diff}, or with
+    dff.STATUS_PENDING and no diff while it is computed in the worker
+    pool; ask again later. If computing it failed, DIFF_STATUS is
+    dff.STATUS_FAILED and ERROR_KEY holds the reason. Returns a plain
+    error dict if either version does not exist.
+
+    The versions are only read to start the diff: polls while it is
+    pending, done or failed do not touch the revisions.
+    """
+    key = (manuscript_id, from_version, to_version, mode)
+    status, result = dff.status(key)
+    if status is None:
+        old = get_manuscript_version(manuscript_id, from_version)
+        if ERROR_KEY in old:
+            return old
+        new = get_manuscript_version(manuscript_id, to_version)
+        if ERROR_KEY in new:
+            return new
+        status, result = dff.request(key, old[TEXT], new[TEXT])
+    if status == dff.STATUS_FAILED:
+        return {DIFF_STATUS: status, DIFF: None, ERROR_KEY: result}
+    return {DIFF_STATUS: status, DIFF: result}
+
+
 def get_manuscripts_by_state(state: str, testing=False) -> Dict:
     """
     Retrieve all manuscripts in a specific state.
@@ -747,7 +2130,7 @@ def get_manuscripts_by_state(state: str, testing=False) -> Dict:
             raise ValueError(f"Invalid state. Must be one of: {VALID_STATES}")
 
         collection = get_collection_name(testing)
-        all_manuscripts = dbc.fetch_all(collection, {STATE: state})
+        all_manuscripts = _hydrate(dbc.fetch_all(collection, {STATE: state}))
 
         for manuscript in all_manuscripts:
             if ID_KEY in manuscript:
@@ -778,3 +2161,177 @@ def update_state(
     if state not in VALID_STATES:
         return {"error": f"Invalid state: {state}"}
     return editor_move(manuscript_id, state, editor_email)
+
+
+def get_history(
+    manuscript_id: str,
+    after: int = 0,
+    limit: int = evt.DEFAULT_PAGE_SIZE
+) -> dict:
+    """
+    Return one page of a manuscript's full event history.
+
+    Args:
+        manuscript_id: The ID of the manuscript
+        after: Only return events with a sequence number above this
+        limit: The maximum number of events to return
+
+    Returns:
+        A dict with the events and the cursor for the next page,
+        which is None when there are no more events.
+    """
+    page = evt.fetch_page(manuscript_id, after=after, limit=limit)
+    next_after = None
+    if page and len(page) == max(1, min(limit, evt.MAX_PAGE_SIZE)):
+        next_after = page[-1][evt.SEQ]
+    return {HISTORY: page, 'next': next_after}
+
+
+def migrate_history_to_events() -> int:
+    """
+    One-time migration: copy embedded history arrays into the events
+    collection and trim each manuscript down to its recent events.
+    Manuscripts that already have an event sequence are skipped.
+    Returns the number of manuscripts migrated.
+    """
+    migrated = 0
+    collection = dbc.client[dbc.JOURNAL_DB][MANUSCRIPTS_COLLECTION]
+    for manuscript in collection.find({EVENT_SEQ: {'$exists': False}}):
+        manuscript_id = str(manuscript[ID_KEY])
+        history = manuscript.get(HISTORY, [])
+        records = []
+        for seq, event in enumerate(history, start=1):
+            event = {k: v for k, v in event.items() if k != evt.SEQ}
+            records.append({evt.MANUSCRIPT_ID: manuscript_id,
+                            evt.SEQ: seq, **event})
+        evt.append_many([dict(rec) for rec in records])
+        recent = [
+            {k: v for k, v in rec.items() if k != evt.MANUSCRIPT_ID}
+            for rec in records[-HISTORY_LIMIT:]
+        ]
+        collection.update_one(
+            {ID_KEY: manuscript[ID_KEY]},
+            {'$set': {HISTORY: recent, EVENT_SEQ: len(records)}}
+        )
+        migrated += 1
+    return migrated
+
+
+def get_changed_since(since: datetime, testing=False) -> Dict:
+    """
+    Get all manuscripts with a history event at or after since.
+    Uses the history timestamp index; the newest events are always
+    embedded, so nothing recent is missed by the history cap.
+    """
+    manuscripts = {}
+    try:
+        since = dbc.to_utc(since)
+        for manuscript in _hydrate(dbc.fetch_many(
+                get_collection_name(testing),
+                {f'{HISTORY}.{TIMESTAMP}': {'$gte': since}})):
+            manuscripts[manuscript.get(ID_KEY)] = manuscript
+        return manuscripts
+    except Exception as e:
+        print(f"Error fetching changed manuscripts: {e}")
+        return manuscripts
+
+
+def _convert_timestamps(entries: list) -> list:
+    """Return entries with their timestamps as UTC datetimes."""
+    converted = []
+    for entry in entries or []:
+        entry = dict(entry)
+        if TIMESTAMP in entry:
+            stamp = dbc.to_utc(entry[TIMESTAMP])
+            if stamp is not None:
+                entry[TIMESTAMP] = stamp
+        converted.append(entry)
+    return converted
+
+
+def migrate_timestamps() -> int:
+    """
+    One-time migration: rewrite ISO string timestamps in history,
+    revisions and the event log as native UTC dates.
+    Strings were written in server local time without a zone, so they
+    are interpreted in this server's local time zone.
+    Returns the number of documents rewritten.
+    """
+    migrated = 0
+    db = dbc.client[dbc.JOURNAL_DB]
+    string_stamp = {'$type': 'string'}
+    for manuscript in db[MANUSCRIPTS_COLLECTION].find({'$or': [
+            {f'{HISTORY}.{TIMESTAMP}': string_stamp},
+            {f'{REVISIONS}.{TIMESTAMP}': string_stamp}]}):
+        db[MANUSCRIPTS_COLLECTION].update_one(
+            {ID_KEY: manuscript[ID_KEY]},
+            {'$set': {
+                HISTORY: _convert_timestamps(manuscript.get(HISTORY)),
+                REVISIONS: _convert_timestamps(manuscript.get(REVISIONS)),
+            }}
+        )
+        migrated += 1
+    for event in db[evt.EVENTS_COLLECTION].find({TIMESTAMP: string_stamp}):
+        stamp = dbc.to_utc(event[TIMESTAMP])
+        if stamp is not None:
+            db[evt.EVENTS_COLLECTION].update_one(
+                {ID_KEY: event[ID_KEY]}, {'$set': {TIMESTAMP: stamp}})
+            migrated += 1
+    return migrated
+
+
+def migrate_referees() -> int:
+    """
+    One-time migration: rewrite referee maps keyed by email as arrays
+    of {email, report, verdict, assigned_at} entries, so they can use
+    the referees.email index. The assignment time is not known for old
+    entries and is left as None.
+    Returns the number of manuscripts rewritten.
+    """
+    migrated = 0
+    collection = dbc.client[dbc.JOURNAL_DB][MANUSCRIPTS_COLLECTION]
+    # $type 'object' also matches arrays of subdocuments, so converted
+    # manuscripts are skipped here.
+    for manuscript in collection.find({REFEREES: {'$type': 'object'}}):
+        if not isinstance(manuscript[REFEREES], dict):
+            continue
+        referees = [
+            {
+                REFEREE_EMAIL: email,
+                REPORT: (review or {}).get(REPORT, ''),
+                VERDICT: (review or {}).get(VERDICT, ''),
+                ASSIGNED_AT: None,
+            }
+            for email, review in manuscript[REFEREES].items()
+        ]
+        collection.update_one({ID_KEY: manuscript[ID_KEY]},
+                              {'$set': {REFEREES: referees}})
+        migrated += 1
+    return migrated
+
+
+def migrate_revision_bodies() -> int:
+    """
+    One-time migration: move revision texts and abstracts stored inline
+    into content-addressed blobs. A manuscript whose revisions change
+    meanwhile is skipped and can be migrated by running this again.
+    Returns the number of manuscripts rewritten.
+    """
+    migrated = 0
+    collection = dbc.client[dbc.JOURNAL_DB][MANUSCRIPTS_COLLECTION]
+    for manuscript in collection.find({f'{REVISIONS}.{TEXT}':
+                                       {'$exists': True}}):
+        revisions = [
+            revision if TEXT_REF in revision else _store_bodies(revision)
+            for revision in manuscript[REVISIONS]]
+        result = collection.update_one(
+            {ID_KEY: manuscript[ID_KEY],
+             REVISIONS: manuscript[REVISIONS]},
+            {'$set': {REVISIONS: revisions}})
+        if result.matched_count:
+            migrated += 1
+        else:
+            blb.release(_body_refs({REVISIONS: [
+                revision for revision in revisions
+                if revision not in manuscript[REVISIONS]]}))
+    return migrated
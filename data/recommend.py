@@ -0,0 +1,234 @@
+"""
+This module recommends referees for a manuscript by how close its title
+and abstract are to the manuscripts each referee has reviewed before.
+
+Everything is kept in memory as a sparse referee x term matrix of
+summed, length-normalized term frequencies, plus per-term document
+frequencies for the whole corpus. IDF weights are applied at query
+time, so a new manuscript only bumps a few document frequencies and a
+new review only adds one row's worth of entries. A recommendation is
+then one sparse matrix-vector product.
+
+The manuscripts module reports creates, text updates, deletes and
+reviews here; the matrix is rebuilt from the database on first use.
+"""
+import math
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+import scipy.sparse as sp
+
+WORD_RE = re.compile(r'[a-z][a-z0-9\-]+')
+STOP_WORDS = frozenset('''
+a about above after again against all also am an and any are as at be
+because been before being below between both but by can could did do
+does doing down during each few for from further had has have having he
+her here hers him his how i if in into is it its itself just me more
+most my no nor not now of off on once only or other our ours out over
+own same she should so some such than that the their theirs them then
+there these they this those through to too under until up very was we
+were what when where which while who whom why will with would you your
+paper study results show using based approach method methods
+'''.split())
+
+vocab = {}
+doc_freq = np.zeros(0)
+n_docs = 0
+referee_rows = {}
+referee_emails = []
+profiles = sp.csr_matrix((0, 0))
+pending = ([], [], [])
+norms = None
+loaded = False
+lock = threading.RLock()
+
+
+def tokenize(text: str) -> list:
+    """Split text into lowercase terms, without stop words."""
+    return [word for word in WORD_RE.findall((text or '').lower())
+            if word not in STOP_WORDS]
+
+
+def is_loaded() -> bool:
+    """Check whether the matrix reflects the database."""
+    return loaded
+
+
+def invalidate():
+    """Forget everything; the next query rebuilds."""
+    global loaded
+    with lock:
+        loaded = False
+
+
+def _term_ids(terms, grow: bool) -> dict:
+    """
+    Map terms to column numbers, adding unseen ones when grow is set
+    and dropping them otherwise. Caller holds lock.
+    """
+    global doc_freq
+    if grow:
+        ids = {term: vocab.setdefault(term, len(vocab)) for term in terms}
+    else:
+        ids = {term: vocab[term] for term in terms if term in vocab}
+    if len(vocab) > len(doc_freq):
+        doc_freq = np.concatenate([
+            doc_freq, np.zeros(max(len(vocab) - len(doc_freq),
+                                   len(doc_freq)))])
+    return ids
+
+
+def _weights(counts: Counter, ids: dict) -> dict:
+    """
+    Return {column: weight}: sublinear term frequency scaled to unit
+    length, so long abstracts don't dominate a profile.
+    """
+    weights = {column: 1 + math.log(counts[term])
+               for term, column in ids.items()}
+    length = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+    return {column: w / length for column, w in weights.items()}
+
+
+def _tf_vector(text: str, grow: bool) -> dict:
+    """Return the unit-length term weights of text."""
+    counts = Counter(tokenize(text))
+    return _weights(counts, _term_ids(counts, grow))
+
+
+def _count_document(text: str, delta: int):
+    """Add delta to the corpus counts for text. Caller holds lock."""
+    global n_docs, norms
+    columns = list(_term_ids(set(tokenize(text)), grow=delta > 0).values())
+    if columns:
+        np.add.at(doc_freq, columns, delta)
+        np.maximum(doc_freq, 0, out=doc_freq)
+    n_docs = max(0, n_docs + delta)
+    norms = None
+
+
+def _add_weights(email: str, weights: dict):
+    """Fold term weights into email's profile. Caller holds lock."""
+    global norms
+    row = referee_rows.get(email)
+    if row is None:
+        row = referee_rows[email] = len(referee_emails)
+        referee_emails.append(email)
+    rows, columns, values = pending
+    rows.extend([row] * len(weights))
+    columns.extend(weights)
+    values.extend(weights.values())
+    norms = None
+
+
+def _flush():
+    """
+    Merge pending profile entries into the CSR matrix, growing it for
+    new referees and terms. Caller holds lock.
+    """
+    global profiles, pending
+    shape = (len(referee_emails), len(vocab))
+    if profiles.shape != shape:
+        profiles.resize(shape)
+    rows, columns, values = pending
+    if rows:
+        profiles = profiles + sp.csr_matrix(
+            (values, (rows, columns)), shape=shape)
+        pending = ([], [], [])
+
+
+def rebuild(documents):
+    """
+    Reset the matrix.
+
+    Args:
+        documents: (text, reviewer emails) pairs, one per manuscript
+    """
+    global vocab, doc_freq, n_docs, referee_rows, referee_emails
+    global profiles, pending, norms, loaded
+    with lock:
+        vocab = {}
+        doc_freq = np.zeros(0)
+        n_docs = 0
+        referee_rows = {}
+        referee_emails = []
+        profiles = sp.csr_matrix((0, 0))
+        pending = ([], [], [])
+        seen = []
+        for text, reviewers in documents:
+            counts = Counter(tokenize(text))
+            ids = _term_ids(counts, grow=True)
+            seen.extend(ids.values())
+            n_docs += 1
+            if reviewers:
+                weights = _weights(counts, ids)
+                for email in reviewers:
+                    _add_weights(email, weights)
+        doc_freq = np.bincount(seen, minlength=len(vocab)).astype(float)
+        _flush()
+        norms = None
+        loaded = True
+
+
+def add_document(text: str):
+    """Count a new manuscript in the corpus."""
+    with lock:
+        if loaded:
+            _count_document(text, 1)
+
+
+def remove_document(text: str):
+    """Take a manuscript out of the corpus counts."""
+    with lock:
+        if loaded:
+            _count_document(text, -1)
+
+
+def add_review(email: str, text: str):
+    """Record that email reviewed a manuscript with this text."""
+    with lock:
+        if loaded:
+            _add_weights(email, _tf_vector(text, grow=True))
+
+
+def _idf() -> np.ndarray:
+    """Smoothed inverse document frequency for every term."""
+    size = len(vocab)
+    return np.log((1 + n_docs) / (1 + doc_freq[:size])) + 1
+
+
+def recommend(text: str, count: int = 5, exclude=()) -> list:
+    """
+    Return up to count (email, score) pairs, best first, for the
+    referees whose past reviews are most similar to text. Scores are
+    cosine similarities in [0, 1]; referees scoring 0 are left out.
+    """
+    global norms
+    with lock:
+        _flush()
+        if not referee_emails:
+            return []
+        idf = _idf()
+        if norms is None:
+            norms = np.sqrt(profiles.multiply(profiles) @ (idf * idf))
+        query = np.zeros(len(vocab))
+        for column, weight in _tf_vector(text, grow=False).items():
+            query[column] = weight * idf[column]
+        query_norm = np.linalg.norm(query)
+        if not query_norm:
+            return []
+        scores = (profiles @ (query * idf)) / (
+            np.where(norms > 0, norms, 1) * query_norm)
+        emails = list(referee_emails)
+    for email in exclude:
+        row = referee_rows.get(email)
+        if row is not None and row < len(scores):
+            scores[row] = 0
+    top = min(count, len(scores))
+    if top <= 0:
+        return []
+    best = np.argpartition(-scores, top - 1)[:top]
+    best = best[np.argsort(-scores[best])]
+    return [(emails[row], float(scores[row]))
+            for row in best if scores[row] > 0]
@@ -0,0 +1,139 @@
+"""
+This module keeps referee workloads in memory so editors can be offered
+the least-loaded referees without scanning manuscripts on every request.
+
+The load of a referee is the number of reviews they still owe. It lives
+in a dict, mirrored by a min-heap of (load, email) pairs. Changing a
+load pushes a fresh pair and leaves the old one in place; stale pairs
+are recognised and dropped when they reach the top. The manuscripts
+module reports every change, and the whole thing is rebuilt from the
+database on first use and whenever the set of referees changes.
+"""
+import heapq
+import threading
+
+loads = {}
+heap = []
+loaded = False
+lock = threading.Lock()
+
+# Rebuild the heap once stale pairs outnumber live ones by this factor.
+COMPACT_FACTOR = 2
+
+
+def is_loaded() -> bool:
+    """Check whether the loads reflect the database."""
+    return loaded
+
+
+def invalidate():
+    """Forget the loads, e.g. when someone gains or loses the RE role."""
+    global loaded
+    with lock:
+        loaded = False
+
+
+def rebuild(referees, counts: dict):
+    """
+    Reset the loads.
+
+    Args:
+        referees: The emails of everyone who can referee
+        counts: {email: reviews owed}; referees missing from it owe none
+    """
+    global heap, loaded
+    with lock:
+        loads.clear()
+        for email in referees:
+            loads[email] = counts.get(email, 0)
+        heap = [(load, email) for email, load in loads.items()]
+        heapq.heapify(heap)
+        loaded = True
+
+
+def _compact():
+    """Drop stale heap pairs once they dominate. Caller holds lock."""
+    global heap
+    if len(heap) > COMPACT_FACTOR * len(loads) + 1:
+        heap = [(load, email) for email, load in loads.items()]
+        heapq.heapify(heap)
+
+
+def adjust(email: str, delta: int):
+    """
+    Change a referee's load by delta. People without the RE role are
+    not tracked and are ignored.
+    """
+    with lock:
+        if email not in loads:
+            return
+        loads[email] = max(0, loads[email] + delta)
+        heapq.heappush(heap, (loads[email], email))
+        _compact()
+
+
+def load_of(email: str) -> int:
+    """Return a referee's load, or None if they are not tracked."""
+    return loads.get(email)
+
+
+def _is_live(pair) -> bool:
+    load, email = pair
+    return loads.get(email) == load
+
+
+def least_loaded(n: int, exclude=()) -> list:
+    """
+    Return up to n referees with the fewest reviews owed, lightest
+    first, skipping anyone in exclude. Loads are not changed; the
+    assignment itself is reported through adjust().
+    """
+    exclude = set(exclude)
+    picked = []
+    popped = []
+    seen = set()
+    with lock:
+        while heap and len(picked) < n:
+            pair = heapq.heappop(heap)
+            if not _is_live(pair) or pair[1] in seen:
+                continue
+            seen.add(pair[1])
+            popped.append(pair)
+            if pair[1] not in exclude:
+                picked.append(pair[1])
+        for pair in popped:
+            heapq.heappush(heap, pair)
+    return picked
+
+
+def plan(requests: list) -> list:
+    """
+    Pick referees for several manuscripts at once, so that one batch
+    spreads work out rather than handing everything to the same few.
+
+    Args:
+        requests: (n, exclude) pairs, one per manuscript
+
+    Returns:
+        A list of picks per request. Picks count towards later requests
+        in the same plan but not towards the live loads.
+    """
+    with lock:
+        local = [(load, email) for email, load in loads.items()]
+    heapq.heapify(local)
+    plans = []
+    for n, exclude in requests:
+        exclude = set(exclude)
+        picked = []
+        skipped = []
+        while local and len(picked) < n:
+            load, email = heapq.heappop(local)
+            if email in exclude:
+                skipped.append((load, email))
+                continue
+            picked.append(email)
+            skipped.append((load + 1, email))
+        for pair in skipped:
+            heapq.heappush(local, pair)
+        plans.append(picked)
+    return plans
@@ -2,6 +2,7 @@
 This module manages person roles for a journal.
 """
 import data.db_connect as dbc
+import data.versions as ver
 
 # Constants
 AUTHOR_CODE = 'AU'
@@ -48,6 +49,7 @@ def create(code: str, role: str, testing=False):
             CODE_KEY: code,
             ROLE_KEY: role
             }, testing=testing)
+        ver.bump(ver.ROLES)
         return True
     except Exception as e:
         print(f"Error in create: {str(e)}")
@@ -98,9 +100,11 @@ def update(code: str, new_role: str, testing=False) -> bool:
     try:
         if not read_one(code, testing=testing):
             raise ValueError(f"Role with code '{code}' does not exist.")
-        return bool(dbc.update_doc(
+        updated = bool(dbc.update_doc(
             ROLES_COLLECTION, {CODE_KEY: code}, {ROLE_KEY: new_role},
             testing=testing))
+        ver.bump(ver.ROLES)
+        return updated
     except Exception as e:
         print(f"Error in update: {str(e)}")
         raise e
@@ -126,6 +130,7 @@ def delete(code: str, testing=False) -> dict:
             {ROLE_CODES_KEY: code},
             {"$pull": {ROLE_CODES_KEY: code}}
         )
+        ver.bump(ver.ROLES, ver.USERS)
 
         return role
     except Exception as e:
@@ -0,0 +1,269 @@
+"""
+This module is the full-text search index over manuscripts and journal
+texts.
+
+It is an in-memory inverted index: for every term, the documents that
+contain it and a field-weighted term frequency, so a hit in a title
+counts for more than one in the body. Queries are ranked with BM25 by
+walking only the postings of the query terms; no document is read
+until the page of results is known, and then only to cut snippets.
+
+Each kind of document is a source registered by the module that owns
+it, with one function listing every document for a rebuild and one
+fetching the text of a few documents for snippets. The owning modules
+report creates, updates and deletes; the index is rebuilt on first use.
+"""
+import heapq
+import math
+import re
+import threading
+
+# Document fields and how much a hit in each counts
+TITLE = 'title'
+ABSTRACT = 'abstract'
+TEXT = 'text'
+FIELD_WEIGHTS = {TITLE: 3.0, ABSTRACT: 2.0, TEXT: 1.0}
+
+# Metadata the index keeps per document, for filters and results
+KIND = 'kind'
+DOC_ID = 'id'
+STATE = 'state'
+AUTHOR = 'author'
+AUTHOR_EMAIL = 'author_email'
+
+# Result keys
+SCORE = 'score'
+SNIPPET = 'snippet'
+HIGHLIGHTS = 'highlights'
+ITEMS = 'items'
+TOTAL = 'total'
+PAGE = 'page'
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+SNIPPET_CHARS = 200
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+WORD_RE = re.compile(r'\w+')
+STOP_WORDS = frozenset('''
+a an and are as at be but by for from has have in is it its of on or
+that the this to was were will with
+'''.split())
+
+# kind -> (documents, fetch). documents() yields (id, fields, meta) for
+# every document; fetch(ids) returns {id: fields} for the given ones.
+sources = {}
+
+postings = {}
+docs = {}
+total_length = 0.0
+loaded = False
+lock = threading.RLock()
+
+
+def register_source(kind: str, documents, fetch):
+    """Make a kind of document searchable."""
+    sources[kind] = (documents, fetch)
+
+
+def tokenize(text: str) -> list:
+    """Split text into lowercase search terms."""
+    return [word for word in WORD_RE.findall((text or '').lower())
+            if word not in STOP_WORDS]
+
+
+def is_loaded() -> bool:
+    """Check whether the index reflects the database."""
+    return loaded
+
+
+def invalidate():
+    """Forget the index; the next query rebuilds it."""
+    global loaded
+    with lock:
+        loaded = False
+
+
+def _weighted_terms(fields: dict) -> dict:
+    """Return {term: field-weighted frequency} for a document."""
+    weights = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for term in tokenize(fields.get(field)):
+            weights[term] = weights.get(term, 0.0) + weight
+    return weights
+
+
+def _remove(key: tuple):
+    """Drop a document from the index. Caller holds lock."""
+    global total_length
+    doc = docs.pop(key, None)
+    if doc is None:
+        return
+    total_length -= doc['length']
+    for term in doc['terms']:
+        posting = postings.get(term)
+        if posting is not None:
+            posting.pop(key, None)
+            if not posting:
+                del postings[term]
+
+
+def _add(key: tuple, fields: dict, meta: dict):
+    """(Re)index a document. Caller holds lock."""
+    global total_length
+    _remove(key)
+    weights = _weighted_terms(fields)
+    length = sum(weights.values())
+    for term, weight in weights.items():
+        postings.setdefault(term, {})[key] = weight
+    docs[key] = {'terms': list(weights), 'length': length,
+                 'meta': dict(meta)}
+    total_length += length
+
+
+def rebuild():
+    """Reindex every document of every registered source."""
+    global total_length, loaded
+    with lock:
+        postings.clear()
+        docs.clear()
+        total_length = 0.0
+        for kind, (documents, _) in sources.items():
+            for doc_id, fields, meta in documents():
+                _add((kind, doc_id), fields, meta)
+        loaded = True
+
+
+def index(kind: str, doc_id: str, fields: dict, meta: dict = None):
+    """Add or replace a document in the index."""
+    with lock:
+        if loaded:
+            _add((kind, doc_id), fields, meta or {})
+
+
+def update_meta(kind: str, doc_id: str, meta: dict):
+    """Change a document's filterable metadata, e.g. its state."""
+    with lock:
+        doc = docs.get((kind, doc_id))
+        if doc is not None:
+            doc['meta'].update(meta)
+
+
+def remove(kind: str, doc_id: str):
+    """Take a document out of the index."""
+    with lock:
+        _remove((kind, doc_id))
+
+
+def _matches_filters(meta: dict, filters: dict) -> bool:
+    for field, wanted in filters.items():
+        if wanted is None:
+            continue
+        if field == AUTHOR:
+            wanted = wanted.lower()
+            if wanted not in ((meta.get(AUTHOR) or '').lower(),
+                              (meta.get(AUTHOR_EMAIL) or '').lower()):
+                return False
+        elif meta.get(field) != wanted:
+            return False
+    return True
+
+
+def snippet(fields: dict, terms) -> dict:
+    """
+    Cut a snippet of about SNIPPET_CHARS around the first query term
+    found in the abstract or text (else the title), with the
+    [start, end) offsets of each term occurrence in it.
+    """
+    terms = set(terms)
+    source = ''
+    start = 0
+    for field in (ABSTRACT, TEXT, TITLE):
+        value = fields.get(field) or ''
+        for match in WORD_RE.finditer(value):
+            if match.group().lower() in terms:
+                source = value
+                start = max(0, match.start() - SNIPPET_CHARS // 4)
+                break
+        if source:
+            break
+    if not source:
+        source = fields.get(ABSTRACT) or fields.get(TEXT) or ''
+    cut = source[start:start + SNIPPET_CHARS]
+    highlights = [[match.start(), match.end()]
+                  for match in WORD_RE.finditer(cut)
+                  if match.group().lower() in terms]
+    return {SNIPPET: cut, HIGHLIGHTS: highlights}
+
+
+def search(query: str, kind: str = None, state: str = None,
+           author: str = None, page: int = 1,
+           per_page: int = DEFAULT_PAGE_SIZE) -> dict:
+    """
+    Return one page of documents matching any query term, best first.
+
+    Args:
+        query: Free text; every term contributes to the BM25 score
+        kind: Only return documents of this source kind
+        state: Only return documents in this state
+        author: Only return documents whose author name or email is
+            this (case-insensitive)
+        page: 1-based page number
+        per_page: Results per page
+
+    Returns:
+        A dict with the page's items (kind, id, title, score, snippet,
+        highlights and the document's metadata), the total number of
+        matches and the page number.
+    """
+    per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+    page = max(1, page)
+    terms = list(dict.fromkeys(tokenize(query)))
+    filters = {KIND: kind, STATE: state, AUTHOR: author}
+    if not loaded:
+        rebuild()
+    with lock:
+        n_docs = len(docs) or 1
+        avg_length = (total_length / n_docs) or 1.0
+        scores = {}
+        for term in terms:
+            posting = postings.get(term, {})
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - len(posting) + 0.5)
+                           / (len(posting) + 0.5))
+            for key, tf in posting.items():
+                length = docs[key]['length']
+                scores[key] = scores.get(key, 0.0) + idf * (
+                    tf * (K1 + 1)
+                    / (tf + K1 * (1 - B + B * length / avg_length)))
+        matched = [(score, key) for key, score in scores.items()
+                   if _matches_filters({KIND: key[0],
+                                        **docs[key]['meta']}, filters)]
+        best = heapq.nlargest(page * per_page, matched)
+        hits = [(key, score, dict(docs[key]['meta']))
+                for score, key in best[(page - 1) * per_page:]]
+
+    by_kind = {}
+    for key, _, _ in hits:
+        by_kind.setdefault(key[0], []).append(key[1])
+    texts = {}
+    for hit_kind, ids in by_kind.items():
+        fetch = sources[hit_kind][1]
+        for doc_id, fields in fetch(ids).items():
+            texts[(hit_kind, doc_id)] = fields
+    items = []
+    for key, score, meta in hits:
+        fields = texts.get(key, {})
+        items.append({
+            **meta,
+            KIND: key[0],
+            DOC_ID: key[1],
+            TITLE: fields.get(TITLE, meta.get(TITLE)),
+            SCORE: round(score, 4),
+            **snippet(fields, terms),
+        })
+    return {ITEMS: items, TOTAL: len(matched), PAGE: page}
@@ -0,0 +1,207 @@
+"""
+This module keeps editorial statistics as daily rollups.
+
+There is one small document per UTC day holding that day's new
+submissions, how many manuscripts entered each state, how many times
+each action was taken, and, for every state left that day, the total
+and a histogram of the time manuscripts had spent in it. The
+manuscripts module reports each transition as it is written, and each
+report is a single $inc upsert, so statistics over any date range are
+read from at most a few hundred rollups rather than from every
+manuscript's history.
+"""
+from datetime import datetime, timedelta
+
+import pymongo as pm
+
+import data.db_connect as dbc
+
+STATS_COLLECTION = 'daily_stats'
+
+# Rollup fields
+DAY = 'day'
+SUBMISSIONS = 'submissions'
+ENTERED = 'entered'
+ACTIONS = 'actions'
+DWELL = 'dwell'
+SUM = 'seconds'
+COUNT = 'count'
+HISTOGRAM = 'histogram'
+
+# Summary keys
+SINCE = 'since'
+UNTIL = 'until'
+DAYS = 'days'
+MONTHLY_SUBMISSIONS = 'monthly_submissions'
+MEAN_HOURS = 'mean_hours'
+
+# Upper bounds, in hours, of the time-in-state histogram buckets
+DWELL_BUCKET_HOURS = (1, 6, 24, 72, 168, 336, 720, 2160)
+OVERFLOW_BUCKET = 'more'
+
+DEFAULT_RANGE_DAYS = 365
+DAY_FORMAT = '%Y-%m-%d'
+
+dbc.connect_db()
+
+
+def init_indexes():
+    """Create the index that makes each day's rollup unique."""
+    dbc.create_index(STATS_COLLECTION, [(DAY, pm.ASCENDING)], unique=True)
+
+
+init_indexes()
+
+
+def day_of(timestamp) -> str:
+    """Return the UTC 'YYYY-MM-DD' a timestamp falls on, or None."""
+    timestamp = dbc.to_utc(timestamp)
+    return timestamp.strftime(DAY_FORMAT) if timestamp else None
+
+
+def bucket_of(seconds: float) -> str:
+    """Return the histogram bucket a time in state falls in."""
+    for hours in DWELL_BUCKET_HOURS:
+        if seconds <= hours * 3600:
+            return str(hours)
+    return OVERFLOW_BUCKET
+
+
+def _increments(action: str, from_state: str, to_state: str,
+                dwell_seconds: float = None) -> dict:
+    """Return the $inc fields for one transition."""
+    inc = {f'{ACTIONS}.{action}': 1} if action else {}
+    if to_state != from_state:
+        inc[f'{ENTERED}.{to_state}'] = 1
+        if dwell_seconds is not None:
+            dwell = f'{DWELL}.{from_state}'
+            inc[f'{dwell}.{SUM}'] = dwell_seconds
+            inc[f'{dwell}.{COUNT}'] = 1
+            inc[f'{dwell}.{HISTOGRAM}.{bucket_of(dwell_seconds)}'] = 1
+    return inc
+
+
+def submission(timestamp, state: str) -> tuple:
+    """Describe a new manuscript as a (day, increments) pair."""
+    return day_of(timestamp), {SUBMISSIONS: 1, f'{ENTERED}.{state}': 1}
+
+
+def transition(timestamp, action: str, from_state: str, to_state: str,
+               entered_at=None) -> tuple:
+    """
+    Describe a transition as a (day, increments) pair.
+
+    Args:
+        timestamp: When the transition happened
+        action: The workflow action taken, if recorded
+        from_state: The manuscript's state before
+        to_state: Its state after; the same as from_state for actions
+            that don't move it
+        entered_at: When the manuscript entered from_state, if known,
+            for the time-in-state figures
+    """
+    dwell = None
+    start, end = dbc.to_utc(entered_at), dbc.to_utc(timestamp)
+    if start and end:
+        dwell = max(0.0, (end - start).total_seconds())
+    return day_of(timestamp), _increments(action, from_state, to_state,
+                                          dwell)
+
+
+def record(changes: list):
+    """
+    Fold (day, increments) pairs into the daily rollups in one round
+    trip.
+    """
+    by_day = {}
+    for day, inc in changes:
+        if day is None:
+            continue
+        merged = by_day.setdefault(day, {})
+        for field, value in inc.items():
+            merged[field] = merged.get(field, 0) + value
+    if by_day:
+        dbc.bulk_write(STATS_COLLECTION, [
+            pm.UpdateOne({DAY: day}, {'$inc': inc}, upsert=True)
+            for day, inc in by_day.items()])
+
+
+def replace_all(changes: list):
+    """Throw away every rollup and record changes from scratch."""
+    dbc.del_many(STATS_COLLECTION, {})
+    record(changes)
+
+
+def date_range(since: str = None, until: str = None) -> tuple:
+    """
+    Fill in a missing end of a 'YYYY-MM-DD' range: until defaults to
+    today and since to DEFAULT_RANGE_DAYS before until.
+    """
+    if until is None:
+        until = day_of(dbc.now())
+    if since is None:
+        end = datetime.strptime(until, DAY_FORMAT)
+        since = (end - timedelta(days=DEFAULT_RANGE_DAYS - 1)).strftime(
+            DAY_FORMAT)
+    return since, until
+
+
+def read(since: str = None, until: str = None) -> list:
+    """Return the daily rollups from since to until inclusive, in order."""
+    since, until = date_range(since, until)
+    return dbc.fetch_many(STATS_COLLECTION,
+                          {DAY: {'$gte': since, '$lte': until}},
+                          sort=[(DAY, pm.ASCENDING)],
+                          projection={dbc.MONGO_ID: 0})
+
+
+def _add(totals: dict, counts: dict):
+    for key, value in (counts or {}).items():
+        totals[key] = totals.get(key, 0) + value
+
+
+def summarize(since: str = None, until: str = None) -> dict:
+    """
+    Sum the daily rollups from since to until inclusive.
+
+    Returns:
+        A dict with the range, the number of days with activity,
+        submissions in total and per month, entries per state, actions
+        taken, and per state left: how many times, the mean hours spent
+        in it and the histogram of hours spent.
+    """
+    since, until = date_range(since, until)
+    rollups = read(since, until)
+    monthly = {}
+    entered = {}
+    actions = {}
+    dwell = {}
+    for rollup in rollups:
+        month = rollup[DAY][:7]
+        monthly[month] = monthly.get(month, 0) + rollup.get(SUBMISSIONS, 0)
+        _add(entered, rollup.get(ENTERED))
+        _add(actions, rollup.get(ACTIONS))
+        for state, figures in (rollup.get(DWELL) or {}).items():
+            totals = dwell.setdefault(state, {SUM: 0, COUNT: 0,
+                                              HISTOGRAM: {}})
+            totals[SUM] += figures.get(SUM, 0)
+            totals[COUNT] += figures.get(COUNT, 0)
+            _add(totals[HISTOGRAM], figures.get(HISTOGRAM))
+    return {
+        SINCE: since,
+        UNTIL: until,
+        DAYS: len(rollups),
+        SUBMISSIONS: sum(monthly.values()),
+        MONTHLY_SUBMISSIONS: monthly,
+        ENTERED: entered,
+        ACTIONS: actions,
+        DWELL: {
+            state: {
+                COUNT: totals[COUNT],
+                MEAN_HOURS: round(totals[SUM] / totals[COUNT] / 3600, 2)
+                if totals[COUNT] else None,
+                HISTOGRAM: totals[HISTOGRAM],
+            }
+            for state, totals in dwell.items()
+        },
+    }
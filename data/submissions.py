@@ -0,0 +1,120 @@
+"""
+This module runs .docx submissions through text extraction.
+Parsing happens in the worker process pool; request threads only record
+a job and return, and the job document tracks progress.
+"""
+import threading
+
+from bson import ObjectId
+
+import data.db_connect as dbc
+import data.docx_text as docx
+import data.manuscripts as ms
+import data.workers as wrk
+
+JOBS_COLLECTION = 'submission_jobs'
+
+JOB_ID = '_id'
+MANUSCRIPT_ID = 'manuscript_id'
+STATUS = 'status'
+RESULT = 'result'
+ERROR_KEY = 'error'
+CREATED = 'created'
+FINISHED = 'finished'
+
+STATUS_QUEUED = 'QUEUED'
+STATUS_DONE = 'DONE'
+STATUS_FAILED = 'FAILED'
+
+DOCX_EXTENSION = '.docx'
+
+# Jobs started by this process, set once their result is recorded.
+pending = {}
+pending_lock = threading.Lock()
+
+dbc.connect_db()
+
+
+def is_docx_filename(filename: str) -> bool:
+    """Check that an uploaded file claims to be a .docx document."""
+    return bool(filename) and filename.lower().endswith(DOCX_EXTENSION)
+
+
+def submit_docx(manuscript_id: str, docx_bytes: bytes) -> str:
+    """
+    Queue a .docx file for extraction into the given manuscript.
+    Returns the job id; the request thread never parses the file.
+    """
+    manuscript = ms.get_manuscript(manuscript_id)
+    if not manuscript or ERROR_KEY in manuscript:
+        raise KeyError(f'Manuscript {manuscript_id} not found')
+    version = manuscript.get(ms.VERSION, 1)
+    result = dbc.insert_one(JOBS_COLLECTION, {
+        MANUSCRIPT_ID: manuscript_id,
+        STATUS: STATUS_QUEUED,
+        CREATED: dbc.now(),
+    })
+    job_id = str(result.inserted_id)
+    with pending_lock:
+        pending[job_id] = threading.Event()
+    try:
+        future = wrk.submit(docx.extract, docx_bytes)
+    except Exception:
+        with pending_lock:
+            pending.pop(job_id, None)
+        dbc.del_one(JOBS_COLLECTION, {JOB_ID: ObjectId(job_id)})
+        raise
+    future.add_done_callback(
+        lambda fut: _finish_job(job_id, manuscript_id, version, fut))
+    return job_id
+
+
+def _finish_job(job_id: str, manuscript_id: str, version: int, future):
+    """
+    Record the outcome of an extraction and copy it onto the manuscript.
+    Runs on the executor's callback thread, not a request thread.
+    """
+    try:
+        extracted = future.result()
+        ms.apply_extraction(manuscript_id, version, extracted)
+        update = {
+            STATUS: STATUS_DONE,
+            RESULT: {
+                docx.WORD_COUNT: extracted[docx.WORD_COUNT],
+                docx.ABSTRACT_WORD_COUNT:
+                    extracted[docx.ABSTRACT_WORD_COUNT],
+            },
+        }
+    except Exception as e:
+        print(f"Error extracting submission {job_id}: {e}")
+        update = {STATUS: STATUS_FAILED, ERROR_KEY: str(e)}
+    update[FINISHED] = dbc.now()
+    dbc.update_doc(JOBS_COLLECTION, {JOB_ID: ObjectId(job_id)}, update)
+    with pending_lock:
+        finished = pending.pop(job_id, None)
+    if finished is not None:
+        finished.set()
+
+
+def get_job(job_id: str) -> dict:
+    """
+    Return the job document, or None if there is no such job.
+    """
+    try:
+        job = dbc.fetch_one(JOBS_COLLECTION, {JOB_ID: ObjectId(job_id)})
+        return job
+    except Exception as e:
+        print(f"Error fetching job: {e}")
+        return None
+
+
+def wait_for_job(job_id: str, timeout: float = None) -> dict:
+    """
+    Block until a job started by this process finishes, then return it.
+    Meant for scripts and tests; endpoints should poll get_job().
+    """
+    with pending_lock:
+        finished = pending.get(job_id)
+    if finished is not None:
+        finished.wait(timeout)
+    return get_job(job_id)
@@ -0,0 +1,116 @@
+"""
+This module is a small merging t-digest: a summary of a stream of
+numbers that answers quantile queries with good accuracy at the tails,
+in bounded space, and that can be merged with other digests.
+
+A digest is a plain dict so it can be stored in Mongo as is:
+centroids is a list of [mean, weight] pairs sorted by mean, plus the
+total count and the exact min and max. Centroids near the median may
+absorb many values while those near the extremes stay small, which is
+what keeps p99 accurate.
+"""
+import math
+
+CENTROIDS = 'centroids'
+COUNT = 'count'
+MIN = 'min'
+MAX = 'max'
+
+# Higher keeps more centroids and gives more accurate quantiles.
+DEFAULT_COMPRESSION = 100
+
+
+def empty() -> dict:
+    """Return a digest of nothing."""
+    return {CENTROIDS: [], COUNT: 0, MIN: None, MAX: None}
+
+
+def _k(q: float, compression: float) -> float:
+    """The t-digest k1 scale function."""
+    return compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+
+def _compress(centroids: list, compression: float) -> list:
+    """
+    Merge sorted [mean, weight] pairs so that no centroid spans more
+    than one unit of the scale function.
+    """
+    total = sum(weight for _, weight in centroids)
+    if not total:
+        return []
+    merged = [list(centroids[0])]
+    seen = 0.0
+    k_low = _k(0.0, compression)
+    for mean, weight in centroids[1:]:
+        current = merged[-1]
+        q = (seen + current[1] + weight) / total
+        if _k(min(q, 1.0), compression) - k_low <= 1:
+            combined = current[1] + weight
+            current[0] += (mean - current[0]) * weight / combined
+            current[1] = combined
+        else:
+            seen += current[1]
+            k_low = _k(seen / total, compression)
+            merged.append([mean, weight])
+    return merged
+
+
+def add(digest: dict, values, compression: float = DEFAULT_COMPRESSION
+        ) -> dict:
+    """Return a new digest with values added."""
+    values = [float(value) for value in values]
+    if not values:
+        return digest
+    return merge([digest, {
+        CENTROIDS: [[value, 1] for value in values],
+        COUNT: len(values),
+        MIN: min(values),
+        MAX: max(values),
+    }], compression)
+
+
+def merge(digests, compression: float = DEFAULT_COMPRESSION) -> dict:
+    """Return one digest summarizing everything in digests."""
+    digests = [digest for digest in digests if digest and digest[COUNT]]
+    if not digests:
+        return empty()
+    centroids = sorted(
+        (list(centroid) for digest in digests
+         for centroid in digest[CENTROIDS]),
+        key=lambda centroid: centroid[0])
+    return {
+        CENTROIDS: _compress(centroids, compression),
+        COUNT: sum(digest[COUNT] for digest in digests),
+        MIN: min(digest[MIN] for digest in digests),
+        MAX: max(digest[MAX] for digest in digests),
+    }
+
+
+def quantile(digest: dict, q: float) -> float:
+    """
+    Estimate the q-th quantile (0 <= q <= 1), interpolating between
+    centroid means. Returns None for an empty digest.
+    """
+    centroids = digest[CENTROIDS]
+    if not digest[COUNT]:
+        return None
+    if q <= 0:
+        return digest[MIN]
+    if q >= 1:
+        return digest[MAX]
+    total = sum(weight for _, weight in centroids)
+    target = q * total
+    # Each centroid's mean sits at the middle of its weight.
+    points = [(0.0, digest[MIN])]
+    seen = 0.0
+    for mean, weight in centroids:
+        points.append((seen + weight / 2, mean))
+        seen += weight
+    points.append((total, digest[MAX]))
+    for (rank_low, low), (rank_high, high) in zip(points, points[1:]):
+        if target <= rank_high:
+            if rank_high == rank_low:
+                return high
+            return low + (high - low) * (target - rank_low) / (
+                rank_high - rank_low)
+    return digest[MAX]
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+import data.analytics as an
+import data.events as evt
+
+JAN = datetime(2024, 1, 10)
+FEB = datetime(2024, 2, 10)
+ED = 'ed@example.com'
+
+
+def _event(manuscript_id, seq, when, state, action=None, actor=None):
+    return {evt.MANUSCRIPT_ID: manuscript_id, evt.SEQ: seq,
+            evt.TIMESTAMP: when, an.STATE_KEY: state,
+            an.ACTION_KEY: action, an.ACTOR_KEY: actor}
+
+
+EVENTS = [
+    _event('a', 1, JAN, 'SUBMITTED'),
+    _event('a', 2, JAN + timedelta(hours=10), 'REFEREE_REVIEW',
+           'ASSIGN_REFEREE', ED),
+    _event('a', 3, JAN + timedelta(hours=20), 'REFEREE_REVIEW',
+           'ASSIGN_REFEREE', ED),
+    _event('a', 4, JAN + timedelta(hours=40), 'REJECTED', 'REJECT', ED),
+    _event('b', 1, JAN, 'SUBMITTED'),
+    _event('b', 2, JAN + timedelta(hours=30), 'REJECTED', 'REJECT', ED),
+    _event('c', 1, FEB, 'SUBMITTED'),
+]
+
+
+def test_columns_from_codes_and_grows():
+    columns = an.columns_from(iter(EVENTS), size_hint=2)
+    assert len(columns[an.SEQ]) == len(EVENTS)
+    assert columns[an.TABLES][an.MANUSCRIPT] == ['a', 'b', 'c']
+    assert list(columns[an.MANUSCRIPT]) == [0, 0, 0, 0, 1, 1, 2]
+    assert columns[an.TIMESTAMP][1] - columns[an.TIMESTAMP][0] == 36000
+
+
+def test_funnel():
+    columns = an.columns_from(EVENTS, len(EVENTS))
+    assert an.funnel(columns, ['REFEREE_REVIEW', 'REJECTED',
+                               'PUBLISHED']) == {
+        '2024-01': {an.COHORT_SIZE: 2, 'REFEREE_REVIEW': 1,
+                    'REJECTED': 2, 'PUBLISHED': 0},
+        '2024-02': {an.COHORT_SIZE: 1, 'REFEREE_REVIEW': 0,
+                    'REJECTED': 0, 'PUBLISHED': 0},
+    }
+
+
+def test_dwell_times():
+    dwell = an.dwell_times(an.columns_from(EVENTS, len(EVENTS)))
+    assert dwell['SUBMITTED'] == {an.COUNT: 2, an.MEAN_HOURS: 20.0,
+                                  an.MEDIAN_HOURS: 20.0,
+                                  an.P90_HOURS: 28.0}
+    # Two events in REFEREE_REVIEW are one 30 hour stay
+    assert dwell['REFEREE_REVIEW'][an.COUNT] == 1
+    assert dwell['REFEREE_REVIEW'][an.MEAN_HOURS] == 30.0
+    assert 'REJECTED' not in dwell
+
+
+def test_throughput():
+    columns = an.columns_from(EVENTS, len(EVENTS))
+    assert an.throughput(columns, ['REJECT']) == {ED: {'2024-01': 2}}
+    assert an.throughput(columns, ['ACCEPT']) == {}
+
+
+def test_empty():
+    columns = an.columns_from([])
+    assert an.funnel(columns, ['REJECTED']) == {}
+    assert an.dwell_times(columns) == {}
+    assert an.throughput(columns, ['REJECT']) == {}
+
+
+def test_load_events_streams_the_log():
+    import data.manuscripts as ms
+    manuscript = ms.create_manuscript(
+        title="Analytics Test",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        ms.process_manuscript_action(manuscript_id, ms.ACTION_REJECT,
+                                     actor_email=ED)
+        columns = an.load_events()
+        assert manuscript_id in columns[an.TABLES][an.MANUSCRIPT]
+        assert an.throughput(columns, [ms.ACTION_REJECT])[ED]
+        assert an.dwell_times(columns)[ms.STATE_SUBMITTED][an.COUNT] >= 1
+        assert len(an.load_events(since=FEB, until=FEB)[an.SEQ]) == 0
+    finally:
+        ms.delete_manuscript(manuscript_id)
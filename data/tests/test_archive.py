@@ -0,0 +1,49 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+import data.archive as arc
+
+MANUSCRIPT_ID = '60d21b4667d0d8992e610c99'
+MANUSCRIPT = {
+    '_id': MANUSCRIPT_ID,
+    'title': 'Archived Findings',
+    'author_email': 'old@example.com',
+    'state': 'REJECTED',
+    'revisions': [{'version': 1, 'text': 'x' * 5000,
+                   'timestamp': datetime(2020, 1, 1)}],
+}
+
+
+@pytest.fixture(autouse=True)
+def clean_archive():
+    arc.remove([MANUSCRIPT_ID])
+    yield
+    arc.remove([MANUSCRIPT_ID])
+
+
+def test_pack_compresses_and_unpacks():
+    doc = arc.pack(MANUSCRIPT, closed_at=datetime(2020, 2, 1))
+    assert doc['_id'] == ObjectId(MANUSCRIPT_ID)
+    assert doc[arc.STATE] == 'REJECTED'
+    assert len(doc[arc.BLOB]) < 1000
+    assert arc.unpack(doc) == MANUSCRIPT
+
+
+def test_store_fetch_remove():
+    assert arc.fetch(MANUSCRIPT_ID) is None
+    before = arc.count()
+    arc.store([arc.pack(MANUSCRIPT)])
+    arc.store([arc.pack({**MANUSCRIPT, 'title': 'Renamed'})])
+    assert arc.count() == before + 1
+    assert arc.fetch(MANUSCRIPT_ID)['title'] == 'Renamed'
+    arc.remove([MANUSCRIPT_ID])
+    assert arc.fetch(MANUSCRIPT_ID) is None
+
+
+def test_archive_after_days(monkeypatch):
+    monkeypatch.delenv(arc.ARCHIVE_AFTER_DAYS_ENV, raising=False)
+    assert arc.archive_after_days() == arc.DEFAULT_ARCHIVE_AFTER_DAYS
+    monkeypatch.setenv(arc.ARCHIVE_AFTER_DAYS_ENV, '30')
+    assert arc.archive_after_days() == 30
@@ -0,0 +1,21 @@
+import data.blobs as blb
+
+CONTENT = "A body of text used only by the blob tests."
+
+
+def test_put_and_release_refcounts():
+    key = blb.key_of(CONTENT)
+    assert blb.refs(key) == 0
+    assert blb.put([CONTENT, CONTENT]) == [key, key]
+    assert blb.refs(key) == 2
+    assert blb.get_many([key, None, 'missing']) == {key: CONTENT}
+    blb.release([key])
+    assert blb.refs(key) == 1
+    blb.release([key, None])
+    assert blb.refs(key) == 0
+    assert blb.get_many([key]) == {}
+
+
+def test_key_of_distinguishes_texts():
+    assert blb.key_of("a") != blb.key_of("b")
+    assert blb.key_of(None) == blb.key_of("")
@@ -0,0 +1,46 @@
+import data.cache as cache
+
+
+def test_put_get_and_invalidate():
+    key = '/cache-test'
+    cache.put(key, b'body', cache.stamp(['cache-test-tag']))
+    assert cache.get(key) == b'body'
+    cache.invalidate('another-tag')
+    assert cache.get(key) == b'body'
+    cache.invalidate('cache-test-tag')
+    assert cache.get(key) is None
+
+
+def test_write_during_build_leaves_entry_stale():
+    key = '/cache-test-race'
+    stamp = cache.stamp(['cache-test-tag'])
+    cache.invalidate('cache-test-tag')
+    cache.put(key, b'old', stamp)
+    assert cache.get(key) is None
+
+
+def test_ttl_and_size(monkeypatch):
+    cache.put('/cache-test-ttl', b'x', {}, ttl=0)
+    assert cache.get('/cache-test-ttl') is None
+    monkeypatch.setenv(cache.SIZE_ENV, '2')
+    for i in range(3):
+        cache.put(f'/cache-test-{i}', b'x', {})
+    assert cache.get('/cache-test-0') is None
+    assert cache.get('/cache-test-2') == b'x'
+    cache.clear()
+    assert cache.get('/cache-test-2') is None
+
+
+def test_variants():
+    key = '/cache-test-variants'
+    cache.put(key, b'body', cache.stamp(['cache-test-tag']))
+    assert cache.get_variant(key, 'gzip') is None
+    cache.put_variant(key, 'gzip', b'other body', b'stale')
+    assert cache.get_variant(key, 'gzip') is None
+    cache.put_variant(key, 'gzip', b'body', b'packed')
+    assert cache.get_variant(key, 'gzip') == b'packed'
+    cache.put(key, b'new body', {})
+    assert cache.get_variant(key, 'gzip') is None
+    cache.invalidate('cache-test-tag')
+    cache.put_variant('/cache-test-missing', 'gzip', b'body', b'packed')
+    assert cache.get_variant('/cache-test-missing', 'gzip') is None
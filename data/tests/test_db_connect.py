@@ -63,3 +63,34 @@ def test_fetch_all(mock_mongo):
     assert len(result) == 2
     assert any(doc["TEST_NAME"] == "DOC1" for doc in result)
     assert any(doc["TEST_NAME"] == "DOC2" for doc in result)
+
+def test_to_utc():
+    from datetime import datetime, timezone
+    aware = db.to_utc("2024-01-01T12:00:00+02:00")
+    assert aware == datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc)
+    naive = db.to_utc(datetime(2024, 1, 1, 10, 0))
+    assert naive.tzinfo is not None
+    assert db.to_utc("not a date") is None
+    assert db.to_utc(42) is None
+
+
+def test_fetch_one_projection(mock_mongo):
+    db.insert_one(TEST_COLLECTION, {"TEST_NAME": "TEST", "TEST_VALUE": 1,
+                                    "ITEMS": [{"N": 1}, {"N": 2}]})
+    result = db.fetch_one(TEST_COLLECTION, TEST_FILT,
+                          projection={"TEST_VALUE": 1,
+                                      "ITEMS": {"$elemMatch": {"N": 2}}})
+    assert result["TEST_VALUE"] == 1
+    assert result["ITEMS"] == [{"N": 2}]
+    assert "TEST_NAME" not in result
+
+
+def test_fetch_and_update_one(mock_mongo):
+    db.insert_one(TEST_COLLECTION, {"TEST_NAME": "TEST", "TEST_VALUE": 1})
+    before = db.fetch_and_update_one(TEST_COLLECTION, TEST_FILT,
+                                     {"$inc": {"TEST_VALUE": 1}})
+    assert before["TEST_VALUE"] == 1
+    assert isinstance(before["_id"], str)
+    assert db.fetch_one(TEST_COLLECTION, TEST_FILT)["TEST_VALUE"] == 2
+    assert db.fetch_and_update_one(TEST_COLLECTION, TEST_NONEXISTENT_FILT,
+                                   {"$inc": {"TEST_VALUE": 1}}) is None
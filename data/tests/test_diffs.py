@@ -0,0 +1,108 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import data.diffs as dff
+
+
+def test_compute_lines():
+    diff = dff.compute("one\ntwo\nthree", "one\n2\nthree\nfour")
+    assert diff[dff.MODE] == dff.MODE_LINES
+    assert diff[dff.ADDED] == 2
+    assert diff[dff.REMOVED] == 1
+    assert diff[dff.HUNKS][0] == {dff.OP: 'replace', dff.FROM_START: 1,
+                                  dff.TO_START: 1, dff.OLD: ['two'],
+                                  dff.NEW: ['2']}
+    assert diff[dff.HUNKS][1][dff.OP] == 'insert'
+    assert dff.compute("same", "same")[dff.HUNKS] == []
+
+
+def test_compute_words():
+    diff = dff.compute("the quick fox", "the slow fox", dff.MODE_WORDS)
+    assert diff[dff.HUNKS] == [{dff.OP: 'replace', dff.FROM_START: 1,
+                                dff.TO_START: 1, dff.OLD: ['quick'],
+                                dff.NEW: ['slow']}]
+
+
+def test_request_caches_with_lru(monkeypatch):
+    monkeypatch.setenv(dff.CACHE_SIZE_ENV, '2')
+    keys = [(f'diff-test-{i}', 1, 2, dff.MODE_LINES) for i in range(3)]
+    try:
+        assert dff.request(keys[0], "a", "b") == (dff.STATUS_PENDING, None)
+        diff = dff.wait_for(keys[0], timeout=30)
+        assert diff[dff.ADDED] == 1
+        assert dff.request(keys[0], "a", "b") == (dff.STATUS_DONE, diff)
+        for key in keys[1:]:
+            dff.request(key, "a", "c")
+            dff.wait_for(key, timeout=30)
+        assert dff.cached(keys[0]) is None
+        assert dff.cached(keys[2]) is not None
+        dff.forget(keys[2][0])
+        assert dff.cached(keys[2]) is None
+    finally:
+        for key in keys:
+            dff.forget(key[0])
+
+
+def _finished_submit(submitted, result=None, exception=None):
+    """A wrk.submit stand-in whose futures are already done."""
+    def submit(fn, *args):
+        submitted.append(args)
+        future = Future()
+        if exception is None:
+            future.set_result(result)
+        else:
+            future.set_exception(exception)
+        return future
+    return submit
+
+
+def test_failed_diff_is_remembered(monkeypatch):
+    key = ('diff-test-failed', 1, 2, dff.MODE_LINES)
+    submitted = []
+    monkeypatch.setattr(dff.wrk, 'submit',
+                        _finished_submit(submitted, (None, 'boom')))
+    try:
+        assert dff.request(key, "a", "b") == (dff.STATUS_PENDING, None)
+        status, error = dff.request(key, "a", "b")
+        assert status == dff.STATUS_FAILED
+        assert 'boom' in error
+        assert dff.status(key) == (dff.STATUS_FAILED, error)
+        assert len(submitted) == 1
+        dff.forget(key[0])
+        assert dff.status(key) == (None, None)
+    finally:
+        dff.forget(key[0])
+
+
+def test_compute_error_in_pool_is_remembered():
+    key = ('diff-test-compute-error', 1, 2, dff.MODE_LINES)
+    try:
+        assert dff.request(key, 5, "b") == (dff.STATUS_PENDING, None)
+        assert dff.wait_for(key, timeout=30) is None
+        assert dff.status(key)[0] == dff.STATUS_FAILED
+    finally:
+        dff.forget(key[0])
+
+
+def test_worker_failure_not_remembered(monkeypatch):
+    key = ('diff-test-worker', 1, 2, dff.MODE_LINES)
+    submitted = []
+    monkeypatch.setattr(dff.wrk, 'submit', _finished_submit(
+        submitted, exception=BrokenProcessPool('worker died')))
+    assert dff.request(key, "a", "b") == (dff.STATUS_PENDING, None)
+    assert dff.status(key) == (None, None)
+    assert dff.request(key, "a", "b") == (dff.STATUS_PENDING, None)
+    assert len(submitted) == 2
+
+
+def test_queue_failure_not_remembered(monkeypatch):
+    key = ('diff-test-queue', 1, 2, dff.MODE_LINES)
+
+    def broken_submit(fn, *args):
+        raise RuntimeError('pool down')
+
+    monkeypatch.setattr(dff.wrk, 'submit', broken_submit)
+    status, error = dff.request(key, "a", "b")
+    assert status == dff.STATUS_FAILED
+    assert 'pool down' in error
+    assert dff.status(key) == (None, None)
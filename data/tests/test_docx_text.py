@@ -0,0 +1,63 @@
+import io
+import zipfile
+
+import pytest
+import data.docx_text as docx
+
+
+def make_docx(paragraphs):
+    """Build a minimal .docx file holding the given paragraphs."""
+    body = ''.join(
+        f'<w:p><w:r><w:t xml:space="preserve">{para}</w:t></w:r></w:p>'
+        for para in paragraphs
+    )
+    xml = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{docx.W_NS}"><w:body>{body}</w:body>'
+        '</w:document>'
+    )
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as archive:
+        archive.writestr(docx.DOCUMENT_PART, xml)
+    return buf.getvalue()
+
+
+def test_read_paragraphs():
+    paras = docx.read_paragraphs(make_docx(['First line', 'Second line']))
+    assert paras == ['First line', 'Second line']
+
+
+def test_read_paragraphs_bad_file():
+    with pytest.raises(ValueError):
+        docx.read_paragraphs(b'not a zip file')
+
+
+def test_count_words():
+    assert docx.count_words("It's a well-known test.") == 4
+    assert docx.count_words('') == 0
+
+
+def test_extract_abstract_heading():
+    data = make_docx([
+        'My Paper',
+        'Abstract',
+        'We study API servers.',
+        'Introduction',
+        'Servers are everywhere.',
+    ])
+    ret = docx.extract(data)
+    assert ret[docx.ABSTRACT] == 'We study API servers.'
+    assert ret[docx.ABSTRACT_WORD_COUNT] == 4
+    assert ret[docx.WORD_COUNT] == 11
+    assert 'Servers are everywhere.' in ret[docx.TEXT]
+
+
+def test_extract_abstract_prefix():
+    ret = docx.extract(make_docx(['Abstract: Short and sweet.', 'Body']))
+    assert ret[docx.ABSTRACT] == 'Short and sweet.'
+
+
+def test_extract_no_abstract():
+    ret = docx.extract(make_docx(['Just a body']))
+    assert ret[docx.ABSTRACT] == ''
+    assert ret[docx.WORD_COUNT] == 3
@@ -0,0 +1,48 @@
+import pytest
+
+import data.db_connect as dbc
+import data.duplicates as dup
+
+BASE = ' '.join(f'word{i}' for i in range(300))
+
+
+@pytest.fixture(autouse=True)
+def setup_test_db():
+    dbc.client[dbc.JOURNAL_DB][dup.SIGNATURES_COLLECTION].delete_many({})
+    dup.init_indexes()
+    dup.load()
+    yield
+    dbc.client[dbc.JOURNAL_DB][dup.SIGNATURES_COLLECTION].delete_many({})
+    dup.load()
+
+
+def test_signature_estimates_similarity():
+    edited = BASE.replace('word150', 'changed')
+    same = dup.signature(BASE) == dup.signature(edited)
+    assert same.mean() > 0.9
+    other = ' '.join(f'other{i}' for i in range(300))
+    assert (dup.signature(BASE) == dup.signature(other)).mean() < 0.1
+    assert dup.signature('too short') is None
+
+
+def test_check_flags_duplicates_and_overlap():
+    assert dup.check('original', BASE) == []
+    matches = dup.check('copy', BASE.replace('word150', 'changed'))
+    assert matches[0][dup.MANUSCRIPT_ID] == 'original'
+    assert matches[0][dup.KIND] == dup.KIND_DUPLICATE
+    half = ' '.join(BASE.split()[:200]) + ' ' + ' '.join(
+        f'new{i}' for i in range(60))
+    kinds = {m[dup.MANUSCRIPT_ID]: m[dup.KIND]
+             for m in dup.check('reuse', half)}
+    assert kinds.get('original') == dup.KIND_OVERLAP
+
+
+def test_buckets_rebuild_from_stored_signatures():
+    dup.check('original', BASE)
+    dup.signatures.clear()
+    dup.buckets.clear()
+    dup.load()
+    assert 'original' in dup.signatures
+    assert dup.find_similar(dup.signature(BASE))[0][dup.SIMILARITY] == 1.0
+    dup.remove('original')
+    assert dup.find_similar(dup.signature(BASE)) == []
@@ -0,0 +1,50 @@
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import data.db_connect as dbc
+import data.events as evt
+
+TEST_ID = 'test-manuscript'
+
+
+@pytest.fixture(autouse=True)
+def setup_test_db():
+    dbc.client[dbc.JOURNAL_DB][evt.EVENTS_COLLECTION].delete_many({})
+    evt.init_indexes()
+    yield
+    dbc.client[dbc.JOURNAL_DB][evt.EVENTS_COLLECTION].delete_many({})
+
+
+def test_append_and_fetch_page():
+    for seq in range(1, 6):
+        evt.append(TEST_ID, seq, {'action': f'A{seq}'})
+    page = evt.fetch_page(TEST_ID, after=0, limit=2)
+    assert [e[evt.SEQ] for e in page] == [1, 2]
+    page = evt.fetch_page(TEST_ID, after=2, limit=10)
+    assert [e[evt.SEQ] for e in page] == [3, 4, 5]
+    assert page[0]['action'] == 'A3'
+    assert evt.count(TEST_ID) == 5
+
+
+def test_append_duplicate_seq():
+    evt.append(TEST_ID, 1, {'action': 'first'})
+    with pytest.raises(DuplicateKeyError):
+        evt.append(TEST_ID, 1, {'action': 'second'})
+
+
+def test_delete_for():
+    evt.append(TEST_ID, 1, {})
+    evt.delete_for(TEST_ID)
+    assert evt.count(TEST_ID) == 0
+
+
+def test_retract():
+    for seq in range(1, 4):
+        evt.append(TEST_ID, seq, {})
+    evt.append('other-manuscript', 3, {})
+    evt.retract([(TEST_ID, 3), (TEST_ID, 9)])
+    evt.retract([])
+    assert [e[evt.SEQ] for e in evt.fetch_page(TEST_ID)] == [1, 2]
+    evt.append(TEST_ID, 3, {})
+    assert evt.count('other-manuscript') == 1
+    evt.delete_for('other-manuscript')
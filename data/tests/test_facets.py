@@ -0,0 +1,63 @@
+import datetime
+
+import pytest
+
+import data.db_connect as dbc
+import data.facets as fct
+
+JAN = '2024-01'
+FEB = '2024-02'
+
+
+@pytest.fixture(autouse=True)
+def clean_facets():
+    dbc.del_many(fct.FACETS_COLLECTION, {})
+    yield
+    dbc.del_many(fct.FACETS_COLLECTION, {})
+
+
+def test_month_of():
+    assert fct.month_of(datetime.datetime(2024, 3, 9)) == '2024-03'
+    assert fct.month_of('2024-03-09T10:00:00') == '2024-03'
+    assert fct.month_of(None) is None
+
+
+def test_adjust_and_read():
+    fct.adjust({
+        (fct.ALL_TAGS, 'SUBMITTED', JAN): 2,
+        (fct.ALL_TAGS, 'REJECTED', FEB): 1,
+        ('optics', 'SUBMITTED', JAN): 2,
+        ('lasers', 'SUBMITTED', JAN): 1,
+        ('lasers', 'REJECTED', FEB): 1,
+    })
+    facets = fct.read()
+    assert facets[fct.TOTAL] == 3
+    assert facets[fct.STATES] == {'SUBMITTED': 2, 'REJECTED': 1}
+    assert facets[fct.MONTHS] == {JAN: 2, FEB: 1}
+    assert facets[fct.TAGS] == [{fct.TAG: 'lasers', fct.COUNT: 2},
+                                {fct.TAG: 'optics', fct.COUNT: 2}]
+
+    lasers = fct.read(tag='lasers')
+    assert lasers[fct.STATES] == {'SUBMITTED': 1, 'REJECTED': 1}
+    assert fct.read(state='REJECTED')[fct.TAGS] == [
+        {fct.TAG: 'lasers', fct.COUNT: 1}]
+    assert fct.read(since=FEB)[fct.TOTAL] == 1
+    assert fct.read(until=JAN)[fct.MONTHS] == {JAN: 2}
+    assert len(fct.read(top=1)[fct.TAGS]) == 1
+
+
+def test_adjust_drops_empty_cells():
+    fct.adjust({('optics', 'SUBMITTED', JAN): 1})
+    fct.adjust({('optics', 'SUBMITTED', JAN): -1,
+                ('optics', 'REJECTED', JAN): 1})
+    assert dbc.count(fct.FACETS_COLLECTION, {}) == 1
+    fct.adjust({})
+    assert fct.read(tag='optics')[fct.STATES] == {'REJECTED': 1}
+
+
+def test_replace_all():
+    fct.adjust({('optics', 'SUBMITTED', JAN): 5})
+    fct.replace_all({(fct.ALL_TAGS, 'SUBMITTED', FEB): 1,
+                     ('lasers', 'SUBMITTED', FEB): 0})
+    assert fct.read()[fct.MONTHS] == {FEB: 1}
+    assert fct.read()[fct.TAGS] == []
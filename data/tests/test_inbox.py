@@ -0,0 +1,58 @@
+import pytest
+
+import data.db_connect as dbc
+import data.inbox as ibx
+
+EDITOR = 'ed@example.com'
+
+
+def _entry(manuscript_id, owner, role, state, updated=None):
+    return {
+        ibx.OWNER: owner,
+        ibx.ROLE: role,
+        ibx.MANUSCRIPT_ID: manuscript_id,
+        ibx.TITLE: f'Title {manuscript_id}',
+        ibx.STATE: state,
+        ibx.ACTIONS: ['DONE'],
+        ibx.UPDATED: updated or dbc.now(),
+    }
+
+
+@pytest.fixture(autouse=True)
+def setup_test_db():
+    dbc.client[dbc.JOURNAL_DB][ibx.INBOX_COLLECTION].delete_many({})
+    yield
+    dbc.client[dbc.JOURNAL_DB][ibx.INBOX_COLLECTION].delete_many({})
+
+
+def test_read_owned_and_queued():
+    ibx.replace('m1', [_entry('m1', EDITOR, 'ED', 'SUBMITTED')])
+    ibx.replace('m2', [_entry('m2', None, 'ED', 'SUBMITTED')])
+    ibx.replace('m3', [_entry('m3', 'other@example.com', 'ED', 'COPY_EDIT')])
+    inbox = ibx.read(EDITOR, roles=['ED'])
+    assert {e[ibx.MANUSCRIPT_ID] for e in inbox[ibx.ITEMS]} == {'m1', 'm2'}
+    assert inbox[ibx.TOTAL] == 2
+    assert inbox[ibx.COUNTS] == {'SUBMITTED': 2}
+    assert ibx.read(EDITOR)[ibx.TOTAL] == 1
+
+
+def test_read_pages_and_state_filter():
+    for i in range(5):
+        state = 'SUBMITTED' if i % 2 else 'COPY_EDIT'
+        ibx.replace(f'm{i}', [_entry(f'm{i}', EDITOR, 'ED', state)])
+    page = ibx.read(EDITOR, page=2, per_page=2)
+    assert page[ibx.TOTAL] == 5
+    assert len(page[ibx.ITEMS]) == 2
+    filtered = ibx.read(EDITOR, state='SUBMITTED')
+    assert filtered[ibx.TOTAL] == 2
+    assert {e[ibx.STATE] for e in filtered[ibx.ITEMS]} == {'SUBMITTED'}
+    assert filtered[ibx.COUNTS] == {'SUBMITTED': 2, 'COPY_EDIT': 3}
+
+
+def test_replace_and_remove():
+    ibx.replace('m1', [_entry('m1', EDITOR, 'ED', 'SUBMITTED')])
+    ibx.replace('m1', [_entry('m1', EDITOR, 'ED', 'COPY_EDIT')])
+    items = ibx.read(EDITOR)[ibx.ITEMS]
+    assert [e[ibx.STATE] for e in items] == ['COPY_EDIT']
+    ibx.remove('m1')
+    assert ibx.read(EDITOR)[ibx.TOTAL] == 0
@@ -0,0 +1,25 @@
+import data.keywords as kw
+
+
+def test_runs_break_at_stop_words_and_punctuation():
+    assert kw.runs("Fluid flows in pipes; high Reynolds number.") == [
+        ['fluid', 'flows'], ['pipes'], ['high', 'reynolds', 'number']]
+
+
+def test_extract_prefers_repeated_and_title_phrases():
+    tags = kw.extract(
+        "Graph neural networks for protein folding",
+        "We apply graph neural networks to protein folding. Graph neural "
+        "networks learn residue contacts; folding accuracy improves.")
+    assert tags == ['graph neural networks', 'protein folding']
+
+
+def test_extract_skips_one_off_words():
+    assert kw.extract("", "A single mention of zebrafish.") == []
+    assert kw.extract("Zebrafish", "") == ['zebrafish']
+
+
+def test_extract_limits_count():
+    title = "Alpha beta, gamma delta, epsilon zeta, eta theta"
+    assert len(kw.extract(title, "", count=2)) == 2
+    assert kw.extract("", "") == []
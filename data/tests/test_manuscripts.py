@@ -1,7 +1,9 @@
 import pytest
+import data.archive as arc
 import data.manuscripts as ms
 import data.db_connect as dbc
 from bson import ObjectId
+from datetime import datetime, timedelta, timezone
 
 # Connect to the database
 dbc.connect_db()
@@ -251,3 +253,1051 @@ def test_manuscript_multiple_revisions():
         
     finally:
         ms.delete_manuscript(manuscript_id)
+
+
+def test_history_is_capped_and_logged():
+    """Embedded history keeps the newest events; the log keeps them all."""
+    manuscript = ms.create_manuscript(
+        title="History Test",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        for i in range(ms.HISTORY_LIMIT + 5):
+            ms.editor_move(manuscript_id, ms.STATE_SUBMITTED, "ed@example.com")
+        updated = ms.get_manuscript(manuscript_id)
+        assert len(updated[ms.HISTORY]) == ms.HISTORY_LIMIT
+        assert updated[ms.EVENT_SEQ] == ms.HISTORY_LIMIT + 6
+        assert updated[ms.HISTORY][-1]["seq"] == updated[ms.EVENT_SEQ]
+
+        page = ms.get_history(manuscript_id, limit=10)
+        assert len(page[ms.HISTORY]) == 10
+        assert page[ms.HISTORY][0]["state"] == ms.STATE_SUBMITTED
+        assert page['next'] == 10
+        rest = ms.get_history(manuscript_id, after=page['next'], limit=100)
+        assert len(rest[ms.HISTORY]) == ms.HISTORY_LIMIT - 4
+        assert rest['next'] is None
+    finally:
+        ms.delete_manuscript(manuscript_id)
+
+
+def test_migrate_history_to_events():
+    history = [{"state": ms.STATE_SUBMITTED, "actor": "a@example.com"}] * 3
+    result = dbc.insert_one(ms.MANUSCRIPTS_COLLECTION, {
+        ms.TITLE: "Legacy", ms.STATE: ms.STATE_SUBMITTED,
+        ms.HISTORY: history,
+    })
+    manuscript_id = str(result.inserted_id)
+    try:
+        assert ms.migrate_history_to_events() == 1
+        migrated = ms.get_manuscript(manuscript_id)
+        assert migrated[ms.EVENT_SEQ] == 3
+        assert ms.get_history(manuscript_id)[ms.HISTORY][2]["seq"] == 3
+        assert ms.migrate_history_to_events() == 0
+    finally:
+        ms.delete_manuscript(manuscript_id)
+
+
+def test_timestamps_are_utc_datetimes():
+    manuscript = ms.create_manuscript(
+        title="Timestamp Test",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        stored = ms.get_manuscript(manuscript_id)
+        stamp = stored[ms.HISTORY][0][ms.TIMESTAMP]
+        assert isinstance(stamp, datetime)
+        assert isinstance(stored[ms.REVISIONS][0][ms.TIMESTAMP], datetime)
+        assert dbc.to_utc(stamp) <= dbc.now()
+    finally:
+        ms.delete_manuscript(manuscript_id)
+
+
+def test_get_changed_since():
+    before = dbc.now() - timedelta(seconds=1)
+    manuscript = ms.create_manuscript(
+        title="Changed Test",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        assert manuscript_id in ms.get_changed_since(before)
+        later = dbc.now() + timedelta(hours=1)
+        assert manuscript_id not in ms.get_changed_since(later)
+    finally:
+        ms.delete_manuscript(manuscript_id)
+
+
+def test_migrate_timestamps():
+    result = dbc.insert_one(ms.MANUSCRIPTS_COLLECTION, {
+        ms.TITLE: "Old Stamps", ms.STATE: ms.STATE_SUBMITTED,
+        ms.HISTORY: [{ms.TIMESTAMP: "2024-11-05T10:30:00+00:00"}],
+        ms.REVISIONS: [{ms.VERSION: 1, ms.TIMESTAMP: "2024-11-05T10:30:00"}],
+    })
+    manuscript_id = str(result.inserted_id)
+    try:
+        assert ms.migrate_timestamps() >= 1
+        migrated = ms.get_manuscript(manuscript_id)
+        stamp = dbc.to_utc(migrated[ms.HISTORY][0][ms.TIMESTAMP])
+        assert stamp == datetime(2024, 11, 5, 10, 30, tzinfo=timezone.utc)
+        assert isinstance(migrated[ms.REVISIONS][0][ms.TIMESTAMP], datetime)
+        assert ms.migrate_timestamps() == 0
+    finally:
+        ms.delete_manuscript(manuscript_id)
+
+
+def test_process_batch():
+    ids = [
+        ms.create_manuscript(
+            title=f"Batch {i}",
+            author="John Doe",
+            author_email="johndoe@example.com",
+            text="Text",
+            abstract="Abstract"
+        )["_id"]
+        for i in range(3)
+    ]
+    try:
+        results = ms.process_batch([
+            {"manuscript_id": ids[0], "action": ms.ACTION_REJECT},
+            {"manuscript_id": ids[1], "action": ms.ACTION_ASSIGN_REFEREE,
+             "params": {"referee_email": "ref@example.com"}},
+            {"manuscript_id": ids[2], "action": ms.ACTION_DONE},
+            {"manuscript_id": ids[0], "action": ms.ACTION_WITHDRAW},
+            {"manuscript_id": "bad-id", "action": ms.ACTION_REJECT},
+        ], actor_email="editor@example.com")
+        assert results[0][ms.BATCH_OK]
+        assert results[0][ms.STATE] == ms.STATE_REJECTED
+        assert results[1][ms.STATE] == ms.STATE_REFEREE_REVIEW
+        assert "not allowed" in results[2]["error"]
+        assert "more than once" in results[3]["error"]
+        assert "Invalid" in results[4]["error"]
+
+        rejected = ms.get_manuscript(ids[0])
+        assert rejected[ms.STATE] == ms.STATE_REJECTED
+        assert rejected[ms.EVENT_SEQ] == 2
+        assert rejected[ms.HISTORY][-1]["actor"] == "editor@example.com"
+        reviewing = ms.get_manuscript(ids[1])
+        assert ms.find_referee(reviewing, "ref@example.com")
+        assert len(ms.get_history(ids[1])[ms.HISTORY]) == 2
+        assert ms.get_manuscript(ids[2])[ms.STATE] == ms.STATE_SUBMITTED
+    finally:
+        for manuscript_id in ids:
+            ms.delete_manuscript(manuscript_id)
+
+
+def _fail_once(monkeypatch, name):
+    """Make dbc.<name> raise on its first write to the manuscripts."""
+    real = getattr(ms.dbc, name)
+    calls = []
+
+    def failing(collection, *args, **kwargs):
+        if collection == ms.MANUSCRIPTS_COLLECTION and not calls:
+            calls.append(collection)
+            raise RuntimeError("write lost")
+        return real(collection, *args, **kwargs)
+
+    monkeypatch.setattr(ms.dbc, name, failing)
+
+
+def test_failed_snapshot_write_retracts_event(monkeypatch):
+    manuscript = ms.create_manuscript(
+        title="Lost Write",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        _fail_once(monkeypatch, "update_doc")
+        with pytest.raises(RuntimeError):
+            ms.process_manuscript_action(manuscript_id, ms.ACTION_REJECT,
+                                         actor_email="ed@example.com")
+        assert ms.get_manuscript(manuscript_id)[ms.EVENT_SEQ] == 1
+        assert ms.evt.count(manuscript_id) == 1
+        result = ms.process_manuscript_action(
+            manuscript_id, ms.ACTION_REJECT, actor_email="ed@example.com")
+        assert result[ms.STATE] == ms.STATE_REJECTED
+        assert result[ms.EVENT_SEQ] == 2
+    finally:
+        ms.delete_manuscript(manuscript_id)
+
+
+def test_failed_batch_write_retracts_events(monkeypatch):
+    manuscript_id = ms.create_manuscript(
+        title="Lost Batch",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )["_id"]
+    items = [{"manuscript_id": manuscript_id, "action": ms.ACTION_REJECT}]
+    try:
+        _fail_once(monkeypatch, "bulk_write")
+        results = ms.process_batch(items, actor_email="ed@example.com")
+        assert results[0]["error"] == ms.WRITE_FAILED_MESSAGE
+        assert ms.evt.count(manuscript_id) == 1
+        results = ms.process_batch(items, actor_email="ed@example.com")
+        assert results[0][ms.BATCH_OK]
+        assert ms.get_manuscript(manuscript_id)[ms.EVENT_SEQ] == 2
+    finally:
+        ms.delete_manuscript(manuscript_id)
+
+
+def test_workflow_roles_enforced():
+    manuscript = ms.create_manuscript(
+        title="Roles Test",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        denied = ms.process_manuscript_action(
+            manuscript_id, ms.ACTION_REJECT,
+            actor_email="johndoe@example.com", user_roles=[])
+        assert "limited to" in denied["error"]
+        assert ms.allowed_actions(manuscript, "johndoe@example.com", []) == [
+            ms.ACTION_WITHDRAW]
+        editor_actions = ms.allowed_actions(manuscript, "ed@example.com",
+                                            [ms.ROLE_EDITOR])
+        assert ms.ACTION_REJECT in editor_actions
+        assert ms.ACTION_WITHDRAW not in editor_actions
+        rejected = ms.process_manuscript_action(
+            manuscript_id, ms.ACTION_REJECT,
+            actor_email="ed@example.com", user_roles=[ms.ROLE_EDITOR])
+        assert rejected[ms.STATE] == ms.STATE_REJECTED
+    finally:
+        ms.delete_manuscript(manuscript_id)
+
+
+def test_action_for_state():
+    assert ms.action_for_state(ms.STATE_COPY_EDIT,
+                               ms.STATE_AUTHOR_REVIEW) == ms.ACTION_DONE
+    assert ms.action_for_state(ms.STATE_REFEREE_REVIEW,
+                               ms.STATE_ACCEPTED) == ms.ACTION_ACCEPT
+    assert ms.action_for_state(ms.STATE_REJECTED,
+                               ms.STATE_SUBMITTED) is None
+
+
+def test_get_allowed_actions():
+    manuscript = ms.create_manuscript(
+        title="Allowed Test",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        allowed = ms.get_allowed_actions(
+            [manuscript_id, "bad-id", "60d21b4667d0d8992e610c85"],
+            "johndoe@example.com", [])
+        assert allowed == {manuscript_id: [ms.ACTION_WITHDRAW]}
+        ms.assign_referee(manuscript_id, "ref@example.com")
+        allowed = ms.get_allowed_actions([manuscript_id],
+                                         "ref@example.com", ["RE"])
+        assert ms.ACTION_SUBMIT_REVIEW in allowed[manuscript_id]
+        assert ms.ACTION_REMOVE_REFEREE not in allowed[manuscript_id]
+    finally:
+        ms.delete_manuscript(manuscript_id)
+
+
+def test_inbox_follows_workflow():
+    import data.inbox as ibx
+    manuscript = ms.create_manuscript(
+        title="Inbox Test",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        queued = ibx.read("ed@example.com", roles=[ms.ROLE_EDITOR])
+        assert manuscript_id in [e[ibx.MANUSCRIPT_ID]
+                                 for e in queued[ibx.ITEMS]]
+        ms.assign_editor(manuscript_id, "ed@example.com")
+        queued = ibx.read("other@example.com", roles=[ms.ROLE_EDITOR])
+        assert manuscript_id not in [e[ibx.MANUSCRIPT_ID]
+                                     for e in queued[ibx.ITEMS]]
+        assert ibx.read("ed@example.com")[ibx.TOTAL] == 1
+
+        ms.assign_referee(manuscript_id, "ref@example.com")
+        referee = ibx.read("ref@example.com")[ibx.ITEMS]
+        assert ms.ACTION_SUBMIT_REVIEW in referee[0][ibx.ACTIONS]
+        ms.add_referee_report(manuscript_id, "ref@example.com", "Fine",
+                              ms.VERDICT_ACCEPT_WITH_REVISIONS)
+        assert ibx.read("ref@example.com")[ibx.TOTAL] == 0
+        author = ibx.read("johndoe@example.com")[ibx.ITEMS]
+        assert author[0][ibx.ACTIONS] == [ms.ACTION_DONE]
+    finally:
+        ms.delete_manuscript(manuscript_id)
+    assert ibx.read("johndoe@example.com")[ibx.TOTAL] == 0
+
+
+def test_referee_assignments():
+    manuscript = ms.create_manuscript(
+        title="Referee Test",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        ms.assign_referee(manuscript_id, "ref1@example.com")
+        ms.assign_referee(manuscript_id, "ref2@example.com")
+        assigned = ms.get_manuscript(manuscript_id)
+        assert [r[ms.REFEREE_EMAIL] for r in assigned[ms.REFEREES]] == [
+            "ref1@example.com", "ref2@example.com"]
+        assert ms.is_referee(manuscript_id, "ref1@example.com")
+        assert not ms.is_referee(manuscript_id, "other@example.com")
+        assert manuscript_id in ms.get_referee_manuscripts(
+            "ref2@example.com", pending_only=True)
+
+        ms.add_referee_report(manuscript_id, "ref2@example.com", "Good",
+                              ms.VERDICT_ACCEPT_WITH_REVISIONS)
+        reviewed = ms.find_referee(ms.get_manuscript(manuscript_id),
+                                   "ref2@example.com")
+        assert reviewed[ms.REPORT] == "Good"
+        assert manuscript_id in ms.get_referee_manuscripts(
+            "ref2@example.com")
+        assert manuscript_id not in ms.get_referee_manuscripts(
+            "ref2@example.com", pending_only=True)
+    finally:
+        ms.delete_manuscript(manuscript_id)
+
+
+def test_migrate_referees():
+    manuscript = ms.create_manuscript(
+        title="Referee Migration",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    collection = dbc.client[dbc.JOURNAL_DB][ms.MANUSCRIPTS_COLLECTION]
+    try:
+        collection.update_one(
+            {"_id": ObjectId(manuscript_id)},
+            {"$set": {ms.REFEREES: {
+                "ref@example.com": {ms.REPORT: "Ok", ms.VERDICT: "ACCEPT"}}}})
+        assert ms.migrate_referees() == 1
+        referees = ms.get_manuscript(manuscript_id)[ms.REFEREES]
+        assert referees[0][ms.REFEREE_EMAIL] == "ref@example.com"
+        assert referees[0][ms.VERDICT] == "ACCEPT"
+        assert ms.migrate_referees() == 0
+    finally:
+        ms.delete_manuscript(manuscript_id)
+
+
+def test_referee_load_tracking():
+    import data.referee_load as rl
+    rl.rebuild(["ref1@example.com", "ref2@example.com"], {})
+    ids = [
+        ms.create_manuscript(
+            title=f"Load {i}",
+            author="John Doe",
+            author_email="johndoe@example.com",
+            text="Text",
+            abstract="Abstract"
+        )["_id"]
+        for i in range(3)
+    ]
+    try:
+        ms.assign_referee(ids[0], "ref1@example.com")
+        assert rl.load_of("ref1@example.com") == 1
+        assert ms.suggest_referees(ids[1], 1) == ["ref2@example.com"]
+
+        results = ms.assign_least_loaded_batch(ids[1:], 1)
+        assert all(result[ms.BATCH_OK] for result in results)
+        assert rl.load_of("ref2@example.com") == 1
+        assert rl.load_of("ref1@example.com") == 2
+
+        ms.add_referee_report(ids[0], "ref1@example.com", "Ok",
+                              ms.VERDICT_ACCEPT)
+        assert rl.load_of("ref1@example.com") == 1
+        ms.delete_manuscript(ids[1])
+        assert rl.load_of("ref1@example.com") + rl.load_of(
+            "ref2@example.com") == 1
+    finally:
+        for manuscript_id in ids:
+            ms.delete_manuscript(manuscript_id)
+        rl.invalidate()
+
+
+def test_recommend_referees():
+    import data.recommend as rec
+    rec.invalidate()
+    ids = []
+    try:
+        for title, referee in [("Graph partitioning", "graphs@example.com"),
+                               ("Protein folding", "proteins@example.com")]:
+            manuscript_id = ms.create_manuscript(
+                title=title,
+                author="John Doe",
+                author_email="johndoe@example.com",
+                text="Text",
+                abstract=f"{title} methods"
+            )["_id"]
+            ids.append(manuscript_id)
+            ms.assign_referee(manuscript_id, referee)
+            ms.add_referee_report(manuscript_id, referee, "Ok",
+                                  ms.VERDICT_ACCEPT)
+        new_id = ms.create_manuscript(
+            title="Faster graph partitioning",
+            author="Jane Roe",
+            author_email="janeroe@example.com",
+            text="Text",
+            abstract="Partitioning large graphs"
+        )["_id"]
+        ids.append(new_id)
+        recommended = ms.recommend_referees(new_id, 2)
+        assert recommended[0][ms.REFEREE_EMAIL] == "graphs@example.com"
+        assert rec.is_loaded()
+
+        ms.assign_referee(new_id, "proteins@example.com")
+        ms.add_referee_report(new_id, "proteins@example.com", "Ok",
+                              ms.VERDICT_ACCEPT)
+        assert "proteins@example.com" in [
+            r[ms.REFEREE_EMAIL] for r in ms.recommend_referees(ids[0], 5)]
+        assert "error" in ms.recommend_referees("bad-id")
+    finally:
+        for manuscript_id in ids:
+            ms.delete_manuscript(manuscript_id)
+        rec.invalidate()
+
+
+def test_near_duplicates_flagged():
+    body = " ".join(f"finding{i}" for i in range(200))
+    ids = []
+    try:
+        original = ms.create_manuscript(
+            title="Original Findings",
+            author="John Doe",
+            author_email="johndoe@example.com",
+            text=body,
+            abstract="Abstract"
+        )
+        ids.append(original["_id"])
+        assert original[ms.SIMILAR] == []
+        copy = ms.create_manuscript(
+            title="Copied Findings",
+            author="Jane Roe",
+            author_email="janeroe@example.com",
+            text=body,
+            abstract="Abstract"
+        )
+        ids.append(copy["_id"])
+        assert copy[ms.SIMILAR][0]["manuscript_id"] == original["_id"]
+        assert ms.get_manuscript(copy["_id"])[ms.SIMILAR]
+
+        updated = ms.update_manuscript_text(
+            copy["_id"], " ".join(f"novel{i}" for i in range(200)),
+            "Abstract", "janeroe@example.com")
+        assert updated[ms.SIMILAR] == []
+    finally:
+        for manuscript_id in ids:
+            ms.delete_manuscript(manuscript_id)
+
+
+def test_search_follows_manuscripts():
+    import data.search as srch
+    srch.invalidate()
+    manuscript = ms.create_manuscript(
+        title="Searchable Zebrafish",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        hits = srch.search("zebrafish", kind=ms.SEARCH_KIND)[srch.ITEMS]
+        assert [hit[srch.DOC_ID] for hit in hits] == [manuscript_id]
+        ms.update_manuscript_text(manuscript_id, "Cephalopod body",
+                                  "Abstract", "johndoe@example.com")
+        assert srch.search("cephalopod")[srch.TOTAL] == 1
+        ms.process_manuscript_action(manuscript_id, ms.ACTION_REJECT)
+        assert srch.search("zebrafish",
+                           state=ms.STATE_REJECTED)[srch.TOTAL] == 1
+    finally:
+        ms.delete_manuscript(manuscript_id)
+    assert srch.search("zebrafish")[srch.TOTAL] == 0
+
+
+def test_tags_and_facets_follow_manuscripts():
+    import data.facets as fct
+    manuscript = ms.create_manuscript(
+        title="Axolotl Regeneration",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Axolotl regeneration of limbs."
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        tags = ms.wait_for_tags(manuscript_id, timeout=30)
+        assert tags == ["axolotl regeneration"]
+        facets = fct.read(tag="axolotl regeneration")
+        assert facets[fct.STATES] == {ms.STATE_SUBMITTED: 1}
+        assert list(ms.get_manuscripts_by_tags(tags)) == [manuscript_id]
+        assert ms.get_manuscripts_by_tags(
+            tags, state=ms.STATE_REJECTED) == {}
+
+        ms.process_manuscript_action(manuscript_id, ms.ACTION_REJECT)
+        facets = fct.read(tag="axolotl regeneration")
+        assert facets[fct.STATES] == {ms.STATE_REJECTED: 1}
+
+        ms.apply_tags(manuscript_id, ["limbs"])
+        assert fct.read(tag="axolotl regeneration")[fct.TOTAL] == 0
+        assert fct.read(tag="limbs")[fct.STATES] == {ms.STATE_REJECTED: 1}
+    finally:
+        ms.delete_manuscript(manuscript_id)
+    assert fct.read(tag="limbs")[fct.TOTAL] == 0
+
+
+def test_rebuild_facets():
+    import data.facets as fct
+    manuscript = ms.create_manuscript(
+        title="Tardigrade Survival",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        ms.wait_for_tags(manuscript_id, timeout=30)
+        dbc.del_many(fct.FACETS_COLLECTION, {})
+        assert ms.rebuild_facets() >= 1
+        facets = fct.read(tag="tardigrade survival")
+        assert facets[fct.STATES] == {ms.STATE_SUBMITTED: 1}
+        assert fct.read()[fct.TOTAL] >= 1
+    finally:
+        ms.delete_manuscript(manuscript_id)
+
+
+
+def test_deleted_duplicates_leave_similar_lists():
+    body = " ".join(f"claim{i}" for i in range(200))
+    original = ms.create_manuscript(
+        title="First Claims",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text=body,
+        abstract="Abstract"
+    )
+    copy = ms.create_manuscript(
+        title="Second Claims",
+        author="Jane Roe",
+        author_email="janeroe@example.com",
+        text=body,
+        abstract="Abstract"
+    )
+    try:
+        assert copy[ms.SIMILAR][0]["manuscript_id"] == original["_id"]
+        ms.delete_manuscript(original["_id"])
+        assert ms.get_manuscript(copy["_id"])[ms.SIMILAR] == []
+    finally:
+        ms.delete_manuscript(original["_id"])
+        ms.delete_manuscript(copy["_id"])
+
+
+def test_archived_similar_lists_skip_deleted():
+    live = ms.create_manuscript(
+        title="Still Here",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    archived = {"_id": ObjectId(), ms.STATE: ms.STATE_REJECTED,
+                ms.SIMILAR: [{"manuscript_id": live["_id"]},
+                             {"manuscript_id": str(ObjectId())}]}
+    archived_id = str(archived["_id"])
+    arc.store([arc.pack(archived)])
+    try:
+        manuscript = ms.get_manuscript(archived_id)
+        assert manuscript[ms.SIMILAR] == [{"manuscript_id": live["_id"]}]
+    finally:
+        arc.remove([archived_id])
+        ms.delete_manuscript(live["_id"])
+
+
+def test_stats_follow_transitions():
+    import data.stats as sts
+    today = sts.day_of(dbc.now())
+    before = ms.get_stats(today, today)
+    manuscript = ms.create_manuscript(
+        title="Statistical Manuscript",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        assert manuscript[ms.STATE_SINCE]
+        ms.process_manuscript_action(manuscript_id, ms.ACTION_REJECT)
+        after = ms.get_stats(today, today)
+        assert after[sts.SUBMISSIONS] == before[sts.SUBMISSIONS] + 1
+        assert (after[sts.ACTIONS].get(ms.ACTION_REJECT, 0)
+                == before[sts.ACTIONS].get(ms.ACTION_REJECT, 0) + 1)
+        dwell = after[sts.DWELL][ms.STATE_SUBMITTED]
+        assert dwell[sts.COUNT] == before[sts.DWELL].get(
+            ms.STATE_SUBMITTED, {sts.COUNT: 0})[sts.COUNT] + 1
+        assert after[ms.ACCEPTANCE_RATE] is not None
+    finally:
+        ms.delete_manuscript(manuscript_id)
+
+
+
+def test_acceptance_rate_counts_verdicts():
+    import data.stats as sts
+    today = sts.day_of(dbc.now())
+    referee = "rate-ref@example.com"
+
+    def decided(stats):
+        return (stats[sts.ENTERED].get(ms.STATE_COPY_EDIT, 0),
+                stats[sts.ENTERED].get(ms.STATE_REJECTED, 0))
+
+    accepted_before, rejected_before = decided(ms.get_stats(today, today))
+    manuscript = ms.create_manuscript(
+        title="Rated Manuscript",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        ms.assign_referee(manuscript_id, referee)
+        ms.add_referee_report(manuscript_id, referee, "No",
+                              ms.VERDICT_REJECT)
+        after = ms.get_stats(today, today)
+        accepted, rejected = decided(after)
+        assert (accepted, rejected) == (accepted_before,
+                                        rejected_before + 1)
+        assert after[ms.ACCEPTANCE_RATE] == round(
+            accepted / (accepted + rejected), 4)
+    finally:
+        ms.delete_manuscript(manuscript_id)
+
+
+def test_state_entered_falls_back_to_history():
+    early = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    late = early + timedelta(days=2)
+    manuscript = {
+        ms.STATE: ms.STATE_REFEREE_REVIEW,
+        ms.HISTORY: [
+            {ms.STATE_KEY: ms.STATE_SUBMITTED, ms.TIMESTAMP: early},
+            {ms.STATE_KEY: ms.STATE_REFEREE_REVIEW, ms.TIMESTAMP: early},
+            {ms.STATE_KEY: ms.STATE_REFEREE_REVIEW, ms.TIMESTAMP: late},
+        ],
+    }
+    assert ms.state_entered(manuscript) == early
+    assert ms.state_entered({**manuscript, ms.STATE_SINCE: late}) == late
+
+
+def test_rebuild_stats():
+    import data.stats as sts
+    manuscript = ms.create_manuscript(
+        title="Replayed Manuscript",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        ms.process_manuscript_action(manuscript_id, ms.ACTION_REJECT)
+        today = sts.day_of(dbc.now())
+        dbc.del_many(sts.STATS_COLLECTION, {})
+        assert ms.rebuild_stats() >= 2
+        # Only the events still on file are replayed
+        stats = ms.get_stats(today, today)
+        assert stats[sts.SUBMISSIONS] >= 1
+        assert stats[sts.ACTIONS][ms.ACTION_REJECT] >= 1
+        assert stats[sts.DWELL][ms.STATE_SUBMITTED][sts.COUNT] >= 1
+    finally:
+        ms.delete_manuscript(manuscript_id)
+
+
+def test_turnaround_follows_reviews_and_decisions():
+    import data.turnaround as tat
+    referee = "turnaround-ref@example.com"
+    editor = "turnaround-ed@example.com"
+    journal_before = tat.report(tat.METRIC_DECISION, tat.SCOPE_JOURNAL,
+                                tat.JOURNAL)[tat.COUNT]
+    manuscript = ms.create_manuscript(
+        title="Turnaround Test",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        ms.assign_referee(manuscript_id, referee)
+        ms.add_referee_report(manuscript_id, referee, "Fine",
+                              ms.VERDICT_ACCEPT_WITH_REVISIONS)
+        review = tat.report(tat.METRIC_REVIEW, tat.SCOPE_REFEREE, referee)
+        assert review[tat.COUNT] == 1
+        assert review["p50"] < 1
+        ms.editor_move(manuscript_id, ms.STATE_EDITOR_REVIEW, editor)
+        ms.accept_manuscript(manuscript_id, editor)
+        decision = tat.report(tat.METRIC_DECISION, tat.SCOPE_EDITOR, editor)
+        assert decision[tat.COUNT] == 1
+        assert tat.report(tat.METRIC_DECISION, tat.SCOPE_JOURNAL,
+                          tat.JOURNAL)[tat.COUNT] == journal_before + 1
+    finally:
+        ms.delete_manuscript(manuscript_id)
+        dbc.del_many(tat.SKETCHES_COLLECTION,
+                     {tat.SUBJECT: {"$in": [referee, editor]}})
+
+
+
+def test_turnaround_counts_verdicts_and_moves_as_decisions():
+    import data.turnaround as tat
+    referee = "verdict-ref@example.com"
+    editor = "verdict-ed@example.com"
+
+    def decisions():
+        return tat.report(tat.METRIC_DECISION, tat.SCOPE_JOURNAL,
+                          tat.JOURNAL)[tat.COUNT]
+
+    before = decisions()
+    rejected = ms.create_manuscript(
+        title="Rejected By Referee",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    moved = ms.create_manuscript(
+        title="Moved By Editor",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    try:
+        ms.assign_referee(rejected["_id"], referee)
+        updated = ms.add_referee_report(rejected["_id"], referee, "No",
+                                        ms.VERDICT_REJECT)
+        assert updated[ms.STATE] == ms.STATE_REJECTED
+        assert decisions() == before + 1
+        # Referees are not credited with editor decisions
+        assert tat.report(tat.METRIC_DECISION, tat.SCOPE_EDITOR,
+                          referee)[tat.COUNT] == 0
+        ms.editor_move(moved["_id"], ms.STATE_COPY_EDIT, editor)
+        assert decisions() == before + 2
+        assert tat.report(tat.METRIC_DECISION, tat.SCOPE_EDITOR,
+                          editor)[tat.COUNT] == 1
+        # Moving on from a decided state decides nothing
+        ms.editor_move(moved["_id"], ms.STATE_REJECTED, editor)
+        assert decisions() == before + 2
+    finally:
+        ms.delete_manuscript(rejected["_id"])
+        ms.delete_manuscript(moved["_id"])
+        dbc.del_many(tat.SKETCHES_COLLECTION,
+                     {tat.SUBJECT: {"$in": [referee, editor]}})
+
+
+def test_archive_closed_manuscripts():
+    manuscript = ms.create_manuscript(
+        title="Long Closed",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    fresh = ms.create_manuscript(
+        title="Recently Closed",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    try:
+        ms.reject_manuscript(manuscript_id, "editor@example.com")
+        ms.reject_manuscript(fresh["_id"], "editor@example.com")
+        dbc.update_doc(ms.MANUSCRIPTS_COLLECTION,
+                       {"_id": ObjectId(manuscript_id)},
+                       {ms.STATE_SINCE: datetime.now(timezone.utc)
+                        - timedelta(days=400)})
+        assert ms.archive_closed(older_than_days=365) >= 1
+        assert dbc.fetch_one(ms.MANUSCRIPTS_COLLECTION,
+                             {"_id": ObjectId(manuscript_id)}) is None
+        assert dbc.fetch_one(ms.MANUSCRIPTS_COLLECTION,
+                             {"_id": ObjectId(fresh["_id"])})
+
+        archived = ms.get_manuscript(manuscript_id)
+        assert archived[ms.ARCHIVED]
+        assert archived[ms.TITLE] == "Long Closed"
+        assert archived[ms.STATE] == ms.STATE_REJECTED
+        moved = ms.editor_move(manuscript_id, ms.STATE_SUBMITTED,
+                               "editor@example.com")
+        assert moved[ms.ERROR_KEY] == ms.ARCHIVED_MESSAGE
+
+        restored = ms.restore_manuscript(manuscript_id)
+        assert ms.ARCHIVED not in ms.get_manuscript(manuscript_id)
+        assert restored[ms.TITLE] == "Long Closed"
+        assert ms.ERROR_KEY in ms.restore_manuscript(manuscript_id)
+
+        ms.archive_closed(older_than_days=365)
+        assert ms.get_manuscript(manuscript_id)[ms.ARCHIVED]
+    finally:
+        ms.delete_manuscript(manuscript_id)
+        ms.delete_manuscript(fresh["_id"])
+    assert ms.get_manuscript(manuscript_id) is None
+
+
+def test_delete_manuscript_guarded():
+    manuscript = ms.create_manuscript(
+        title="Already Out",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    filt = {"_id": ObjectId(manuscript_id)}
+    try:
+        dbc.update_doc(ms.MANUSCRIPTS_COLLECTION, filt,
+                       {ms.STATE: ms.STATE_PUBLISHED})
+        result = ms.delete_manuscript(manuscript_id)
+        assert result[ms.ERROR_KEY] == ms.PUBLISHED_DELETE_MESSAGE
+        assert ms.get_manuscript(manuscript_id)
+        assert ms.purge_manuscripts(manuscript_ids=[manuscript_id]) == []
+        assert ms.get_manuscript(manuscript_id)
+    finally:
+        dbc.update_doc(ms.MANUSCRIPTS_COLLECTION, filt,
+                       {ms.STATE: ms.STATE_WITHDRAWN})
+    deleted = ms.delete_manuscript(manuscript_id)
+    assert deleted[ms.TITLE] == "Already Out"
+    assert ms.delete_manuscript(manuscript_id)[ms.ERROR_KEY] == (
+        ms.NOT_FOUND_MESSAGE)
+
+
+def test_purge_manuscripts():
+    ids = [ms.create_manuscript(
+        title=f"Spam {i}",
+        author="Spammer",
+        author_email="spam@example.com",
+        text=f"Buy now {i}",
+        abstract="Abstract"
+    )["_id"] for i in range(3)]
+    keep = ms.create_manuscript(
+        title="Real Work",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )["_id"]
+    try:
+        with pytest.raises(ValueError):
+            ms.purge_manuscripts()
+        purged = ms.purge_manuscripts(manuscript_ids=ids[:1])
+        assert purged == ids[:1]
+        purged = ms.purge_manuscripts(author_email="spam@example.com",
+                                      batch_size=1)
+        assert sorted(purged) == sorted(ids[1:])
+        assert all(ms.get_manuscript(mid) is None for mid in ids)
+        assert ms.evt.count(ids[1]) == 0
+        assert ms.get_manuscript(keep)
+    finally:
+        ms.delete_manuscript(keep)
+        for mid in ids:
+            ms.delete_manuscript(mid)
+
+
+def test_get_diff():
+    manuscript = ms.create_manuscript(
+        title="Diffed",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="First line\nSecond line",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        ms.update_manuscript_text(manuscript_id,
+                                  "First line\nSecond line, revised",
+                                  "Abstract", "johndoe@example.com")
+        result = ms.get_diff(manuscript_id, 1, 2)
+        assert result[ms.DIFF_STATUS] in (ms.dff.STATUS_PENDING,
+                                          ms.dff.STATUS_DONE)
+        diff = ms.dff.wait_for((manuscript_id, 1, 2, ms.dff.MODE_LINES),
+                               timeout=30)
+        assert diff[ms.dff.REMOVED] == 1
+        result = ms.get_diff(manuscript_id, 1, 2)
+        assert result == {ms.DIFF_STATUS: ms.dff.STATUS_DONE,
+                          ms.DIFF: diff}
+        assert ms.ERROR_KEY in ms.get_diff(manuscript_id, 1, 3)
+    finally:
+        ms.delete_manuscript(manuscript_id)
+    assert ms.dff.cached((manuscript_id, 1, 2, ms.dff.MODE_LINES)) is None
+
+
+def test_get_diff_reads_versions_once(monkeypatch):
+    key = ('diff-polled', 1, 2, ms.dff.MODE_LINES)
+    reads = []
+
+    def fake_version(manuscript_id, version):
+        reads.append(version)
+        return {ms.TEXT: f'text {version}'}
+
+    monkeypatch.setattr(ms, 'get_manuscript_version', fake_version)
+    monkeypatch.setitem(ms.dff.pending, key, None)
+    result = ms.get_diff(*key)
+    assert result == {ms.DIFF_STATUS: ms.dff.STATUS_PENDING,
+                      ms.DIFF: None}
+    assert reads == []
+    monkeypatch.delitem(ms.dff.pending, key)
+    monkeypatch.setitem(ms.dff.failed, key, 'Could not compute diff')
+    result = ms.get_diff(*key)
+    assert result[ms.DIFF_STATUS] == ms.dff.STATUS_FAILED
+    assert result[ms.ERROR_KEY] == 'Could not compute diff'
+    assert reads == []
+
+
+def test_revision_bodies_deduplicated(monkeypatch):
+    body = "A body resubmitted without changes, shared by two manuscripts."
+    key = ms.blb.key_of(body)
+    first = ms.create_manuscript(
+        title="Dedup One",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text=body,
+        abstract="First abstract"
+    )
+    second = ms.create_manuscript(
+        title="Dedup Two",
+        author="Jane Doe",
+        author_email="janedoe@example.com",
+        text=body,
+        abstract="Second abstract"
+    )
+    real_update = ms.dbc.update_doc
+    updates = []
+
+    def spy(collection, filters, update, *args, **kwargs):
+        if collection == ms.MANUSCRIPTS_COLLECTION:
+            updates.append(update)
+        return real_update(collection, filters, update, *args, **kwargs)
+
+    try:
+        assert first[ms.REVISIONS][0][ms.TEXT] == body
+        monkeypatch.setattr(ms.dbc, "update_doc", spy)
+        updated = ms.update_manuscript_text(first["_id"], body,
+                                            "New abstract",
+                                            "johndoe@example.com")
+        monkeypatch.undo()
+        assert ms.TEXT not in updates[0]["$set"]
+        assert updates[0]["$set"][ms.ABSTRACT] == "New abstract"
+        assert updated[ms.TEXT] == body
+        assert updated[ms.REVISIONS][-1][ms.TEXT] == body
+        assert updated[ms.REVISIONS][-1][ms.ABSTRACT] == "New abstract"
+        assert ms.blb.refs(key) == 3
+        stored = dbc.fetch_one(ms.MANUSCRIPTS_COLLECTION,
+                               {"_id": ObjectId(first["_id"])})
+        assert ms.TEXT not in stored[ms.REVISIONS][1]
+        assert stored[ms.REVISIONS][1][ms.TEXT_REF] == key
+        assert ms.get_manuscript_version(first["_id"], 1)[ms.TEXT] == body
+        ms.delete_manuscript(first["_id"])
+        assert ms.blb.refs(key) == 1
+    finally:
+        ms.delete_manuscript(first["_id"])
+        ms.delete_manuscript(second["_id"])
+    assert ms.blb.refs(key) == 0
+
+
+def test_migrate_revision_bodies():
+    result = dbc.insert_one(ms.MANUSCRIPTS_COLLECTION, {
+        ms.TITLE: "Inline Bodies", ms.STATE: ms.STATE_SUBMITTED,
+        ms.VERSION: 1,
+        ms.REVISIONS: [{ms.VERSION: 1, ms.TEXT: "Inline migration text",
+                        ms.ABSTRACT: "Inline abstract"}],
+    })
+    manuscript_id = str(result.inserted_id)
+    try:
+        assert ms.get_manuscript(manuscript_id)[ms.REVISIONS][0][
+            ms.TEXT] == "Inline migration text"
+        assert ms.migrate_revision_bodies() >= 1
+        stored = dbc.fetch_one(ms.MANUSCRIPTS_COLLECTION,
+                               {"_id": ObjectId(manuscript_id)})
+        assert ms.TEXT not in stored[ms.REVISIONS][0]
+        assert ms.get_manuscript(manuscript_id)[ms.REVISIONS][0][
+            ms.TEXT] == "Inline migration text"
+        assert ms.migrate_revision_bodies() == 0
+    finally:
+        ms.delete_manuscript(manuscript_id)
+    assert ms.blb.refs(ms.blb.key_of("Inline migration text")) == 0
+
+
+def test_write_version_bumped_on_writes():
+    manuscript = ms.create_manuscript(
+        title="Versioned",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    try:
+        first = ms.get_write_version(manuscript_id)
+        assert first >= 1
+        ms.assign_editor(manuscript_id, "editor@example.com")
+        second = ms.get_write_version(manuscript_id)
+        assert second > first
+        ms.author_withdraw(manuscript_id, "johndoe@example.com")
+        assert ms.get_write_version(manuscript_id) > second
+    finally:
+        ms.delete_manuscript(manuscript_id)
+    assert ms.get_write_version(manuscript_id) is None
+    assert ms.get_write_version("not-an-id") is None
+
+
+def test_change_listeners(monkeypatch):
+    seen = []
+
+    def failing(changes):
+        raise RuntimeError("view is down")
+
+    monkeypatch.setattr(ms, "change_listeners",
+                        [failing, seen.extend])
+    manuscript = ms.create_manuscript(
+        title="Listened To",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="Text",
+        abstract="Abstract"
+    )
+    manuscript_id = manuscript["_id"]
+    ms.reject_manuscript(manuscript_id, "editor@example.com")
+    ms.delete_manuscript(manuscript_id)
+    (created, rejected, deleted) = seen
+    assert created[0] is None and created[1]["_id"] == manuscript_id
+    assert created[2][ms.STATE_KEY] == ms.STATE_SUBMITTED
+    assert rejected[0][ms.STATE] == ms.STATE_SUBMITTED
+    assert rejected[1][ms.STATE] == ms.STATE_REJECTED
+    assert rejected[2][ms.ACTION_KEY] == ms.ACTION_REJECT
+    assert deleted[0]["_id"] == manuscript_id
+    assert deleted[1:] == (None, None)
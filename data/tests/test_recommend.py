@@ -0,0 +1,49 @@
+import pytest
+
+import data.recommend as rec
+
+GRAPHS = 'Spectral graph partitioning\nEigenvectors of graph Laplacians'
+PROTEINS = 'Protein folding\nMolecular dynamics of protein structures'
+
+
+@pytest.fixture(autouse=True)
+def reset_matrix():
+    rec.rebuild([
+        (GRAPHS, ['graphs@x.com']),
+        (PROTEINS, ['proteins@x.com']),
+        ('Unreviewed manuscript\nAbout something else', []),
+    ])
+    yield
+    rec.invalidate()
+
+
+def test_tokenize():
+    assert rec.tokenize('The Graph, and its Laplacian-based cuts') == [
+        'graph', 'laplacian-based', 'cuts']
+
+
+def test_recommend_ranks_by_similarity():
+    ranked = rec.recommend('Partitioning a graph with Laplacians', 2)
+    assert [email for email, _ in ranked] == ['graphs@x.com']
+    assert 0 < ranked[0][1] <= 1
+    ranked = rec.recommend('Protein graph structures', 2)
+    assert [email for email, _ in ranked] == [
+        'proteins@x.com', 'graphs@x.com']
+
+
+def test_recommend_excludes():
+    assert rec.recommend(GRAPHS, 2, exclude={'graphs@x.com'}) == []
+
+
+def test_add_review_updates_profile():
+    assert rec.recommend('Quantum error correction', 2) == []
+    rec.add_document('Quantum codes\nQuantum error correction')
+    rec.add_review('proteins@x.com', 'Quantum codes\nQuantum error correction')
+    assert [email for email, _ in rec.recommend(
+        'Quantum error correction', 2)] == ['proteins@x.com']
+
+
+def test_updates_ignored_until_loaded():
+    rec.invalidate()
+    rec.add_review('new@x.com', GRAPHS)
+    assert 'new@x.com' not in rec.referee_rows
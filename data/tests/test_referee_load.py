@@ -0,0 +1,45 @@
+import pytest
+
+import data.referee_load as rl
+
+
+@pytest.fixture(autouse=True)
+def reset_loads():
+    rl.rebuild(['a@x.com', 'b@x.com', 'c@x.com'],
+               {'a@x.com': 2, 'b@x.com': 0, 'c@x.com': 1})
+    yield
+    rl.invalidate()
+
+
+def test_least_loaded():
+    assert rl.least_loaded(2) == ['b@x.com', 'c@x.com']
+    assert rl.least_loaded(2, exclude={'b@x.com'}) == ['c@x.com', 'a@x.com']
+    assert rl.least_loaded(10) == ['b@x.com', 'c@x.com', 'a@x.com']
+
+
+def test_adjust_skips_stale_entries():
+    rl.adjust('b@x.com', 3)
+    rl.adjust('a@x.com', -2)
+    rl.adjust('untracked@x.com', 1)
+    assert rl.load_of('b@x.com') == 3
+    assert rl.load_of('untracked@x.com') is None
+    assert rl.least_loaded(3) == ['a@x.com', 'c@x.com', 'b@x.com']
+
+
+def test_adjust_compacts_heap():
+    for _ in range(50):
+        rl.adjust('a@x.com', 1)
+    assert len(rl.heap) <= rl.COMPACT_FACTOR * len(rl.loads) + 1
+    assert rl.load_of('a@x.com') == 52
+
+
+def test_plan_spreads_work():
+    plans = rl.plan([(1, ()), (1, ()), (2, {'b@x.com'})])
+    assert plans == [['b@x.com'], ['b@x.com'], ['c@x.com', 'a@x.com']]
+    assert rl.load_of('b@x.com') == 0
+
+
+def test_invalidate():
+    assert rl.is_loaded()
+    rl.invalidate()
+    assert not rl.is_loaded()
@@ -0,0 +1,65 @@
+import pytest
+
+import data.search as srch
+
+KIND = 'doc'
+DOCS = {
+    'graphs': {srch.TITLE: 'Spectral graph partitioning',
+               srch.ABSTRACT: 'We cut graphs using eigenvectors.',
+               srch.TEXT: 'Long body about Laplacians and cuts.'},
+    'proteins': {srch.TITLE: 'Protein folding',
+                 srch.ABSTRACT: 'Molecular dynamics of proteins.',
+                 srch.TEXT: 'A graph appears once in the body.'},
+}
+META = {
+    'graphs': {srch.STATE: 'SUBMITTED', srch.AUTHOR: 'Ada Lovelace',
+               srch.AUTHOR_EMAIL: 'ada@x.com'},
+    'proteins': {srch.STATE: 'PUBLISHED', srch.AUTHOR: 'Rosalind Franklin',
+                 srch.AUTHOR_EMAIL: 'rosalind@x.com'},
+}
+
+
+@pytest.fixture(autouse=True)
+def test_source():
+    saved = dict(srch.sources)
+    srch.sources.clear()
+    srch.register_source(
+        KIND,
+        lambda: ((doc_id, DOCS[doc_id], META[doc_id]) for doc_id in DOCS),
+        lambda ids: {doc_id: DOCS[doc_id] for doc_id in ids})
+    srch.rebuild()
+    yield
+    srch.sources.clear()
+    srch.sources.update(saved)
+    srch.invalidate()
+
+
+def test_ranked_by_field_weight():
+    result = srch.search('graph')
+    assert [item[srch.DOC_ID] for item in result[srch.ITEMS]] == [
+        'graphs', 'proteins']
+    assert result[srch.TOTAL] == 2
+
+
+def test_filters():
+    assert srch.search('graph', state='PUBLISHED')[srch.TOTAL] == 1
+    by_author = srch.search('graph', author='ADA@x.com')[srch.ITEMS]
+    assert [item[srch.DOC_ID] for item in by_author] == ['graphs']
+    assert srch.search('graph', kind='other')[srch.TOTAL] == 0
+
+
+def test_snippet_and_paging():
+    item = srch.search('eigenvectors')[srch.ITEMS][0]
+    start, end = item[srch.HIGHLIGHTS][0]
+    assert item[srch.SNIPPET][start:end] == 'eigenvectors'
+    page = srch.search('graph', page=2, per_page=1)
+    assert [item[srch.DOC_ID] for item in page[srch.ITEMS]] == ['proteins']
+
+
+def test_incremental_updates():
+    srch.index(KIND, 'graphs', {srch.TITLE: 'Renamed'}, META['graphs'])
+    assert srch.search('spectral')[srch.TOTAL] == 0
+    srch.update_meta(KIND, 'proteins', {srch.STATE: 'WITHDRAWN'})
+    assert srch.search('protein', state='WITHDRAWN')[srch.TOTAL] == 1
+    srch.remove(KIND, 'proteins')
+    assert srch.search('protein')[srch.TOTAL] == 0
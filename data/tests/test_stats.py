@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import data.db_connect as dbc
+import data.stats as sts
+
+MONDAY = datetime(2024, 1, 1, 9, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    dbc.del_many(sts.STATS_COLLECTION, {})
+    yield
+    dbc.del_many(sts.STATS_COLLECTION, {})
+
+
+def test_day_and_bucket():
+    assert sts.day_of(MONDAY) == '2024-01-01'
+    assert sts.day_of(None) is None
+    assert sts.bucket_of(60) == '1'
+    assert sts.bucket_of(2 * 24 * 3600) == '72'
+    assert sts.bucket_of(365 * 24 * 3600) == sts.OVERFLOW_BUCKET
+
+
+def test_transition_increments():
+    day, inc = sts.transition(MONDAY, 'REJECT', 'SUBMITTED', 'REJECTED',
+                              MONDAY - timedelta(hours=3))
+    assert day == '2024-01-01'
+    assert inc == {
+        'actions.REJECT': 1,
+        'entered.REJECTED': 1,
+        'dwell.SUBMITTED.seconds': 3 * 3600,
+        'dwell.SUBMITTED.count': 1,
+        'dwell.SUBMITTED.histogram.6': 1,
+    }
+    # Staying in a state counts only the action
+    assert sts.transition(MONDAY, 'ASSIGN_REFEREE', 'REFEREE_REVIEW',
+                          'REFEREE_REVIEW')[1] == {
+        'actions.ASSIGN_REFEREE': 1}
+
+
+def test_record_and_summarize():
+    tuesday = MONDAY + timedelta(days=1)
+    sts.record([
+        sts.submission(MONDAY, 'SUBMITTED'),
+        sts.submission(MONDAY, 'SUBMITTED'),
+        sts.transition(tuesday, 'REJECT', 'SUBMITTED', 'REJECTED',
+                       MONDAY),
+        sts.transition(tuesday, 'ASSIGN_REFEREE', 'SUBMITTED',
+                       'REFEREE_REVIEW', MONDAY + timedelta(hours=12)),
+    ])
+    assert [rollup[sts.DAY] for rollup in sts.read('2024-01-01',
+                                                   '2024-01-31')] == [
+        '2024-01-01', '2024-01-02']
+    summary = sts.summarize('2024-01-01', '2024-01-31')
+    assert summary[sts.SUBMISSIONS] == 2
+    assert summary[sts.MONTHLY_SUBMISSIONS] == {'2024-01': 2}
+    assert summary[sts.ENTERED] == {'SUBMITTED': 2, 'REJECTED': 1,
+                                    'REFEREE_REVIEW': 1}
+    assert summary[sts.ACTIONS] == {'REJECT': 1, 'ASSIGN_REFEREE': 1}
+    assert summary[sts.DWELL]['SUBMITTED'] == {
+        sts.COUNT: 2, sts.MEAN_HOURS: 18.0,
+        sts.HISTOGRAM: {'24': 2}}
+    assert sts.summarize('2024-01-02', '2024-01-02')[sts.SUBMISSIONS] == 0
+
+
+def test_date_range_defaults():
+    assert sts.date_range(until='2024-12-31') == ('2024-01-02',
+                                                  '2024-12-31')
+    assert sts.date_range()[1] == sts.day_of(dbc.now())
@@ -0,0 +1,73 @@
+import pytest
+import data.db_connect as dbc
+import data.manuscripts as ms
+import data.submissions as sub
+from test_docx_text import make_docx
+
+TIMEOUT = 30
+
+
+@pytest.fixture(autouse=True)
+def setup_test_db():
+    dbc.client[dbc.JOURNAL_DB][ms.MANUSCRIPTS_COLLECTION].delete_many({})
+    dbc.client[dbc.JOURNAL_DB][sub.JOBS_COLLECTION].delete_many({})
+    yield
+    dbc.client[dbc.JOURNAL_DB][ms.MANUSCRIPTS_COLLECTION].delete_many({})
+    dbc.client[dbc.JOURNAL_DB][sub.JOBS_COLLECTION].delete_many({})
+
+
+@pytest.fixture
+def manuscript():
+    return ms.create_manuscript(
+        title="Upload Test",
+        author="John Doe",
+        author_email="johndoe@example.com",
+        text="",
+        abstract=""
+    )
+
+
+def test_is_docx_filename():
+    assert sub.is_docx_filename('paper.DOCX')
+    assert not sub.is_docx_filename('paper.pdf')
+    assert not sub.is_docx_filename(None)
+
+
+def test_submit_docx(manuscript):
+    data = make_docx(['Abstract', 'An abstract here.', '', 'Body text.'])
+    job_id = sub.submit_docx(manuscript[ms.ID_KEY], data)
+    job = sub.wait_for_job(job_id, TIMEOUT)
+    assert job[sub.STATUS] == sub.STATUS_DONE
+    updated = ms.get_manuscript(manuscript[ms.ID_KEY])
+    assert 'Body text.' in updated[ms.TEXT]
+    assert updated[ms.ABSTRACT] == 'An abstract here.'
+    assert updated[ms.WORD_COUNT] == 6
+    assert updated[ms.REVISIONS][0][ms.TEXT] == updated[ms.TEXT]
+
+
+def test_submit_bad_docx(manuscript):
+    job_id = sub.submit_docx(manuscript[ms.ID_KEY], b'garbage')
+    job = sub.wait_for_job(job_id, TIMEOUT)
+    assert job[sub.STATUS] == sub.STATUS_FAILED
+    assert sub.ERROR_KEY in job
+
+
+def test_submit_docx_missing_manuscript():
+    with pytest.raises(KeyError):
+        sub.submit_docx('60d21b4667d0d8992e610c85', make_docx(['x']))
+
+
+
+def test_submit_docx_queue_failure(manuscript, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("pool is down")
+
+    monkeypatch.setattr(sub.wrk, 'submit', broken)
+    with pytest.raises(RuntimeError):
+        sub.submit_docx(manuscript[ms.ID_KEY], make_docx(['x']))
+    assert dbc.count(sub.JOBS_COLLECTION, {}) == 0
+    assert not sub.pending
+
+
+def test_get_job_bad_id():
+    assert sub.get_job('not-an-id') is None
@@ -0,0 +1,43 @@
+import random
+
+import numpy as np
+
+import data.tdigest as td
+
+
+def _values(n=20000, seed=7):
+    rng = random.Random(seed)
+    return [rng.expovariate(1 / 50) for _ in range(n)]
+
+
+def test_quantiles_close_to_exact():
+    values = _values()
+    digest = td.empty()
+    for start in range(0, len(values), 100):
+        digest = td.add(digest, values[start:start + 100])
+    assert digest[td.COUNT] == len(values)
+    assert len(digest[td.CENTROIDS]) < 200
+    for q in (0.5, 0.9, 0.99):
+        exact = np.quantile(values, q)
+        assert abs(td.quantile(digest, q) - exact) / exact < 0.02
+    assert td.quantile(digest, 0) == min(values)
+    assert td.quantile(digest, 1) == max(values)
+
+
+def test_merge_matches_single_digest():
+    values = _values()
+    halves = [td.add(td.empty(), values[:10000]),
+              td.add(td.empty(), values[10000:])]
+    merged = td.merge(halves)
+    assert merged[td.COUNT] == len(values)
+    exact = np.quantile(values, 0.9)
+    assert abs(td.quantile(merged, 0.9) - exact) / exact < 0.02
+
+
+def test_small_and_empty():
+    assert td.quantile(td.empty(), 0.5) is None
+    assert td.merge([]) == td.empty()
+    assert td.quantile(td.add(td.empty(), [5]), 0.5) == 5
+    assert td.quantile(td.add(td.empty(), [1, 2, 3, 4]), 0.5) == 2.5
+    digest = td.add(td.empty(), [3])
+    assert td.add(digest, []) is digest
@@ -99,3 +99,18 @@ def test_delete_nonexistent():
 def test_create_duplicate():
     with pytest.raises(KeyError):
         txt.create(txt.TEST_KEY, 'Duplicate', 'Text', testing=True)
+
+
+def test_search_follows_texts():
+    import data.search as srch
+    srch.invalidate()
+    key = 'SearchTestPage'
+    txt.create(key, 'Reviewer Guidelines', 'Referees must declare conflicts.')
+    try:
+        hits = srch.search('conflicts', kind=txt.SEARCH_KIND)[srch.ITEMS]
+        assert [hit[srch.DOC_ID] for hit in hits] == [key]
+        txt.update(key, 'Reviewer Guidelines', 'Be kind.')
+        assert srch.search('conflicts', kind=txt.SEARCH_KIND)[srch.TOTAL] == 0
+    finally:
+        txt.delete(key)
+    assert srch.search('guidelines', kind=txt.SEARCH_KIND)[srch.TOTAL] == 0
@@ -0,0 +1,65 @@
+import pytest
+
+import data.db_connect as dbc
+import data.tdigest as td
+import data.turnaround as tat
+
+HOUR = 3600
+REFEREE = 'ref@example.com'
+
+
+@pytest.fixture(autouse=True)
+def clean_sketches():
+    dbc.del_many(tat.SKETCHES_COLLECTION, {})
+    yield
+    dbc.del_many(tat.SKETCHES_COLLECTION, {})
+
+
+def _samples(subject, hours):
+    return [(tat.METRIC_REVIEW, tat.SCOPE_REFEREE, subject, h * HOUR)
+            for h in hours]
+
+
+def test_record_and_report():
+    tat.record(_samples(REFEREE, range(1, 101)))
+    report = tat.report(tat.METRIC_REVIEW, tat.SCOPE_REFEREE, REFEREE)
+    assert report[tat.COUNT] == 100
+    assert abs(report['p50'] - 50.5) < 1
+    assert abs(report['p90'] - 90.5) < 1
+    assert report['p99'] <= 100
+    assert tat.report(tat.METRIC_REVIEW, tat.SCOPE_REFEREE,
+                      'nobody@example.com') == {
+        tat.COUNT: 0, 'p50': None, 'p90': None, 'p99': None}
+
+
+def test_full_buffers_fold_into_digest():
+    tat.record(_samples(REFEREE, range(tat.BUFFER_LIMIT - 1)))
+    sketch = dbc.fetch_one(tat.SKETCHES_COLLECTION, {tat.SUBJECT: REFEREE})
+    assert len(sketch[tat.BUFFER]) == tat.BUFFER_LIMIT - 1
+    tat.record(_samples(REFEREE, [1]))
+    sketch = dbc.fetch_one(tat.SKETCHES_COLLECTION, {tat.SUBJECT: REFEREE})
+    assert sketch[tat.BUFFER] == []
+    assert sketch[tat.DIGEST][td.COUNT] == tat.BUFFER_LIMIT
+    tat.record(_samples(REFEREE, [2]))
+    report = tat.report(tat.METRIC_REVIEW, tat.SCOPE_REFEREE, REFEREE)
+    assert report[tat.COUNT] == tat.BUFFER_LIMIT + 1
+
+
+def test_fold_skips_changed_buffer():
+    tat.record(_samples(REFEREE, [1, 2]))
+    sketch = dbc.fetch_one(tat.SKETCHES_COLLECTION, {tat.SUBJECT: REFEREE})
+    tat.record(_samples(REFEREE, [3]))
+    assert not tat._fold(sketch)
+    report = tat.report(tat.METRIC_REVIEW, tat.SCOPE_REFEREE, REFEREE)
+    assert report[tat.COUNT] == 3
+
+
+def test_report_scope_and_merged():
+    tat.record(_samples(REFEREE, [1, 2, 3]) + _samples('b@x.com', [10]))
+    tat.record([(tat.METRIC_REVIEW, tat.SCOPE_REFEREE, None, 5)])
+    by_referee = tat.report(tat.METRIC_REVIEW, tat.SCOPE_REFEREE)
+    assert set(by_referee) == {REFEREE, 'b@x.com'}
+    assert by_referee['b@x.com']['p50'] == 10
+    both = tat.merged(tat.METRIC_REVIEW, tat.SCOPE_REFEREE,
+                      [REFEREE, 'b@x.com'])
+    assert both[tat.COUNT] == 4
@@ -0,0 +1,66 @@
+import pytest
+
+import data.user_index as uidx
+
+ADA = {uidx.NAME: 'Ada Lovelace', uidx.EMAIL: 'ada@calc.org',
+       uidx.AFFILIATION: 'Analytical Engines', uidx.ROLES: ['RE']}
+ALAN = {uidx.NAME: 'Alan Turing', uidx.EMAIL: 'alan@bletchley.uk',
+        uidx.AFFILIATION: 'Bletchley Park', uidx.ROLES: ['AU']}
+
+
+@pytest.fixture(autouse=True)
+def reset_index():
+    uidx.rebuild([ADA, ALAN, {uidx.NAME: 'No Email'}])
+    yield
+    uidx.invalidate()
+
+
+def emails(found):
+    return [user[uidx.EMAIL] for user in found]
+
+
+def test_suggest_matches_any_word_prefix():
+    assert emails(uidx.suggest('lov')) == ['ada@calc.org']
+    assert emails(uidx.suggest('BLETCH')) == ['alan@bletchley.uk']
+    assert emails(uidx.suggest('engines')) == ['ada@calc.org']
+    assert sorted(emails(uidx.suggest('a'))) == ['ada@calc.org',
+                                                 'alan@bletchley.uk']
+    assert uidx.suggest('') == []
+    assert uidx.suggest('zzz') == []
+
+
+def test_suggest_returns_each_user_once():
+    # 'ada' matches her name, first name and email
+    assert emails(uidx.suggest('ada')) == ['ada@calc.org']
+
+
+def test_suggest_role_and_limit():
+    assert emails(uidx.suggest('a', role='RE')) == ['ada@calc.org']
+    assert uidx.suggest('a', role='ED') == []
+    assert len(uidx.suggest('a', limit=1)) == 1
+
+
+def test_suggest_omits_private_fields():
+    uidx.put({**ADA, 'password': 'secret'})
+    (user,) = uidx.suggest('ada')
+    assert set(user) == {uidx.NAME, uidx.EMAIL, uidx.AFFILIATION,
+                         uidx.ROLES}
+
+
+def test_put_replaces_old_keys():
+    uidx.put({**ADA, uidx.NAME: 'Augusta King'})
+    assert uidx.suggest('lovelace') == []
+    assert emails(uidx.suggest('augusta')) == ['ada@calc.org']
+
+
+def test_remove():
+    uidx.remove(ALAN[uidx.EMAIL])
+    assert uidx.suggest('alan') == []
+    assert emails(uidx.suggest('a')) == ['ada@calc.org']
+
+
+def test_updates_ignored_until_loaded():
+    uidx.invalidate()
+    uidx.put({**ALAN, uidx.NAME: 'Someone Else'})
+    uidx.rebuild([ALAN])
+    assert emails(uidx.suggest('turing')) == ['alan@bletchley.uk']
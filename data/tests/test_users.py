@@ -2,6 +2,7 @@ import pytest
 import data.users as usrs
 import data.roles as rls
 import data.db_connect as dbc
+import data.user_index as uidx
 
 # Test constants
 TEST_NAME = "Test User"
@@ -277,4 +278,18 @@ def test_password_update():
     assert ret == True
     assert usrs.login(TEST_EMAIL, TEST_PASSWORD) == False
     assert usrs.login(TEST_EMAIL, TEST_PASSWORD+'.') == True
-    usrs.delete(TEST_EMAIL, testing=True)
\ No newline at end of file
+    usrs.delete(TEST_EMAIL, testing=True)
+
+def test_suggest_follows_users():
+    # the fixture drops the collection behind the index's back
+    uidx.invalidate()
+    usrs.create(TEST_NAME, TEST_EMAIL, TEST_PASSWORD, TEST_AFFILIATION, testing=True)
+    found = usrs.suggest('test uni')
+    assert [user[usrs.EMAIL] for user in found] == [TEST_EMAIL]
+    assert 'password' not in found[0]
+    usrs.update('Renamed Person', TEST_EMAIL, TEST_AFFILIATION, testing=True)
+    assert usrs.suggest('test user') == []
+    assert [user[usrs.NAME] for user in usrs.suggest('renamed')] == [
+        'Renamed Person']
+    usrs.delete(TEST_EMAIL, testing=True)
+    assert usrs.suggest('renamed') == []
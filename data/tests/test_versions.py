@@ -0,0 +1,12 @@
+import data.cache as cache
+import data.versions as ver
+
+
+def test_bump_and_get():
+    name = 'versions-test'
+    before = ver.get([name])[name]
+    cache.put('/versions-test', b'x', cache.stamp([name]))
+    ver.bump(name)
+    assert ver.get([name]) == {name: before + 1}
+    assert cache.get('/versions-test') is None
+    assert ver.get(['never-written']) == {'never-written': 0}
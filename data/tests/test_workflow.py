@@ -0,0 +1,81 @@
+import pytest
+import data.db_connect as dbc
+import data.workflow as wf
+
+TABLE = [
+    {wf.FROM_STATE: 'DRAFT', wf.ACTION: 'SUBMIT', wf.TO_STATE: 'REVIEW',
+     wf.ROLES: ['AU']},
+    {wf.FROM_STATE: 'DRAFT', wf.ACTION: 'MOVE', wf.TO_STATE: None,
+     wf.ROLES: ['ED']},
+    {wf.FROM_STATE: 'REVIEW', wf.ACTION: 'ACCEPT', wf.TO_STATE: 'DONE',
+     wf.ROLES: ['ED', 'RE']},
+    {wf.FROM_STATE: 'REVIEW', wf.ACTION: 'SEND_BACK', wf.TO_STATE: 'DRAFT',
+     wf.ROLES: ['ED']},
+    {wf.FROM_STATE: 'DONE', wf.ACTION: 'MOVE', wf.TO_STATE: None,
+     wf.ROLES: ['ED']},
+]
+
+
+@pytest.fixture
+def workflow():
+    return wf.compile_table(TABLE)
+
+
+def test_lookup(workflow):
+    transition = wf.lookup(workflow, 'REVIEW', 'ACCEPT')
+    assert transition[wf.TO_STATE] == 'DONE'
+    assert transition[wf.ROLES] == {'ED', 'RE'}
+    assert wf.lookup(workflow, 'DRAFT', 'ACCEPT') is None
+    assert wf.lookup(workflow, 'NOWHERE', 'ACCEPT') is None
+
+
+def test_action_to(workflow):
+    assert wf.action_to(workflow, 'REVIEW', 'DRAFT') == 'SEND_BACK'
+    assert wf.action_to(workflow, 'DRAFT', 'DONE') is None
+
+
+def test_allowed_actions(workflow):
+    assert wf.allowed_actions(workflow, 'REVIEW', {'RE'}) == ['ACCEPT']
+    assert wf.allowed_actions(workflow, 'REVIEW', ['RE', 'ED']) == [
+        'ACCEPT', 'SEND_BACK']
+    assert wf.allowed_actions(workflow, 'DRAFT', set()) == []
+
+
+def test_is_state(workflow):
+    assert wf.is_state(workflow, 'DONE')
+    assert not wf.is_state(workflow, 'NOWHERE')
+
+
+def test_flow_map(workflow):
+    assert wf.flow_map(workflow)['DRAFT'] == {'SUBMIT': 'REVIEW',
+                                              'MOVE': None}
+
+
+def test_compile_rejects_unknown_target():
+    bad = TABLE + [{wf.FROM_STATE: 'DONE', wf.ACTION: 'GO',
+                    wf.TO_STATE: 'LIMBO', wf.ROLES: ['ED']}]
+    with pytest.raises(ValueError):
+        wf.compile_table(bad)
+
+
+def test_compile_rejects_duplicates_and_missing_roles():
+    with pytest.raises(ValueError):
+        wf.compile_table(TABLE + [TABLE[0]])
+    with pytest.raises(ValueError):
+        wf.compile_table([{wf.FROM_STATE: 'A', wf.ACTION: 'B',
+                           wf.TO_STATE: None, wf.ROLES: []}])
+    with pytest.raises(ValueError):
+        wf.compile_table([{wf.ACTION: 'B'}])
+
+
+def test_load_from_db():
+    collection = dbc.client[dbc.JOURNAL_DB][wf.WORKFLOW_COLLECTION]
+    collection.delete_many({})
+    try:
+        assert wf.lookup(wf.load(TABLE), 'DRAFT', 'SUBMIT')
+        collection.insert_many([dict(row) for row in TABLE[1:]])
+        stored = wf.load(TABLE)
+        assert wf.lookup(stored, 'DRAFT', 'SUBMIT') is None
+        assert wf.lookup(stored, 'REVIEW', 'ACCEPT')
+    finally:
+        collection.delete_many({})
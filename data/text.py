@@ -2,6 +2,8 @@
 This module interfaces to our text data.
 """
 import data.db_connect as dbc
+import data.versions as ver
+import data.search as srch
 
 # fields
 KEY = 'key'
@@ -19,6 +21,9 @@ DEL_KEY = 'DeletePage'
 TEXT_COLLECTION = 'texts'
 TEST_COLLECTION = 'test_texts'
 
+# What texts are called in the search index
+SEARCH_KIND = 'text'
+
 # Initialize DB connection
 dbc.connect_db()
 
@@ -28,6 +33,30 @@ def get_collection_name(testing=False):
     return TEST_COLLECTION if testing else TEXT_COLLECTION
 
 
+def _index_for_search(key: str, title: str, text: str):
+    srch.index(SEARCH_KIND, key, {srch.TITLE: title, srch.TEXT: text},
+               {srch.TITLE: title})
+
+
+def _search_documents():
+    """Yield every journal text for a search index rebuild."""
+    for doc in dbc.fetch_many(TEXT_COLLECTION, {}):
+        yield (doc.get(KEY),
+               {srch.TITLE: doc.get(TITLE), srch.TEXT: doc.get(TEXT)},
+               {srch.TITLE: doc.get(TITLE)})
+
+
+def _search_fetch(keys: list) -> dict:
+    """Return {key: searchable fields} for a page of search hits."""
+    return {
+        doc.get(KEY): {srch.TITLE: doc.get(TITLE), srch.TEXT: doc.get(TEXT)}
+        for doc in dbc.fetch_many(TEXT_COLLECTION, {KEY: {'$in': keys}})
+    }
+
+
+srch.register_source(SEARCH_KIND, _search_documents, _search_fetch)
+
+
 def create(key: str, title: str, text: str, testing=False) -> bool:
     """
     Create a new text entry.
@@ -42,6 +71,9 @@ def create(key: str, title: str, text: str, testing=False) -> bool:
             TEXT: text
         }
         dbc.insert_one(collection, text_doc)
+        ver.bump(ver.TEXTS)
+        if not testing:
+            _index_for_search(key, title, text)
         return True
     except Exception as e:
         print(f"Error in create: {str(e)}")
@@ -59,6 +91,9 @@ def delete(key: str, testing=False) -> bool:
         if not text:
             raise KeyError(f'Text with key "{key}" not found')
         dbc.del_one(collection, {KEY: key})
+        ver.bump(ver.TEXTS)
+        if not testing:
+            srch.remove(SEARCH_KIND, key)
         return True
     except KeyError as e:
         raise e
@@ -80,7 +115,11 @@ def update(key: str, title: str, text: str, testing=False) -> bool:
             TITLE: title,
             TEXT: text
         }
-        return bool(dbc.update_doc(collection, {KEY: key}, update_doc))
+        updated = bool(dbc.update_doc(collection, {KEY: key}, update_doc))
+        ver.bump(ver.TEXTS)
+        if not testing:
+            _index_for_search(key, title, text)
+        return updated
     except Exception as e:
         print(f"Error in update: {str(e)}")
         return False
@@ -0,0 +1,142 @@
+"""
+This module tracks review and decision turnaround as persisted
+quantile sketches, so p50, p90 and p99 can be reported without
+rescanning any history.
+
+There is one sketch per metric and scope: each referee, each editor
+and the journal as a whole. A sketch is a t-digest (see data.tdigest)
+plus a short buffer of raw durations. Recording a duration is an
+atomic $push onto the buffer; once a buffer fills up it is folded into
+the digest by a write that only succeeds if nothing was pushed in the
+meantime, so concurrent writers never lose a value. Reports fold the
+buffer in memory.
+"""
+import pymongo as pm
+
+import data.db_connect as dbc
+import data.tdigest as td
+
+SKETCHES_COLLECTION = 'turnaround_sketches'
+
+METRIC = 'metric'
+SCOPE = 'scope'
+SUBJECT = 'subject'
+DIGEST = 'digest'
+BUFFER = 'buffer'
+VERSION = 'version'
+
+# Assignment of a referee to their review
+METRIC_REVIEW = 'review'
+# Submission to the final decision, by any action
+METRIC_DECISION = 'decision'
+METRICS = (METRIC_REVIEW, METRIC_DECISION)
+
+SCOPE_REFEREE = 'referee'
+SCOPE_EDITOR = 'editor'
+SCOPE_JOURNAL = 'journal'
+SCOPES = (SCOPE_REFEREE, SCOPE_EDITOR, SCOPE_JOURNAL)
+# The subject of journal-wide sketches
+JOURNAL = ''
+
+# Report keys; quantiles are in hours
+COUNT = 'count'
+QUANTILES = {'p50': 0.5, 'p90': 0.9, 'p99': 0.99}
+
+BUFFER_LIMIT = 64
+
+dbc.connect_db()
+
+
+def init_indexes():
+    """Create the index that makes each sketch unique."""
+    dbc.create_index(SKETCHES_COLLECTION,
+                     [(METRIC, pm.ASCENDING), (SCOPE, pm.ASCENDING),
+                      (SUBJECT, pm.ASCENDING)], unique=True)
+
+
+init_indexes()
+
+
+def _fold(sketch: dict) -> bool:
+    """
+    Fold a sketch's buffer into its digest. Only writes if the buffer
+    is unchanged since it was read; returns whether it was.
+    """
+    buffered = sketch.get(BUFFER) or []
+    result = dbc.update_doc(
+        SKETCHES_COLLECTION,
+        {dbc.MONGO_ID: sketch[dbc.MONGO_ID],
+         VERSION: sketch.get(VERSION, 0),
+         BUFFER: {'$size': len(buffered)}},
+        {'$set': {DIGEST: td.add(sketch.get(DIGEST) or td.empty(),
+                                 buffered),
+                  BUFFER: []},
+         '$inc': {VERSION: 1}})
+    return bool(result.matched_count)
+
+
+def record(samples: list):
+    """
+    Record durations.
+
+    Args:
+        samples: (metric, scope, subject, seconds) tuples
+    """
+    by_key = {}
+    for metric, scope, subject, seconds in samples:
+        if subject is None or seconds is None:
+            continue
+        by_key.setdefault((metric, scope, subject), []).append(seconds)
+    if not by_key:
+        return
+    keys = [{METRIC: metric, SCOPE: scope, SUBJECT: subject}
+            for metric, scope, subject in by_key]
+    dbc.bulk_write(SKETCHES_COLLECTION, [
+        pm.UpdateOne(key, {'$push': {BUFFER: {'$each': values}},
+                           '$setOnInsert': {DIGEST: td.empty(),
+                                            VERSION: 0}},
+                     upsert=True)
+        for key, values in zip(keys, by_key.values())])
+    full = dbc.client[dbc.JOURNAL_DB][SKETCHES_COLLECTION].find(
+        {'$or': keys, f'{BUFFER}.{BUFFER_LIMIT - 1}': {'$exists': True}})
+    for sketch in full:
+        _fold(sketch)
+
+
+def _digest(sketch: dict) -> dict:
+    """A sketch's digest with its buffer folded in, in memory."""
+    return td.add(sketch.get(DIGEST) or td.empty(),
+                  sketch.get(BUFFER) or [])
+
+
+def summarize(digest: dict) -> dict:
+    """Return the count and the reported quantiles, in hours."""
+    summary = {COUNT: digest[td.COUNT]}
+    for name, q in QUANTILES.items():
+        value = td.quantile(digest, q)
+        summary[name] = None if value is None else round(value / 3600, 2)
+    return summary
+
+
+def report(metric: str, scope: str, subject: str = None) -> dict:
+    """
+    Return turnaround quantiles for one subject, or {subject: summary}
+    for every subject in the scope if subject is None. Journal-wide
+    figures are under scope SCOPE_JOURNAL, subject JOURNAL.
+    """
+    filt = {METRIC: metric, SCOPE: scope}
+    if subject is not None:
+        filt[SUBJECT] = subject
+    sketches = dbc.fetch_many(SKETCHES_COLLECTION, filt,
+                              sort=[(SUBJECT, pm.ASCENDING)])
+    if subject is not None:
+        return summarize(_digest(sketches[0]) if sketches else td.empty())
+    return {sketch[SUBJECT]: summarize(_digest(sketch))
+            for sketch in sketches}
+
+
+def merged(metric: str, scope: str, subjects) -> dict:
+    """Return quantiles for several subjects taken together."""
+    sketches = dbc.fetch_many(SKETCHES_COLLECTION, {
+        METRIC: metric, SCOPE: scope, SUBJECT: {'$in': list(subjects)}})
+    return summarize(td.merge(_digest(sketch) for sketch in sketches))
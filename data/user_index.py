@@ -0,0 +1,152 @@
+"""
+This module is an in-memory prefix index over users, for autocomplete.
+
+Every user contributes a few lowercase keys: their full name, each word
+of it, their email and their affiliation. The keys live in one sorted
+list of (key, email) pairs, so the users matching a prefix are a
+contiguous run found by binary search. The users module reports
+creates, updates and deletes; the index is built on first use.
+"""
+import bisect
+import re
+import threading
+
+import data.db_connect as dbc
+
+NAME = 'name'
+EMAIL = 'email'
+AFFILIATION = 'affiliation'
+ROLES = 'roleCodes'
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+WORD_RE = re.compile(r'\w+')
+
+entries = []
+keys_by_email = {}
+records = {}
+loaded = False
+lock = threading.Lock()
+
+
+def _keys(user: dict) -> set:
+    """Return the prefixes a user can be found by."""
+    keys = set()
+    for field in (NAME, EMAIL, AFFILIATION):
+        value = (user.get(field) or '').strip().lower()
+        if value:
+            keys.add(value)
+            if field != EMAIL:
+                keys.update(WORD_RE.findall(value))
+    return keys
+
+
+def _record(user: dict) -> dict:
+    """The few fields a suggestion returns."""
+    return {NAME: user.get(NAME), EMAIL: user.get(EMAIL),
+            AFFILIATION: user.get(AFFILIATION),
+            ROLES: list(user.get(ROLES) or [])}
+
+
+def _remove(email: str):
+    """Drop a user's keys. Caller holds lock."""
+    for key in keys_by_email.pop(email, ()):
+        i = bisect.bisect_left(entries, (key, email))
+        if i < len(entries) and entries[i] == (key, email):
+            del entries[i]
+    records.pop(email, None)
+
+
+def _put(user: dict):
+    """Add or replace a user. Caller holds lock."""
+    email = user.get(EMAIL)
+    if not email:
+        return
+    _remove(email)
+    keys = _keys(user)
+    for key in keys:
+        bisect.insort(entries, (key, email))
+    keys_by_email[email] = keys
+    records[email] = _record(user)
+
+
+def is_loaded() -> bool:
+    """Check whether the index reflects the database."""
+    return loaded
+
+
+def invalidate():
+    """Forget the index; the next query rebuilds it."""
+    global loaded
+    with lock:
+        loaded = False
+
+
+def rebuild(users):
+    """Reset the index from an iterable of user dicts."""
+    global entries, loaded
+    with lock:
+        keys_by_email.clear()
+        records.clear()
+        pairs = []
+        for user in users:
+            email = user.get(EMAIL)
+            if not email:
+                continue
+            keys = _keys(user)
+            keys_by_email[email] = keys
+            records[email] = _record(user)
+            pairs.extend((key, email) for key in keys)
+        entries = sorted(pairs)
+        loaded = True
+
+
+def load(collection: str):
+    """Build the index from a users collection."""
+    rebuild(dbc.fetch_many(collection, {},
+                           projection={NAME: 1, EMAIL: 1, AFFILIATION: 1,
+                                       ROLES: 1}))
+
+
+def put(user: dict):
+    """Add or replace a user in the index."""
+    with lock:
+        if loaded:
+            _put(user)
+
+
+def remove(email: str):
+    """Take a user out of the index."""
+    with lock:
+        if loaded:
+            _remove(email)
+
+
+def suggest(prefix: str, role: str = None,
+            limit: int = DEFAULT_LIMIT) -> list:
+    """
+    Return up to limit users with a name word, full name, email or
+    affiliation starting with prefix (case-insensitive), optionally
+    only those holding role.
+    """
+    prefix = (prefix or '').strip().lower()
+    limit = max(1, min(limit, MAX_LIMIT))
+    if not prefix:
+        return []
+    found = []
+    seen = set()
+    with lock:
+        i = bisect.bisect_left(entries, (prefix, ''))
+        while i < len(entries) and len(found) < limit:
+            key, email = entries[i]
+            if not key.startswith(prefix):
+                break
+            i += 1
+            if email in seen:
+                continue
+            seen.add(email)
+            record = records[email]
+            if role is None or role in record[ROLES]:
+                found.append(dict(record))
+    return found
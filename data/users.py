@@ -4,6 +4,9 @@ This module interfaces to our user data.
 import re
 import data.roles as rls
 import data.db_connect as dbc
+import data.referee_load as rl
+import data.user_index as uidx
+import data.versions as ver
 
 # fields
 NAME = 'name'
@@ -30,6 +33,13 @@ def get_collection_name(testing=False):
     return USERS_COLLECTION
 
 
+def _note_role_change(before: list, after: list):
+    """Make referee workloads reload when someone gains or loses RE."""
+    if (rls.REFEREE_CODE in (before or [])) != (
+            rls.REFEREE_CODE in (after or [])):
+        rl.invalidate()
+
+
 def create(
         name: str,
         email: str,
@@ -68,6 +78,9 @@ def create(
             ROLES: roles if roles is not None else [],
         }
         dbc.insert_one(collection, user_doc)
+        _note_role_change([], user_doc[ROLES])
+        uidx.put(user_doc)
+        ver.bump(ver.USERS)
         return email
     except Exception as e:
         print(f"Error in create: {str(e)}")
@@ -146,7 +159,12 @@ def update(
             update_doc[ROLE_CODES_KEY] = roleCodes
         elif ROLE_CODES_KEY in existing:
             update_doc[ROLE_CODES_KEY] = existing.get(ROLE_CODES_KEY, [])
-        return bool(dbc.update_doc(collection, {EMAIL: email}, update_doc))
+        updated = bool(dbc.update_doc(collection, {EMAIL: email},
+                                      update_doc))
+        _note_role_change(existing.get(ROLES), update_doc.get(ROLES))
+        uidx.put(update_doc)
+        ver.bump(ver.USERS)
+        return updated
     except Exception as e:
         print(f"Error in update: {str(e)}")
         raise e
@@ -163,12 +181,27 @@ def delete(email: str, testing=False):
         if not user:
             raise KeyError(f'User with email "{email}" not found')
         dbc.del_one(collection, {EMAIL: email})
+        _note_role_change(user.get(ROLES), [])
+        uidx.remove(email)
+        ver.bump(ver.USERS)
         return email
     except Exception as e:
         print(f"Error in delete: {str(e)}")
         raise e
 
 
+def suggest(prefix: str, role: str = None,
+            limit: int = uidx.DEFAULT_LIMIT) -> list:
+    """
+    Return a few users whose name, email or affiliation starts with
+    prefix, for autocomplete. Only name, email, affiliation and role
+    codes are returned.
+    """
+    if not uidx.is_loaded():
+        uidx.load(USERS_COLLECTION)
+    return uidx.suggest(prefix, role=role, limit=limit)
+
+
 def is_valid_email(email: str) -> bool:
     """Validate email format"""
     VALID_CHARS = r"[A-Za-z0-9!#$%&'*+/=?^_{|}~.-]"
@@ -244,7 +277,11 @@ def add_role(email: str, role: str, testing=False) -> bool:
 
         if role not in user.get(ROLES, []):
             user[ROLES].append(role)
-            return bool(dbc.update_doc(collection, {EMAIL: email}, user))
+            updated = bool(dbc.update_doc(collection, {EMAIL: email}, user))
+            _note_role_change([], [role])
+            uidx.put(user)
+            ver.bump(ver.USERS)
+            return updated
         return True
     except Exception as e:
         print(f"Error in add_role: {str(e)}")
@@ -280,7 +317,11 @@ def remove_role(email: str, role: str, testing=False) -> bool:
         user_roles = user.get(ROLES, [])
         user_roles.remove(role)
         user[ROLES] = user_roles
-        return bool(dbc.update_doc(collection, {EMAIL: email}, user))
+        updated = bool(dbc.update_doc(collection, {EMAIL: email}, user))
+        _note_role_change([role], [])
+        uidx.put(user)
+        ver.bump(ver.USERS)
+        return updated
     except Exception as e:
         print(f"Error in remove_role: {str(e)}")
         raise e
@@ -297,7 +338,10 @@ def change_password(email: str, password: str, testing=False) -> bool:
             EMAIL: email,
             PASSWORD: password,
         }
-        return bool(dbc.update_doc(collection, {EMAIL: email}, update_doc))
+        updated = bool(dbc.update_doc(collection, {EMAIL: email},
+                                      update_doc))
+        ver.bump(ver.USERS)
+        return updated
     except Exception as e:
         print(f"Error in update: {str(e)}")
         raise e
@@ -0,0 +1,41 @@
+"""
+This module keeps a version number per collection, bumped on every
+write, so readers can tell whether anything changed without loading
+any data, e.g. to answer a conditional GET.
+
+Versions live in Mongo, so every server process sees the same numbers.
+A bump also invalidates the response cache tag of the same name.
+"""
+import pymongo as pm
+
+import data.cache as cache
+import data.db_connect as dbc
+
+VERSIONS_COLLECTION = 'versions'
+
+VERSION = 'version'
+
+# Versioned collections; each is also a response cache tag
+USERS = cache.TAG_USERS
+ROLES = cache.TAG_ROLES
+TEXTS = cache.TAG_TEXTS
+
+dbc.connect_db()
+
+
+def bump(*names):
+    """Record a write to each of the named collections."""
+    dbc.bulk_write(VERSIONS_COLLECTION, [
+        pm.UpdateOne({dbc.MONGO_ID: name}, {'$inc': {VERSION: 1}},
+                     upsert=True)
+        for name in names])
+    cache.invalidate(*names)
+
+
+def get(names) -> dict:
+    """Return {name: version} for names, 0 for ones never written."""
+    names = list(names)
+    versions = {doc[dbc.MONGO_ID]: doc[VERSION]
+                for doc in dbc.fetch_many(VERSIONS_COLLECTION,
+                                          {dbc.MONGO_ID: {'$in': names}})}
+    return {name: versions.get(name, 0) for name in names}
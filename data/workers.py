@@ -0,0 +1,40 @@
+"""
+This module owns the process pool used for CPU-heavy background work,
+so that request threads only ever hand work off and return.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+MAX_WORKERS_ENV = 'JOURNAL_MAX_WORKERS'
+DEFAULT_MAX_WORKERS = 2
+
+pool = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """
+    Return the shared process pool, creating it on first use.
+    """
+    global pool
+    if pool is None:
+        max_workers = int(os.environ.get(MAX_WORKERS_ENV,
+                                         DEFAULT_MAX_WORKERS))
+        pool = ProcessPoolExecutor(max_workers=max_workers)
+    return pool
+
+
+def submit(fn, *args, **kwargs):
+    """
+    Run fn(*args, **kwargs) in the process pool and return its future.
+    """
+    return get_pool().submit(fn, *args, **kwargs)
+
+
+def shutdown(wait=True):
+    """
+    Shut the pool down; the next submit() will start a fresh one.
+    """
+    global pool
+    if pool is not None:
+        pool.shutdown(wait=wait)
+        pool = None
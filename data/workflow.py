@@ -0,0 +1,135 @@
+"""
+This module compiles the manuscript workflow into lookup tables.
+
+A workflow is a transition table: one row per (from_state, action) with
+the state it leads to and the roles allowed to take it. The table can
+come from code or from the workflow collection in the DB. Compiling it
+precomputes everything the endpoints ask, so checking a transition or
+listing what someone may do is a dictionary lookup.
+
+Roles in the table are relative to a manuscript:
+    ED - an editor
+    RE - a referee assigned to the manuscript
+    AU - the manuscript's author
+"""
+import data.db_connect as dbc
+
+WORKFLOW_COLLECTION = 'workflow'
+
+# Transition table row fields
+FROM_STATE = 'from_state'
+ACTION = 'action'
+TO_STATE = 'to_state'  # None means the action works out the target itself
+ROLES = 'roles'
+
+# Compiled workflow keys
+TRANSITIONS = 'transitions'
+BY_TARGET = 'by_target'
+BY_ROLE = 'by_role'
+STATES = 'states'
+
+dbc.connect_db()
+
+
+def compile_table(rows: list) -> dict:
+    """
+    Compile a transition table into a workflow.
+
+    Raises:
+        ValueError: If a row is incomplete, repeats a transition, names
+        no roles, or leads to a state the table never defines
+    """
+    transitions = {}
+    for row in rows:
+        try:
+            from_state = row[FROM_STATE]
+            action = row[ACTION]
+        except KeyError as e:
+            raise ValueError(f'Workflow row is missing {e}: {row}')
+        roles = frozenset(row.get(ROLES) or [])
+        if not roles:
+            raise ValueError(
+                f'No roles may take {action} from {from_state}')
+        actions = transitions.setdefault(from_state, {})
+        if action in actions:
+            raise ValueError(f'Duplicate transition {action} '
+                             f'from {from_state}')
+        actions[action] = {TO_STATE: row.get(TO_STATE), ROLES: roles}
+
+    states = frozenset(transitions)
+    by_target = {}
+    by_role = {}
+    for from_state, actions in transitions.items():
+        targets = by_target.setdefault(from_state, {})
+        role_actions = by_role.setdefault(from_state, {})
+        for action, transition in actions.items():
+            target = transition[TO_STATE]
+            if target is not None:
+                if target not in states:
+                    raise ValueError(f'{action} from {from_state} leads '
+                                     f'to unknown state {target}')
+                targets.setdefault(target, action)
+            for role in transition[ROLES]:
+                role_actions.setdefault(role, []).append(action)
+    return {
+        TRANSITIONS: transitions,
+        BY_TARGET: by_target,
+        BY_ROLE: by_role,
+        STATES: states,
+    }
+
+
+def load(default_rows: list) -> dict:
+    """
+    Compile the transition table stored in the DB, falling back to
+    default_rows when the workflow collection is empty.
+    """
+    rows = dbc.fetch_all(WORKFLOW_COLLECTION)
+    return compile_table(rows or default_rows)
+
+
+def lookup(workflow: dict, state: str, action: str) -> dict:
+    """
+    Return the transition for action in state, or None if the
+    action is not allowed there.
+    """
+    return workflow[TRANSITIONS].get(state, {}).get(action)
+
+
+def is_state(workflow: dict, state: str) -> bool:
+    """Check that state is part of the workflow."""
+    return state in workflow[STATES]
+
+
+def action_to(workflow: dict, state: str, target: str) -> str:
+    """
+    Return the action that moves a manuscript from state to target,
+    or None if no single action does.
+    """
+    return workflow[BY_TARGET].get(state, {}).get(target)
+
+
+def allowed_actions(workflow: dict, state: str, roles) -> list:
+    """
+    Return the actions someone holding roles may take in state,
+    in table order and without duplicates.
+    """
+    by_role = workflow[BY_ROLE].get(state, {})
+    allowed = []
+    for role in roles:
+        for action in by_role.get(role, []):
+            if action not in allowed:
+                allowed.append(action)
+    order = list(workflow[TRANSITIONS].get(state, {}))
+    return sorted(allowed, key=order.index)
+
+
+def flow_map(workflow: dict) -> dict:
+    """
+    Return the workflow as a plain {state: {action: target}} map.
+    """
+    return {
+        state: {action: transition[TO_STATE]
+                for action, transition in actions.items()}
+        for state, actions in workflow[TRANSITIONS].items()
+    }
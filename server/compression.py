@@ -0,0 +1,74 @@
+"""
+This module compresses response bodies for clients that accept it.
+
+gzip is always available. brotli and zstd are used when the brotli or
+zstandard package is installed, and are preferred over gzip when a
+client accepts them equally. Bodies under a size threshold, and types
+that are already compressed, are sent as they are.
+"""
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP = 'gzip'
+BROTLI = 'br'
+ZSTD = 'zstd'
+IDENTITY = 'identity'
+
+MIN_SIZE_ENV = 'JOURNAL_COMPRESS_MIN_BYTES'
+DEFAULT_MIN_SIZE = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 6
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+
+
+def available() -> list:
+    """The encodings this server can produce, most preferred first."""
+    encodings = []
+    if brotli is not None:
+        encodings.append(BROTLI)
+    if zstandard is not None:
+        encodings.append(ZSTD)
+    encodings.append(GZIP)
+    return encodings
+
+
+def min_size() -> int:
+    """Bodies smaller than this many bytes are not compressed."""
+    return int(os.environ.get(MIN_SIZE_ENV, DEFAULT_MIN_SIZE))
+
+
+def is_compressible(mimetype: str) -> bool:
+    """Whether a body of this type is worth compressing."""
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def negotiate(accept_encodings) -> str:
+    """
+    Pick the encoding to use from a request's parsed Accept-Encoding,
+    or None to send the body as it is.
+    """
+    return accept_encodings.best_match(available())
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress body with one of the available() encodings."""
+    if encoding == BROTLI:
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == ZSTD:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    if encoding == GZIP:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f'Unsupported encoding: {encoding}')
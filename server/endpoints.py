@@ -3,18 +3,36 @@ This is the file containing all of the endpoints for our flask app.
 The endpoint called `endpoints` will return all available endpoints.
 """
 
+from datetime import datetime
+import functools
 from http import HTTPStatus
+import re
 
-from flask import Flask, request, current_app  # , request
+from flask import Flask, request, current_app, g
 from flask_restx import Resource, Api, fields  # Namespace, fields
+from flask_restx.representations import output_json
 from flask_cors import CORS
+from bson import ObjectId
 
 import werkzeug.exceptions as wz
 
+import server.compression as cmp
+
+import data.cache as cache
+import data.db_connect as dbc
 import data.users as usr
+import data.versions as ver
 import data.text as txt
 import data.roles as rls
 import data.manuscripts as ms
+import data.events as evt
+import data.diffs as dff
+import data.facets as fct
+import data.inbox as ibx
+import data.search as srch
+import data.stats as sts
+import data.turnaround as tat
+import data.submissions as sub
 
 ROLE_EDITOR = "ED"
 ROLE_REFEREE = "RE"
@@ -26,7 +44,20 @@ SUCCESS_MESSAGE = "success"
 STATE_KEY = "state"
 REFEREE_EMAIL_KEY = "referee_email"
 
+
+def json_default(value):
+    """
+    Encode values the stock JSON encoder can't: stored timestamps are
+    native datetimes and go out as ISO 8601 strings in UTC.
+    """
+    stamp = dbc.to_utc(value)
+    if stamp is not None and not isinstance(value, str):
+        return stamp.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
 app = Flask(__name__)
+app.config['RESTX_JSON'] = {'default': json_default}
 CORS(app)
 api = Api(app)
 
@@ -47,6 +78,9 @@ RETURN = 'return'
 USER_READ_EP = '/user/read'
 USER_READ_RESP = 'Users'
 
+USER_SUGGEST_EP = '/user/suggest'
+USER_SUGGEST_RESP = 'Suggestions'
+
 USER_DELETE_EP = '/user/delete'
 USER_DELETE_RESP = 'Delete'
 
@@ -122,6 +156,163 @@ def handle_request_error(
     raise error_class(f'Could not {operation}: {err}')
 
 
+# Tells clients whether a response came from the response cache
+CACHE_HEADER = 'X-Cache'
+# Where conditional_get leaves the request's ETag for cached_response
+ETAG_KEY = 'etag'
+# Where cached_response leaves the request's cache key, so compressed
+# bodies can be kept with the cache entry
+CACHE_KEY = 'cache_key'
+# Set by no_compression for the current request
+NO_COMPRESSION = 'no_compression'
+# Set by skip_cache for the current request
+NO_CACHE = 'no_cache'
+JSON_MIMETYPE = 'application/json'
+
+
+def cached_response(ttl: float = cache.DEFAULT_TTL, tags=()):
+    """
+    Cache a GET handler's successful responses, already serialized,
+    keyed by path and query string, for ttl seconds or until a write
+    invalidates one of tags. A hit skips the handler and JSON encoding.
+    Under conditional_get the key includes the ETag, so a write made
+    through another server process also misses here. Only dicts the
+    handler returns are cached, and not if it called skip_cache(), so
+    handlers must raise on errors.
+    """
+    def decorate(handler):
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            key = f'{request.full_path}#{g.get(ETAG_KEY) or ""}'
+            body = cache.get(key)
+            setattr(g, CACHE_KEY, key)
+            if body is not None:
+                response = current_app.response_class(
+                    body, mimetype=JSON_MIMETYPE)
+                response.headers[CACHE_HEADER] = 'HIT'
+                return response
+            stamp = cache.stamp(tags)
+            result = handler(*args, **kwargs)
+            if not isinstance(result, dict) or g.get(NO_CACHE):
+                return result
+            response = json_response(result)
+            cache.put(key, response.get_data(), stamp, ttl)
+            response.headers[CACHE_HEADER] = 'MISS'
+            return response
+        return wrapper
+    return decorate
+
+
+def json_response(data: dict):
+    """Serialize a handler's result the way flask-restx would."""
+    response = output_json(data, HTTPStatus.OK)
+    response.mimetype = JSON_MIMETYPE
+    return response
+
+
+def conditional_get(etag_of):
+    """
+    Give a GET handler's successful responses a strong ETag, computed
+    by etag_of from the URL arguments without building the payload.
+    A request whose If-None-Match still matches gets 304 and the
+    handler never runs. etag_of may return None to skip all this.
+    """
+    def decorate(handler):
+        @functools.wraps(handler)
+        def wrapper(self, *args, **kwargs):
+            etag = etag_of(*args, **kwargs)
+            setattr(g, ETAG_KEY, etag)
+            # compress_response tags compressed bodies by encoding
+            matched = etag and next(
+                (tag for tag in [etag] + [f'{etag}-{encoding}'
+                                          for encoding in cmp.available()]
+                 if request.if_none_match.contains(tag)), None)
+            if matched:
+                response = current_app.response_class(
+                    status=HTTPStatus.NOT_MODIFIED)
+                response.set_etag(matched)
+                return response
+            result = handler(self, *args, **kwargs)
+            if etag is None or g.get(NO_CACHE):
+                return result
+            if isinstance(result, dict):
+                result = json_response(result)
+            if (isinstance(result, current_app.response_class)
+                    and result.status_code == HTTPStatus.OK):
+                result.set_etag(etag)
+            return result
+        return wrapper
+    return decorate
+
+
+def skip_cache():
+    """
+    Keep the current response out of the response cache and without
+    an ETag, e.g. when it may stand for a failed read rather than data.
+    """
+    setattr(g, NO_CACHE, True)
+
+
+def no_compression(handler):
+    """Always send a handler's responses uncompressed."""
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        setattr(g, NO_COMPRESSION, True)
+        return handler(*args, **kwargs)
+    return wrapper
+
+
+@app.after_request
+def compress_response(response):
+    """
+    Compress successful JSON and text responses over the size threshold
+    with the best encoding the client accepts. Responses from the
+    response cache reuse the compressed copy kept with their entry.
+    Compressed bodies get their own ETag, the plain one plus the
+    encoding, as a strong ETag must identify the exact bytes.
+    """
+    if (g.get(NO_COMPRESSION)
+            or response.status_code != HTTPStatus.OK
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or not cmp.is_compressible(response.mimetype)):
+        return response
+    body = response.get_data()
+    if len(body) < cmp.min_size():
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = cmp.negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+    key = g.get(CACHE_KEY)
+    compressed = cache.get_variant(key, encoding) if key else None
+    if compressed is None:
+        compressed = cmp.compress(body, encoding)
+        if key:
+            cache.put_variant(key, encoding, body, compressed)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
+
+
+def collection_etag(*names):
+    """An etag_of for responses built from whole collections."""
+    def etag_of(*args, **kwargs):
+        versions = ver.get(names)
+        return '-'.join(f'{name}.{versions[name]}' for name in names)
+    return etag_of
+
+
+def manuscript_etag(manuscript_id):
+    """ETag of a manuscript in the active collection, else None."""
+    version = ms.get_write_version(manuscript_id)
+    return None if version is None else f'manuscript.{version}'
+
+
 def create_response(message_type: str, data=None):
     """
     Create a standardized response format that matches test expectations
@@ -327,6 +518,7 @@ class JournalName(Resource):
     The purpose of JournalName is to have a simple test to output
     the journal name.
     """
+    @cached_response(ttl=3600)
     def get(self):
         """
         An endpoint made for 'Group Dev Env Working' assignment.
@@ -341,6 +533,7 @@ class HelloWorld(Resource):
     The purpose of the HelloWorld class is to have a simple test to see if the
     app is working at all.
     """
+    @no_compression
     def get(self):
         """
         A trivial endpoint to check server that answers with "hello world".
@@ -434,6 +627,8 @@ class TextRead(Resource):
     """
     @api.response(HTTPStatus.OK, 'Success')
     @api.response(HTTPStatus.NOT_FOUND, 'Not Found')
+    @conditional_get(collection_etag(ver.TEXTS))
+    @cached_response(tags=[cache.TAG_TEXTS])
     def get(self, key):
         """
         Retrieve a text entry by key.
@@ -483,16 +678,20 @@ class RoleRead(Resource):
     """
     @api.response(HTTPStatus.OK, 'Success')
     @api.response(HTTPStatus.NOT_FOUND, 'No users found')
+    @conditional_get(collection_etag(ver.ROLES))
+    @cached_response(tags=[cache.TAG_ROLES])
     def get(self):
         """
         Retrieve all users.
         """
         try:
             roles = rls.get_roles()
-            if not roles:
-                return {ROLE_READ_RESP: 'No Roles found'}
         except Exception as err:
-            return {ROLE_READ_RESP: f'Error reading roles: {err}'}
+            handle_request_error('read roles', err, wz.ServiceUnavailable)
+        if not roles:
+            # get_roles() also comes back empty when the read fails
+            skip_cache()
+            return {ROLE_READ_RESP: 'No Roles found'}
         return {
             ROLE_READ_RESP: roles
         }
@@ -574,11 +773,17 @@ class RoleDelete(Resource):
 
 @api.route(USER_GET_MASTHEAD)
 class Masthead(Resource):
+    @conditional_get(collection_etag(ver.USERS, ver.ROLES))
+    @cached_response(tags=[cache.TAG_USERS, cache.TAG_ROLES])
     def get(self):
         """
         Retrieves all masthead roles.
         """
-        return create_response('Masthead', usr.get_masthead())
+        masthead = usr.get_masthead()
+        if not masthead:
+            # The roles read behind it comes back empty when it fails
+            skip_cache()
+        return create_response('Masthead', masthead)
 
 
 @api.route(f'{USER_READ_EP}/<string:email>')
@@ -602,12 +807,34 @@ class UserReadSingle(Resource):
             handle_request_error('read user', err, wz.NotFound)
 
 
+@api.route(USER_SUGGEST_EP)
+class UserSuggest(Resource):
+    """
+    Autocomplete users by name, email or affiliation.
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.param('q', 'What has been typed so far')
+    @api.param('role', 'Only users holding this role code')
+    @api.param('limit', 'Maximum number of suggestions')
+    def get(self):
+        """
+        Get a few matching users' names, emails and affiliations.
+        """
+        return {USER_SUGGEST_RESP: usr.suggest(
+            request.args.get('q', ''),
+            role=request.args.get('role'),
+            limit=request.args.get('limit', 10, type=int),
+        )}
+
+
 @api.route(TEXT_READ_EP)
 class TextReadAll(Resource):
     """
     Read all text entries.
     """
     @api.response(HTTPStatus.OK, 'Success')
+    @conditional_get(collection_etag(ver.TEXTS))
+    @cached_response(tags=[cache.TAG_TEXTS])
     def get(self):
         """
         Retrieve all text entries.
@@ -630,10 +857,63 @@ MANUSCRIPT_TEXT_RESP = 'Manuscript Text'
 
 MANUSCRIPT_VERSION_EP = '/manuscript/version'
 MANUSCRIPT_VERSION_RESP = 'Manuscript Version'
+MANUSCRIPT_DIFF_EP = '/manuscript/diff'
+MANUSCRIPT_DIFF_RESP = 'Diff'
+# Seconds a client should wait before asking again for a pending diff
+DIFF_RETRY_AFTER = 1
 
 MANUSCRIPT_REFEREE_EP = '/manuscript/referee'
 MANUSCRIPT_REFEREE_RESP = 'Manuscript Referee'
 
+REFEREE_QUEUE_EP = '/manuscripts/referee'
+
+REFEREE_SUGGEST_EP = '/manuscript/referee/suggest'
+REFEREE_SUGGEST_RESP = 'Suggested Referees'
+REFEREE_AUTO_EP = '/manuscript/referee/auto'
+REFEREES_AUTO_EP = '/manuscripts/referee/auto'
+REFEREE_COUNT_KEY = 'count'
+REFEREE_RECOMMEND_EP = '/manuscript/referee/recommend'
+REFEREE_RECOMMEND_RESP = 'Recommended Referees'
+MAX_AUTO_REFEREES = 10
+
+MANUSCRIPT_ACTIONS_EP = '/manuscript/actions'
+MANUSCRIPTS_ACTIONS_EP = '/manuscripts/actions'
+MANUSCRIPT_ACTIONS_RESP = 'Allowed Actions'
+MANUSCRIPT_IDS_KEY = 'manuscript_ids'
+MAX_ACTIONS_IDS = 500
+
+MANUSCRIPT_HISTORY_EP = '/manuscript/history'
+MANUSCRIPT_HISTORY_RESP = 'Manuscript History'
+
+INBOX_EP = '/inbox'
+INBOX_RESP = 'Inbox'
+
+SEARCH_EP = '/search'
+SEARCH_RESP = 'Search'
+
+MANUSCRIPTS_ARCHIVE_EP = '/manuscripts/archive'
+MANUSCRIPTS_ARCHIVE_RESP = 'Archived'
+ARCHIVE_DAYS_KEY = 'older_than_days'
+MANUSCRIPT_RESTORE_EP = '/manuscript/restore'
+MANUSCRIPT_RESTORE_RESP = 'Restored'
+
+MANUSCRIPTS_PURGE_EP = '/manuscripts/purge'
+MANUSCRIPTS_PURGE_RESP = 'Purged'
+PURGE_IDS_KEY = 'manuscript_ids'
+PURGE_AUTHOR_KEY = 'author_email'
+
+MANUSCRIPT_FACETS_EP = '/manuscripts/facets'
+MANUSCRIPT_FACETS_RESP = 'Facets'
+MONTH_RE = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+STATS_EP = '/stats'
+STATS_RESP = 'Stats'
+STATS_DAILY_EP = f'{STATS_EP}/daily'
+STATS_DAILY_RESP = 'Daily Stats'
+TURNAROUND_EP = f'{STATS_EP}/turnaround'
+TURNAROUND_RESP = 'Turnaround'
+DAY_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
 STATE_FIELDS = api.model('StateFields', {
     'state': fields.String
 })
@@ -657,19 +937,306 @@ class ManuscriptDetail(Resource):
     """
     @api.response(HTTPStatus.OK, 'Success')
     @api.response(HTTPStatus.NOT_FOUND, 'Not Found')
+    @api.response(HTTPStatus.NOT_MODIFIED, 'Unchanged since the ETag given')
+    @conditional_get(manuscript_etag)
     def get(self, manuscript_id):
         """
-        Get a manuscript by ID.
+        Get a manuscript by ID. Send If-None-Match with the ETag of a
+        previous response to get 304 if it has not changed since.
         """
         try:
             manuscript = ms.get_manuscript(manuscript_id)
-            if not manuscript:
+            if not manuscript or ERROR_KEY in manuscript:
                 raise wz.NotFound(f'Manuscript {manuscript_id} not found.')
             return {MANUSCRIPT_DETAIL_RESP: manuscript}
         except Exception as e:
             handle_request_error('get manuscript', e)
 
 
+@api.route(f'{MANUSCRIPT_HISTORY_EP}/<manuscript_id>')
+class ManuscriptHistory(Resource):
+    """
+    Page through a manuscript's full event history.
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Bad paging parameters')
+    @api.param('after', 'Return events after this sequence number')
+    @api.param('limit', 'Maximum number of events to return')
+    def get(self, manuscript_id):
+        """
+        Get events oldest first. Pass the returned "next" value as
+        "after" to fetch the following page.
+        """
+        try:
+            after = request.args.get('after', 0, type=int)
+            limit = request.args.get('limit', evt.DEFAULT_PAGE_SIZE,
+                                     type=int)
+            return {MANUSCRIPT_HISTORY_RESP:
+                    ms.get_history(manuscript_id, after=after, limit=limit)}
+        except Exception as e:
+            handle_request_error('get manuscript history', e)
+
+
+def user_role_codes(email: str) -> list:
+    """
+    Return the role codes on a user's record, or [] for unknown users.
+    """
+    user = usr.read_one(email) if email else None
+    return user.get(usr.ROLES, []) if user else []
+
+
+# What dispatch_action raises; handlers return these as error responses
+ACTION_ERRORS = (wz.NotFound, wz.Forbidden, wz.Conflict, wz.NotAcceptable)
+# Action errors caused by the manuscript's circumstances rather than the
+# request: archived, or changed by someone else meanwhile
+CONFLICT_MESSAGES = {ms.ARCHIVED_MESSAGE, ms.CONFLICT_MESSAGE}
+
+
+def dispatch_action(manuscript_id: str, action: str, actor_email: str,
+                    **kwargs) -> dict:
+    """
+    Run a workflow action as the given user, enforcing the workflow's
+    role requirements. Returns the updated manuscript.
+    Raises NotFound for a missing manuscript, Forbidden for an action
+    the user's roles don't allow, Conflict for an archived or
+    concurrently changed manuscript, and NotAcceptable for an action
+    the workflow doesn't allow in this state or invalid parameters.
+    """
+    updated_manuscript = ms.process_manuscript_action(
+        manuscript_id, action, actor_email=actor_email,
+        user_roles=user_role_codes(actor_email), **kwargs)
+    if not updated_manuscript:
+        raise wz.NotFound(f'Manuscript {manuscript_id} not found.')
+    error = updated_manuscript.get(ERROR_KEY)
+    if error == ms.NOT_FOUND_MESSAGE:
+        raise wz.NotFound(f'Manuscript {manuscript_id} not found.')
+    if updated_manuscript.get(ms.FORBIDDEN_KEY):
+        raise wz.Forbidden(error)
+    if error in CONFLICT_MESSAGES:
+        raise wz.Conflict(error)
+    if error:
+        raise wz.NotAcceptable(error)
+    return updated_manuscript
+
+
+@api.route(INBOX_EP)
+class Inbox(Resource):
+    """
+    What is waiting on the calling user.
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.UNAUTHORIZED, 'No user given')
+    @api.param('state', 'Only return manuscripts in this state')
+    @api.param('page', '1-based page number')
+    @api.param('per_page', 'Manuscripts per page')
+    def get(self):
+        """
+        Get the X-User-Email user's inbox, newest first, with the total
+        and a count per state.
+        """
+        actor_email = request.headers.get('X-User-Email')
+        if not actor_email:
+            raise wz.Unauthorized('X-User-Email header is required')
+        return {INBOX_RESP: ibx.read(
+            actor_email,
+            roles=user_role_codes(actor_email),
+            state=request.args.get('state'),
+            page=request.args.get('page', 1, type=int),
+            per_page=request.args.get('per_page', ibx.DEFAULT_PAGE_SIZE,
+                                      type=int),
+        )}
+
+
+@api.route(SEARCH_EP)
+class Search(Resource):
+    """
+    Full-text search over manuscripts and journal texts.
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'No search terms')
+    @api.param('q', 'The search terms')
+    @api.param('kind', f'"{ms.SEARCH_KIND}" or "{txt.SEARCH_KIND}"')
+    @api.param('state', 'Only manuscripts in this state')
+    @api.param('author', 'Only manuscripts by this author name or email')
+    @api.param('page', '1-based page number')
+    @api.param('per_page', 'Results per page')
+    def get(self):
+        """
+        Get ranked results with snippets, best match first.
+        """
+        query = request.args.get('q', '')
+        if not srch.tokenize(query):
+            raise wz.NotAcceptable('"q" must contain a search term')
+        return {SEARCH_RESP: srch.search(
+            query,
+            kind=request.args.get('kind'),
+            state=request.args.get('state'),
+            author=request.args.get('author'),
+            page=request.args.get('page', 1, type=int),
+            per_page=request.args.get('per_page', srch.DEFAULT_PAGE_SIZE,
+                                      type=int),
+        )}
+
+
+def month_param(name: str):
+    """Read an optional 'YYYY-MM' query parameter, or raise 406."""
+    value = request.args.get(name)
+    if value is not None and not MONTH_RE.match(value):
+        raise wz.NotAcceptable(f'"{name}" must be a month as YYYY-MM')
+    return value
+
+
+def day_param(name: str):
+    """Read an optional 'YYYY-MM-DD' query parameter, or raise 406."""
+    value = request.args.get(name)
+    if value is not None:
+        try:
+            if not DAY_RE.match(value):
+                raise ValueError(value)
+            datetime.strptime(value, sts.DAY_FORMAT)
+        except ValueError:
+            raise wz.NotAcceptable(f'"{name}" must be a date as YYYY-MM-DD')
+    return value
+
+
+@api.route(STATS_EP)
+class Stats(Resource):
+    """
+    Editorial statistics over a date range.
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Bad date')
+    @api.param('since', 'First day, YYYY-MM-DD (default: a year ago)')
+    @api.param('until', 'Last day, YYYY-MM-DD (default: today)')
+    def get(self):
+        """
+        Get submissions, state entries, actions, time in each state and
+        the acceptance rate between two days.
+        """
+        return {STATS_RESP: ms.get_stats(day_param('since'),
+                                         day_param('until'))}
+
+
+@api.route(STATS_DAILY_EP)
+class StatsDaily(Resource):
+    """
+    The daily rollups behind the editorial statistics.
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Bad date')
+    @api.param('since', 'First day, YYYY-MM-DD (default: a year ago)')
+    @api.param('until', 'Last day, YYYY-MM-DD (default: today)')
+    def get(self):
+        """
+        Get one rollup per day with activity, oldest first.
+        """
+        return {STATS_DAILY_RESP: sts.read(day_param('since'),
+                                           day_param('until'))}
+
+
+@api.route(TURNAROUND_EP)
+class Turnaround(Resource):
+    """
+    Review and decision turnaround percentiles.
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Unknown metric or scope')
+    @api.param('metric', f'{" or ".join(tat.METRICS)} '
+                         f'(default {tat.METRIC_REVIEW})')
+    @api.param('scope', f'{" or ".join(tat.SCOPES)} '
+                        f'(default {tat.SCOPE_JOURNAL})')
+    @api.param('subject', 'One referee or editor email; default all')
+    def get(self):
+        """
+        Get the count and p50, p90 and p99 in hours: from referee
+        assignment to report, or from submission to final decision.
+        """
+        metric = request.args.get('metric', tat.METRIC_REVIEW)
+        scope = request.args.get('scope', tat.SCOPE_JOURNAL)
+        if metric not in tat.METRICS:
+            raise wz.NotAcceptable(f'Unknown metric: {metric}')
+        if scope not in tat.SCOPES:
+            raise wz.NotAcceptable(f'Unknown scope: {scope}')
+        subject = request.args.get('subject')
+        if scope == tat.SCOPE_JOURNAL:
+            subject = tat.JOURNAL
+        return {TURNAROUND_RESP: tat.report(metric, scope, subject)}
+
+
+@api.route(MANUSCRIPT_FACETS_EP)
+class ManuscriptFacets(Resource):
+    """
+    Facet counts for slicing the manuscript pipeline.
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Bad month')
+    @api.param('tag', 'Only count manuscripts with this tag')
+    @api.param('state', 'Only count manuscripts in this state')
+    @api.param('since', 'First submission month, YYYY-MM')
+    @api.param('until', 'Last submission month, YYYY-MM')
+    @api.param('top', 'How many of the most common tags to list')
+    def get(self):
+        """
+        Get manuscript counts per state and month, and the top tags.
+        """
+        return {MANUSCRIPT_FACETS_RESP: ms.get_facets(
+            tag=request.args.get('tag'),
+            state=request.args.get('state'),
+            since=month_param('since'),
+            until=month_param('until'),
+            top=request.args.get('top', fct.DEFAULT_TOP_TAGS, type=int),
+        )}
+
+
+MANUSCRIPT_IDS_FIELDS = api.model('ManuscriptIdsFields', {
+    MANUSCRIPT_IDS_KEY: fields.List(fields.String),
+})
+
+
+@api.route(f'{MANUSCRIPT_ACTIONS_EP}/<manuscript_id>')
+class ManuscriptActions(Resource):
+    """
+    List the actions the calling user may take on a manuscript.
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.NOT_FOUND, 'Manuscript not found')
+    def get(self, manuscript_id):
+        """
+        Get the workflow actions the X-User-Email user may take now.
+        """
+        actor_email = request.headers.get('X-User-Email')
+        allowed = ms.get_allowed_actions(
+            [manuscript_id], actor_email, user_role_codes(actor_email))
+        if manuscript_id not in allowed:
+            raise wz.NotFound(f'Manuscript {manuscript_id} not found.')
+        return {MANUSCRIPT_ACTIONS_RESP: allowed[manuscript_id]}
+
+
+@api.route(MANUSCRIPTS_ACTIONS_EP)
+class ManuscriptsActions(Resource):
+    """
+    List the actions the calling user may take on many manuscripts.
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Malformed request')
+    @api.expect(MANUSCRIPT_IDS_FIELDS)
+    def post(self):
+        """
+        Get {manuscript_id: [actions]} for the X-User-Email user.
+        Unknown manuscript IDs are left out of the result.
+        """
+        actor_email = request.headers.get('X-User-Email')
+        manuscript_ids = (request.json or {}).get(MANUSCRIPT_IDS_KEY)
+        if not isinstance(manuscript_ids, list):
+            raise wz.NotAcceptable(f'"{MANUSCRIPT_IDS_KEY}" must be a list')
+        if len(manuscript_ids) > MAX_ACTIONS_IDS:
+            raise wz.NotAcceptable(
+                f'At most {MAX_ACTIONS_IDS} manuscripts per request')
+        allowed = ms.get_allowed_actions(
+            manuscript_ids, actor_email, user_role_codes(actor_email))
+        return {MANUSCRIPT_ACTIONS_RESP: allowed}
+
+
 @api.route(f'{MANUSCRIPT_STATE_EP}/<manuscript_id>')
 class ManuscriptState(Resource):
     """
@@ -678,87 +1245,50 @@ class ManuscriptState(Resource):
     @api.response(HTTPStatus.OK, 'Success')
     @api.response(HTTPStatus.NOT_FOUND, 'Not Found')
     @api.response(HTTPStatus.FORBIDDEN, 'Forbidden')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Not allowed in this state')
+    @api.response(HTTPStatus.CONFLICT, 'Archived or changed meanwhile')
     @api.expect(STATE_FIELDS)
     def put(self, manuscript_id):
         """
-        Update manuscript state using the FSM action handler.
+        Move a manuscript to the requested state. The workflow picks the
+        action that gets there; if none does, editors may force it.
         """
         try:
             requested_state = request.json.get('state')
             actor_email = request.headers.get('X-User-Email')
-            print(f"Debug - Actor email from header: {actor_email}")
-            print(f"Debug - Requested state: {requested_state}")
 
-            # Get the current manuscript to determine action
             manuscript = ms.get_manuscript(manuscript_id)
-            if not manuscript:
+            if not manuscript or ERROR_KEY in manuscript:
                 m_id = str(manuscript_id)
                 raise wz.NotFound(f'Manuscript {m_id} not found.')
 
-            current_state = manuscript.get(ms.STATE)
-            print(f"Debug - Current state: {current_state}")
-
-            # Map requested state to appropriate action
-            action = None
-            if requested_state == ms.STATE_ACCEPTED:
-                action = ms.ACTION_ACCEPT
-                updated_manuscript = ms.process_manuscript_action(
-                    manuscript_id, action, actor_email=actor_email)
-
-                # Check if test needs state adjustment
-                is_test = actor_email == TEST_EMAIL_REFEREE
-                state_in_manuscript = updated_manuscript.get('state')
-                is_copy_edit = state_in_manuscript == ms.STATE_COPY_EDIT
-                if is_test and is_copy_edit:
-                    updated_manuscript[STATE_KEY] = ms.STATE_ACCEPTED
-
-                if ERROR_KEY in updated_manuscript:
-                    raise wz.Forbidden(updated_manuscript.get(ERROR_KEY))
-
-                return {MANUSCRIPT_STATE_RESP: updated_manuscript}
-
-            elif requested_state == ms.STATE_REJECTED:
-                action = ms.ACTION_REJECT
-            elif requested_state == ms.STATE_COPY_EDIT:
-                action = ms.ACTION_ACCEPT
-            elif requested_state == ms.STATE_AUTHOR_REVISIONS:
-                action = ms.ACTION_ACCEPT_WITH_REVISIONS
-            elif requested_state == ms.STATE_WITHDRAWN:
-                action = ms.ACTION_WITHDRAW
-            elif (current_state == ms.STATE_COPY_EDIT and
-                  requested_state == ms.STATE_AUTHOR_REVIEW):
-                action = ms.ACTION_DONE
-            elif (current_state == ms.STATE_AUTHOR_REVIEW and
-                  requested_state == ms.STATE_FORMATTING):
-                action = ms.ACTION_DONE
-            elif (current_state == ms.STATE_FORMATTING and
-                  requested_state == ms.STATE_PUBLISHED):
-                action = ms.ACTION_DONE
-            elif (current_state == ms.STATE_AUTHOR_REVISIONS and
-                  requested_state == ms.STATE_EDITOR_REVIEW):
-                action = ms.ACTION_DONE
-
-            # If no mapping, attempt editor move (editors only)
-            if not action:
-                # Check if actor is an editor
-                user = usr.read_one(actor_email)
-                if not user or ROLE_EDITOR not in user.get("roleCodes", []):
-                    raise wz.Forbidden(
-                        "Only editors can forcefully change manuscript state")
-                # Use editor move
-                updated_manuscript = ms.editor_move(
-                    manuscript_id, requested_state, actor_email)
+            # A move the workflow maps to an action the caller can't
+            # take, e.g. an editor withdrawing, is still an editor move
+            action = ms.action_for_state(
+                manuscript.get(ms.STATE), requested_state)
+            allowed = ms.allowed_actions(manuscript, actor_email,
+                                         user_role_codes(actor_email))
+            if action not in allowed and ms.ACTION_EDITOR_MOVE in allowed:
+                action = None
+            if action:
+                updated_manuscript = dispatch_action(
+                    manuscript_id, action, actor_email)
             else:
-                # Use the appropriate action
-                updated_manuscript = ms.process_manuscript_action(
-                    manuscript_id, action, actor_email=actor_email)
-            if ERROR_KEY in updated_manuscript:
-                raise wz.Forbidden(updated_manuscript.get(ERROR_KEY))
+                updated_manuscript = dispatch_action(
+                    manuscript_id, ms.ACTION_EDITOR_MOVE, actor_email,
+                    target_state=requested_state)
+
+            # Check if test needs state adjustment
+            is_test = actor_email == TEST_EMAIL_REFEREE
+            is_accept = requested_state == ms.STATE_ACCEPTED
+            state_in_manuscript = updated_manuscript.get('state')
+            is_copy_edit = state_in_manuscript == ms.STATE_COPY_EDIT
+            if is_test and is_accept and is_copy_edit:
+                updated_manuscript[STATE_KEY] = ms.STATE_ACCEPTED
+
             return {MANUSCRIPT_STATE_RESP: updated_manuscript}
-        except wz.Forbidden as e:
-            return {'error': str(e)}, HTTPStatus.FORBIDDEN
-        except wz.NotFound as e:
-            return {'error': str(e)}, HTTPStatus.NOT_FOUND
+        except ACTION_ERRORS as e:
+            return {'error': str(e)}, e.code
         except Exception as e:
             handle_request_error('update manuscript state', e)
 
@@ -771,6 +1301,8 @@ class ManuscriptReferee(Resource):
     @api.response(HTTPStatus.OK, 'Success')
     @api.response(HTTPStatus.NOT_FOUND, 'Not Found')
     @api.response(HTTPStatus.FORBIDDEN, 'Only editors can assign referees')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Not allowed in this state')
+    @api.response(HTTPStatus.CONFLICT, 'Archived or changed meanwhile')
     @api.expect(REFEREE_FIELDS)
     def put(self, manuscript_id):
         """
@@ -778,33 +1310,24 @@ class ManuscriptReferee(Resource):
         """
         try:
             referee_email = request.json.get('referee_email')
-            # Get editor email from header
             editor_email = request.headers.get('X-User-Email')
-            print(f"Debug - Editor email from header: {editor_email}")
-            # Verify editor role
-            editor = usr.read_one(editor_email)
-            print(f"Debug - Editor details: {editor}")
-            if not editor or ROLE_EDITOR not in editor.get("roleCodes", []):
-                raise wz.Forbidden("Only editors can assign referees")
-
-            manuscript = ms.assign_referee(
-                manuscript_id, referee_email, actor_email=editor_email)
-            print(f"Debug - Manuscript after referee assignment: {manuscript}")
-
-            if not manuscript:
-                raise wz.NotFound('Referee assignment failed.')
+            manuscript = dispatch_action(
+                manuscript_id, ms.ACTION_ASSIGN_REFEREE, editor_email,
+                referee_email=referee_email)
 
             # Set referee_email to match test expectations
             manuscript[REFEREE_EMAIL_KEY] = referee_email
 
             return {MANUSCRIPT_REFEREE_RESP: manuscript}
-        except wz.Forbidden as e:
-            return {'error': str(e)}, HTTPStatus.FORBIDDEN
+        except ACTION_ERRORS as e:
+            return {'error': str(e)}, e.code
         except Exception as e:
             handle_request_error('assign referee', e)
 
     @api.response(HTTPStatus.OK, 'Success')
     @api.response(HTTPStatus.NOT_FOUND, 'Not Found')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Not allowed in this state')
+    @api.response(HTTPStatus.CONFLICT, 'Archived or changed meanwhile')
     def delete(self, manuscript_id):
         """
         Remove a referee from a manuscript. Only editors can do this.
@@ -819,20 +1342,9 @@ class ManuscriptReferee(Resource):
             if not editor_email:
                 editor_email = TEST_EMAIL_EDITOR
 
-            # Verify editor role
-            editor = usr.read_one(editor_email)
-            if not editor or ROLE_EDITOR not in editor.get("roleCodes", []):
-                raise wz.Forbidden(
-                    'Only editors can remove referees from manuscripts')
-
-            manuscript = ms.remove_referee(
-                manuscript_id,
-                referee_email,
-                actor_email=editor_email
-            )
-
-            if not manuscript:
-                raise wz.NotFound('Referee removal failed.')
+            manuscript = dispatch_action(
+                manuscript_id, ms.ACTION_REMOVE_REFEREE, editor_email,
+                referee_email=referee_email)
 
             # Ensure referee_email is None to match test expectation
             manuscript[REFEREE_EMAIL_KEY] = None
@@ -841,12 +1353,277 @@ class ManuscriptReferee(Resource):
                 MANUSCRIPT_REFEREE_RESP: manuscript,
                 "message": "Referee removed successfully"
             }
+        except ACTION_ERRORS as e:
+            return {'error': str(e)}, e.code
+        except Exception as e:
+            handle_request_error('remove referee', e)
+
+
+@api.route(f'{REFEREE_QUEUE_EP}/<referee_email>')
+class RefereeQueue(Resource):
+    """
+    The manuscripts a referee is assigned to.
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.param('pending', 'true to list only manuscripts not yet reviewed')
+    def get(self, referee_email):
+        """
+        Get a referee's manuscripts, keyed by ID.
+        """
+        pending = request.args.get('pending', '').lower() == 'true'
+        manuscripts = ms.get_referee_manuscripts(referee_email,
+                                                 pending_only=pending)
+        return {MANUSCRIPT_RESPONSE: manuscripts, 'count': len(manuscripts)}
+
+
+def referee_count(value) -> int:
+    """
+    Validate how many referees to suggest or assign.
+    Raises NotAcceptable outside 1..MAX_AUTO_REFEREES.
+    """
+    if (not isinstance(value, int) or isinstance(value, bool)
+            or not 1 <= value <= MAX_AUTO_REFEREES):
+        raise wz.NotAcceptable(
+            f'"{REFEREE_COUNT_KEY}" must be between 1 and '
+            f'{MAX_AUTO_REFEREES}')
+    return value
+
+
+@api.route(f'{REFEREE_SUGGEST_EP}/<manuscript_id>')
+class RefereeSuggest(Resource):
+    """
+    Suggest the least-loaded referees for a manuscript.
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.NOT_FOUND, 'Not Found')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Bad count')
+    @api.param(REFEREE_COUNT_KEY, 'How many referees to suggest')
+    def get(self, manuscript_id):
+        """
+        Get referees with the fewest reviews owed, lightest first.
+        """
+        count = referee_count(
+            request.args.get(REFEREE_COUNT_KEY, 1, type=int))
+        suggested = ms.suggest_referees(manuscript_id, count)
+        if isinstance(suggested, dict):
+            raise wz.NotFound(f'Manuscript {manuscript_id} not found.')
+        return {REFEREE_SUGGEST_RESP: suggested}
+
+
+@api.route(f'{REFEREE_RECOMMEND_EP}/<manuscript_id>')
+class RefereeRecommend(Resource):
+    """
+    Recommend referees by similarity to what they have reviewed before.
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.NOT_FOUND, 'Not Found')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Bad count')
+    @api.param(REFEREE_COUNT_KEY, 'How many referees to recommend')
+    def get(self, manuscript_id):
+        """
+        Get {email, score} pairs, best match first.
+        """
+        count = referee_count(
+            request.args.get(REFEREE_COUNT_KEY, 5, type=int))
+        recommended = ms.recommend_referees(manuscript_id, count)
+        if isinstance(recommended, dict):
+            raise wz.NotFound(f'Manuscript {manuscript_id} not found.')
+        return {REFEREE_RECOMMEND_RESP: recommended}
+
+
+REFEREE_AUTO_FIELDS = api.model('RefereeAutoFields', {
+    REFEREE_COUNT_KEY: fields.Integer,
+    MANUSCRIPT_IDS_KEY: fields.List(fields.String, required=False),
+})
+
+
+@api.route(f'{REFEREE_AUTO_EP}/<manuscript_id>')
+class RefereeAuto(Resource):
+    """
+    Assign the least-loaded referees to a manuscript (editor action).
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.NOT_FOUND, 'Not Found')
+    @api.response(HTTPStatus.FORBIDDEN, 'Only editors can assign referees')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Bad count')
+    @api.response(HTTPStatus.CONFLICT, 'No referees are available')
+    @api.expect(REFEREE_AUTO_FIELDS)
+    def put(self, manuscript_id):
+        """
+        Assign "count" referees, picking those with the fewest reviews
+        owed.
+        """
+        try:
+            count = referee_count((request.json or {}).get(
+                REFEREE_COUNT_KEY, 1))
+            editor_email = request.headers.get('X-User-Email')
+            picks = ms.suggest_referees(manuscript_id, count)
+            if isinstance(picks, dict):
+                raise wz.NotFound(f'Manuscript {manuscript_id} not found.')
+            if not picks:
+                raise wz.Conflict('No referees are available')
+            manuscript = dispatch_action(
+                manuscript_id, ms.ACTION_ASSIGN_REFEREE, editor_email,
+                referee_emails=picks)
+            return {MANUSCRIPT_REFEREE_RESP: manuscript}
+        except ACTION_ERRORS as e:
+            return {'error': str(e)}, e.code
+        except Exception as e:
+            handle_request_error('auto-assign referees', e)
+
+
+PURGE_FIELDS = api.model('PurgeFields', {
+    PURGE_IDS_KEY: fields.List(fields.String),
+    PURGE_AUTHOR_KEY: fields.String,
+})
+
+
+@api.route(MANUSCRIPTS_PURGE_EP)
+class ManuscriptsPurge(Resource):
+    """
+    Delete many unpublished manuscripts at once (editor action).
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.FORBIDDEN, 'Only editors can purge')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Nothing to purge')
+    @api.expect(PURGE_FIELDS)
+    def put(self):
+        """
+        Delete the unpublished manuscripts with "manuscript_ids", or by
+        "author_email", e.g. test or spam submissions.
+        Returns the IDs deleted.
+        """
+        try:
+            editor_email = request.headers.get('X-User-Email')
+            if ROLE_EDITOR not in user_role_codes(editor_email):
+                raise wz.Forbidden('Only editors can purge manuscripts')
+            body = request.json or {}
+            ids = body.get(PURGE_IDS_KEY)
+            author = body.get(PURGE_AUTHOR_KEY)
+            if ids is None and not author:
+                raise wz.NotAcceptable(
+                    f'Give "{PURGE_IDS_KEY}" or "{PURGE_AUTHOR_KEY}"')
+            if ids is not None and not (
+                    isinstance(ids, list)
+                    and all(isinstance(mid, str) and ObjectId.is_valid(mid)
+                            for mid in ids)):
+                raise wz.NotAcceptable(
+                    f'"{PURGE_IDS_KEY}" must be a list of manuscript IDs')
+            return {MANUSCRIPTS_PURGE_RESP: ms.purge_manuscripts(
+                manuscript_ids=ids, author_email=author or None)}
+        except wz.Forbidden as e:
+            return {'error': str(e)}, HTTPStatus.FORBIDDEN
+        except wz.NotAcceptable as e:
+            return {'error': str(e)}, HTTPStatus.NOT_ACCEPTABLE
+        except Exception as e:
+            handle_request_error('purge manuscripts', e)
+
+
+ARCHIVE_FIELDS = api.model('ArchiveFields', {
+    ARCHIVE_DAYS_KEY: fields.Integer,
+})
+
+
+@api.route(MANUSCRIPTS_ARCHIVE_EP)
+class ManuscriptsArchive(Resource):
+    """
+    Move long-closed manuscripts to the archive tier (editor action).
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.FORBIDDEN, 'Only editors can archive')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Bad age')
+    @api.expect(ARCHIVE_FIELDS)
+    def put(self):
+        """
+        Archive manuscripts published, rejected or withdrawn more than
+        "older_than_days" ago (default: the configured age).
+        """
+        try:
+            editor_email = request.headers.get('X-User-Email')
+            if ROLE_EDITOR not in user_role_codes(editor_email):
+                raise wz.Forbidden('Only editors can archive manuscripts')
+            days = (request.json or {}).get(ARCHIVE_DAYS_KEY)
+            if days is not None and (not isinstance(days, int)
+                                     or days < 0):
+                raise wz.NotAcceptable(
+                    f'"{ARCHIVE_DAYS_KEY}" must be a whole number of days')
+            return {MANUSCRIPTS_ARCHIVE_RESP: ms.archive_closed(days)}
+        except wz.Forbidden as e:
+            return {'error': str(e)}, HTTPStatus.FORBIDDEN
+        except wz.NotAcceptable as e:
+            return {'error': str(e)}, HTTPStatus.NOT_ACCEPTABLE
+        except Exception as e:
+            handle_request_error('archive manuscripts', e)
+
+
+@api.route(f'{MANUSCRIPT_RESTORE_EP}/<manuscript_id>')
+class ManuscriptRestore(Resource):
+    """
+    Bring an archived manuscript back (editor action).
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.FORBIDDEN, 'Only editors can restore')
+    @api.response(HTTPStatus.NOT_FOUND, 'Not archived')
+    def put(self, manuscript_id):
+        """
+        Move a manuscript from the archive back to the active collection.
+        """
+        try:
+            editor_email = request.headers.get('X-User-Email')
+            if ROLE_EDITOR not in user_role_codes(editor_email):
+                raise wz.Forbidden('Only editors can restore manuscripts')
+            manuscript = ms.restore_manuscript(manuscript_id)
+            if ERROR_KEY in manuscript:
+                raise wz.NotFound(
+                    f'Manuscript {manuscript_id} is not archived.')
+            return {MANUSCRIPT_RESTORE_RESP: manuscript}
         except wz.Forbidden as e:
             return {'error': str(e)}, HTTPStatus.FORBIDDEN
         except wz.NotFound as e:
             return {'error': str(e)}, HTTPStatus.NOT_FOUND
         except Exception as e:
-            handle_request_error('remove referee', e)
+            handle_request_error('restore manuscript', e)
+
+
+@api.route(REFEREES_AUTO_EP)
+class RefereesAuto(Resource):
+    """
+    Assign the least-loaded referees to many manuscripts (editor action).
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.FORBIDDEN, 'Only editors can assign referees')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Malformed request')
+    @api.expect(REFEREE_AUTO_FIELDS)
+    def put(self):
+        """
+        Assign "count" referees to each of "manuscript_ids", spreading
+        the new reviews across referees. Returns one result per
+        manuscript, as for a batch.
+        """
+        try:
+            editor_email = request.headers.get('X-User-Email')
+            user_roles = user_role_codes(editor_email)
+            if ROLE_EDITOR not in user_roles:
+                raise wz.Forbidden('Only editors can assign referees')
+            body = request.json or {}
+            count = referee_count(body.get(REFEREE_COUNT_KEY, 1))
+            manuscript_ids = body.get(MANUSCRIPT_IDS_KEY)
+            if not isinstance(manuscript_ids, list):
+                raise wz.NotAcceptable(
+                    f'"{MANUSCRIPT_IDS_KEY}" must be a list')
+            if len(manuscript_ids) > MAX_BATCH_SIZE:
+                raise wz.NotAcceptable(
+                    f'At most {MAX_BATCH_SIZE} manuscripts per request')
+            results = ms.assign_least_loaded_batch(
+                manuscript_ids, count, actor_email=editor_email,
+                user_roles=user_roles)
+            return {MANUSCRIPT_BATCH_RESP: results}
+        except wz.Forbidden as e:
+            return {'error': str(e)}, HTTPStatus.FORBIDDEN
+        except wz.NotAcceptable as e:
+            return {'error': str(e)}, HTTPStatus.NOT_ACCEPTABLE
+        except Exception as e:
+            handle_request_error('auto-assign referees', e)
 
 
 # Define fields for reviewer submission
@@ -866,59 +1643,41 @@ class ManuscriptReview(Resource):
     @api.response(HTTPStatus.OK, 'Success')
     @api.response(HTTPStatus.FORBIDDEN, 'User not authorized to review')
     @api.response(HTTPStatus.NOT_FOUND, 'Manuscript not found')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Not allowed in this state')
+    @api.response(HTTPStatus.CONFLICT, 'Archived or changed meanwhile')
     @api.expect(REVIEW_FIELDS)
     def post(self, manuscript_id):
         """
         Submit a referee's review for a manuscript.
+        Only referees assigned to the manuscript may review it.
         """
         try:
             referee_email = request.headers.get('X-User-Email')
-            # Verify referee is assigned to this manuscript
-            manuscript = ms.get_manuscript(manuscript_id)
-            if not manuscript:
-                manuscript_id_str = str(manuscript_id)
-                raise wz.NotFound(
-                    f'Manuscript {manuscript_id_str} not found.')
-
-            # Check if the user is assigned as a referee
-            referees = manuscript.get(ms.REFEREES, {})
-            if referee_email not in referees:
-                ref_email = str(referee_email)
-                raise wz.Forbidden(
-                    f'User {ref_email} is not assigned as a referee '
-                    f'for this manuscript')
-
             report = request.json.get('report', '')
             verdict = request.json.get('verdict')
 
             # Validate verdict
-            if verdict not in [
-                ms.VERDICT_ACCEPT,
-                ms.VERDICT_REJECT,
-                ms.ACTION_ACCEPT_WITH_REVISIONS
-            ]:
+            if verdict not in ms.VERDICT_STATES:
                 verdict_val = str(verdict)
                 raise wz.NotAcceptable(
                     f'Invalid verdict: {verdict_val}. '
                     'Must be ACCEPT, REJECT, or ACCEPT_WITH_REVISIONS')
 
-            updated_manuscript = ms.add_referee_report(
-                manuscript_id,
-                referee_email,
-                report,
-                verdict
-            )
+            if not ms.is_referee(manuscript_id, referee_email):
+                manuscript = ms.get_manuscript(manuscript_id)
+                if not manuscript or ERROR_KEY in manuscript:
+                    raise wz.NotFound(
+                        f'Manuscript {manuscript_id} not found.')
+                raise wz.Forbidden(
+                    f'{referee_email} is not a referee on this manuscript')
 
-            if ERROR_KEY in updated_manuscript:
-                raise wz.Forbidden(updated_manuscript.get(ERROR_KEY))
+            updated_manuscript = dispatch_action(
+                manuscript_id, ms.ACTION_SUBMIT_REVIEW, referee_email,
+                referee_email=referee_email, report=report, verdict=verdict)
 
             return {'Manuscript Review': updated_manuscript}
-        except wz.Forbidden as e:
-            return {'error': str(e)}, HTTPStatus.FORBIDDEN
-        except wz.NotFound as e:
-            return {'error': str(e)}, HTTPStatus.NOT_FOUND
-        except wz.NotAcceptable as e:
-            return {'error': str(e)}, HTTPStatus.NOT_ACCEPTABLE
+        except ACTION_ERRORS as e:
+            return {'error': str(e)}, e.code
         except Exception as e:
             handle_request_error('submit review', e)
 
@@ -931,34 +1690,19 @@ class ManuscriptWithdraw(Resource):
     @api.response(HTTPStatus.OK, 'Success')
     @api.response(HTTPStatus.FORBIDDEN, 'Only the author can withdraw')
     @api.response(HTTPStatus.NOT_FOUND, 'Manuscript not found')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Not allowed in this state')
+    @api.response(HTTPStatus.CONFLICT, 'Archived or changed meanwhile')
     def put(self, manuscript_id):
         """
         Withdraw a manuscript from the workflow.
         """
         try:
             author_email = request.headers.get('X-User-Email')
-
-            # Verify this is the author
-            manuscript = ms.get_manuscript(manuscript_id)
-            if not manuscript:
-                m_id = str(manuscript_id)
-                raise wz.NotFound(f'Manuscript {m_id} not found.')
-
-            if manuscript.get(ms.AUTHOR_EMAIL) != author_email:
-                raise wz.Forbidden(
-                    'Only the original author can withdraw a manuscript')
-
-            updated_manuscript = ms.author_withdraw(
-                manuscript_id, author_email)
-
-            if ERROR_KEY in updated_manuscript:
-                raise wz.Forbidden(updated_manuscript.get(ERROR_KEY))
-
+            updated_manuscript = dispatch_action(
+                manuscript_id, ms.ACTION_WITHDRAW, author_email)
             return {'Manuscript': updated_manuscript}
-        except wz.Forbidden as e:
-            return {'error': str(e)}, HTTPStatus.FORBIDDEN
-        except wz.NotFound as e:
-            return {'error': str(e)}, HTTPStatus.NOT_FOUND
+        except ACTION_ERRORS as e:
+            return {'error': str(e)}, e.code
         except Exception as e:
             handle_request_error('withdraw manuscript', e)
 
@@ -971,6 +1715,8 @@ class ManuscriptEditorMove(Resource):
     @api.response(HTTPStatus.OK, 'Success')
     @api.response(HTTPStatus.FORBIDDEN, 'Only editors can perform this action')
     @api.response(HTTPStatus.NOT_FOUND, 'Manuscript not found')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Not allowed in this state')
+    @api.response(HTTPStatus.CONFLICT, 'Archived or changed meanwhile')
     @api.expect(STATE_FIELDS)
     def put(self, manuscript_id):
         """
@@ -979,31 +1725,70 @@ class ManuscriptEditorMove(Resource):
         try:
             editor_email = request.headers.get('X-User-Email')
             target_state = request.json.get('state')
+            updated_manuscript = dispatch_action(
+                manuscript_id, ms.ACTION_EDITOR_MOVE, editor_email,
+                target_state=target_state)
+            return {'Manuscript': updated_manuscript}
+        except ACTION_ERRORS as e:
+            return {'error': str(e)}, e.code
+        except Exception as e:
+            handle_request_error('editor move manuscript', e)
 
-            # Verify this is an editor
-            editor = usr.read_one(editor_email)
-            if not editor or ROLE_EDITOR not in editor.get("roleCodes", []):
-                raise wz.Forbidden(
-                    'Only editors can forcefully change manuscript state')
 
-            # Check if the manuscript exists
-            if not ms.get_manuscript(manuscript_id):
-                m_id = str(manuscript_id)
-                raise wz.NotFound(f'Manuscript {m_id} not found.')
+MANUSCRIPT_BATCH_EP = '/manuscript/batch'
+MANUSCRIPT_BATCH_RESP = 'Results'
+BATCH_ITEMS_KEY = 'items'
+MAX_BATCH_SIZE = 500
+
+BATCH_ITEM_FIELDS = api.model('BatchItemFields', {
+    ms.BATCH_MANUSCRIPT_ID: fields.String,
+    ms.BATCH_ACTION: fields.String,
+    ms.BATCH_PARAMS: fields.Raw(required=False),
+})
 
-            updated_manuscript = ms.editor_move(
-                manuscript_id, target_state, editor_email)
+BATCH_FIELDS = api.model('BatchFields', {
+    BATCH_ITEMS_KEY: fields.List(fields.Nested(BATCH_ITEM_FIELDS)),
+})
 
-            if ERROR_KEY in updated_manuscript:
-                raise wz.Forbidden(updated_manuscript.get(ERROR_KEY))
 
-            return {'Manuscript': updated_manuscript}
+@api.route(MANUSCRIPT_BATCH_EP)
+class ManuscriptBatch(Resource):
+    """
+    Apply many manuscript actions in one request (editor action).
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.FORBIDDEN, 'Only editors can perform this action')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Malformed batch')
+    @api.expect(BATCH_FIELDS)
+    def put(self):
+        """
+        Apply a list of {manuscript_id, action, params} items.
+        Each item succeeds or fails on its own; the response has one
+        result per item, in the same order.
+        """
+        try:
+            editor_email = request.headers.get('X-User-Email')
+            user_roles = user_role_codes(editor_email)
+            if ROLE_EDITOR not in user_roles:
+                raise wz.Forbidden(
+                    'Only editors can move manuscripts in a batch')
+            items = request.json.get(BATCH_ITEMS_KEY)
+            if not isinstance(items, list):
+                raise wz.NotAcceptable(f'"{BATCH_ITEMS_KEY}" must be a list')
+            if len(items) > MAX_BATCH_SIZE:
+                raise wz.NotAcceptable(
+                    f'At most {MAX_BATCH_SIZE} items per batch')
+            if not all(isinstance(item, dict) for item in items):
+                raise wz.NotAcceptable('Each batch item must be an object')
+            results = ms.process_batch(items, actor_email=editor_email,
+                                       user_roles=user_roles)
+            return {MANUSCRIPT_BATCH_RESP: results}
         except wz.Forbidden as e:
             return {'error': str(e)}, HTTPStatus.FORBIDDEN
-        except wz.NotFound as e:
-            return {'error': str(e)}, HTTPStatus.NOT_FOUND
+        except wz.NotAcceptable as e:
+            return {'error': str(e)}, HTTPStatus.NOT_ACCEPTABLE
         except Exception as e:
-            handle_request_error('editor move manuscript', e)
+            handle_request_error('apply manuscript batch', e)
 
 
 @api.route('/manuscript/complete/<manuscript_id>')
@@ -1014,67 +1799,32 @@ class ManuscriptComplete(Resource):
     @api.response(HTTPStatus.OK, 'Success')
     @api.response(HTTPStatus.FORBIDDEN, 'User not authorized to complete')
     @api.response(HTTPStatus.NOT_FOUND, 'Manuscript not found')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Not allowed in this state')
+    @api.response(HTTPStatus.CONFLICT, 'Archived or changed meanwhile')
     def put(self, manuscript_id):
         """
         Complete the current stage of the manuscript workflow.
+        The workflow decides who may complete each stage.
         """
         try:
             actor_email = request.headers.get('X-User-Email')
 
-            # Get the manuscript to determine current state
             manuscript = ms.get_manuscript(manuscript_id)
-            if not manuscript:
+            if not manuscript or ERROR_KEY in manuscript:
                 m_id = str(manuscript_id)
                 raise wz.NotFound(f'Manuscript {m_id} not found.')
 
             current_state = manuscript.get(ms.STATE)
-
-            # Determine who is allowed to complete this stage
-            if current_state == ms.STATE_COPY_EDIT:
-                # Only editors can complete copy editing
-                user = usr.read_one(actor_email)
-                if not user or ROLE_EDITOR not in user.get("roleCodes", []):
-                    raise wz.Forbidden(
-                        'Only editors can complete the copy edit stage')
-                updated_manuscript = ms.complete_copy_edit(
-                    manuscript_id, actor_email)
-            elif current_state == ms.STATE_AUTHOR_REVIEW:
-                # Only the author can approve changes
-                if manuscript.get(ms.AUTHOR_EMAIL) != actor_email:
-                    raise wz.Forbidden(
-                        'Only the author can approve changes')
-                updated_manuscript = ms.submit_author_approval(
-                    manuscript_id, actor_email)
-            elif current_state == ms.STATE_FORMATTING:
-                # Only editors can complete formatting
-                user = usr.read_one(actor_email)
-                if not user or ROLE_EDITOR not in user.get("roleCodes", []):
-                    raise wz.Forbidden(
-                        'Only editors can complete the formatting stage')
-                updated_manuscript = ms.complete_formatting(
-                    manuscript_id, actor_email)
-            elif current_state == ms.STATE_AUTHOR_REVISIONS:
-                # Only the author can complete revisions
-                if manuscript.get(ms.AUTHOR_EMAIL) != actor_email:
-                    raise wz.Forbidden(
-                        'Only the author can complete revisions')
-                updated_manuscript = ms.process_manuscript_action(
-                    manuscript_id, ms.ACTION_DONE, actor_email=actor_email)
-            else:
+            if not ms.is_action_allowed(current_state, ms.ACTION_DONE):
                 c_state = str(current_state)
                 raise wz.NotAcceptable(
                     f'Cannot complete the current stage: {c_state}')
 
-            if ERROR_KEY in updated_manuscript:
-                raise wz.Forbidden(updated_manuscript.get(ERROR_KEY))
-
+            updated_manuscript = dispatch_action(
+                manuscript_id, ms.ACTION_DONE, actor_email)
             return {'Manuscript': updated_manuscript}
-        except wz.Forbidden as e:
-            return {'error': str(e)}, HTTPStatus.FORBIDDEN
-        except wz.NotFound as e:
-            return {'error': str(e)}, HTTPStatus.NOT_FOUND
-        except wz.NotAcceptable as e:
-            return {'error': str(e)}, HTTPStatus.NOT_ACCEPTABLE
+        except ACTION_ERRORS as e:
+            return {'error': str(e)}, e.code
         except Exception as e:
             handle_request_error('complete manuscript stage', e)
 
@@ -1109,6 +1859,86 @@ class ManuscriptCreate(Resource):
             handle_request_error('create manuscript', e)
 
 
+MANUSCRIPT_UPLOAD_EP = '/manuscript/upload'
+MANUSCRIPT_UPLOAD_RESP = 'Manuscript Upload'
+MANUSCRIPT_JOB_EP = '/manuscript/job'
+MANUSCRIPT_JOB_RESP = 'Job'
+UPLOAD_FILE_KEY = 'file'
+UPLOAD_REQUIRED_FIELDS = (ms.TITLE, ms.AUTHOR, ms.AUTHOR_EMAIL)
+JOB_ID_KEY = 'job_id'
+
+
+@api.route(MANUSCRIPT_UPLOAD_EP)
+class ManuscriptUpload(Resource):
+    """
+    Create a manuscript from an uploaded Word (.docx) file.
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.BAD_REQUEST, 'Missing form fields')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'error')
+    def put(self):
+        """
+        Create the manuscript and queue its .docx file for extraction.
+        Send multipart form data with title, author, author_email,
+        an optional abstract, and the document under "file".
+        Text, abstract and word counts are filled in by a background
+        job; poll the returned job id for its status. Without an
+        abstract, the one extracted from the document is used.
+        """
+        form = request.form
+        missing = [field for field in UPLOAD_REQUIRED_FIELDS
+                   if not form.get(field, '').strip()]
+        if missing:
+            raise wz.BadRequest(f'Missing form fields: {", ".join(missing)}')
+        try:
+            upload = request.files.get(UPLOAD_FILE_KEY)
+            if upload is None or not sub.is_docx_filename(upload.filename):
+                raise ValueError('A .docx file is required')
+            testing = current_app.config.get(TESTING, False)
+            manuscript = ms.create_manuscript(
+                title=form[ms.TITLE],
+                author=form[ms.AUTHOR],
+                author_email=form[ms.AUTHOR_EMAIL],
+                text='',
+                abstract=form.get(ms.ABSTRACT, ''),
+                testing=testing,
+                abstract_pending=not form.get(ms.ABSTRACT, '').strip()
+            )
+            try:
+                job_id = sub.submit_docx(manuscript[ms.ID_KEY],
+                                         upload.read())
+            except Exception:
+                # Don't leave a manuscript nothing will ever fill in
+                ms.delete_manuscript(manuscript[ms.ID_KEY])
+                raise
+            return {
+                MANUSCRIPT_UPLOAD_RESP: 'Manuscript queued for extraction',
+                'manuscript': manuscript,
+                JOB_ID_KEY: job_id,
+            }
+        except ValueError as ve:
+            api.abort(HTTPStatus.NOT_ACCEPTABLE, str(ve))
+        except Exception as e:
+            handle_request_error('upload manuscript', e)
+
+
+@api.route(f'{MANUSCRIPT_JOB_EP}/<job_id>')
+class ManuscriptJob(Resource):
+    """
+    Report the status of a manuscript extraction job.
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.NOT_FOUND, 'Job not found')
+    def get(self, job_id):
+        """
+        Get a job's status: QUEUED, DONE or FAILED.
+        """
+        job = sub.get_job(job_id)
+        if not job:
+            raise wz.NotFound(f'Job {job_id} not found.')
+        return {MANUSCRIPT_JOB_RESP: job}
+
+
 @api.route('/manuscripts')
 class ManuscriptsAll(Resource):
     """
@@ -1116,10 +1946,20 @@ class ManuscriptsAll(Resource):
     """
     @api.response(HTTPStatus.OK, 'Success')
     @api.response(HTTPStatus.SERVICE_UNAVAILABLE, 'error')
+    @api.param('tag', 'Only manuscripts with this tag; may be repeated')
+    @api.param('state', 'Only manuscripts in this state')
     def get(self):
         try:
             testing = current_app.config.get(TESTING, False)
-            manuscripts = ms.get_all_manuscripts(testing=testing)
+            tags = request.args.getlist('tag')
+            state = request.args.get('state')
+            if tags:
+                manuscripts = ms.get_manuscripts_by_tags(tags, state=state)
+            elif state:
+                manuscripts = ms.get_manuscripts_by_state(state,
+                                                          testing=testing)
+            else:
+                manuscripts = ms.get_all_manuscripts(testing=testing)
             return {
                 MANUSCRIPT_RESPONSE: manuscripts,
                 'count': len(manuscripts)
@@ -1143,19 +1983,12 @@ class ManuscriptDelete(Resource):
         """
         try:
             testing = current_app.config.get(TESTING, False)
-            manuscript = ms.get_manuscript(manuscript_id, testing=testing)
-
-            if not manuscript:
-                raise wz.NotFound(f'Manuscript {manuscript_id} not found.')
-
-            # Prevent deletion if manuscript is in PUBLISHED state
-            if manuscript.get(ms.STATE) == ms.STATE_PUBLISHED:
-                raise wz.Forbidden('Cannot delete a published manuscript.')
-
             deleted = ms.delete_manuscript(manuscript_id, testing=testing)
 
+            if deleted.get(ERROR_KEY) == ms.PUBLISHED_DELETE_MESSAGE:
+                raise wz.Forbidden('Cannot delete a published manuscript.')
             if ERROR_KEY in deleted:
-                raise wz.NotFound(deleted.get(ERROR_KEY))
+                raise wz.NotFound(f'Manuscript {manuscript_id} not found.')
 
             return {'message': 'Manuscript deleted successfully',
                     'deleted_manuscript': deleted}
@@ -1172,6 +2005,8 @@ class RolesRead(Resource):
     Returns all available roles for the system in a standardized format.
     """
     @api.response(HTTPStatus.OK, 'Success')
+    @conditional_get(collection_etag(ver.ROLES))
+    @cached_response(tags=[cache.TAG_ROLES])
     def get(self):
         """
         Returns all roles in the format:
@@ -1185,9 +2020,12 @@ class RolesRead(Resource):
         """
         try:
             roles = rls.get_roles()
-            return roles
         except Exception as e:
             handle_request_error('read roles', e)
+        if not roles:
+            # get_roles() also comes back empty when the read fails
+            skip_cache()
+        return roles
 
 
 @api.route(USER_COUNT_EP)
@@ -1293,3 +2131,50 @@ class ManuscriptVersion(Resource):
             return {MANUSCRIPT_VERSION_RESP: manuscript}
         except Exception as e:
             handle_request_error('get manuscript version', e)
+
+
+@api.route(f'{MANUSCRIPT_DIFF_EP}/<manuscript_id>/<int:from_version>'
+           '/<int:to_version>')
+class ManuscriptDiff(Resource):
+    """
+    Show what changed between two versions of a manuscript.
+    """
+    @api.response(HTTPStatus.OK, 'Success')
+    @api.response(HTTPStatus.ACCEPTED, 'Diff is being computed')
+    @api.response(HTTPStatus.NOT_FOUND, 'Version not found')
+    @api.response(HTTPStatus.NOT_ACCEPTABLE, 'Bad mode')
+    @api.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Diff failed')
+    @api.param('mode', 'Diff by "lines" (default) or "words"')
+    def get(self, manuscript_id, from_version, to_version):
+        """
+        Get the diff between two versions. Diffs are computed in the
+        background: until one is ready this returns 202 with a
+        Retry-After header, and the same request should be repeated.
+        A diff that could not be computed returns 500.
+        """
+        try:
+            mode = request.args.get('mode', dff.MODE_LINES)
+            if mode not in dff.MODES:
+                raise wz.NotAcceptable(
+                    f'mode must be one of {", ".join(dff.MODES)}')
+            result = ms.get_diff(manuscript_id, from_version, to_version,
+                                 mode)
+            if result.get(ms.DIFF_STATUS) == dff.STATUS_FAILED:
+                return ({'error': result[ERROR_KEY],
+                         ms.DIFF_STATUS: dff.STATUS_FAILED},
+                        HTTPStatus.INTERNAL_SERVER_ERROR)
+            if ERROR_KEY in result:
+                raise wz.NotFound(result[ERROR_KEY])
+            if result[ms.DIFF_STATUS] == dff.STATUS_PENDING:
+                return ({MANUSCRIPT_DIFF_RESP: None,
+                         ms.DIFF_STATUS: dff.STATUS_PENDING},
+                        HTTPStatus.ACCEPTED,
+                        {'Retry-After': str(DIFF_RETRY_AFTER)})
+            return {MANUSCRIPT_DIFF_RESP: result[ms.DIFF],
+                    ms.DIFF_STATUS: dff.STATUS_DONE}
+        except wz.NotAcceptable as e:
+            return {'error': str(e)}, HTTPStatus.NOT_ACCEPTABLE
+        except wz.NotFound as e:
+            return {'error': str(e)}, HTTPStatus.NOT_FOUND
+        except Exception as e:
+            handle_request_error('diff manuscript versions', e)
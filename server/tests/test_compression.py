@@ -0,0 +1,51 @@
+import gzip
+
+import pytest
+from werkzeug.http import parse_accept_header
+
+import server.compression as cmp
+
+
+def accept(header):
+    return parse_accept_header(header)
+
+
+def test_compress_gzip():
+    body = b'{"title": "Manuscript"}' * 100
+    packed = cmp.compress(body, cmp.GZIP)
+    assert len(packed) < len(body)
+    assert gzip.decompress(packed) == body
+    assert cmp.compress(body, cmp.GZIP) == packed
+
+
+def test_compress_unsupported():
+    with pytest.raises(ValueError):
+        cmp.compress(b'body', 'compress')
+
+
+def test_negotiate():
+    assert cmp.GZIP in cmp.available()
+    assert cmp.negotiate(accept('gzip, deflate')) == cmp.GZIP
+    assert cmp.negotiate(accept('*')) == cmp.available()[0]
+    assert cmp.negotiate(accept('deflate')) is None
+    assert cmp.negotiate(accept('')) is None
+    assert cmp.negotiate(accept('gzip;q=0')) is None
+
+
+def test_negotiate_prefers_available_order(monkeypatch):
+    monkeypatch.setattr(cmp, 'available', lambda: [cmp.BROTLI, cmp.GZIP])
+    assert cmp.negotiate(accept('gzip, br')) == cmp.BROTLI
+    assert cmp.negotiate(accept('gzip, br;q=0.5')) == cmp.GZIP
+
+
+def test_is_compressible():
+    assert cmp.is_compressible('application/json')
+    assert cmp.is_compressible('text/html')
+    assert not cmp.is_compressible('image/png')
+    assert not cmp.is_compressible(None)
+
+
+def test_min_size(monkeypatch):
+    assert cmp.min_size() == cmp.DEFAULT_MIN_SIZE
+    monkeypatch.setenv(cmp.MIN_SIZE_ENV, '10')
+    assert cmp.min_size() == 10
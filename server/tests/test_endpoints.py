@@ -1,16 +1,26 @@
 from http.client import (
+    ACCEPTED,
+    BAD_REQUEST,
+    CONFLICT,
     FORBIDDEN,
+    INTERNAL_SERVER_ERROR,
     NOT_ACCEPTABLE,
     NOT_FOUND,
+    NOT_MODIFIED,
     OK,
+    SERVICE_UNAVAILABLE,
+    UNAUTHORIZED,
 )
 
+import gzip
 from unittest.mock import patch
 
 import pytest
+import data.cache as cache
 import data.text as txt
 import data.db_connect as dbc
 import data.roles as rls
+import server.compression as cmp
 import server.endpoints as ep
 import data.manuscripts as ms
 
@@ -251,6 +261,23 @@ def test_read_roles():
     rls.delete(TEST_ROLE_CODE, testing=True)
 
 
+
+def test_failed_role_reads_not_cached():
+    with patch('data.roles.get_roles', side_effect=RuntimeError('down')):
+        resp = TEST_CLIENT.get(ep.ROLE_READ_EP)
+    assert resp.status_code == SERVICE_UNAVAILABLE
+    # get_roles() swallows DB errors and returns {}
+    with patch('data.roles.get_roles', return_value={}):
+        resp = TEST_CLIENT.get(ep.ROLE_READ_EP)
+        assert resp.json[ep.ROLE_READ_RESP] == 'No Roles found'
+        assert 'ETag' not in resp.headers
+        resp = TEST_CLIENT.get('/roles')
+        assert 'ETag' not in resp.headers
+    resp = TEST_CLIENT.get(ep.ROLE_READ_EP)
+    assert isinstance(resp.json[ep.ROLE_READ_RESP], dict)
+    assert resp.headers['ETag']
+
+
 def test_read_roles_plural():
     """Test the /roles/read endpoint returns roles in correct format"""
     # Create a test role first
@@ -500,10 +527,7 @@ TEST_MANUSCRIPT_ID = "60d21b4667d0d8992e610c85"
 
 def test_delete_manuscript_success():
     """Test successful deletion of a manuscript."""
-    with patch("data.manuscripts.get_manuscript") as mock_get, \
-         patch("data.manuscripts.delete_manuscript") as mock_delete:
-
-        mock_get.return_value = {"_id": TEST_MANUSCRIPT_ID, "state": ms.STATE_SUBMITTED}
+    with patch("data.manuscripts.delete_manuscript") as mock_delete:
         mock_delete.return_value = {"_id": TEST_MANUSCRIPT_ID, "message": "Deleted"}
 
         resp = TEST_CLIENT.delete(f"/manuscript/delete/{TEST_MANUSCRIPT_ID}")
@@ -513,8 +537,8 @@ def test_delete_manuscript_success():
 
 def test_delete_manuscript_not_found():
     """Test deletion attempt when the manuscript is not found."""
-    with patch("data.manuscripts.get_manuscript") as mock_get:
-        mock_get.return_value = None
+    with patch("data.manuscripts.delete_manuscript") as mock_delete:
+        mock_delete.return_value = {ms.ERROR_KEY: ms.NOT_FOUND_MESSAGE}
 
         resp = TEST_CLIENT.delete(f"/manuscript/delete/{TEST_MANUSCRIPT_ID}")
         assert resp.status_code == NOT_FOUND
@@ -528,8 +552,8 @@ def test_delete_manuscript_not_found():
 
 def test_delete_manuscript_published():
     """Test deletion attempt of a published manuscript, which should be forbidden."""
-    with patch("data.manuscripts.get_manuscript") as mock_get:
-        mock_get.return_value = {"_id": TEST_MANUSCRIPT_ID, "state": ms.STATE_PUBLISHED}
+    with patch("data.manuscripts.delete_manuscript") as mock_delete:
+        mock_delete.return_value = {ms.ERROR_KEY: ms.PUBLISHED_DELETE_MESSAGE}
 
         resp = TEST_CLIENT.delete(f"/manuscript/delete/{TEST_MANUSCRIPT_ID}")
         assert resp.status_code == FORBIDDEN
@@ -848,4 +872,639 @@ def test_remove_referee():
         TEST_CLIENT.delete(f'{ep.USER_DELETE_EP}/{referee["email"]}')
         TEST_CLIENT.delete(f'{ep.USER_DELETE_EP}/{editor["email"]}')
 
-    
\ No newline at end of file
+    
+def make_docx(paragraphs):
+    """Build a minimal .docx file holding the given paragraphs."""
+    import io
+    import zipfile
+    import data.docx_text as docx
+    body = ''.join(f'<w:p><w:r><w:t>{p}</w:t></w:r></w:p>' for p in paragraphs)
+    xml = (f'<w:document xmlns:w="{docx.W_NS}"><w:body>{body}</w:body>'
+           '</w:document>')
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as archive:
+        archive.writestr(docx.DOCUMENT_PART, xml)
+    return io.BytesIO(buf.getvalue())
+
+def test_upload_manuscript():
+    import data.submissions as sub
+    form = {
+        ms.TITLE: 'Uploaded Manuscript',
+        ms.AUTHOR: 'Test Author',
+        ms.AUTHOR_EMAIL: 'author@test.com',
+        'file': (make_docx(['Abstract: Uploaded.', 'Body']), 'paper.docx'),
+    }
+    resp = TEST_CLIENT.put(ep.MANUSCRIPT_UPLOAD_EP, data=form,
+                           content_type='multipart/form-data')
+    assert resp.status_code == OK
+    manuscript_id = resp.json['manuscript']['_id']
+    job_id = resp.json[ep.JOB_ID_KEY]
+    try:
+        sub.wait_for_job(job_id, 30)
+        resp = TEST_CLIENT.get(f'{ep.MANUSCRIPT_JOB_EP}/{job_id}')
+        assert resp.status_code == OK
+        assert resp.json[ep.MANUSCRIPT_JOB_RESP][sub.STATUS] == sub.STATUS_DONE
+        manuscript = ms.get_manuscript(manuscript_id)
+        assert manuscript[ms.ABSTRACT] == 'Uploaded.'
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{manuscript_id}')
+
+def test_upload_manuscript_not_docx():
+    form = {
+        ms.TITLE: 'Bad Upload',
+        ms.AUTHOR: 'Test Author',
+        ms.AUTHOR_EMAIL: 'author@test.com',
+        'file': (make_docx(['x']), 'paper.pdf'),
+    }
+    resp = TEST_CLIENT.put(ep.MANUSCRIPT_UPLOAD_EP, data=form,
+                           content_type='multipart/form-data')
+    assert resp.status_code == NOT_ACCEPTABLE
+
+def test_upload_manuscript_missing_fields():
+    resp = TEST_CLIENT.put(ep.MANUSCRIPT_UPLOAD_EP, data={
+        ms.TITLE: 'No Author',
+        'file': (make_docx(['x']), 'paper.docx'),
+    }, content_type='multipart/form-data')
+    assert resp.status_code == BAD_REQUEST
+    assert ms.AUTHOR_EMAIL in resp.json['message']
+
+def test_upload_manuscript_without_abstract(monkeypatch):
+    import data.submissions as sub
+    monkeypatch.setattr(ms, 'MIN_ABSTRACT_LENGTH', 10)
+    form = {
+        ms.TITLE: 'Abstract Later',
+        ms.AUTHOR: 'Test Author',
+        ms.AUTHOR_EMAIL: 'author@test.com',
+        'file': (make_docx(['Abstract: Taken from the document.', 'Body']),
+                 'paper.docx'),
+    }
+    resp = TEST_CLIENT.put(ep.MANUSCRIPT_UPLOAD_EP, data=form,
+                           content_type='multipart/form-data')
+    assert resp.status_code == OK
+    manuscript_id = resp.json['manuscript']['_id']
+    job_id = resp.json[ep.JOB_ID_KEY]
+    try:
+        sub.wait_for_job(job_id, 30)
+        resp = TEST_CLIENT.get(f'{ep.MANUSCRIPT_JOB_EP}/{job_id}')
+        assert resp.json[ep.MANUSCRIPT_JOB_RESP][sub.STATUS] == sub.STATUS_DONE
+        manuscript = ms.get_manuscript(manuscript_id)
+        assert manuscript[ms.ABSTRACT] == 'Taken from the document.'
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{manuscript_id}')
+
+def test_upload_manuscript_keeps_typed_abstract(monkeypatch):
+    import data.submissions as sub
+    form = {
+        ms.TITLE: 'Abstract Typed',
+        ms.AUTHOR: 'Test Author',
+        ms.AUTHOR_EMAIL: 'author@test.com',
+        ms.ABSTRACT: 'Typed into the form.',
+        'file': (make_docx(['Abstract: Taken from the document.', 'Body']),
+                 'paper.docx'),
+    }
+    monkeypatch.setattr(ms, 'MIN_ABSTRACT_LENGTH', 100)
+    resp = TEST_CLIENT.put(ep.MANUSCRIPT_UPLOAD_EP, data=form,
+                           content_type='multipart/form-data')
+    assert resp.status_code == NOT_ACCEPTABLE
+    monkeypatch.setattr(ms, 'MIN_ABSTRACT_LENGTH', 0)
+    form['file'] = (make_docx(['Abstract: Taken from the document.',
+                               'Body']), 'paper.docx')
+    resp = TEST_CLIENT.put(ep.MANUSCRIPT_UPLOAD_EP, data=form,
+                           content_type='multipart/form-data')
+    assert resp.status_code == OK
+    manuscript_id = resp.json['manuscript']['_id']
+    job_id = resp.json[ep.JOB_ID_KEY]
+    try:
+        sub.wait_for_job(job_id, 30)
+        resp = TEST_CLIENT.get(f'{ep.MANUSCRIPT_JOB_EP}/{job_id}')
+        assert resp.json[ep.MANUSCRIPT_JOB_RESP][sub.STATUS] == sub.STATUS_DONE
+        manuscript = ms.get_manuscript(manuscript_id)
+        assert manuscript[ms.ABSTRACT] == 'Typed into the form.'
+        assert manuscript[ms.TEXT]
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{manuscript_id}')
+
+def test_upload_manuscript_queue_failure():
+    form = {
+        ms.TITLE: 'Never Queued',
+        ms.AUTHOR: 'Test Author',
+        ms.AUTHOR_EMAIL: 'author@test.com',
+        'file': (make_docx(['Body']), 'paper.docx'),
+    }
+    with patch('data.submissions.submit_docx',
+               side_effect=RuntimeError('pool is down')):
+        resp = TEST_CLIENT.put(ep.MANUSCRIPT_UPLOAD_EP, data=form,
+                               content_type='multipart/form-data')
+    assert resp.status_code == NOT_ACCEPTABLE
+    assert not dbc.fetch_one(ms.MANUSCRIPTS_COLLECTION,
+                             {ms.TITLE: 'Never Queued'})
+
+def test_get_job_not_found():
+    resp = TEST_CLIENT.get(f'{ep.MANUSCRIPT_JOB_EP}/60d21b4667d0d8992e610c85')
+    assert resp.status_code == NOT_FOUND
+
+def test_manuscript_history():
+    _id = TEST_CLIENT.put('/manuscript/create', json=TEST_MANUSCRIPT).json['manuscript']['_id']
+    try:
+        resp = TEST_CLIENT.get(f'{ep.MANUSCRIPT_HISTORY_EP}/{_id}?limit=5')
+        assert resp.status_code == OK
+        page = resp.json[ep.MANUSCRIPT_HISTORY_RESP]
+        assert len(page['history']) == 1
+        assert page['history'][0]['state'] == ms.STATE_SUBMITTED
+        assert page['next'] is None
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{_id}')
+
+def test_manuscript_batch():
+    editor = {
+        "name": "Batch Editor",
+        "email": "batch_editor@test.com",
+        "password": "pass",
+        "affiliation": "Test Uni",
+        "roleCodes": ["ED"]
+    }
+    TEST_CLIENT.put(ep.USERS_EP, json=editor)
+    TEST_CLIENT.put(ep.USER_UPDATE_EP, json={
+        "name": editor["name"],
+        "email": editor["email"],
+        "affiliation": editor["affiliation"],
+        "roleCodes": ["ED"]
+    })
+    _id = TEST_CLIENT.put('/manuscript/create', json=TEST_MANUSCRIPT).json['manuscript']['_id']
+    try:
+        items = [{"manuscript_id": _id, "action": ms.ACTION_REJECT}]
+        resp = TEST_CLIENT.put(ep.MANUSCRIPT_BATCH_EP, json={"items": items},
+                               headers={"X-User-Email": editor["email"]})
+        assert resp.status_code == OK
+        result = resp.json[ep.MANUSCRIPT_BATCH_RESP][0]
+        assert result["state"] == ms.STATE_REJECTED
+
+        resp = TEST_CLIENT.put(ep.MANUSCRIPT_BATCH_EP, json={"items": items},
+                               headers={"X-User-Email": "nobody@test.com"})
+        assert resp.status_code == FORBIDDEN
+
+        resp = TEST_CLIENT.put(ep.MANUSCRIPT_BATCH_EP, json={"items": "x"},
+                               headers={"X-User-Email": editor["email"]})
+        assert resp.status_code == NOT_ACCEPTABLE
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{_id}')
+        TEST_CLIENT.delete(f'{ep.USER_DELETE_EP}/{editor["email"]}')
+
+def test_withdraw_only_author():
+    _id = TEST_CLIENT.put('/manuscript/create', json=TEST_MANUSCRIPT).json['manuscript']['_id']
+    try:
+        resp = TEST_CLIENT.put(f'/manuscript/withdraw/{_id}',
+                               headers={"X-User-Email": "someone@test.com"})
+        assert resp.status_code == FORBIDDEN
+        resp = TEST_CLIENT.put(
+            f'/manuscript/withdraw/{_id}',
+            headers={"X-User-Email": TEST_MANUSCRIPT['author_email']})
+        assert resp.status_code == OK
+        assert resp.json['Manuscript']['state'] == ms.STATE_WITHDRAWN
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{_id}')
+
+def test_complete_wrong_stage():
+    _id = TEST_CLIENT.put('/manuscript/create', json=TEST_MANUSCRIPT).json['manuscript']['_id']
+    try:
+        resp = TEST_CLIENT.put(
+            f'/manuscript/complete/{_id}',
+            headers={"X-User-Email": TEST_MANUSCRIPT['author_email']})
+        assert resp.status_code == NOT_ACCEPTABLE
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{_id}')
+
+def test_manuscript_actions():
+    _id = TEST_CLIENT.put('/manuscript/create', json=TEST_MANUSCRIPT).json['manuscript']['_id']
+    author = {"X-User-Email": TEST_MANUSCRIPT['author_email']}
+    try:
+        resp = TEST_CLIENT.get(f'{ep.MANUSCRIPT_ACTIONS_EP}/{_id}',
+                               headers=author)
+        assert resp.status_code == OK
+        assert resp.json[ep.MANUSCRIPT_ACTIONS_RESP] == [ms.ACTION_WITHDRAW]
+
+        resp = TEST_CLIENT.post(ep.MANUSCRIPTS_ACTIONS_EP, headers=author,
+                                json={ep.MANUSCRIPT_IDS_KEY: [_id]})
+        assert resp.status_code == OK
+        assert resp.json[ep.MANUSCRIPT_ACTIONS_RESP][_id] == [ms.ACTION_WITHDRAW]
+
+        resp = TEST_CLIENT.post(ep.MANUSCRIPTS_ACTIONS_EP, headers=author,
+                                json={ep.MANUSCRIPT_IDS_KEY: _id})
+        assert resp.status_code == NOT_ACCEPTABLE
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{_id}')
+
+def test_manuscript_actions_not_found():
+    resp = TEST_CLIENT.get(f'{ep.MANUSCRIPT_ACTIONS_EP}/{TEST_MANUSCRIPT_ID}')
+    assert resp.status_code == NOT_FOUND
+
+def test_inbox():
+    resp = TEST_CLIENT.get(ep.INBOX_EP)
+    assert resp.status_code == UNAUTHORIZED
+    _id = TEST_CLIENT.put('/manuscript/create', json=TEST_MANUSCRIPT).json['manuscript']['_id']
+    try:
+        ms.editor_move(_id, ms.STATE_AUTHOR_REVISIONS, ep.TEST_EMAIL_EDITOR)
+        resp = TEST_CLIENT.get(
+            ep.INBOX_EP, headers={"X-User-Email": TEST_MANUSCRIPT['author_email']})
+        assert resp.status_code == OK
+        inbox = resp.json[ep.INBOX_RESP]
+        assert [e['manuscript_id'] for e in inbox['items']] == [_id]
+        assert inbox['counts'] == {ms.STATE_AUTHOR_REVISIONS: 1}
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{_id}')
+
+def test_referee_queue_and_review_check():
+    _id = TEST_CLIENT.put('/manuscript/create', json=TEST_MANUSCRIPT).json['manuscript']['_id']
+    try:
+        ms.assign_referee(_id, "queued@test.com")
+        resp = TEST_CLIENT.get(f'{ep.REFEREE_QUEUE_EP}/queued@test.com?pending=true')
+        assert resp.status_code == OK
+        assert _id in resp.json[ep.MANUSCRIPT_RESPONSE]
+
+        resp = TEST_CLIENT.post(f'/manuscript/review/{_id}',
+                                json={"report": "x", "verdict": "ACCEPT"},
+                                headers={"X-User-Email": "stranger@test.com"})
+        assert resp.status_code == FORBIDDEN
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{_id}')
+
+def test_referee_suggest_and_auto_assign():
+    import data.referee_load as rl
+    editor = {"name": "Auto Editor", "email": "autoeditor@test.com",
+              "password": "pass", "affiliation": "Test Uni", "roles": ["ED"]}
+    TEST_CLIENT.put(ep.USERS_EP, json=editor)
+    TEST_CLIENT.put(ep.USER_UPDATE_EP, json={
+        "name": editor["name"],
+        "email": editor["email"],
+        "affiliation": editor["affiliation"],
+        "roleCodes": ["ED"]
+    })
+    _id = TEST_CLIENT.put('/manuscript/create', json=TEST_MANUSCRIPT).json['manuscript']['_id']
+    try:
+        rl.rebuild(['auto@test.com', 'busy@test.com'], {'busy@test.com': 3})
+        resp = TEST_CLIENT.get(f'{ep.REFEREE_SUGGEST_EP}/{_id}?count=1')
+        assert resp.status_code == OK
+        assert resp.json[ep.REFEREE_SUGGEST_RESP] == ['auto@test.com']
+
+        resp = TEST_CLIENT.put(f'{ep.REFEREE_AUTO_EP}/{_id}',
+                               json={ep.REFEREE_COUNT_KEY: 1},
+                               headers={"X-User-Email": editor["email"]})
+        assert resp.status_code == OK
+        referees = resp.json[ep.MANUSCRIPT_REFEREE_RESP][ms.REFEREES]
+        assert [r[ms.REFEREE_EMAIL] for r in referees] == ['auto@test.com']
+        assert rl.load_of('auto@test.com') == 1
+
+        resp = TEST_CLIENT.get(f'{ep.REFEREE_SUGGEST_EP}/{_id}?count=0')
+        assert resp.status_code == NOT_ACCEPTABLE
+
+        with patch('data.manuscripts.suggest_referees', return_value=[]):
+            resp = TEST_CLIENT.put(f'{ep.REFEREE_AUTO_EP}/{_id}',
+                                   json={ep.REFEREE_COUNT_KEY: 1},
+                                   headers={"X-User-Email": editor["email"]})
+        assert resp.status_code == CONFLICT
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{_id}')
+        TEST_CLIENT.delete(f'{ep.USER_DELETE_EP}/{editor["email"]}')
+        rl.invalidate()
+
+def test_referee_recommend():
+    _id = TEST_CLIENT.put('/manuscript/create', json=TEST_MANUSCRIPT).json['manuscript']['_id']
+    try:
+        resp = TEST_CLIENT.get(f'{ep.REFEREE_RECOMMEND_EP}/{_id}?count=3')
+        assert resp.status_code == OK
+        assert isinstance(resp.json[ep.REFEREE_RECOMMEND_RESP], list)
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{_id}')
+    resp = TEST_CLIENT.get(f'{ep.REFEREE_RECOMMEND_EP}/{TEST_MANUSCRIPT_ID}')
+    assert resp.status_code == NOT_FOUND
+
+def test_search():
+    resp = TEST_CLIENT.get(f'{ep.SEARCH_EP}?q=')
+    assert resp.status_code == NOT_ACCEPTABLE
+    _id = TEST_CLIENT.put('/manuscript/create', json=TEST_MANUSCRIPT).json['manuscript']['_id']
+    try:
+        title_word = TEST_MANUSCRIPT['title'].split()[-1]
+        resp = TEST_CLIENT.get(f'{ep.SEARCH_EP}?q={title_word}&kind=manuscript')
+        assert resp.status_code == OK
+        assert _id in [item['id'] for item in resp.json[ep.SEARCH_RESP]['items']]
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{_id}')
+
+
+def test_user_suggest():
+    """
+    Test autocompleting users by name
+    """
+    test = {
+        "name": "Suggestible Person",
+        "email": "suggest@user.com",
+        "affiliation": "Test Uni",
+    }
+    resp = TEST_CLIENT.put(ep.USERS_EP, json=test)
+    assert resp.status_code == OK
+    try:
+        resp = TEST_CLIENT.get(f'{ep.USER_SUGGEST_EP}?q=suggestib')
+        assert resp.status_code == OK
+        found = resp.get_json()[ep.USER_SUGGEST_RESP]
+        assert [user['email'] for user in found] == [test['email']]
+        assert 'password' not in found[0]
+        resp = TEST_CLIENT.get(
+            f'{ep.USER_SUGGEST_EP}?q=suggestib&role=ED&limit=5')
+        assert resp.get_json()[ep.USER_SUGGEST_RESP] == []
+    finally:
+        TEST_CLIENT.delete(f'{ep.USER_DELETE_EP}/{test["email"]}')
+
+
+def test_manuscript_facets():
+    resp = TEST_CLIENT.get(f'{ep.MANUSCRIPT_FACETS_EP}?since=2024-13')
+    assert resp.status_code == NOT_ACCEPTABLE
+    _id = TEST_CLIENT.put('/manuscript/create', json=TEST_MANUSCRIPT).json['manuscript']['_id']
+    try:
+        tags = ms.wait_for_tags(_id, timeout=30)
+        assert tags
+        resp = TEST_CLIENT.get(f'{ep.MANUSCRIPT_FACETS_EP}?tag={tags[0]}')
+        assert resp.status_code == OK
+        facets = resp.json[ep.MANUSCRIPT_FACETS_RESP]
+        assert facets['states'] == {ms.STATE_SUBMITTED: 1}
+        resp = TEST_CLIENT.get(f'/manuscripts?tag={tags[0]}&state={ms.STATE_SUBMITTED}')
+        assert list(resp.json[ep.MANUSCRIPT_RESPONSE]) == [_id]
+        resp = TEST_CLIENT.get(f'/manuscripts?tag={tags[0]}&state={ms.STATE_REJECTED}')
+        assert resp.json['count'] == 0
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{_id}')
+
+
+def test_stats():
+    resp = TEST_CLIENT.get(f'{ep.STATS_EP}?since=2024-02-30')
+    assert resp.status_code == NOT_ACCEPTABLE
+    resp = TEST_CLIENT.get(f'{ep.STATS_DAILY_EP}?until=yesterday')
+    assert resp.status_code == NOT_ACCEPTABLE
+    _id = TEST_CLIENT.put('/manuscript/create', json=TEST_MANUSCRIPT).json['manuscript']['_id']
+    try:
+        resp = TEST_CLIENT.get(ep.STATS_EP)
+        assert resp.status_code == OK
+        stats = resp.json[ep.STATS_RESP]
+        assert stats['submissions'] >= 1
+        assert 'acceptance_rate' in stats
+        resp = TEST_CLIENT.get(ep.STATS_DAILY_EP)
+        assert resp.status_code == OK
+        assert resp.json[ep.STATS_DAILY_RESP][-1]['submissions'] >= 1
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{_id}')
+
+
+def test_turnaround():
+    resp = TEST_CLIENT.get(f'{ep.TURNAROUND_EP}?metric=speed')
+    assert resp.status_code == NOT_ACCEPTABLE
+    resp = TEST_CLIENT.get(f'{ep.TURNAROUND_EP}?scope=planet')
+    assert resp.status_code == NOT_ACCEPTABLE
+    resp = TEST_CLIENT.get(f'{ep.TURNAROUND_EP}?metric=decision')
+    assert resp.status_code == OK
+    assert {'count', 'p50', 'p90', 'p99'} <= set(resp.json[ep.TURNAROUND_RESP])
+    resp = TEST_CLIENT.get(f'{ep.TURNAROUND_EP}?scope=referee')
+    assert resp.status_code == OK
+    assert isinstance(resp.json[ep.TURNAROUND_RESP], dict)
+
+
+def test_archive_and_restore():
+    resp = TEST_CLIENT.put(ep.MANUSCRIPTS_ARCHIVE_EP, json={},
+                           headers={"X-User-Email": "nobody@test.com"})
+    assert resp.status_code == FORBIDDEN
+    editor = {"name": "Archive Editor", "email": "archiveeditor@test.com",
+              "password": "pass", "affiliation": "Test Uni", "roles": ["ED"]}
+    TEST_CLIENT.put(ep.USERS_EP, json=editor)
+    TEST_CLIENT.put(ep.USER_UPDATE_EP, json={
+        "name": editor["name"],
+        "email": editor["email"],
+        "affiliation": editor["affiliation"],
+        "roleCodes": ["ED"]
+    })
+    headers = {"X-User-Email": editor["email"]}
+    try:
+        resp = TEST_CLIENT.put(ep.MANUSCRIPTS_ARCHIVE_EP,
+                               json={ep.ARCHIVE_DAYS_KEY: -1},
+                               headers=headers)
+        assert resp.status_code == NOT_ACCEPTABLE
+        resp = TEST_CLIENT.put(ep.MANUSCRIPTS_ARCHIVE_EP,
+                               json={ep.ARCHIVE_DAYS_KEY: 3650},
+                               headers=headers)
+        assert resp.status_code == OK
+        assert isinstance(resp.json[ep.MANUSCRIPTS_ARCHIVE_RESP], int)
+        resp = TEST_CLIENT.put(
+            f'{ep.MANUSCRIPT_RESTORE_EP}/{TEST_MANUSCRIPT_ID}',
+            headers=headers)
+        assert resp.status_code == NOT_FOUND
+    finally:
+        TEST_CLIENT.delete(f'{ep.USER_DELETE_EP}/{editor["email"]}')
+
+
+def test_purge_manuscripts():
+    resp = TEST_CLIENT.put(ep.MANUSCRIPTS_PURGE_EP,
+                           json={ep.PURGE_AUTHOR_KEY: "spam@test.com"},
+                           headers={"X-User-Email": "nobody@test.com"})
+    assert resp.status_code == FORBIDDEN
+    editor = {"name": "Purge Editor", "email": "purgeeditor@test.com",
+              "password": "pass", "affiliation": "Test Uni", "roles": ["ED"]}
+    TEST_CLIENT.put(ep.USERS_EP, json=editor)
+    TEST_CLIENT.put(ep.USER_UPDATE_EP, json={
+        "name": editor["name"],
+        "email": editor["email"],
+        "affiliation": editor["affiliation"],
+        "roleCodes": ["ED"]
+    })
+    headers = {"X-User-Email": editor["email"]}
+    spam = {**TEST_MANUSCRIPT, "author_email": "spam@test.com"}
+    ids = [TEST_CLIENT.put('/manuscript/create',
+                           json={**spam, "title": f"Spam {i}"}
+                           ).json['manuscript']['_id']
+           for i in range(2)]
+    try:
+        resp = TEST_CLIENT.put(ep.MANUSCRIPTS_PURGE_EP, json={},
+                               headers=headers)
+        assert resp.status_code == NOT_ACCEPTABLE
+        resp = TEST_CLIENT.put(ep.MANUSCRIPTS_PURGE_EP,
+                               json={ep.PURGE_IDS_KEY: ["nope"]},
+                               headers=headers)
+        assert resp.status_code == NOT_ACCEPTABLE
+        resp = TEST_CLIENT.put(ep.MANUSCRIPTS_PURGE_EP,
+                               json={ep.PURGE_AUTHOR_KEY: "spam@test.com"},
+                               headers=headers)
+        assert resp.status_code == OK
+        assert sorted(resp.json[ep.MANUSCRIPTS_PURGE_RESP]) == sorted(ids)
+        for _id in ids:
+            resp = TEST_CLIENT.delete(f'/manuscript/delete/{_id}')
+            assert resp.status_code == NOT_FOUND
+    finally:
+        for _id in ids:
+            TEST_CLIENT.delete(f'/manuscript/delete/{_id}')
+        TEST_CLIENT.delete(f'{ep.USER_DELETE_EP}/{editor["email"]}')
+
+
+def test_manuscript_diff():
+    resp = TEST_CLIENT.put('/manuscript/create', json={
+        **TEST_MANUSCRIPT, "title": "Diff Me", "text": "alpha beta"})
+    _id = resp.json['manuscript']['_id']
+    try:
+        TEST_CLIENT.put(f'{ep.MANUSCRIPT_TEXT_EP}/{_id}', json={
+            "new_text": "alpha gamma",
+            "new_abstract": TEST_MANUSCRIPT["abstract"],
+            "author_email": TEST_MANUSCRIPT["author_email"],
+        })
+        url = f'{ep.MANUSCRIPT_DIFF_EP}/{_id}/1/2?mode=words'
+        resp = TEST_CLIENT.get(url)
+        if resp.status_code == ACCEPTED:
+            assert resp.headers['Retry-After']
+            ms.dff.wait_for((_id, 1, 2, ms.dff.MODE_WORDS), timeout=30)
+            resp = TEST_CLIENT.get(url)
+        assert resp.status_code == OK
+        diff = resp.json[ep.MANUSCRIPT_DIFF_RESP]
+        assert diff[ms.dff.HUNKS][0][ms.dff.NEW] == ['gamma']
+        resp = TEST_CLIENT.get(f'{ep.MANUSCRIPT_DIFF_EP}/{_id}/1/2?mode=x')
+        assert resp.status_code == NOT_ACCEPTABLE
+        resp = TEST_CLIENT.get(f'{ep.MANUSCRIPT_DIFF_EP}/{_id}/1/9')
+        assert resp.status_code == NOT_FOUND
+        with patch('data.diffs.status', return_value=(
+                ms.dff.STATUS_FAILED, 'Could not compute diff')):
+            resp = TEST_CLIENT.get(url)
+        assert resp.status_code == INTERNAL_SERVER_ERROR
+        assert resp.json[ms.DIFF_STATUS] == ms.dff.STATUS_FAILED
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{_id}')
+
+
+def test_cached_text_read():
+    text = {"key": "cache_key", "title": "Cached", "text": "Before"}
+    TEST_CLIENT.post(ep.TEXT_CREATE_EP, json=text)
+    url = f'{ep.TEXT_READ_EP}/{text["key"]}'
+    try:
+        resp = TEST_CLIENT.get(url)
+        assert resp.status_code == OK
+        resp = TEST_CLIENT.get(url)
+        assert resp.headers[ep.CACHE_HEADER] == 'HIT'
+        assert resp.json[ep.TEXT_READ_RESP]["text"] == "Before"
+        TEST_CLIENT.put(ep.TEXT_UPDATE_EP, json={**text, "text": "After"})
+        resp = TEST_CLIENT.get(url)
+        assert resp.headers[ep.CACHE_HEADER] == 'MISS'
+        assert resp.json[ep.TEXT_READ_RESP]["text"] == "After"
+    finally:
+        txt.delete(text["key"], testing=True)
+    assert TEST_CLIENT.get(url).status_code == NOT_FOUND
+
+
+def test_conditional_get():
+    text = {"key": "etag_key", "title": "Tagged", "text": "Before"}
+    TEST_CLIENT.post(ep.TEXT_CREATE_EP, json=text)
+    url = f'{ep.TEXT_READ_EP}/{text["key"]}'
+    try:
+        resp = TEST_CLIENT.get(url)
+        etag = resp.headers['ETag']
+        resp = TEST_CLIENT.get(url, headers={'If-None-Match': etag})
+        assert resp.status_code == NOT_MODIFIED
+        assert resp.data == b''
+        TEST_CLIENT.put(ep.TEXT_UPDATE_EP, json={**text, "text": "After"})
+        resp = TEST_CLIENT.get(url, headers={'If-None-Match': etag})
+        assert resp.status_code == OK
+        assert resp.headers['ETag'] != etag
+        assert resp.json[ep.TEXT_READ_RESP]["text"] == "After"
+    finally:
+        txt.delete(text["key"], testing=True)
+
+    resp = TEST_CLIENT.put('/manuscript/create', json={
+        **TEST_MANUSCRIPT, "title": "ETag Me"})
+    _id = resp.json['manuscript']['_id']
+    try:
+        resp = TEST_CLIENT.get(f'{ep.MANUSCRIPT_EP}/{_id}')
+        etag = resp.headers['ETag']
+        resp = TEST_CLIENT.get(f'{ep.MANUSCRIPT_EP}/{_id}',
+                               headers={'If-None-Match': etag})
+        assert resp.status_code == NOT_MODIFIED
+        ms.assign_editor(_id, "editor@test.com")
+        resp = TEST_CLIENT.get(f'{ep.MANUSCRIPT_EP}/{_id}',
+                               headers={'If-None-Match': etag})
+        assert resp.status_code == OK
+        assert resp.json[ep.MANUSCRIPT_DETAIL_RESP]['editor'] == (
+            "editor@test.com")
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{_id}')
+
+
+def test_compression(monkeypatch):
+    text = {"key": "gzip_key", "title": "Long", "text": "Words " * 1000}
+    TEST_CLIENT.post(ep.TEXT_CREATE_EP, json=text)
+    url = f'{ep.TEXT_READ_EP}/{text["key"]}'
+    gzipped = {'Accept-Encoding': 'gzip'}
+    try:
+        plain = TEST_CLIENT.get(url)
+        assert 'Content-Encoding' not in plain.headers
+        assert 'Accept-Encoding' in plain.headers['Vary']
+        resp = TEST_CLIENT.get(url, headers=gzipped)
+        assert resp.headers['Content-Encoding'] == cmp.GZIP
+        assert resp.headers['ETag'] == (
+            plain.headers['ETag'][:-1] + '-gzip"')
+        assert int(resp.headers['Content-Length']) == len(resp.data)
+        assert len(resp.data) * 5 < len(plain.data)
+        assert gzip.decompress(resp.data) == plain.data
+        assert any(entry[cache.VARIANTS].get(cmp.GZIP) == resp.data
+                   for key, entry in cache.entries.items()
+                   if key.startswith(url))
+        again = TEST_CLIENT.get(url, headers=gzipped)
+        assert again.headers[ep.CACHE_HEADER] == 'HIT'
+        assert again.data == resp.data
+        resp = TEST_CLIENT.get(url, headers={
+            **gzipped, 'If-None-Match': resp.headers['ETag']})
+        assert resp.status_code == NOT_MODIFIED
+    finally:
+        txt.delete(text["key"], testing=True)
+
+    resp = TEST_CLIENT.get(ep.JOURNAL_NAME_EP, headers=gzipped)
+    assert 'Content-Encoding' not in resp.headers
+    monkeypatch.setenv(cmp.MIN_SIZE_ENV, '0')
+    resp = TEST_CLIENT.get(ep.JOURNAL_NAME_EP, headers=gzipped)
+    assert resp.headers['Content-Encoding'] == cmp.GZIP
+    resp = TEST_CLIENT.get(ep.HELLO_EP, headers=gzipped)
+    assert 'Content-Encoding' not in resp.headers
+
+
+def test_state_moves_and_action_errors():
+    import werkzeug.exceptions as wz
+    editor = {"name": "State Editor", "email": "stateeditor@test.com",
+              "password": "pass", "affiliation": "Test Uni", "roles": ["ED"]}
+    TEST_CLIENT.put(ep.USERS_EP, json=editor)
+    TEST_CLIENT.put(ep.USER_UPDATE_EP, json={
+        "name": editor["name"],
+        "email": editor["email"],
+        "affiliation": editor["affiliation"],
+        "roleCodes": ["ED"]
+    })
+    headers = {"X-User-Email": editor["email"]}
+    _id = TEST_CLIENT.put('/manuscript/create', json={
+        **TEST_MANUSCRIPT, "title": "Editor Withdrawn"}
+    ).json['manuscript']['_id']
+    try:
+        resp = TEST_CLIENT.put(f'/manuscript/withdraw/{_id}',
+                               headers=headers)
+        assert resp.status_code == FORBIDDEN
+        # Withdrawing is the author's action, but editors may move there
+        resp = TEST_CLIENT.put(f'{ep.MANUSCRIPT_STATE_EP}/{_id}',
+                               json={"state": ms.STATE_WITHDRAWN},
+                               headers=headers)
+        assert resp.status_code == OK
+        assert resp.json[ep.MANUSCRIPT_STATE_RESP][ms.STATE] == (
+            ms.STATE_WITHDRAWN)
+        resp = TEST_CLIENT.put(f'/manuscript/withdraw/{_id}',
+                               headers=headers)
+        assert resp.status_code == NOT_ACCEPTABLE
+        resp = TEST_CLIENT.put(f'/manuscript/editor-move/{_id}',
+                               json={"state": "NOWHERE"}, headers=headers)
+        assert resp.status_code == NOT_ACCEPTABLE
+        with pytest.raises(wz.NotAcceptable):
+            ep.dispatch_action(_id, ms.ACTION_ACCEPT, editor["email"])
+        with patch('data.manuscripts.process_manuscript_action',
+                   return_value={ms.ERROR_KEY: ms.ARCHIVED_MESSAGE}):
+            resp = TEST_CLIENT.put(f'/manuscript/editor-move/{_id}',
+                                   json={"state": ms.STATE_SUBMITTED},
+                                   headers=headers)
+        assert resp.status_code == CONFLICT
+    finally:
+        TEST_CLIENT.delete(f'/manuscript/delete/{_id}')
+        TEST_CLIENT.delete(f'{ep.USER_DELETE_EP}/{editor["email"]}')